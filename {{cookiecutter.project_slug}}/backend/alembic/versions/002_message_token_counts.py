@@ -0,0 +1,29 @@
+"""Add per-message token counts and a conversation history index.
+
+Revision ID: 002_message_token_counts
+Revises: 001_initial
+Create Date: 2024-06-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '002_message_token_counts'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('token_count', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_messages_conversation_created', 'messages', ['conversation_id', 'created_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_created', table_name='messages')
+    op.drop_column('messages', 'token_count')
@@ -0,0 +1,95 @@
+"""Add running token totals to messages and conversations.
+
+Revision ID: 003_conversation_token_totals
+Revises: 002_message_token_counts
+Create Date: 2024-07-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '003_conversation_token_totals'
+down_revision: Union[str, None] = '002_message_token_counts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows per UPDATE batch of the SQLite backfill
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('cumulative_tokens', sa.Integer(), nullable=True))
+    op.add_column(
+        'conversations',
+        sa.Column('total_tokens', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Backfill: estimate missing counts (~4 characters per token), then running totals
+    op.execute(
+        "UPDATE messages SET token_count = LENGTH(content) / 4 WHERE token_count IS NULL"
+    )
+    _backfill_cumulative_tokens()
+    op.execute(
+        """
+        UPDATE conversations SET total_tokens = COALESCE((
+            SELECT SUM(token_count) FROM messages
+            WHERE messages.conversation_id = conversations.id
+        ), 0)
+        """
+    )
+
+    op.create_index(
+        'ix_messages_conversation_cumulative',
+        'messages',
+        ['conversation_id', 'cumulative_tokens'],
+        unique=False,
+    )
+
+
+def _backfill_cumulative_tokens() -> None:
+    """Set each message's running total; the window is computed once, not per row."""
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        op.execute(
+            """
+            UPDATE messages SET cumulative_tokens = running.total
+            FROM (
+                SELECT id, SUM(token_count) OVER (
+                    PARTITION BY conversation_id ORDER BY created_at, id
+                ) AS total
+                FROM messages
+            ) AS running
+            WHERE running.id = messages.id
+            """
+        )
+        return
+
+    # SQLite: accumulate in one ordered pass and write back in batches
+    rows = bind.execute(
+        sa.text(
+            "SELECT id, conversation_id, token_count FROM messages "
+            "ORDER BY conversation_id, created_at, id"
+        )
+    )
+    update = sa.text("UPDATE messages SET cumulative_tokens = :total WHERE id = :id")
+    batch = []
+    conversation_id, total = None, 0
+    for message_id, message_conversation_id, token_count in rows.fetchall():
+        if message_conversation_id != conversation_id:
+            conversation_id, total = message_conversation_id, 0
+        total += token_count or 0
+        batch.append({"id": message_id, "total": total})
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            bind.execute(update, batch)
+            batch = []
+    if batch:
+        bind.execute(update, batch)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_cumulative', table_name='messages')
+    op.drop_column('conversations', 'total_tokens')
+    op.drop_column('messages', 'cumulative_tokens')
@@ -1,4 +1,5 @@
 """Customer support agent using LangChain's create_agent."""
+import asyncio
 import json
 from typing import AsyncGenerator, Callable, Optional
 
@@ -8,8 +9,14 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from app.agents.prompt.customer_support import SYSTEM_PROMPT
 from app.agents.structured_output.customer_support import CustomerSupportResponse
 from app.agents.tool.customer_support import CUSTOMER_SUPPORT_TOOLS
+from app.infrastructure.admission import Priority, get_admission_controller
 from app.infrastructure.langfuse_handler import get_langfuse_config
 from app.infrastructure.llm_provider import OpenRouterProvider
+from app.infrastructure.single_flight import get_single_flight, make_flight_key
+from app.infrastructure.stream_cancellation import (
+    record_stream_cancelled,
+    record_stream_completed,
+)
 from app.utils.logging import get_logger
 from app.utils.structured_streaming import (
     StructuredStreamingHandler,
@@ -95,10 +102,29 @@ class CustomerSupportAgent:
             run_name="customer-support-inquiry"
         )
 
-        # Invoke agent with Langfuse config
-        result = await self.agent.ainvoke(
-            {"messages": [HumanMessage(content=customer_message)]},
-            config=langfuse_config
+        # Invoke agent with Langfuse config; identical concurrent inquiries
+        # (e.g. a double submit) share one agent run. The run calls tools and
+        # is traced per customer and session, so only those are coalesced.
+        flight_key = make_flight_key(
+            self.model_name,
+            {
+                "temperature": self.temperature,
+                "agent": "customer_support",
+                "customer_id": customer_id,
+                "session_id": session_id,
+            },
+            [("system", SYSTEM_PROMPT), ("user", customer_message)],
+        )
+        result = await get_single_flight().do(
+            flight_key,
+            lambda: get_admission_controller().run(
+                self.model_name,
+                Priority.INTERACTIVE_SYNC,
+                lambda: self.agent.ainvoke(
+                    {"messages": [HumanMessage(content=customer_message)]},
+                    config=langfuse_config
+                ),
+            ),
         )
 
         # Extract structured response with error handling
@@ -184,6 +210,7 @@ class CustomerSupportAgent:
         # Reset tool tracking state
         self._in_target_tool = False
         self._should_reset_handler = False
+        tokens = 0
         
         try:
             # Use stream_mode="messages" to get LLM tokens as they stream
@@ -193,6 +220,7 @@ class CustomerSupportAgent:
                 config=langfuse_config,
                 stream_mode="messages"
             ):
+                tokens += 1
                 # Extract content from token - for structured output it's in tool_call_chunks
                 content = self._extract_text_from_message(token)
                 
@@ -209,8 +237,10 @@ class CustomerSupportAgent:
                         last_yielded = incremental_update
                         yield incremental_update
             
+            record_stream_completed(tokens)
+
             # Yield final response if we have one and haven't yielded it yet
-            final_response = handler.get_last_valid()
+            final_response = handler.finalize()
             if final_response is not None:
                 if (
                     last_yielded is None
@@ -228,6 +258,10 @@ class CustomerSupportAgent:
                     requires_escalation=False,
                     confidence=0.5
                 )
+        except (asyncio.CancelledError, GeneratorExit):
+            # Consumer went away (e.g. client disconnect): upstream is closed
+            record_stream_cancelled(tokens)
+            raise
         except Exception as e:
             logger.error(f"[CustomerSupportAgent] Error in streaming: {e}", exc_info=True)
             # Yield fallback response
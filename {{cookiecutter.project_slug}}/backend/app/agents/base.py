@@ -5,19 +5,26 @@ All agents should inherit from BaseAgent and implement the required methods.
 Protected by circuit breaker for resilient LLM calls.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, Dict, Generic, List, Optional, TypeVar
+from typing import Any, AsyncGenerator, Dict, Generic, List, Optional, Tuple, TypeVar
 
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 
+from app.infrastructure.admission import Priority, get_admission_controller
 from app.infrastructure.circuit_breaker import (
     CircuitBreakerOpenError,
     get_llm_circuit_breaker,
 )
 from app.infrastructure.langfuse_handler import get_langfuse_config
 from app.infrastructure.llm_provider import OpenRouterProvider
+from app.infrastructure.model_router import get_model_router
+from app.infrastructure.stream_cancellation import (
+    record_stream_cancelled,
+    record_stream_completed,
+)
 from app.utils.logging import get_logger
 
 logger = get_logger("base_agent")
@@ -32,6 +39,9 @@ class AgentConfig(BaseModel):
     temperature: float = 0.7
     max_tokens: Optional[int] = None
     fallback_models: List[str] = []
+    # Maximum acceptable time-to-first-token; with fallback_models set, each
+    # call is routed to the cheapest model meeting it (see ModelRouter)
+    latency_slo_ms: Optional[float] = None
 
 
 class AgentContext(BaseModel):
@@ -88,23 +98,63 @@ class BaseAgent(ABC, Generic[T]):
         self.config = config or AgentConfig()
         self.llm_provider = llm_provider or OpenRouterProvider()
 
+        # LangChain agents per model, built lazily as the router picks models
+        self._agents: Dict[str, Any] = {}
+
         # Get LLM instance
-        self.llm = self.llm_provider.get_llm(
-            model_name=self.config.model_name,
-            temperature=self.config.temperature
-        )
+        self.llm = self._get_llm(self.config.model_name)
 
         # Create LangChain agent
-        self._agent = create_agent(
-            model=self.llm,
+        self._agent = self._build_agent(self.config.model_name, self.llm)
+
+        logger.info(f"[{self.name}] Initialized with model: {self.config.model_name}")
+
+    @property
+    def candidate_models(self) -> List[str]:
+        """Acceptable models: the configured model followed by its fallbacks."""
+        fallbacks = [m for m in self.config.fallback_models if m != self.config.model_name]
+        return [self.config.model_name, *fallbacks]
+
+    def _get_llm(self, model_name: str) -> Any:
+        """Get the LLM for a model, with the other candidates as fallbacks."""
+        fallbacks = [m for m in self.candidate_models if m != model_name]
+        return self.llm_provider.get_llm(
+            model_name=model_name,
+            temperature=self.config.temperature,
+            fallback_models=fallbacks or None,
+        )
+
+    def _build_agent(self, model_name: str, llm: Optional[Any] = None) -> Any:
+        """Create (and remember) the LangChain agent for a model."""
+        agent = create_agent(
+            model=llm or self._get_llm(model_name),
             system_prompt=self.system_prompt,
             tools=self.tools,
             response_format=self.response_model,
         )
+        self._agents[model_name] = agent
+        return agent
 
-        logger.info(f"[{self.name}] Initialized with model: {self.config.model_name}")
+    def _select_agent(self) -> Tuple[str, Any]:
+        """
+        Pick the model for this call.
 
-    def _get_langfuse_config(self, context: AgentContext) -> Dict[str, Any]:
+        Agents that declare fallback models are routed to the cheapest model
+        meeting `latency_slo_ms`; others always use the configured model.
+        """
+        candidates = self.candidate_models
+        if len(candidates) == 1:
+            return self.config.model_name, self._agent
+
+        model_name = get_model_router().select(candidates, self.config.latency_slo_ms)
+        agent = self._agents.get(model_name) or self._build_agent(model_name)
+        if model_name != self.config.model_name:
+            logger.debug(f"[{self.name}] Routed to model: {model_name}")
+        return model_name, agent
+
+    def _get_langfuse_config(
+        self, context: AgentContext, model_name: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Build Langfuse configuration from context."""
         return get_langfuse_config(
             session_id=context.session_id,
@@ -112,7 +162,7 @@ class BaseAgent(ABC, Generic[T]):
             tags=[self.name, *context.tags],
             metadata={
                 "agent_name": self.name,
-                "model": self.config.model_name,
+                "model": model_name or self.config.model_name,
                 "conversation_id": context.conversation_id,
                 **context.metadata
             },
@@ -138,7 +188,8 @@ class BaseAgent(ABC, Generic[T]):
         self,
         message: str,
         context: Optional[AgentContext] = None,
-        use_circuit_breaker: bool = True
+        use_circuit_breaker: bool = True,
+        priority: Priority = Priority.INTERACTIVE_SYNC
     ) -> T:
         """
         Invoke the agent with a message.
@@ -147,20 +198,24 @@ class BaseAgent(ABC, Generic[T]):
             message: User message
             context: Agent context with user/session info
             use_circuit_breaker: Whether to use circuit breaker protection
+            priority: Admission priority for the upstream LLM call
 
         Returns:
             Structured response of type T
 
         Raises:
             CircuitBreakerOpenError: If circuit breaker is open
+            AdmissionTimeoutError: If the call could not be admitted in time
         """
         context = context or AgentContext()
-        langfuse_config = self._get_langfuse_config(context)
+        model_name, agent = self._select_agent()
+        langfuse_config = self._get_langfuse_config(context, model_name)
+        admission = get_admission_controller()
 
         logger.debug(f"[{self.name}] Invoking with message: {message[:50]}...")
 
         async def invoke_llm():
-            return await self._agent.ainvoke(
+            return await agent.ainvoke(
                 {"messages": [HumanMessage(content=message)]},
                 config=langfuse_config
             )
@@ -168,9 +223,11 @@ class BaseAgent(ABC, Generic[T]):
         # Execute with or without circuit breaker
         if use_circuit_breaker:
             circuit_breaker = get_llm_circuit_breaker()
-            result = await circuit_breaker.call(invoke_llm)
+            result = await admission.run(
+                model_name, priority, lambda: circuit_breaker.call(invoke_llm)
+            )
         else:
-            result = await invoke_llm()
+            result = await admission.run(model_name, priority, invoke_llm)
 
         response = self._process_response(result)
         logger.info(f"[{self.name}] Response generated successfully")
@@ -201,7 +258,8 @@ class BaseAgent(ABC, Generic[T]):
             CircuitBreakerOpenError: If circuit breaker is open
         """
         context = context or AgentContext()
-        langfuse_config = self._get_langfuse_config(context)
+        model_name, agent = self._select_agent()
+        langfuse_config = self._get_langfuse_config(context, model_name)
 
         logger.debug(f"[{self.name}] Streaming invocation: {message[:50]}...")
 
@@ -220,32 +278,44 @@ class BaseAgent(ABC, Generic[T]):
 
         handler = StructuredStreamingHandler(self.response_model)
 
-        try:
-            async for token, metadata in self._agent.astream(
-                {"messages": [HumanMessage(content=message)]},
-                config=langfuse_config,
-                stream_mode="messages"
-            ):
-                content = self._extract_content_from_stream(token)
-                if content:
-                    partial = handler.add_chunk(content)
-                    if partial is not None:
-                        yield partial
-
-            # Stream completed successfully
-            if circuit_breaker:
-                await circuit_breaker._record_success()
-
-            # Yield final response
-            final = handler.get_last_valid()
-            if final is not None:
-                yield final
-
-        except Exception as e:
-            # Record failure in circuit breaker
-            if circuit_breaker:
-                await circuit_breaker._record_failure(e)
-            raise
+        async with get_admission_controller().admit(
+            model_name, Priority.INTERACTIVE_STREAM
+        ) as ticket:
+            tokens = 0
+            try:
+                async for token, metadata in agent.astream(
+                    {"messages": [HumanMessage(content=message)]},
+                    config=langfuse_config,
+                    stream_mode="messages"
+                ):
+                    ticket.mark_first_token()
+                    tokens += 1
+                    content = self._extract_content_from_stream(token)
+                    if content:
+                        partial = handler.add_chunk(content)
+                        if partial is not None:
+                            yield partial
+
+                # Stream completed successfully
+                record_stream_completed(tokens)
+                if circuit_breaker:
+                    await circuit_breaker._record_success()
+
+                # Yield final response (fully validated)
+                final = handler.finalize()
+                if final is not None:
+                    yield final
+
+            except (asyncio.CancelledError, GeneratorExit):
+                # Consumer went away (e.g. client disconnect): upstream is closed
+                record_stream_cancelled(tokens)
+                raise
+
+            except Exception as e:
+                # Record failure in circuit breaker
+                if circuit_breaker:
+                    await circuit_breaker._record_failure(e)
+                raise
 
     def _extract_content_from_stream(self, message: Any) -> Optional[str]:
         """Extract text content from streaming message."""
@@ -286,27 +356,34 @@ class BaseAgent(ABC, Generic[T]):
         Raises:
             CircuitBreakerOpenError: If circuit breaker is open
         """
-        import asyncio
 
         context = context or AgentContext()
-        langfuse_config = self._get_langfuse_config(context)
+        model_name, agent = self._select_agent()
+        langfuse_config = self._get_langfuse_config(context, model_name)
 
         def invoke_llm():
-            return self._agent.invoke(
+            return agent.invoke(
                 {"messages": [HumanMessage(content=message)]},
                 config=langfuse_config
             )
 
         # For sync version, we wrap in async and run
+        admission = get_admission_controller()
         if use_circuit_breaker:
             circuit_breaker = get_llm_circuit_breaker()
 
             async def async_invoke():
-                return await circuit_breaker.call(invoke_llm)
-
-            result = asyncio.get_event_loop().run_until_complete(async_invoke())
+                return await admission.run(
+                    model_name,
+                    Priority.INTERACTIVE_SYNC,
+                    lambda: circuit_breaker.call(invoke_llm),
+                )
         else:
-            result = invoke_llm()
+            async def async_invoke():
+                async with admission.admit(model_name, Priority.INTERACTIVE_SYNC):
+                    return invoke_llm()
+
+        result = asyncio.get_event_loop().run_until_complete(async_invoke())
 
         return self._process_response(result)
 
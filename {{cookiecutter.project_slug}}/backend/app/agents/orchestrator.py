@@ -5,13 +5,17 @@ Provides multi-agent coordination, routing, and pipeline execution.
 Protected by circuit breaker for resilient LLM calls.
 """
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
 from app.agents.base import AgentConfig, AgentContext
-from app.agents.registry import AgentRegistry, create_agent
+from app.agents.parallel import ParallelBranch, ParallelExecutor, ParallelResult, ParallelStrategy
+from app.agents.pipeline import PipelineExecutor, PipelineResult, PipelineStage
+from app.agents.registry import AgentRegistry
+from app.config import get_settings
+from app.infrastructure.admission import Priority, get_admission_controller
 from app.infrastructure.circuit_breaker import (
     CircuitBreakerOpenError,
     get_llm_circuit_breaker,
@@ -38,15 +42,6 @@ class HandoffContext(BaseModel):
     metadata: Dict[str, Any] = {}
 
 
-class PipelineResult(BaseModel):
-    """Result from a pipeline execution."""
-    stages: List[Dict[str, Any]]
-    final_output: Any
-    total_duration_ms: int
-    success: bool
-    error: Optional[str] = None
-
-
 class AgentOrchestrator:
     """
     Orchestrates multiple agents for complex tasks.
@@ -54,8 +49,8 @@ class AgentOrchestrator:
     Features:
     - Intent-based routing to appropriate agents
     - Seamless handoff between agents with context preservation
-    - Pipeline execution for multi-step workflows
-    - Parallel agent execution for independent tasks
+    - Pipeline execution for multi-step workflows (stages run as a dependency graph)
+    - Parallel fan-out across agents or models (ensemble, first success, quorum vote)
 
     Example:
     ```python
@@ -71,6 +66,21 @@ class AgentOrchestrator:
         input_data={"query": "latest AI trends"}
     )
 
+    # Independent stages run concurrently
+    result = await orchestrator.run_pipeline([
+        PipelineStage(name="research", agent="research"),
+        PipelineStage(name="facts", agent="fact_check", depends_on=["research"]),
+        PipelineStage(name="tone", agent="style", depends_on=["research"]),
+        PipelineStage(name="report", agent="writer", depends_on=["facts", "tone"]),
+    ], input_data={"message": "latest AI trends"})
+
+    # Ask three models, act once two agree on escalation
+    result = await orchestrator.invoke_parallel(
+        ["customer_support"], message,
+        models=["openai/gpt-4o-mini", "anthropic/claude-3-haiku", "google/gemini-flash-1.5"],
+        strategy="quorum", vote_field="requires_escalation",
+    )
+
     # Handoff between agents
     await orchestrator.handoff(
         from_agent="support",
@@ -197,7 +207,11 @@ User message: {message}"""
                     config=langfuse_config
                 )
 
-            decision: RoutingDecision = await circuit_breaker.call(invoke_routing_llm)
+            decision: RoutingDecision = await get_admission_controller().run(
+                self.router_model,
+                Priority.INTERACTIVE_SYNC,
+                lambda: circuit_breaker.call(invoke_routing_llm),
+            )
 
             logger.info(f"Routed to '{decision.agent_name}': {decision.reasoning}")
             return decision
@@ -230,6 +244,9 @@ User message: {message}"""
         """
         Invoke a specific agent with a message.
 
+        Uses the registry's shared instance for the configuration, so the
+        agent is not rebuilt on every call.
+
         Args:
             agent_name: Name of the agent to invoke
             message: User message
@@ -239,7 +256,7 @@ User message: {message}"""
         Returns:
             Agent response
         """
-        agent = create_agent(agent_name, self.llm_provider, config)
+        agent = AgentRegistry.acquire(agent_name, self.llm_provider, config)
         return await agent.invoke(message, context)
 
     async def route_and_invoke(
@@ -309,88 +326,121 @@ User message: {message}"""
 
     async def run_pipeline(
         self,
-        agents: List[str],
+        agents: Sequence[Union[str, PipelineStage]],
         input_data: Dict[str, Any],
         context: Optional[AgentContext] = None,
-        stop_on_error: bool = True
+        stop_on_error: bool = True,
+        max_concurrency: Optional[int] = None,
+        stage_timeout_seconds: Optional[float] = None
     ) -> PipelineResult:
         """
-        Run multiple agents in sequence (pipeline).
+        Run multiple agents as a pipeline.
 
-        Each agent's output is passed as input to the next agent.
+        Given agent names, the agents run in sequence and each agent's output
+        (as JSON) is the next agent's message. Given `PipelineStage`s, stages
+        run as soon as their dependencies succeed, concurrently where they are
+        independent (see `app.agents.pipeline`).
 
         Args:
-            agents: List of agent names to run in sequence
-            input_data: Initial input for the first agent
+            agents: Agent names to run in sequence, or pipeline stages
+            input_data: Pipeline input (the first stage gets its "message")
             context: Optional context for all agents
-            stop_on_error: Whether to stop on first error
+            stop_on_error: Cancel running stages when one fails (downstream
+                stages of a failed stage are always skipped)
+            max_concurrency: Stages running at once (defaults to PIPELINE_MAX_CONCURRENCY)
+            stage_timeout_seconds: Per-attempt timeout (defaults to PIPELINE_STAGE_TIMEOUT_SECONDS)
 
         Returns:
-            PipelineResult with all stage outputs
-        """
-        import time
-
-        context = context or AgentContext()
-        stages: List[Dict[str, Any]] = []
-        current_input = input_data
-        start_time = time.time()
+            PipelineResult with per-stage status, timing and outputs
 
-        for i, agent_name in enumerate(agents):
-            stage_start = time.time()
+        Raises:
+            ValueError: If stage names or dependencies are invalid
+        """
+        settings = get_settings()
+        stages: List[PipelineStage] = []
+        for i, item in enumerate(agents):
+            if isinstance(item, PipelineStage):
+                stages.append(item)
+            else:
+                # Sequential chain: each stage depends on the previous one
+                stages.append(PipelineStage(
+                    name=f"{i + 1}:{item}",
+                    agent=item,
+                    depends_on=[stages[-1].name] if stages else [],
+                ))
+
+        executor = PipelineExecutor(
+            self.invoke,
+            max_concurrency=max_concurrency or settings.pipeline_max_concurrency,
+            stage_timeout_seconds=(
+                settings.pipeline_stage_timeout_seconds
+                if stage_timeout_seconds is None else stage_timeout_seconds
+            ),
+            stop_on_error=stop_on_error,
+        )
+        return await executor.run(stages, input_data, context)
 
-            try:
-                # Convert input to message string
-                if isinstance(current_input, dict):
-                    message = str(current_input.get("message", str(current_input)))
-                else:
-                    message = str(current_input)
+    async def invoke_parallel(
+        self,
+        agents: Sequence[Union[str, ParallelBranch]],
+        message: str,
+        context: Optional[AgentContext] = None,
+        strategy: Union[ParallelStrategy, str] = ParallelStrategy.ALL,
+        models: Optional[Sequence[str]] = None,
+        config: Optional[AgentConfig] = None,
+        vote_field: Optional[str] = None,
+        quorum: Optional[int] = None,
+        validate: Optional[Callable[[Any], bool]] = None,
+        timeout_seconds: Optional[float] = None
+    ) -> ParallelResult:
+        """
+        Send one message to several agents or models concurrently.
 
-                # Invoke agent
-                response = await self.invoke(agent_name, message, context)
+        Strategies (see `app.agents.parallel`):
+        - "all": wait for every branch and return all outputs
+        - "first_success": return the first valid output, cancel the rest
+        - "quorum": return once `quorum` outputs agree on `vote_field`,
+          cancel the rest
 
-                stage_result = {
-                    "agent": agent_name,
-                    "stage": i + 1,
-                    "input": current_input,
-                    "output": response.model_dump() if hasattr(response, "model_dump") else response,
-                    "duration_ms": int((time.time() - stage_start) * 1000),
-                    "success": True
-                }
-                stages.append(stage_result)
+        Args:
+            agents: Agent names or branches
+            message: Message sent to every branch
+            context: Optional context
+            strategy: How results are combined
+            models: Run each named agent once per model
+            config: Default agent configuration for the branches
+            vote_field: Output field to vote on (dotted path; whole output if unset)
+            quorum: Agreeing branches needed (defaults to a majority)
+            validate: Rejects unusable responses (not counted as successes or votes)
+            timeout_seconds: Per-branch timeout (defaults to PARALLEL_BRANCH_TIMEOUT_SECONDS)
 
-                # Pass output to next stage
-                current_input = {"message": str(response), "previous_output": response}
+        Returns:
+            ParallelResult with the combined output and per-branch status and latency
 
-            except Exception as e:
-                logger.error(f"Pipeline stage {i+1} ({agent_name}) failed: {e}")
-                stage_result = {
-                    "agent": agent_name,
-                    "stage": i + 1,
-                    "input": current_input,
-                    "error": str(e),
-                    "duration_ms": int((time.time() - stage_start) * 1000),
-                    "success": False
-                }
-                stages.append(stage_result)
-
-                if stop_on_error:
-                    return PipelineResult(
-                        stages=stages,
-                        final_output=None,
-                        total_duration_ms=int((time.time() - start_time) * 1000),
-                        success=False,
-                        error=f"Stage {i+1} ({agent_name}) failed: {e}"
-                    )
-
-        total_duration = int((time.time() - start_time) * 1000)
-
-        return PipelineResult(
-            stages=stages,
-            final_output=stages[-1]["output"] if stages and stages[-1]["success"] else None,
-            total_duration_ms=total_duration,
-            success=all(s["success"] for s in stages),
-            error=None
+        Raises:
+            ValueError: If there are no branches, names repeat or the quorum is out of range
+        """
+        branches: List[ParallelBranch] = []
+        for item in agents:
+            if isinstance(item, ParallelBranch):
+                branches.append(item)
+            elif models:
+                branches.extend(ParallelBranch(agent=item, model=model) for model in models)
+            else:
+                branches.append(ParallelBranch(agent=item))
+
+        executor = ParallelExecutor(
+            self.invoke,
+            strategy=strategy,
+            vote_field=vote_field,
+            quorum=quorum,
+            validate=validate,
+            timeout_seconds=(
+                get_settings().parallel_branch_timeout_seconds
+                if timeout_seconds is None else timeout_seconds
+            ),
         )
+        return await executor.run(branches, message, context, config)
 
     async def run_parallel(
         self,
@@ -402,7 +452,8 @@ User message: {message}"""
         Run multiple agents in parallel with the same input.
 
         Useful for getting multiple perspectives or processing
-        different aspects of a request simultaneously.
+        different aspects of a request simultaneously. See
+        `invoke_parallel` for model fan-out, early returns and timing.
 
         Args:
             agents: List of agent names to run in parallel
@@ -433,5 +484,9 @@ __all__ = [
     "AgentOrchestrator",
     "RoutingDecision",
     "HandoffContext",
+    "ParallelBranch",
+    "ParallelResult",
+    "ParallelStrategy",
     "PipelineResult",
+    "PipelineStage",
 ]
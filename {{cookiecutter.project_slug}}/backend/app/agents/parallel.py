@@ -0,0 +1,269 @@
+"""
+Parallel fan-out of one message to several agents or models.
+
+`ParallelExecutor` invokes every branch at once and combines the results
+according to a `ParallelStrategy`:
+
+- `all`: wait for every branch and return each output (ensemble);
+- `first_success`: return the first valid output and cancel the other
+  branches (hedged request: latency of the fastest healthy model);
+- `quorum`: vote on a field of the outputs (e.g. `requires_escalation`) and
+  return as soon as `quorum` branches agree, cancelling the stragglers.
+
+Each branch goes through `AgentOrchestrator.invoke`, so it is admitted and
+protected by the circuit breaker like any other call. Cancelled branches
+release their admission slot and are not counted as circuit failures.
+
+Usage:
+    result = await orchestrator.invoke_parallel(
+        ["customer_support"], message,
+        models=["openai/gpt-4o-mini", "anthropic/claude-3-haiku", "google/gemini-flash-1.5"],
+        strategy="quorum", vote_field="requires_escalation",
+    )
+    if result.success:
+        escalate = result.decision
+"""
+
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Union
+
+import orjson
+from pydantic import BaseModel, Field
+
+from app.agents.base import AgentConfig, AgentContext
+from app.utils.logging import get_logger
+
+logger = get_logger("agent_parallel")
+
+# (agent name, message, context, config) -> agent response
+InvokeFn = Callable[[str, str, AgentContext, Optional[AgentConfig]], Awaitable[Any]]
+
+
+class ParallelStrategy(str, Enum):
+    """How the branch results are combined."""
+    ALL = "all"
+    FIRST_SUCCESS = "first_success"
+    QUORUM = "quorum"
+
+
+class ParallelBranch(BaseModel):
+    """One agent (optionally on a specific model) in a fan-out."""
+    agent: str = Field(..., description="Registered agent to invoke")
+    model: Optional[str] = Field(None, description="Model to run the agent on (overrides the config)")
+    config: Optional[AgentConfig] = None
+    name: Optional[str] = Field(None, description="Branch name (defaults to 'agent' or 'agent@model')")
+
+    @property
+    def label(self) -> str:
+        if self.name:
+            return self.name
+        return f"{self.agent}@{self.model}" if self.model else self.agent
+
+    def agent_config(self, default: Optional[AgentConfig] = None) -> Optional[AgentConfig]:
+        """Config to invoke the branch with (pinned to its model, if set)."""
+        config = self.config or default
+        if self.model is None:
+            return config
+        # Pinned to one model: another branch covers the others
+        return (config or AgentConfig()).model_copy(update={"model_name": self.model, "fallback_models": []})
+
+
+class ParallelResult(BaseModel):
+    """Result from a parallel invocation."""
+    strategy: ParallelStrategy
+    branches: List[Dict[str, Any]]
+    output: Any = None
+    winner: Optional[str] = Field(None, description="Branch whose output was returned")
+    decision: Any = Field(None, description="Winning value of the voted field (quorum)")
+    votes: Dict[str, int] = Field(default_factory=dict, description="Branches per voted value (quorum)")
+    total_duration_ms: int
+    success: bool
+    error: Optional[str] = None
+
+
+def _dump(value: Any) -> Any:
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def _vote_key(value: Any) -> Hashable:
+    """Hashable form of a voted value (nested values compare as JSON)."""
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS, default=str).decode()
+    return value
+
+
+class ParallelExecutor:
+    """
+    Invokes branches concurrently and combines them by strategy.
+
+    Args:
+        invoke: Invokes an agent (e.g. `AgentOrchestrator.invoke`)
+        strategy: How results are combined
+        vote_field: Output field voted on with `quorum` (whole output if unset)
+        quorum: Agreeing branches needed (defaults to a majority)
+        validate: Accepts or rejects a response (`first_success`, `quorum`)
+        timeout_seconds: Per-branch timeout (0 disables it)
+    """
+
+    def __init__(
+        self,
+        invoke: InvokeFn,
+        strategy: Union[ParallelStrategy, str] = ParallelStrategy.ALL,
+        vote_field: Optional[str] = None,
+        quorum: Optional[int] = None,
+        validate: Optional[Callable[[Any], bool]] = None,
+        timeout_seconds: float = 0,
+    ):
+        self.invoke = invoke
+        self.strategy = ParallelStrategy(strategy)
+        self.vote_field = vote_field
+        self.quorum = quorum
+        self.validate = validate
+        self.timeout = timeout_seconds
+
+    def _vote(self, output: Any) -> Any:
+        if self.vote_field is None:
+            return output
+        value = output
+        for field in self.vote_field.split("."):
+            if not isinstance(value, dict) or field not in value:
+                raise ValueError(f"Response has no field '{self.vote_field}'")
+            value = value[field]
+        return value
+
+    async def run(
+        self,
+        branches: Sequence[ParallelBranch],
+        message: str,
+        context: Optional[AgentContext] = None,
+        config: Optional[AgentConfig] = None,
+    ) -> ParallelResult:
+        """
+        Run the branches and combine their results.
+
+        Raises:
+            ValueError: If there are no branches, names repeat or the quorum is out of range
+        """
+        if not branches:
+            raise ValueError("No branches to invoke")
+        labels = [branch.label for branch in branches]
+        if len(set(labels)) != len(labels):
+            raise ValueError(f"Duplicate branch names in {labels}")
+        quorum = self.quorum or len(branches) // 2 + 1
+        if self.strategy is ParallelStrategy.QUORUM and not 1 <= quorum <= len(branches):
+            raise ValueError(f"Quorum {quorum} is not reachable with {len(branches)} branches")
+
+        context = context or AgentContext()
+        start = time.perf_counter()
+
+        def elapsed_ms() -> int:
+            return int((time.perf_counter() - start) * 1000)
+
+        records: Dict[str, Dict[str, Any]] = {
+            label: {
+                "name": label,
+                "agent": branch.agent,
+                "model": (branch.agent_config(config) or AgentConfig()).model_name,
+                "status": "running",
+                "success": False,
+            }
+            for label, branch in zip(labels, branches)
+        }
+
+        async def run_branch(label: str, branch: ParallelBranch) -> Any:
+            record = records[label]
+            call = self.invoke(branch.agent, message, context, branch.agent_config(config))
+            try:
+                response = await asyncio.wait_for(call, self.timeout) if self.timeout else await call
+            except asyncio.CancelledError:
+                record.update(status="cancelled", latency_ms=elapsed_ms())
+                raise
+            except asyncio.TimeoutError:
+                record.update(status="failed", error=f"Timed out after {self.timeout}s", latency_ms=elapsed_ms())
+                raise
+            except Exception as e:
+                logger.warning(f"Parallel branch '{label}' failed: {e}")
+                record.update(status="failed", error=str(e), latency_ms=elapsed_ms())
+                raise
+            record.update(latency_ms=elapsed_ms(), output=_dump(response))
+            if self.validate is not None and not self.validate(response):
+                record.update(status="invalid", error="Rejected by validator")
+                raise ValueError("Rejected by validator")
+            record.update(status="succeeded", success=True)
+            return response
+
+        tasks = {
+            asyncio.ensure_future(run_branch(label, branch)): label
+            for label, branch in zip(labels, branches)
+        }
+        winner: Optional[str] = None
+        decision: Any = None
+        votes: Dict[Hashable, List[str]] = {}
+        pending = set(tasks)
+        try:
+            while pending and winner is None and self.strategy is not ParallelStrategy.ALL:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    label = tasks[task]
+                    if task.exception() is not None or winner is not None:
+                        continue
+                    if self.strategy is ParallelStrategy.FIRST_SUCCESS:
+                        winner = label
+                        continue
+                    try:
+                        value = self._vote(records[label]["output"])
+                    except ValueError as e:
+                        records[label].update(status="invalid", success=False, error=str(e))
+                        continue
+                    agreeing = votes.setdefault(_vote_key(value), [])
+                    agreeing.append(label)
+                    if len(agreeing) >= quorum:
+                        # The first branch to cast the winning vote answers
+                        winner, decision = agreeing[0], value
+            if pending and winner is not None:
+                logger.debug(f"Parallel {self.strategy.value}: '{winner}' won, cancelling {len(pending)} branch(es)")
+                for task in pending:
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # Caller cancelled the fan-out: stop every branch
+            for task in tasks:
+                task.cancel()
+
+        error = None
+        if self.strategy is ParallelStrategy.ALL:
+            output = {label: records[label]["output"] for label in labels if records[label]["success"]}
+            success = len(output) == len(labels)
+            if not success:
+                failed = [label for label in labels if not records[label]["success"]]
+                error = f"Branch(es) failed: {failed}"
+        else:
+            output = records[winner]["output"] if winner is not None else None
+            success = winner is not None
+            if not success:
+                error = (
+                    "No branch succeeded" if self.strategy is ParallelStrategy.FIRST_SUCCESS
+                    else f"No {quorum} branches agreed"
+                )
+
+        return ParallelResult(
+            strategy=self.strategy,
+            branches=[records[label] for label in labels],
+            output=output,
+            winner=winner,
+            decision=decision,
+            votes={str(key): len(agreeing) for key, agreeing in votes.items()},
+            total_duration_ms=elapsed_ms(),
+            success=success,
+            error=error,
+        )
+
+
+__all__ = [
+    "ParallelBranch",
+    "ParallelExecutor",
+    "ParallelResult",
+    "ParallelStrategy",
+]
@@ -0,0 +1,322 @@
+"""
+DAG pipeline executor for {{cookiecutter.project_name}}.
+
+A pipeline is a set of `PipelineStage`s, each running one agent. Stages
+declare the stages they depend on and how their message is built from the
+pipeline input and upstream outputs, so a multi-agent workflow takes as
+long as its critical path rather than the sum of its stages:
+
+- a stage starts as soon as all of its dependencies have succeeded;
+  independent stages run concurrently, at most `max_concurrency` at once;
+- each attempt is bounded by the stage timeout, and failed attempts are
+  retried up to `retries` times (not when the LLM is unavailable);
+- when a stage fails, the stages downstream of it are skipped; with
+  `stop_on_error` every stage still running is cancelled as well.
+
+Stage messages:
+- `inputs` maps template variables to paths: `"input.query"` (pipeline
+  input) or `"<stage>.<field>..."` (a stage output, `"<stage>"` for all of it);
+- `message` is a `str.format` template over those variables;
+- without a template, the resolved inputs (or, without inputs, the outputs
+  of the dependencies) are passed as JSON, and a stage with neither gets
+  the pipeline input's `message`.
+
+Usage:
+    result = await orchestrator.run_pipeline([
+        PipelineStage(name="research", agent="research", inputs={"q": "input.query"},
+                      message="Research: {q}"),
+        PipelineStage(name="facts", agent="fact_check", depends_on=["research"]),
+        PipelineStage(name="tone", agent="style", depends_on=["research"]),
+        PipelineStage(name="report", agent="writer", depends_on=["facts", "tone"]),
+    ], input_data={"query": "latest AI trends"})
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+from pydantic import BaseModel, Field
+
+from app.agents.base import AgentConfig, AgentContext
+from app.infrastructure.admission import AdmissionTimeoutError
+from app.infrastructure.circuit_breaker import CircuitBreakerOpenError
+from app.utils.logging import get_logger
+
+logger = get_logger("agent_pipeline")
+
+# (agent name, message, context, config) -> agent response
+InvokeFn = Callable[[str, str, AgentContext, Optional[AgentConfig]], Awaitable[Any]]
+
+# Not worth retrying: the LLM is unavailable for a while
+_NO_RETRY = (CircuitBreakerOpenError, AdmissionTimeoutError)
+
+
+class PipelineStage(BaseModel):
+    """One agent invocation in a pipeline."""
+    name: str = Field(..., description="Unique stage name, used in dependencies and input paths")
+    agent: str = Field(..., description="Registered agent to invoke")
+    depends_on: List[str] = Field(default_factory=list, description="Stages that must succeed first")
+    inputs: Dict[str, str] = Field(
+        default_factory=dict, description="Template variable -> 'input.<key>' or '<stage>.<field>' path"
+    )
+    message: Optional[str] = Field(None, description="Message template over the input variables")
+    config: Optional[AgentConfig] = None
+    timeout_seconds: Optional[float] = Field(None, description="Per-attempt timeout (pipeline default if unset)")
+    retries: int = Field(0, ge=0, description="Extra attempts after a failure")
+
+
+class PipelineResult(BaseModel):
+    """Result from a pipeline execution."""
+    stages: List[Dict[str, Any]]
+    final_output: Any
+    total_duration_ms: int
+    success: bool
+    error: Optional[str] = None
+
+
+def _dump(value: Any) -> Any:
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def _resolve(path: str, input_data: Dict[str, Any], outputs: Dict[str, Any]) -> Any:
+    """Value at an input path ('input.<key>...' or '<stage>.<field>...')."""
+    head, *fields = path.split(".")
+    if head == "input":
+        value: Any = input_data
+    elif head in outputs:
+        value = outputs[head]
+    else:
+        raise ValueError(f"Unknown input path {path!r}")
+    for field in fields:
+        if isinstance(value, dict) and field in value:
+            value = value[field]
+        else:
+            raise ValueError(f"Input path {path!r} not found")
+    return value
+
+
+def _as_text(value: Any) -> str:
+    return value if isinstance(value, str) else orjson.dumps(value, default=str).decode()
+
+
+def build_stage_message(stage: PipelineStage, input_data: Dict[str, Any], outputs: Dict[str, Any]) -> str:
+    """The message a stage's agent receives."""
+    values = {name: _resolve(path, input_data, outputs) for name, path in stage.inputs.items()}
+    if stage.message is not None:
+        return stage.message.format(**{name: _as_text(value) for name, value in values.items()})
+    if values:
+        return _as_text(values)
+    if len(stage.depends_on) == 1:
+        return _as_text(outputs[stage.depends_on[0]])
+    if stage.depends_on:
+        return _as_text({name: outputs[name] for name in stage.depends_on})
+    return _as_text(input_data.get("message", input_data))
+
+
+def validate_stages(stages: List[PipelineStage]) -> List[PipelineStage]:
+    """
+    Check stage names and dependencies.
+
+    Returns:
+        The stages in a dependency (topological) order
+
+    Raises:
+        ValueError: On duplicate names, unknown dependencies or cycles
+    """
+    by_name: Dict[str, PipelineStage] = {}
+    for stage in stages:
+        if stage.name in by_name or stage.name == "input":
+            raise ValueError(f"Duplicate or reserved stage name '{stage.name}'")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+    ordered: List[PipelineStage] = []
+    remaining = {stage.name: len(set(stage.depends_on)) for stage in stages}
+    dependents: Dict[str, List[str]] = {name: [] for name in by_name}
+    for stage in stages:
+        for dependency in set(stage.depends_on):
+            dependents[dependency].append(stage.name)
+    ready = [stage.name for stage in stages if remaining[stage.name] == 0]
+    while ready:
+        name = ready.pop(0)
+        ordered.append(by_name[name])
+        for dependent in dependents[name]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if len(ordered) != len(stages):
+        cyclic = sorted(name for name, count in remaining.items() if count)
+        raise ValueError(f"Pipeline has a dependency cycle between stages {cyclic}")
+    return ordered
+
+
+class PipelineExecutor:
+    """
+    Runs pipeline stages as a dependency graph.
+
+    Args:
+        invoke: Invokes an agent (e.g. `AgentOrchestrator.invoke`)
+        max_concurrency: Stages running at once
+        stage_timeout_seconds: Default per-attempt timeout (0 disables it)
+        stop_on_error: Cancel every running stage when one fails
+    """
+
+    def __init__(
+        self,
+        invoke: InvokeFn,
+        max_concurrency: int = 4,
+        stage_timeout_seconds: float = 0,
+        stop_on_error: bool = True,
+    ):
+        self.invoke = invoke
+        self.max_concurrency = max(1, max_concurrency)
+        self.stage_timeout = stage_timeout_seconds
+        self.stop_on_error = stop_on_error
+
+    async def _invoke_with_retries(
+        self, stage: PipelineStage, message: str, context: AgentContext, record: Dict[str, Any]
+    ) -> Any:
+        """Invoke a stage's agent, retrying failed or timed-out attempts."""
+        timeout = self.stage_timeout if stage.timeout_seconds is None else stage.timeout_seconds
+        for attempt in range(1, stage.retries + 2):
+            record["attempts"] = attempt
+            call = self.invoke(stage.agent, message, context, stage.config)
+            try:
+                return await asyncio.wait_for(call, timeout) if timeout else await call
+            except asyncio.TimeoutError:
+                error: Exception = TimeoutError(f"Timed out after {timeout}s")
+            except _NO_RETRY:
+                raise
+            except Exception as e:
+                error = e
+            if attempt > stage.retries:
+                raise error
+            logger.warning(f"Pipeline stage '{stage.name}' attempt {attempt} failed: {error}")
+
+    async def run(
+        self,
+        stages: List[PipelineStage],
+        input_data: Dict[str, Any],
+        context: Optional[AgentContext] = None,
+    ) -> PipelineResult:
+        """
+        Run the stages and collect per-stage timing and outputs.
+
+        Raises:
+            ValueError: If the stage graph is invalid
+        """
+        ordered = validate_stages(stages)
+        context = context or AgentContext()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+
+        outputs: Dict[str, Any] = {}
+        records: Dict[str, Dict[str, Any]] = {
+            stage.name: {
+                "stage": index + 1,
+                "name": stage.name,
+                "agent": stage.agent,
+                "depends_on": list(stage.depends_on),
+                "status": "pending",
+                "success": False,
+            }
+            for index, stage in enumerate(stages)
+        }
+        tasks: Dict[str, "asyncio.Task[bool]"] = {}
+        failures: List[str] = []
+
+        def elapsed_ms() -> int:
+            return int((time.perf_counter() - start) * 1000)
+
+        async def run_stage(stage: PipelineStage) -> bool:
+            record = records[stage.name]
+            if stage.depends_on:
+                dependencies = [tasks[name] for name in stage.depends_on]
+                await asyncio.wait(dependencies)
+                failed = [
+                    name for name, task in zip(stage.depends_on, dependencies)
+                    if task.cancelled() or not task.result()
+                ]
+                if failed:
+                    record.update(status="skipped", error=f"Upstream stage(s) failed: {failed}")
+                    return False
+
+            try:
+                async with semaphore:
+                    record.update(status="running", started_ms=elapsed_ms())
+                    message = build_stage_message(stage, input_data, outputs)
+                    record["input"] = message
+                    response = await self._invoke_with_retries(stage, message, context, record)
+            except asyncio.CancelledError:
+                record["status"] = "cancelled"
+                if "started_ms" in record:
+                    record["duration_ms"] = elapsed_ms() - record["started_ms"]
+                raise
+            except Exception as e:
+                logger.error(f"Pipeline stage '{stage.name}' ({stage.agent}) failed: {e}")
+                record.update(
+                    status="failed",
+                    error=str(e),
+                    duration_ms=elapsed_ms() - record["started_ms"],
+                )
+                failures.append(stage.name)
+                if self.stop_on_error:
+                    for name, task in tasks.items():
+                        if name != stage.name and not task.done():
+                            task.cancel()
+                return False
+
+            outputs[stage.name] = _dump(response)
+            record.update(
+                status="succeeded",
+                success=True,
+                output=outputs[stage.name],
+                duration_ms=elapsed_ms() - record["started_ms"],
+            )
+            return True
+
+        for stage in ordered:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+        try:
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        finally:
+            # Caller cancelled the pipeline: stop every stage
+            for task in tasks.values():
+                task.cancel()
+
+        for record in records.values():
+            if record["status"] == "pending":
+                record.update(status="cancelled")
+
+        # Sinks (stages nothing depends on) make up the final output
+        upstream = {name for stage in stages for name in stage.depends_on}
+        sinks = [stage.name for stage in stages if stage.name not in upstream]
+        if len(sinks) == 1:
+            final_output = outputs.get(sinks[0])
+        else:
+            final_output = {name: outputs[name] for name in sinks if name in outputs}
+
+        error = None
+        if failures:
+            first = records[failures[0]]
+            error = f"Stage {first['stage']} ({first['name']}) failed: {first['error']}"
+        return PipelineResult(
+            stages=list(records.values()),
+            final_output=final_output,
+            total_duration_ms=elapsed_ms(),
+            success=all(record["success"] for record in records.values()),
+            error=error,
+        )
+
+
+__all__ = [
+    "PipelineExecutor",
+    "PipelineResult",
+    "PipelineStage",
+    "build_stage_message",
+    "validate_stages",
+]
@@ -0,0 +1,193 @@
+"""
+Pool of initialized agents for {{cookiecutter.project_name}}.
+
+Building an agent resolves its LLM client and compiles a LangChain graph
+with `create_agent(...)`. Agents keep no per-invocation state (the message
+and context are passed to each call; per-model graphs are built once and
+kept), so one instance per (agent name, `AgentConfig`, provider) can serve
+any number of concurrent requests. `AgentPool` keeps those instances:
+
+- a bounded LRU (`AGENT_POOL_MAX_SIZE`) with idle eviction
+  (`AGENT_POOL_IDLE_TTL_SECONDS`), so rarely used configs do not stay alive;
+- `AgentRegistry.warm_up` builds every registered agent ahead of the first
+  request (at startup with `AGENT_POOL_PREWARM`);
+- re-registering or unregistering an agent drops its pooled instances.
+
+Usage:
+    agent = AgentRegistry.acquire("customer_support", config=AgentConfig(...))
+    response = await agent.invoke(message, context)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.agents.base import AgentConfig, BaseAgent
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("agent_pool")
+
+
+def _provider_key(provider: Any) -> Hashable:
+    """Providers with the same endpoint and API key build identical agents."""
+    fingerprint = getattr(provider, "_key_fingerprint", None)
+    if fingerprint is None:
+        # Pooled agents keep their provider alive, so its id is not reused
+        return type(provider).__name__, id(provider)
+    return type(provider).__name__, getattr(provider, "_base_url", None), fingerprint
+
+
+@dataclass
+class AgentPoolStats:
+    """Statistics for the agent pool."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class AgentPool:
+    """
+    Shared agent instances keyed by (agent name, config, provider).
+
+    Args:
+        max_size: Maximum pooled instances (least recently used are evicted)
+        idle_ttl_seconds: Evict instances unused for this long (0 keeps them)
+    """
+
+    def __init__(self, max_size: Optional[int] = None, idle_ttl_seconds: Optional[float] = None):
+        settings = get_settings()
+        self.max_size = max_size or settings.agent_pool_max_size
+        self.idle_ttl = (
+            settings.agent_pool_idle_ttl_seconds if idle_ttl_seconds is None else idle_ttl_seconds
+        )
+        self._stats = AgentPoolStats()
+        # key -> (agent, last used), least recently used first
+        self._agents: "OrderedDict[Hashable, Tuple[BaseAgent, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, config: AgentConfig, provider: Any) -> Hashable:
+        """Pool key of an agent."""
+        return name, config.model_dump_json(), _provider_key(provider)
+
+    def get(
+        self,
+        name: str,
+        config: AgentConfig,
+        provider: Any,
+        factory: Callable[[], BaseAgent],
+    ) -> BaseAgent:
+        """
+        Get the pooled agent, building it with `factory` on a miss.
+
+        Concurrent misses for one key may each build an agent; the first
+        one stored is kept and returned to all of them.
+        """
+        key = self.key(name, config, provider)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._agents.get(key)
+            if entry is not None:
+                self._agents[key] = (entry[0], now)
+                self._agents.move_to_end(key)
+                self._stats.hits += 1
+                return entry[0]
+            self._stats.misses += 1
+
+        # Build outside the lock: compiling an agent takes a while
+        agent = factory()
+
+        with self._lock:
+            entry = self._agents.get(key)
+            if entry is not None:
+                return entry[0]
+            self._agents[key] = (agent, now)
+            while len(self._agents) > self.max_size:
+                self._agents.popitem(last=False)
+                self._stats.evictions += 1
+        return agent
+
+    def _evict_idle(self, now: float) -> None:
+        if not self.idle_ttl:
+            return
+        while self._agents:
+            key, (_, last_used) = next(iter(self._agents.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            del self._agents[key]
+            self._stats.evictions += 1
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """
+        Drop pooled instances of one agent (or all of them).
+
+        Returns:
+            Number of instances dropped
+        """
+        with self._lock:
+            keys = [key for key in self._agents if name is None or key[0] == name]
+            for key in keys:
+                del self._agents[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {**self._stats.to_dict(), "size": len(self), "max_size": self.max_size}
+
+
+# Global agent pool
+_pool: Optional[AgentPool] = None
+
+
+def get_agent_pool() -> AgentPool:
+    """Get the global agent pool."""
+    global _pool
+    if _pool is None:
+        _pool = AgentPool()
+    return _pool
+
+
+def invalidate_pooled_agents(name: Optional[str] = None) -> int:
+    """Drop pooled instances of an agent, if the pool exists."""
+    return _pool.invalidate(name) if _pool is not None else 0
+
+
+def close_agent_pool() -> None:
+    """Drop all pooled agents (called on shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.invalidate()
+        _pool = None
+
+
+def get_agent_pool_stats() -> Dict[str, Any]:
+    """Get agent pool statistics (empty if the pool is unused)."""
+    return _pool.stats() if _pool is not None else {}
+
+
+__all__ = [
+    "AgentPool",
+    "AgentPoolStats",
+    "close_agent_pool",
+    "get_agent_pool",
+    "get_agent_pool_stats",
+    "invalidate_pooled_agents",
+]
@@ -2,11 +2,14 @@
 Agent registry for {{cookiecutter.project_name}}.
 
 Provides dynamic agent registration, discovery, and instantiation.
+Initialized agents are shared through a pool (see `app.agents.pool`).
 """
 
 from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
 
 from app.agents.base import AgentConfig, BaseAgent
+from app.agents.pool import get_agent_pool, invalidate_pooled_agents
+from app.config import get_settings
 from app.infrastructure.llm_provider import OpenRouterProvider
 from app.utils.logging import get_logger
 
@@ -28,6 +31,7 @@ class AgentRegistry:
     - Registration via decorator or direct method call
     - Agent discovery by name or type
     - Dynamic instantiation with configuration
+    - Shared, pre-warmable instances per configuration (`acquire`, `warm_up`)
     - Agent metadata lookup
 
     Example:
@@ -43,6 +47,9 @@ class AgentRegistry:
     # Get and instantiate
     agent = AgentRegistry.create("customer_support", config=AgentConfig(...))
 
+    # Get the shared instance for a configuration (built once)
+    agent = AgentRegistry.acquire("customer_support", config=AgentConfig(...))
+
     # List all agents
     agents = AgentRegistry.list_agents()
     ```
@@ -75,6 +82,7 @@ class AgentRegistry:
                 ...
         """
         def decorator(agent_class: Type[T]) -> Type[T]:
+            invalidate_pooled_agents(name)
             cls._agents[name] = agent_class
             cls._metadata[name] = {
                 "description": description or getattr(agent_class, "description", ""),
@@ -102,6 +110,7 @@ class AgentRegistry:
             description: Optional description
             tags: Optional tags
         """
+        invalidate_pooled_agents(name)
         cls._agents[name] = agent_class
         cls._metadata[name] = {
             "description": description or getattr(agent_class, "description", ""),
@@ -124,6 +133,7 @@ class AgentRegistry:
         if name in cls._agents:
             del cls._agents[name]
             del cls._metadata[name]
+            invalidate_pooled_agents(name)
             logger.info(f"Unregistered agent: {name}")
             return True
         return False
@@ -170,6 +180,68 @@ class AgentRegistry:
         agent_class = cls.get(name)
         return agent_class(llm_provider=llm_provider, config=config)
 
+    @classmethod
+    def acquire(
+        cls,
+        name: str,
+        llm_provider: Optional[OpenRouterProvider] = None,
+        config: Optional[AgentConfig] = None
+    ) -> BaseAgent:
+        """
+        Get a shared, initialized instance of a registered agent.
+
+        Instances are pooled per (name, config, provider) and reused across
+        concurrent requests; the first call for a configuration builds it.
+        Falls back to `create` when AGENT_POOL_ENABLED is off.
+
+        Args:
+            name: Agent name
+            llm_provider: Optional LLM provider
+            config: Optional agent configuration
+
+        Returns:
+            Agent instance (do not mutate it: it is shared)
+
+        Raises:
+            AgentNotFoundError: If agent is not registered
+        """
+        if not get_settings().agent_pool_enabled:
+            return cls.create(name, llm_provider, config)
+        agent_class = cls.get(name)
+        provider = llm_provider or OpenRouterProvider()
+        config = config or AgentConfig()
+        return get_agent_pool().get(
+            name, config, provider, lambda: agent_class(llm_provider=provider, config=config)
+        )
+
+    @classmethod
+    def warm_up(
+        cls,
+        names: Optional[List[str]] = None,
+        llm_provider: Optional[OpenRouterProvider] = None,
+        config: Optional[AgentConfig] = None
+    ) -> List[str]:
+        """
+        Build pooled instances ahead of the first request.
+
+        Args:
+            names: Agents to build (defaults to every registered agent)
+            llm_provider: Optional LLM provider
+            config: Configuration to build (defaults to AgentConfig())
+
+        Returns:
+            Names of the agents that were built; failures are logged and skipped
+        """
+        warmed = []
+        for name in names if names is not None else cls.list_agents():
+            try:
+                cls.acquire(name, llm_provider, config)
+                warmed.append(name)
+            except Exception as e:
+                logger.warning(f"Could not pre-warm agent {name}: {e}")
+        logger.info(f"Pre-warmed agents: {warmed}")
+        return warmed
+
     @classmethod
     def exists(cls, name: str) -> bool:
         """Check if an agent is registered."""
@@ -217,6 +289,7 @@ class AgentRegistry:
         """Clear all registered agents. Useful for testing."""
         cls._agents.clear()
         cls._metadata.clear()
+        invalidate_pooled_agents()
         logger.info("Cleared all registered agents")
 
 
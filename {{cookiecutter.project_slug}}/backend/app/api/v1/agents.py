@@ -0,0 +1,173 @@
+"""
+Agent endpoints with streaming structured output.
+
+Partial structured responses are streamed as Server-Sent Events:
+- `data: {"data": {...partial response...}, "done": false}` - Partial update
+- `data: {"data": {...final response...}, "done": true}` - Stream complete
+- `data: {"error": "message"}` - Error occurred
+
+`/{agent_name}/stream` is delta-encoded instead (see `json_patch`): a
+`{"snapshot": {...}}` frame, then `{"patch": [...]}` frames with JSON Patch
+and `append` operations, then the final full object for verification.
+Reassemble it with `StreamAssembler`.
+
+Partials are coalesced by `SSEWriter`: when several arrive within one
+frame window only the newest is sent, since each supersedes the last.
+With stream replay enabled, streams are resumable with `Last-Event-ID`
+(see `stream_replay`); abandoned streams are cancelled upstream.
+"""
+
+import asyncio
+from typing import Any, AsyncGenerator, Optional
+
+from app.agents.agents.customer_support import CustomerSupportAgent
+from app.agents.base import AgentContext
+from app.agents.registry import AgentRegistry
+from app.infrastructure.admission import AdmissionTimeoutError
+from app.infrastructure.circuit_breaker import CircuitBreakerOpenError
+from app.infrastructure.llm_provider import OpenRouterProvider
+from app.infrastructure.stream_cancellation import record_client_disconnect
+from app.infrastructure.stream_replay import resumable_response, resume_from_request
+from app.middleware.rate_limit import RateLimits, limiter
+from app.security.clerk_auth import ClerkUser, require_current_user
+from app.utils.json_patch import DeltaEncoder
+from app.utils.logging import get_logger
+from app.utils.sse import (
+    ClientDisconnectedError,
+    SSEWriter,
+    encode_event,
+    latest_frame,
+)
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+logger = get_logger("agents_api")
+
+router = APIRouter()
+
+
+class AgentStreamRequest(BaseModel):
+    """Request model for agent streaming endpoints."""
+    message: str = Field(..., min_length=1, description="User message")
+    session_id: Optional[str] = Field(None, description="Session ID for grouping related traces")
+
+
+async def _stream_partials(
+    watch: Optional[Request],
+    partials: AsyncGenerator[Any, None],
+    agent_name: str,
+    user_id: str,
+    deltas: bool = False,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Encode an agent's partial responses as coalesced SSE frames (`watch` is polled for disconnects).
+
+    With `deltas`, partials after the first are sent as patches (see `DeltaEncoder`).
+    """
+    writer = SSEWriter()
+    payload = DeltaEncoder().frame if deltas else latest_frame
+    dump_mode = "json" if deltas else "python"
+    try:
+        async for frame in writer.stream(partials, payload=payload, request=watch):
+            yield frame
+
+        final = writer.last
+        yield writer.event({
+            "data": final.model_dump(mode=dump_mode) if final is not None else None,
+            "done": True,
+        })
+        logger.info(f"[{agent_name}] Stream completed for user {user_id}")
+
+    except (ClientDisconnectedError, asyncio.CancelledError, GeneratorExit) as e:
+        # Detected by polling, or the server cancelled the response first
+        last = writer.last
+        partial = last.model_dump_json() if last is not None else ""
+        record_client_disconnect(f"/agents/{agent_name}/stream", user_id, partial)
+        if not isinstance(e, ClientDisconnectedError):
+            raise
+
+    except (CircuitBreakerOpenError, AdmissionTimeoutError) as e:
+        logger.warning(f"[{agent_name}] LLM unavailable during stream for user {user_id}: {e}")
+        yield encode_event({
+            "error": f"Service temporarily unavailable. Retry after {e.retry_after:.0f} seconds.",
+            "retry_after": int(e.retry_after)
+        })
+
+    except ValueError as e:
+        logger.error(f"[{agent_name}] Configuration error in stream: {e}")
+        yield encode_event({"error": str(e)})
+
+    except Exception as e:
+        logger.error(f"[{agent_name}] Error in agent stream: {e}", exc_info=True)
+        yield encode_event({"error": "Failed to process agent request"})
+
+
+@router.post("/customer-support/stream")
+@limiter.limit(RateLimits.STREAMING)
+async def customer_support_stream(
+    request: Request,
+    request_body: AgentStreamRequest,
+    current_user: ClerkUser = Depends(require_current_user),
+) -> StreamingResponse:
+    """
+    Stream a customer support response as incremental structured updates.
+
+    Requires Clerk authentication. Resumable with `Last-Event-ID`.
+    """
+    resumed = await resume_from_request(request, owner=current_user.id)
+    if resumed is not None:
+        return resumed
+
+    async def partials() -> AsyncGenerator[Any, None]:
+        agent = CustomerSupportAgent(llm_provider=OpenRouterProvider())
+        async for partial in agent.handle_inquiry_stream(
+            customer_message=request_body.message,
+            customer_id=current_user.id,
+            session_id=request_body.session_id,
+        ):
+            yield partial
+
+    return await resumable_response(
+        request,
+        lambda watch: _stream_partials(watch, partials(), "customer_support", current_user.id),
+        owner=current_user.id,
+    )
+
+
+@router.post("/{agent_name}/stream")
+@limiter.limit(RateLimits.STREAMING)
+async def agent_stream(
+    request: Request,
+    agent_name: str,
+    request_body: AgentStreamRequest,
+    current_user: ClerkUser = Depends(require_current_user),
+) -> StreamingResponse:
+    """
+    Stream a registered agent's structured response (`BaseAgent.invoke_stream`).
+
+    Delta-encoded: a snapshot, then JSON Patch frames, then the final object.
+    Requires Clerk authentication. Resumable with `Last-Event-ID`.
+    """
+    if not AgentRegistry.exists(agent_name):
+        raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' not found")
+
+    resumed = await resume_from_request(request, owner=current_user.id)
+    if resumed is not None:
+        return resumed
+
+    async def partials() -> AsyncGenerator[Any, None]:
+        agent = AgentRegistry.acquire(agent_name, llm_provider=OpenRouterProvider())
+        context = AgentContext(
+            user_id=current_user.id,
+            session_id=request_body.session_id,
+            tags=["agent", "api", "streaming"],
+        )
+        async for partial in agent.invoke_stream(request_body.message, context):
+            yield partial
+
+    return await resumable_response(
+        request,
+        lambda watch: _stream_partials(watch, partials(), agent_name, current_user.id, deltas=True),
+        owner=current_user.id,
+    )
@@ -4,31 +4,73 @@ Chat endpoints for LLM interactions with LangChain + OpenRouter.
 Supports both synchronous and streaming responses.
 Rate limited to prevent abuse.
 Protected by circuit breaker to handle LLM API failures gracefully.
+Deterministic (temperature 0) requests are served from the response cache
+when enabled; cached hits are replayed on the streaming endpoint.
+Identical concurrent requests share one upstream LLM call (single-flight).
+Upstream calls pass through the LLM admission controller.
+Streamed tokens are coalesced into SSE frames by `SSEWriter`. With stream
+replay enabled, streams are generated detached from the connection into a
+replay buffer, so clients can resume with `Last-Event-ID`; abandoned
+streams are cancelled upstream.
+Batches run with bounded concurrency and stream NDJSON results.
+Requests with a `conversation_id` include the conversation's history,
+packed into the model's context window, and queue the turn for
+write-behind persistence.
 """
 
-import json
+import asyncio
+import time
 import uuid
-from typing import AsyncGenerator, Optional
-
+from typing import AsyncGenerator, AsyncIterator, List, Optional, Tuple
+
+import orjson
+from app.config import get_settings
+from app.exceptions import NotFoundError
+from app.infrastructure.admission import (
+    AdmissionTimeoutError,
+    Priority,
+    get_admission_controller,
+)
 from app.infrastructure.circuit_breaker import (
     CircuitBreakerOpenError,
     get_llm_circuit_breaker,
 )
 from app.infrastructure.langfuse_handler import get_langfuse_config
 from app.infrastructure.llm_provider import OpenRouterProvider
-from app.middleware.rate_limit import RateLimits, limiter
+from app.infrastructure.response_cache import get_response_cache, iter_cached_chunks
+from app.infrastructure.single_flight import get_single_flight, make_flight_key
+from app.infrastructure.stream_cancellation import (
+    record_client_disconnect,
+    record_stream_cancelled,
+    record_stream_completed,
+)
+from app.infrastructure.stream_replay import (
+    parse_last_event_id,
+    resumable_response,
+    resume_from_request,
+    resume_response,
+)
+from app.infrastructure.write_behind import PersistenceQueueFullError
+from app.middleware.rate_limit import RateLimits, limiter, request_cost
 from app.security.clerk_auth import ClerkUser, require_current_user
+from app.services.conversation_service import (
+    ConversationContext,
+    create_conversation,
+    load_context,
+    save_turn,
+)
 from app.utils.logging import get_logger
-from fastapi import APIRouter, Depends, HTTPException, Request
+from app.utils.sse import SSE_HEADERS, ClientDisconnectedError, SSEWriter, encode_event
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
 logger = get_logger("chat_api")
 
 router = APIRouter()
 
+CHAT_SYSTEM_PROMPT = "You are a helpful assistant. Provide clear, concise, and accurate responses."
+
 
 class ChatRequest(BaseModel):
     """Chat request model."""
@@ -36,12 +78,257 @@ class ChatRequest(BaseModel):
     model: Optional[str] = Field("openai/gpt-4o-mini", description="OpenRouter model name")
     temperature: Optional[float] = Field(0.7, ge=0.0, le=2.0, description="Model temperature")
     session_id: Optional[str] = Field(None, description="Session ID for grouping related traces in Langfuse")
+    conversation_id: Optional[str] = Field(None, description="Conversation to continue; its history is included and the turn is saved")
 
 
 class ChatResponse(BaseModel):
     """Chat response model."""
     response: str = Field(..., description="AI response")
     model_used: str = Field(..., description="Model that was used")
+    cached: bool = Field(False, description="Whether the response was served from the response cache")
+    conversation_id: Optional[str] = Field(None, description="Conversation the turn was saved to")
+    persistence_warning: Optional[str] = Field(None, description="Set when the turn could not be saved to the conversation")
+
+
+class CreateConversationRequest(BaseModel):
+    """Create conversation request model."""
+    title: Optional[str] = Field(None, max_length=500, description="Conversation title (defaults to the first message)")
+    model: Optional[str] = Field(None, description="OpenRouter model name")
+
+
+class ConversationResponse(BaseModel):
+    """Conversation response model."""
+    id: str = Field(..., description="Conversation ID")
+    title: Optional[str] = Field(None, description="Conversation title")
+    model_name: Optional[str] = Field(None, description="OpenRouter model name")
+
+
+async def _generate_response(
+    message: str,
+    model: str,
+    temperature: float,
+    user_id: str,
+    session_id: Optional[str],
+    priority: Priority,
+    tags: List[str],
+    history: Optional[List[Tuple[str, str]]] = None,
+) -> Tuple[str, bool]:
+    """
+    Produce a complete (non-streaming) chat response.
+
+    Deterministic requests without history are served from the response
+    cache when enabled. Otherwise the LLM call goes through single-flight,
+    the admission controller and the circuit breaker. `history` holds
+    prior (role, content) messages placed before `message`.
+
+    Returns:
+        (response text, whether it was served from the cache)
+
+    Raises:
+        CircuitBreakerOpenError: If the circuit breaker is open
+        AdmissionTimeoutError: If the call could not be admitted in time
+    """
+    # Serve deterministic requests from the response cache
+    response_cache = get_response_cache()
+    use_cache = (
+        not history
+        and response_cache is not None
+        and response_cache.is_cacheable(model, temperature)
+    )
+    if use_cache:
+        cached_text = await response_cache.get(model, CHAT_SYSTEM_PROMPT, message)
+        if cached_text is not None:
+            return cached_text, True
+
+    # Get cached chain (LLM client and prompt are reused across requests)
+    provider = OpenRouterProvider()
+    chain = provider.get_chat_chain(
+        CHAT_SYSTEM_PROMPT,
+        model_name=model,
+        temperature=temperature,
+        with_history=bool(history),
+    )
+    chain_input = {"input": message, "history": history} if history else {"input": message}
+
+    # Build Langfuse config with filtering attributes for easy filtering in Langfuse
+    # session_id groups related traces, user_id enables user-level filtering
+    langfuse_config = get_langfuse_config(
+        session_id=session_id or str(uuid.uuid4()),
+        user_id=user_id,
+        tags=tags,
+        metadata={
+            "model": model,
+            "temperature": temperature,
+        },
+    )
+
+    # Invoke chain with Langfuse config, protected by circuit breaker
+    async def invoke_llm():
+        return await chain.ainvoke(
+            chain_input,
+            config=langfuse_config
+        )
+
+    circuit_breaker = get_llm_circuit_breaker()
+
+    # Identical concurrent requests share one upstream call
+    flight_key = make_flight_key(
+        model,
+        {"temperature": temperature},
+        [("system", CHAT_SYSTEM_PROMPT), *(history or []), ("user", message)],
+    )
+    response_text = await get_single_flight().do(
+        flight_key,
+        lambda: get_admission_controller().run(
+            model,
+            priority,
+            lambda: circuit_breaker.call(invoke_llm),
+        ),
+    )
+
+    if use_cache:
+        await response_cache.set(model, CHAT_SYSTEM_PROMPT, message, response_text)
+    return response_text, False
+
+
+def circuit_retry_after() -> Optional[float]:
+    """Seconds until the LLM circuit breaker allows calls again, or None if it is not open."""
+    circuit_breaker = get_llm_circuit_breaker()
+    if circuit_breaker.state.value != "open":
+        return None
+    retry_after = circuit_breaker.config.timeout
+    if circuit_breaker.stats.opened_at:
+        elapsed = time.time() - circuit_breaker.stats.opened_at
+        retry_after = max(0, circuit_breaker.config.timeout - elapsed)
+    return retry_after
+
+
+def stream_tokens(
+    message: str,
+    model: str,
+    temperature: float,
+    user_id: str,
+    session_id: Optional[str],
+    tags: List[str],
+    history: Optional[List[Tuple[str, str]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream response tokens from the LLM.
+
+    `history` holds prior (role, content) messages placed before `message`.
+
+    The upstream stream passes through the admission controller and is
+    shared by identical concurrent requests (single-flight). Success and
+    failure are recorded once per upstream stream in the circuit breaker.
+    Closing the returned iterator cancels the upstream request once no
+    other subscriber remains.
+
+    Raises:
+        ValueError: If the LLM provider is not configured
+    """
+    # Get cached chain (LLM client and prompt are reused across requests)
+    provider = OpenRouterProvider()
+    chain = provider.get_chat_chain(
+        CHAT_SYSTEM_PROMPT,
+        model_name=model,
+        temperature=temperature,
+        with_history=bool(history),
+    )
+    chain_input = {"input": message, "history": history} if history else {"input": message}
+
+    # Build Langfuse config
+    langfuse_config = get_langfuse_config(
+        session_id=session_id or str(uuid.uuid4()),
+        user_id=user_id,
+        tags=tags,
+        metadata={
+            "model": model,
+            "temperature": temperature,
+            "streaming": True,
+        },
+    )
+    circuit_breaker = get_llm_circuit_breaker()
+
+    # Stream the response with circuit breaker tracking
+    # Note: For streaming, we track success/failure at the stream level,
+    # once per upstream stream (it may be shared by identical requests)
+    async def stream_llm() -> AsyncGenerator[str, None]:
+        async with get_admission_controller().admit(model, Priority.INTERACTIVE_STREAM) as ticket:
+            chunks = 0
+            try:
+                async for chunk in chain.astream(chain_input, config=langfuse_config):
+                    ticket.mark_first_token()
+                    chunks += 1
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # Every subscriber left: the upstream request is being closed
+                record_stream_cancelled(chunks)
+                raise
+            except Exception as stream_error:
+                # Record failure in circuit breaker
+                await circuit_breaker._record_failure(stream_error)
+                raise
+
+            # Stream completed successfully - record success
+            record_stream_completed(chunks)
+            await circuit_breaker._record_success()
+
+    flight_key = make_flight_key(
+        model,
+        {"temperature": temperature},
+        [("system", CHAT_SYSTEM_PROMPT), *(history or []), ("user", message)],
+    )
+    return get_single_flight().stream(flight_key, stream_llm)
+
+
+async def load_conversation_context(
+    conversation_id: Optional[str], user: ClerkUser, model: str, message: str
+) -> Optional[ConversationContext]:
+    """Load the history of `conversation_id`, if given (404 if it is not the user's)."""
+    if conversation_id is None:
+        return None
+    try:
+        return await load_context(conversation_id, user, model, CHAT_SYSTEM_PROMPT, message)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+
+
+async def _save_turn_or_warn(
+    context: ConversationContext, response: str, model: str, latency_ms: int
+) -> Optional[str]:
+    """
+    Queue the turn for persistence; returns a warning instead of raising if the queue is full.
+
+    The answer has already been generated (and paid for) at this point, so
+    it is returned to the client even when it cannot be saved.
+    """
+    try:
+        await save_turn(context, response, model, latency_ms=latency_ms)
+    except PersistenceQueueFullError as e:
+        logger.warning(f"Turn not saved to conversation {context.conversation_id}: {e}")
+        return f"The response was not saved to the conversation. {e}"
+    return None
+
+
+@router.post("/conversations", response_model=ConversationResponse, status_code=201)
+@limiter.limit(RateLimits.CHAT)
+async def create_chat_conversation(
+    request: Request,
+    request_body: CreateConversationRequest,
+    current_user: ClerkUser = Depends(require_current_user),
+) -> ConversationResponse:
+    """
+    Create a conversation for conversation-bound chat.
+
+    Pass the returned `id` as `conversation_id` to `/chat/` or
+    `/chat/stream` to include the conversation's history and save each turn.
+    """
+    conversation = await create_conversation(
+        current_user, model=request_body.model, title=request_body.title
+    )
+    return ConversationResponse(
+        id=conversation.id, title=conversation.title, model_name=conversation.model_name
+    )
 
 
 @router.post("/", response_model=ChatResponse)
@@ -55,51 +342,48 @@ async def chat(
     Send a message to the LLM and get a response.
     
     Requires Clerk authentication. Uses LangChain with OpenRouter.
-    No session storage - stateless conversation.
+    Stateless unless `conversation_id` is given: then the conversation's
+    history (as much as fits the model's context window) is included and
+    the turn is saved.
     """
-    # Get circuit breaker for LLM calls
-    circuit_breaker = get_llm_circuit_breaker()
-
+    context = await load_conversation_context(
+        request_body.conversation_id, current_user, request_body.model, request_body.message
+    )
     try:
         logger.info(f"Chat request from user {current_user.id}: {request_body.message[:50]}...")
 
-        # Initialize OpenRouter provider
-        provider = OpenRouterProvider()
-
-        # Get LLM instance
-        llm = provider.get_llm(
-            model_name=request_body.model,
-            temperature=request_body.temperature
-        )
-
-        # Create LangChain chain
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful assistant. Provide clear, concise, and accurate responses."),
-            ("user", "{input}")
-        ])
-
-        chain = prompt | llm | StrOutputParser()
-
-        # Build Langfuse config with filtering attributes for easy filtering in Langfuse
-        # session_id groups related traces, user_id enables user-level filtering
-        langfuse_config = get_langfuse_config(
-            session_id=request_body.session_id or str(uuid.uuid4()),
+        start = time.perf_counter()
+        response_text, cached = await _generate_response(
+            request_body.message,
+            request_body.model,
+            request_body.temperature,
             user_id=current_user.id,
+            session_id=request_body.session_id,
+            priority=Priority.INTERACTIVE_SYNC,
             tags=["chat", "api"],
-            metadata={
-                "model": request_body.model,
-                "temperature": request_body.temperature,
-            },
+            history=context.history if context else None,
         )
-
-        # Invoke chain with Langfuse config, protected by circuit breaker
-        async def invoke_llm():
-            return await chain.ainvoke(
-                {"input": request_body.message},
-                config=langfuse_config
+        if context is not None:
+            warning = await _save_turn_or_warn(
+                context,
+                response_text,
+                request_body.model,
+                latency_ms=int((time.perf_counter() - start) * 1000),
+            )
+            return ChatResponse(
+                response=response_text,
+                model_used=request_body.model,
+                cached=cached,
+                conversation_id=context.conversation_id,
+                persistence_warning=warning,
+            )
+        if cached:
+            logger.info(f"Chat response served from cache for user {current_user.id}")
+            return ChatResponse(
+                response=response_text,
+                model_used=request_body.model,
+                cached=True
             )
-
-        response_text = await circuit_breaker.call(invoke_llm)
 
         logger.info(f"Chat response generated successfully for user {current_user.id}")
 
@@ -108,8 +392,8 @@ async def chat(
             model_used=request_body.model
         )
 
-    except CircuitBreakerOpenError as e:
-        logger.warning(f"Circuit breaker open for user {current_user.id}: {e}")
+    except (CircuitBreakerOpenError, AdmissionTimeoutError) as e:
+        logger.warning(f"LLM unavailable for user {current_user.id}: {e}")
         raise HTTPException(
             status_code=503,
             detail=f"Service temporarily unavailable. Please retry after {e.retry_after:.0f} seconds.",
@@ -123,12 +407,127 @@ async def chat(
         raise HTTPException(status_code=500, detail="Failed to process chat request")
 
 
+class BatchChatItem(BaseModel):
+    """One prompt of a batch; model and temperature default to the batch's."""
+    message: str = Field(..., min_length=1, description="User message")
+    model: Optional[str] = Field(None, description="OpenRouter model name (overrides the batch model)")
+    temperature: Optional[float] = Field(None, ge=0.0, le=2.0, description="Model temperature (overrides the batch temperature)")
+
+
+class BatchChatRequest(BaseModel):
+    """Batch chat request model."""
+    items: List[BatchChatItem] = Field(..., min_length=1, description="Prompts to run")
+    model: str = Field("openai/gpt-4o-mini", description="Default OpenRouter model name")
+    temperature: float = Field(0.7, ge=0.0, le=2.0, description="Default model temperature")
+    session_id: Optional[str] = Field(None, description="Session ID for grouping related traces in Langfuse")
+
+
+class BatchChatResult(BaseModel):
+    """Result line of the batch endpoint (one per item, in completion order)."""
+    index: int = Field(..., description="Position of the item in the request")
+    response: Optional[str] = Field(None, description="AI response, if the item succeeded")
+    model_used: str = Field(..., description="Model that was used")
+    cached: bool = Field(False, description="Whether the response was served from the response cache")
+    error: Optional[str] = Field(None, description="Error message, if the item failed")
+    latency_ms: float = Field(..., description="Time taken by the item")
+
+
+async def batch_chat_body(request: Request, request_body: BatchChatRequest) -> BatchChatRequest:
+    """Check the batch size and charge the rate limit per item."""
+    max_items = get_settings().chat_batch_max_items
+    if len(request_body.items) > max_items:
+        raise HTTPException(status_code=422, detail=f"A batch may contain at most {max_items} items")
+    request.state.rate_limit_cost = len(request_body.items)
+    return request_body
+
+
+@router.post("/batch")
+@limiter.limit(RateLimits.BATCH, cost=request_cost)
+async def chat_batch(
+    request: Request,
+    request_body: BatchChatRequest = Depends(batch_chat_body),
+    current_user: ClerkUser = Depends(require_current_user),
+) -> StreamingResponse:
+    """
+    Run several prompts concurrently and stream the results as NDJSON.
+
+    Requires Clerk authentication. At most `chat_batch_concurrency` items
+    call the LLM at once; each passes through the circuit breaker and the
+    admission controller (at background priority). One `BatchChatResult`
+    line is written per item as soon as it completes, so lines arrive in
+    completion order; `index` refers to the item's position in the request.
+    Failed items carry `error` instead of `response`. The rate limit counts
+    each item.
+    """
+    settings = get_settings()
+    semaphore = asyncio.Semaphore(max(1, settings.chat_batch_concurrency))
+    session_id = request_body.session_id or str(uuid.uuid4())
+    logger.info(f"Batch chat request from user {current_user.id}: {len(request_body.items)} items")
+
+    async def run_item(index: int, item: BatchChatItem) -> BatchChatResult:
+        model = item.model or request_body.model
+        temperature = request_body.temperature if item.temperature is None else item.temperature
+        async with semaphore:
+            start = time.perf_counter()
+            response_text: Optional[str] = None
+            cached = False
+            error: Optional[str] = None
+            try:
+                response_text, cached = await _generate_response(
+                    item.message,
+                    model,
+                    temperature,
+                    user_id=current_user.id,
+                    session_id=session_id,
+                    priority=Priority.BACKGROUND,
+                    tags=["chat", "api", "batch"],
+                )
+            except (CircuitBreakerOpenError, AdmissionTimeoutError) as e:
+                error = f"Service temporarily unavailable. Retry after {e.retry_after:.0f} seconds."
+            except ValueError as e:
+                error = str(e)
+            except Exception as e:
+                logger.error(f"Error processing batch item {index}: {e}", exc_info=True)
+                error = "Failed to process chat request"
+            return BatchChatResult(
+                index=index,
+                response=response_text,
+                model_used=model,
+                cached=cached,
+                error=error,
+                latency_ms=(time.perf_counter() - start) * 1000,
+            )
+
+    async def generate_results() -> AsyncGenerator[bytes, None]:
+        tasks = [
+            asyncio.ensure_future(run_item(index, item))
+            for index, item in enumerate(request_body.items)
+        ]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                failed += result.error is not None
+                yield orjson.dumps(result.model_dump()) + b"\n"
+            logger.info(
+                f"Batch chat completed for user {current_user.id}: "
+                f"{len(tasks) - failed} succeeded, {failed} failed"
+            )
+        finally:
+            # Client went away mid-batch: drop items that have not finished
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(generate_results(), media_type="application/x-ndjson")
+
+
 class StreamingChatRequest(BaseModel):
     """Chat request model for streaming endpoint."""
     message: str = Field(..., min_length=1, description="User message")
     model: Optional[str] = Field("openai/gpt-4o-mini", description="OpenRouter model name")
     temperature: Optional[float] = Field(0.7, ge=0.0, le=2.0, description="Model temperature")
     session_id: Optional[str] = Field(None, description="Session ID for grouping related traces")
+    conversation_id: Optional[str] = Field(None, description="Conversation to continue; its history is included and the turn is saved")
 
 
 @router.post("/stream")
@@ -146,6 +545,7 @@ async def chat_stream(
     The response is streamed as SSE events:
     - `data: {"content": "token", "done": false}` - Content chunk
     - `data: {"content": "", "done": true, "model": "model_name"}` - Stream complete
+      (includes `"cached": true` when replayed from the response cache)
     - `data: {"error": "message"}` - Error occurred
 
     Example client code:
@@ -163,117 +563,169 @@ async def chat_stream(
       }
     };
     ```
+
+    With stream replay enabled (`STREAM_REPLAY_ENABLED`), each event carries
+    an id (`<stream_id>:<seq>`); the stream id is also sent in the
+    `X-Stream-ID` header. Generation then runs detached from the
+    connection: repeating the request with a `Last-Event-ID` header (or
+    `GET /chat/stream/{stream_id}`) resumes after that event instead of
+    calling the LLM again. Otherwise a disconnect cancels the LLM call.
+
+    With `conversation_id`, the conversation's history is included and the
+    turn is saved once the stream completes.
     """
-    # Get circuit breaker for LLM calls
-    circuit_breaker = get_llm_circuit_breaker()
+    # Reconnects resume the buffered stream instead of generating again
+    resumed = await resume_from_request(request, owner=current_user.id)
+    if resumed is not None:
+        return resumed
+
+    context = await load_conversation_context(
+        request_body.conversation_id, current_user, request_body.model, request_body.message
+    )
+    response_cache = get_response_cache()
+    use_cache = (
+        context is None
+        and response_cache is not None
+        and response_cache.is_cacheable(request_body.model, request_body.temperature)
+    )
+
+    async def replay_cached(cached_text: str) -> AsyncGenerator[bytes, None]:
+        """Replay a cached response as a fast synthetic SSE stream."""
+        async def cached_chunks() -> AsyncGenerator[str, None]:
+            for chunk in iter_cached_chunks(cached_text):
+                yield chunk
+
+        writer = SSEWriter()
+        async for frame in writer.stream(cached_chunks()):
+            yield frame
+
+        yield writer.event({
+            "content": "",
+            "done": True,
+            "model": request_body.model,
+            "total_length": len(cached_text),
+            "cached": True
+        })
+
+    # Cached hits are replayed without touching the LLM (even if the circuit is open)
+    if use_cache:
+        cached_text = await response_cache.get(
+            request_body.model, CHAT_SYSTEM_PROMPT, request_body.message
+        )
+        if cached_text is not None:
+            logger.info(f"Streaming chat replayed from cache for user {current_user.id}")
+            return StreamingResponse(
+                replay_cached(cached_text),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS
+            )
 
     # Check circuit breaker state before starting stream
     # (We check early to avoid starting a stream that will immediately fail)
-    if circuit_breaker.state.value == "open":
-        retry_after = circuit_breaker.config.timeout
-        if circuit_breaker.stats.opened_at:
-            import time
-            elapsed = time.time() - circuit_breaker.stats.opened_at
-            retry_after = max(0, circuit_breaker.config.timeout - elapsed)
+    retry_after = circuit_retry_after()
+    if retry_after is not None:
         raise HTTPException(
             status_code=503,
             detail=f"Service temporarily unavailable. Please retry after {retry_after:.0f} seconds.",
             headers={"Retry-After": str(int(retry_after))}
         )
 
-    async def generate_stream() -> AsyncGenerator[str, None]:
-        """Generate SSE events from LLM stream."""
+    async def generate_stream(watch: Optional[Request]) -> AsyncGenerator[bytes, None]:
+        """Generate SSE events from LLM stream (`watch` is polled for client disconnects)."""
+        writer = SSEWriter()
         try:
             logger.info(f"Streaming chat request from user {current_user.id}: {request_body.message[:50]}...")
 
-            # Initialize OpenRouter provider
-            provider = OpenRouterProvider()
-
-            # Get LLM instance
-            llm = provider.get_llm(
-                model_name=request_body.model,
-                temperature=request_body.temperature
-            )
-
-            # Create LangChain chain
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", "You are a helpful assistant. Provide clear, concise, and accurate responses."),
-                ("user", "{input}")
-            ])
-
-            chain = prompt | llm | StrOutputParser()
-
-            # Build Langfuse config
-            langfuse_config = get_langfuse_config(
-                session_id=request_body.session_id or str(uuid.uuid4()),
+            start = time.perf_counter()
+            tokens = stream_tokens(
+                request_body.message,
+                request_body.model,
+                request_body.temperature,
                 user_id=current_user.id,
+                session_id=request_body.session_id,
                 tags=["chat", "api", "streaming"],
-                metadata={
-                    "model": request_body.model,
-                    "temperature": request_body.temperature,
-                    "streaming": True,
-                },
+                history=context.history if context else None,
             )
 
-            # Stream the response with circuit breaker tracking
-            # Note: For streaming, we track success/failure at the stream level
-            full_response = ""
-            chunk_count = 0
-
-            try:
-                async for chunk in chain.astream(
-                    {"input": request_body.message},
-                    config=langfuse_config
-                ):
-                    chunk_count += 1
-                    full_response += chunk
-                    # Yield SSE event with content chunk
-                    event_data = json.dumps({"content": chunk, "done": False})
-                    yield f"data: {event_data}\n\n"
-
-                # Stream completed successfully - record success
-                await circuit_breaker._record_success()
-
-                # Send completion event
-                completion_data = json.dumps({
-                    "content": "",
-                    "done": True,
-                    "model": request_body.model,
-                    "total_length": len(full_response)
-                })
-                yield f"data: {completion_data}\n\n"
-
-                logger.info(f"Streaming chat completed for user {current_user.id}")
+            # Tokens are coalesced into frames; the writer keeps the transcript
+            async for frame in writer.stream(tokens, request=watch):
+                yield frame
+            full_response = writer.text
 
-            except Exception as stream_error:
-                # Record failure in circuit breaker
-                await circuit_breaker._record_failure(stream_error)
-                raise
+            if use_cache:
+                await response_cache.set(
+                    request_body.model, CHAT_SYSTEM_PROMPT, request_body.message, full_response
+                )
 
-        except CircuitBreakerOpenError as e:
-            logger.warning(f"Circuit breaker open during stream for user {current_user.id}: {e}")
-            error_data = json.dumps({
+            done_event = {
+                "content": "",
+                "done": True,
+                "model": request_body.model,
+                "total_length": len(full_response)
+            }
+            if context is not None:
+                warning = await _save_turn_or_warn(
+                    context,
+                    full_response,
+                    request_body.model,
+                    latency_ms=int((time.perf_counter() - start) * 1000),
+                )
+                done_event["conversation_id"] = context.conversation_id
+                if warning:
+                    done_event["persistence_warning"] = warning
+
+            # Send completion event
+            yield writer.event(done_event)
+
+            logger.info(f"Streaming chat completed for user {current_user.id}")
+
+        except ClientDisconnectedError:
+            record_client_disconnect("/chat/stream", current_user.id, writer.text)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # The server cancelled the response because the client went away
+            record_client_disconnect("/chat/stream", current_user.id, writer.text)
+            raise
+
+        except (CircuitBreakerOpenError, AdmissionTimeoutError) as e:
+            logger.warning(f"LLM unavailable during stream for user {current_user.id}: {e}")
+            yield encode_event({
                 "error": f"Service temporarily unavailable. Retry after {e.retry_after:.0f} seconds.",
                 "retry_after": int(e.retry_after)
             })
-            yield f"data: {error_data}\n\n"
 
         except ValueError as e:
             logger.error(f"Configuration error in stream: {e}")
-            error_data = json.dumps({"error": str(e)})
-            yield f"data: {error_data}\n\n"
+            yield encode_event({"error": str(e)})
 
         except Exception as e:
             logger.error(f"Error in streaming chat: {e}", exc_info=True)
-            error_data = json.dumps({"error": "Failed to process chat request"})
-            yield f"data: {error_data}\n\n"
-
-    return StreamingResponse(
-        generate_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # Disable nginx buffering
-        }
-    )
+            yield encode_event({"error": "Failed to process chat request"})
+
+    return await resumable_response(request, generate_stream, owner=current_user.id)
+
+
+@router.get("/stream/{stream_id}")
+@limiter.limit(RateLimits.STREAMING)
+async def resume_chat_stream(
+    request: Request,
+    stream_id: str,
+    last_event_id: Optional[int] = Query(None, ge=0, description="Resume after this event (defaults to the Last-Event-ID header)"),
+    current_user: ClerkUser = Depends(require_current_user),
+) -> StreamingResponse:
+    """
+    Resume a chat or agent stream from the replay buffer.
+
+    Requires Clerk authentication. Events after `last_event_id` (or the
+    `Last-Event-ID` header) are replayed, then the stream is followed
+    until it completes. Works with `EventSource` reconnection.
+    """
+    after = last_event_id
+    if after is None:
+        position = parse_last_event_id(request.headers.get("last-event-id"))
+        after = position[1] if position is not None and position[0] == stream_id else 0
+
+    response = await resume_response(stream_id, after, owner=current_user.id)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+    return response
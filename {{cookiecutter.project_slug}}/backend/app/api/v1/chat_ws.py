@@ -0,0 +1,369 @@
+"""
+Multiplexed WebSocket chat transport.
+
+One socket carries any number of concurrent chat streams. Authentication
+happens once, when the connection is opened (see `require_websocket_user`),
+instead of on every message. Each stream still counts against the
+streaming rate limit.
+
+Messages are JSON objects with a `type`. Client to server:
+
+- `{"type": "start", "stream_id": "s1", "message": "...", "model": ..., "temperature": ..., "session_id": ...}`
+- `{"type": "cancel", "stream_id": "s1"}`: stop the stream (the upstream LLM request is closed)
+- `{"type": "ack", "stream_id": "s1", "seq": 7}`: frames up to `seq` were processed
+- `{"type": "ping"}`
+
+Server to client:
+
+- `{"type": "ready", "user_id": ..., "max_streams": 8, "max_unacked": 32}`
+- `{"type": "chunk", "stream_id": "s1", "seq": 1, "content": "..."}`
+- `{"type": "done", "stream_id": "s1", "seq": 9, "model": ..., "total_length": ..., "cached": false}`
+- `{"type": "cancelled", "stream_id": "s1"}`
+- `{"type": "error", "stream_id": "s1", "error": "...", "retry_after": 30}` (`stream_id` is
+  null for protocol errors)
+- `{"type": "pong"}`
+
+Flow control: a stream sends at most `ws_max_unacked_frames` frames beyond
+the last acknowledged `seq`. Once the window is full, tokens collect in a
+bounded per-stream buffer (`ws_stream_buffer_chunks`). When that buffer
+fills too, the stream stops reading its token source, so a slow client
+cannot grow server buffers. (The upstream stream itself is read by
+single-flight, which keeps one transcript per upstream call.) When the
+window reopens, all buffered tokens go out as one frame. Tokens that
+arrive while the window is open are coalesced as on the SSE endpoint.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
+from app.api.v1.chat import CHAT_SYSTEM_PROMPT, circuit_retry_after, stream_tokens
+from app.config import get_settings
+from app.infrastructure.admission import AdmissionTimeoutError
+from app.infrastructure.circuit_breaker import CircuitBreakerOpenError
+from app.infrastructure.response_cache import get_response_cache, iter_cached_chunks
+from app.infrastructure.stream_cancellation import record_client_disconnect
+from app.middleware.rate_limit import RateLimits, hit_rate_limit
+from app.security.clerk_auth import ClerkUser, require_websocket_user
+from app.utils.logging import get_logger
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, ValidationError
+
+logger = get_logger("chat_ws")
+
+router = APIRouter()
+
+# Marks the end of a stream's token source
+_END = object()
+
+
+class StartStreamMessage(BaseModel):
+    """Client message starting a chat stream."""
+    stream_id: str = Field(..., min_length=1, max_length=64, description="Client-chosen stream ID")
+    message: str = Field(..., min_length=1, description="User message")
+    model: str = Field("openai/gpt-4o-mini", description="OpenRouter model name")
+    temperature: float = Field(0.7, ge=0.0, le=2.0, description="Model temperature")
+    session_id: Optional[str] = Field(None, description="Session ID for grouping related traces")
+
+
+class _SourceFailure:
+    """Wraps an exception raised by a stream's token source."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ChatStream:
+    """
+    One stream multiplexed on a chat socket.
+
+    Tracks the sequence numbers sent and acknowledged, and blocks the
+    sender while `max_unacked` frames are outstanding.
+    """
+
+    def __init__(self, stream_id: str, max_unacked: int):
+        self.stream_id = stream_id
+        self.max_unacked = max(1, max_unacked)
+        self.sent = 0
+        self.acked = 0
+        self.task: Optional[asyncio.Task] = None
+        self._window_open = asyncio.Event()
+        self._window_open.set()
+
+    @property
+    def unacked(self) -> int:
+        return self.sent - self.acked
+
+    def ack(self, seq: int) -> None:
+        """Acknowledge all frames up to `seq` (acks are cumulative)."""
+        self.acked = max(self.acked, min(seq, self.sent))
+        if self.unacked < self.max_unacked:
+            self._window_open.set()
+
+    async def wait_for_window(self) -> None:
+        """Wait until another frame may be sent."""
+        while self.unacked >= self.max_unacked:
+            self._window_open.clear()
+            await self._window_open.wait()
+
+    def next_seq(self) -> int:
+        self.sent += 1
+        return self.sent
+
+
+class ChatSocket:
+    """Serves the streams of one authenticated WebSocket connection."""
+
+    def __init__(self, websocket: WebSocket, user: ClerkUser):
+        settings = get_settings()
+        self.websocket = websocket
+        self.user = user
+        self.max_streams = settings.ws_max_streams_per_connection
+        self.max_unacked = settings.ws_max_unacked_frames
+        self.buffer_chunks = settings.ws_stream_buffer_chunks
+        self.coalesce = settings.sse_coalesce_ms / 1000.0
+        self.max_frame_chars = settings.sse_max_frame_chars
+        self.streams: Dict[str, ChatStream] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        """Send one message (sends from concurrent streams are serialized)."""
+        async with self._send_lock:
+            await self.websocket.send_text(orjson.dumps(payload).decode())
+
+    async def send_error(
+        self, stream_id: Optional[str], error: str, retry_after: Optional[float] = None
+    ) -> None:
+        payload: Dict[str, Any] = {"type": "error", "stream_id": stream_id, "error": error}
+        if retry_after is not None:
+            payload["retry_after"] = int(retry_after)
+        await self.send(payload)
+
+    async def serve(self) -> None:
+        """Handle client messages until the socket closes."""
+        await self.send({
+            "type": "ready",
+            "user_id": self.user.id,
+            "max_streams": self.max_streams,
+            "max_unacked": self.max_unacked,
+        })
+        try:
+            while True:
+                raw = await self.websocket.receive_text()
+                try:
+                    message = orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    await self.send_error(None, "Invalid JSON")
+                    continue
+                if not isinstance(message, dict):
+                    await self.send_error(None, "Messages must be JSON objects")
+                    continue
+                await self.handle(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Closes the upstream LLM requests of all open streams
+            tasks = [stream.task for stream in self.streams.values() if stream.task is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def handle(self, message: Dict[str, Any]) -> None:
+        """Dispatch one client message."""
+        kind = message.get("type")
+        stream_id = message.get("stream_id")
+        stream = self.streams.get(stream_id) if isinstance(stream_id, str) else None
+
+        if kind == "start":
+            await self.start(message)
+        elif kind == "ack":
+            if stream is not None and isinstance(message.get("seq"), int):
+                stream.ack(message["seq"])
+        elif kind == "cancel":
+            if stream is not None and stream.task is not None:
+                stream.task.cancel()
+        elif kind == "ping":
+            await self.send({"type": "pong"})
+        else:
+            await self.send_error(stream_id, f"Unknown message type: {kind!r}")
+
+    async def start(self, message: Dict[str, Any]) -> None:
+        """Validate a start message and launch its stream."""
+        try:
+            request = StartStreamMessage.model_validate(message)
+        except ValidationError as e:
+            await self.send_error(message.get("stream_id"), f"Invalid start message: {e.errors()[0]['msg']}")
+            return
+
+        if request.stream_id in self.streams:
+            await self.send_error(request.stream_id, "Stream ID already in use")
+            return
+        if len(self.streams) >= self.max_streams:
+            await self.send_error(request.stream_id, f"At most {self.max_streams} concurrent streams")
+            return
+        if not hit_rate_limit(RateLimits.STREAMING, "chat_ws", f"user:{self.user.id}"):
+            await self.send_error(request.stream_id, f"Rate limit exceeded: {RateLimits.STREAMING}")
+            return
+
+        retry_after = circuit_retry_after()
+        if retry_after is not None:
+            await self.send_error(
+                request.stream_id,
+                f"Service temporarily unavailable. Retry after {retry_after:.0f} seconds.",
+                retry_after,
+            )
+            return
+
+        stream = ChatStream(request.stream_id, self.max_unacked)
+        self.streams[request.stream_id] = stream
+        stream.task = asyncio.create_task(self.run(stream, request))
+
+    async def _read(self, source: AsyncIterator[str], queue: asyncio.Queue) -> None:
+        """Pull tokens into the stream's bounded buffer (blocks while it is full)."""
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(_SourceFailure(e))
+
+    async def _next_frame(self, stream: ChatStream, queue: asyncio.Queue) -> List[Any]:
+        """
+        Collect the items of the next frame.
+
+        Waits for the flow-control window, then takes everything already
+        buffered. After the first frame, it also waits up to the coalescing
+        window for more tokens. A frame ends at the end of the source or at
+        the frame size budget.
+        """
+        await stream.wait_for_window()
+        items = [await queue.get()]
+        chars = len(items[0]) if isinstance(items[0], str) else 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.coalesce if stream.sent else 0.0)
+
+        while isinstance(items[-1], str) and chars < self.max_frame_chars:
+            if queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = queue.get_nowait()
+            items.append(item)
+            if isinstance(item, str):
+                chars += len(item)
+        return items
+
+    async def run(self, stream: ChatStream, request: StartStreamMessage) -> None:
+        """Stream one response to the client."""
+        parts: List[str] = []
+        reader: Optional[asyncio.Task] = None
+        try:
+            response_cache = get_response_cache()
+            use_cache = response_cache is not None and response_cache.is_cacheable(
+                request.model, request.temperature
+            )
+            cached_text = None
+            if use_cache:
+                cached_text = await response_cache.get(request.model, CHAT_SYSTEM_PROMPT, request.message)
+
+            if cached_text is not None:
+                async def cached_chunks() -> AsyncIterator[str]:
+                    for chunk in iter_cached_chunks(cached_text):
+                        yield chunk
+                source = cached_chunks()
+            else:
+                source = stream_tokens(
+                    request.message,
+                    request.model,
+                    request.temperature,
+                    user_id=self.user.id,
+                    session_id=request.session_id,
+                    tags=["chat", "api", "streaming", "websocket"],
+                )
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.buffer_chunks))
+            reader = asyncio.create_task(self._read(source, queue))
+
+            finished = False
+            while not finished:
+                items = await self._next_frame(stream, queue)
+                text = [item for item in items if isinstance(item, str)]
+                if text:
+                    parts.extend(text)
+                    await self.send({
+                        "type": "chunk",
+                        "stream_id": stream.stream_id,
+                        "seq": stream.next_seq(),
+                        "content": "".join(text),
+                    })
+                if isinstance(items[-1], _SourceFailure):
+                    raise items[-1].error
+                finished = items[-1] is _END
+
+            full_response = "".join(parts)
+            if use_cache and cached_text is None:
+                await response_cache.set(request.model, CHAT_SYSTEM_PROMPT, request.message, full_response)
+
+            await self.send({
+                "type": "done",
+                "stream_id": stream.stream_id,
+                "seq": stream.next_seq(),
+                "model": request.model,
+                "total_length": len(full_response),
+                "cached": cached_text is not None,
+            })
+            logger.info(f"WebSocket stream {stream.stream_id} completed for user {self.user.id}")
+
+        except asyncio.CancelledError:
+            # Cancel message, or the socket closed
+            record_client_disconnect("/chat/ws", self.user.id, "".join(parts))
+            try:
+                await self.send({"type": "cancelled", "stream_id": stream.stream_id})
+            except Exception:
+                pass
+
+        except (CircuitBreakerOpenError, AdmissionTimeoutError) as e:
+            logger.warning(f"LLM unavailable during WebSocket stream for user {self.user.id}: {e}")
+            await self.send_error(
+                stream.stream_id,
+                f"Service temporarily unavailable. Retry after {e.retry_after:.0f} seconds.",
+                e.retry_after,
+            )
+
+        except ValueError as e:
+            logger.error(f"Configuration error in WebSocket stream: {e}")
+            await self.send_error(stream.stream_id, str(e))
+
+        except WebSocketDisconnect:
+            record_client_disconnect("/chat/ws", self.user.id, "".join(parts))
+
+        except Exception as e:
+            logger.error(f"Error in WebSocket stream: {e}", exc_info=True)
+            await self.send_error(stream.stream_id, "Failed to process chat request")
+
+        finally:
+            # Stops reading from upstream (closing the LLM request)
+            if reader is not None:
+                reader.cancel()
+            self.streams.pop(stream.stream_id, None)
+
+
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    current_user: ClerkUser = Depends(require_websocket_user),
+) -> None:
+    """
+    Multiplexed chat streaming over a WebSocket (see the module docstring for the protocol).
+
+    Authenticate with an `Authorization: Bearer` header or a `token` query parameter.
+    """
+    await websocket.accept()
+    logger.info(f"WebSocket chat connected for user {current_user.id}")
+    await ChatSocket(websocket, current_user).serve()
+    logger.info(f"WebSocket chat closed for user {current_user.id}")
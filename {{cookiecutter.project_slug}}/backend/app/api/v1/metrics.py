@@ -4,7 +4,21 @@ Simple metrics endpoints for {{cookiecutter.project_name}}.
 
 from typing import Any, Dict
 
+from app.agents.pool import get_agent_pool_stats
 from app.config import Settings, get_settings
+from app.infrastructure.admission import get_admission_controller
+from app.infrastructure.embedding_batcher import get_embedding_batcher_stats
+from app.infrastructure.embedding_cache import get_embedding_cache_stats
+from app.infrastructure.hedging import get_hedging_stats
+from app.infrastructure.llm_provider import get_llm_cache_stats
+from app.infrastructure.model_catalog import get_model_catalog
+from app.infrastructure.model_router import get_model_router
+from app.infrastructure.response_cache import get_response_cache_stats
+from app.infrastructure.single_flight import get_single_flight
+from app.infrastructure.stream_cancellation import get_stream_cancellation_stats
+from app.infrastructure.stream_replay import get_stream_replay_stats
+from app.infrastructure.write_behind import get_write_behind_stats
+from app.utils.token_counter import get_token_counter_stats
 from fastapi import APIRouter, Depends
 
 router = APIRouter()
@@ -36,3 +50,26 @@ async def get_metrics_summary(
         "status": "healthy",
         "version": settings.app_version
     }
+
+
+@router.get("/llm")
+async def get_llm_metrics() -> Dict[str, Any]:
+    """
+    Get LLM client metrics for dashboards.
+    """
+    return {
+        "client_cache": get_llm_cache_stats(),
+        "model_catalog": get_model_catalog().stats(),
+        "embedding_batches": get_embedding_batcher_stats(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "response_cache": get_response_cache_stats(),
+        "single_flight": get_single_flight().stats(),
+        "hedging": get_hedging_stats(),
+        "model_router": get_model_router().stats(),
+        "admission": get_admission_controller().stats(),
+        "stream_cancellation": get_stream_cancellation_stats(),
+        "stream_replay": get_stream_replay_stats(),
+        "write_behind": get_write_behind_stats(),
+        "token_counter": get_token_counter_stats(),
+        "agent_pool": get_agent_pool_stats(),
+    }
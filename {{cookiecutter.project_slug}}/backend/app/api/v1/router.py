@@ -2,7 +2,7 @@
 Main API v1 router for {{cookiecutter.project_name}}.
 """
 
-from app.api.v1 import auth, chat, health, metrics
+from app.api.v1 import agents, auth, chat, chat_ws, health, metrics
 from fastapi import APIRouter
 
 api_router = APIRouter(prefix="/v1")
@@ -10,5 +10,7 @@ api_router = APIRouter(prefix="/v1")
 # Include all endpoint routers
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(chat_ws.router, prefix="/chat", tags=["chat"])
+api_router.include_router(agents.router, prefix="/agents", tags=["agents"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics", "monitoring"])
@@ -280,6 +280,46 @@ def chat_fallback(models, temperature):
         console.print("\n[yellow]Chat session ended[/yellow]")
 
 
+@llm.command("mock-server")
+@click.option("--host", default="127.0.0.1", help="Host to bind to")
+@click.option("--port", "-p", default=8089, type=int, help="Port to bind to")
+@click.option("--ttft-ms", default=200.0, type=float, help="Time to first token (ms)")
+@click.option("--tokens-per-second", default=50.0, type=float, help="Output token rate")
+@click.option("--error-rate", default=0.0, type=float, help="Fraction of requests failing with 500")
+@click.option("--rate-limit-rate", default=0.0, type=float, help="Fraction of requests failing with 429")
+@click.option("--retry-after", default=1.0, type=float, help="Retry-After seconds sent with 429s")
+@click.option("--fixtures", type=click.Path(exists=True, dir_okay=False), help="JSON file of response fixtures")
+@click.option("--seed", default=0, type=int, help="Seed for jitter and failure injection")
+def mock_server(host, port, ttft_ms, tokens_per_second, error_rate, rate_limit_rate, retry_after, fixtures, seed):
+    """Run a local OpenAI-compatible mock LLM server for offline benchmarks."""
+    import uvicorn
+
+    from app.mock_llm import MockLLMConfig, create_mock_llm_app, load_fixtures
+
+    config = MockLLMConfig(
+        ttft_ms=ttft_ms,
+        tokens_per_second=tokens_per_second,
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+        retry_after_seconds=retry_after,
+        fixtures=load_fixtures(fixtures) if fixtures else [],
+        seed=seed,
+    )
+    console.print(Panel.fit(
+        f"[bold green]Mock LLM server[/bold green]\n"
+        f"TTFT: {ttft_ms:g}ms, {tokens_per_second:g} tokens/s\n"
+        f"Errors: {error_rate:.0%}, 429s: {rate_limit_rate:.0%}\n\n"
+        f"Point the backend at it with:\n"
+        f"[cyan]OPENROUTER_BASE_URL=http://{host}:{port}/v1[/cyan]",
+        title="Mock LLM Configuration"
+    ))
+
+    try:
+        uvicorn.run(create_mock_llm_app(config), host=host, port=port, log_level="warning")
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Mock server stopped by user[/yellow]")
+
+
 def _test_openrouter():
     """Test OpenRouter connection."""
     try:
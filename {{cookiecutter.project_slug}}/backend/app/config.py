@@ -27,7 +27,126 @@ class Settings(BaseSettings):
 
     # OpenRouter (optional, for future use)
     openrouter_api_key: str = ""
-    
+    # OpenAI-compatible API base URL; point at `llm mock-server` for offline benchmarks
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
+
+    # Shared LLM HTTP transport (one keep-alive pool per process)
+    llm_http2_enabled: bool = True
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 20
+    llm_http_keepalive_expiry_seconds: float = 30.0
+    llm_http_timeout_seconds: float = 120.0
+    llm_http_connect_timeout_seconds: float = 10.0
+
+    # Cache of configured LLM clients and compiled chains
+    llm_client_cache_size: int = 64
+
+    # OpenRouter model catalog (limits and pricing)
+    model_catalog_ttl_seconds: int = 3600
+    model_catalog_snapshot_path: str = str(PROJECT_ROOT / ".cache" / "openrouter_models.json")
+
+    # Embedding micro-batching
+    embedding_batch_size: int = 64
+    embedding_batch_window_ms: float = 5.0
+    embedding_max_concurrency: int = 4
+
+    # Embedding cache (in-process LRU + memory-mapped store on disk)
+    embedding_cache_enabled: bool = True
+    embedding_cache_memory_size: int = 10000
+    embedding_cache_dir: str = str(PROJECT_ROOT / ".cache" / "embeddings")
+
+    # LLM response cache for temperature-0 chat requests
+    response_cache_enabled: bool = False
+    response_cache_backend: str = "memory"  # memory, redis or sqlite
+    response_cache_ttl_seconds: int = 3600
+    response_cache_max_entries: int = 1000
+    response_cache_models: str = "*"  # comma-separated opt-in list, * for all
+    response_cache_sqlite_path: str = str(PROJECT_ROOT / ".cache" / "responses.db")
+    response_cache_semantic_enabled: bool = False
+    response_cache_semantic_threshold: float = 0.95
+    response_cache_embedding_model: str = "openai/text-embedding-3-small"
+
+    # Coalesce identical in-flight LLM calls into one upstream call
+    single_flight_enabled: bool = True
+
+    # Hedged requests (get_llm_with_fallbacks(..., hedge=True))
+    llm_hedge_percentile: float = 90.0
+    llm_hedge_min_delay_ms: float = 250.0
+    llm_hedge_max_delay_ms: float = 10000.0
+    llm_hedge_default_delay_ms: float = 2000.0
+    llm_hedge_min_samples: int = 20
+
+    # Adaptive model router (EWMA latency/cost statistics per model)
+    model_router_enabled: bool = True
+    model_router_ewma_alpha: float = 0.2
+    model_router_max_error_rate: float = 0.2
+    model_router_error_half_life_seconds: float = 300.0  # error rates decay while a model is idle
+    model_router_probe_rate: float = 0.05  # share of calls probing unmeasured/unhealthy models
+    model_router_stats_path: str = str(PROJECT_ROOT / ".cache" / "model_router.json")
+
+    # Outbound LLM admission control (per-model AIMD concurrency limits)
+    llm_admission_enabled: bool = True
+    llm_admission_initial_limit: int = 8
+    llm_admission_min_limit: int = 1
+    llm_admission_max_limit: int = 64
+    llm_admission_queue_timeout_seconds: float = 30.0
+
+    # Server-Sent Events streaming (frame coalescing and heartbeats)
+    sse_coalesce_ms: float = 15.0
+    sse_max_frame_chars: int = 4096
+    sse_heartbeat_seconds: float = 15.0
+    sse_disconnect_poll_ms: float = 250.0
+    sse_max_queued_items: int = 256  # read ahead of a slow client
+
+    # Resumable streams (Last-Event-ID replay buffer; generation runs detached,
+    # so a disconnect cancels the LLM request only after the detach grace period)
+    stream_replay_enabled: bool = False
+    stream_replay_backend: str = "memory"  # memory or redis (shared by workers)
+    stream_replay_ttl_seconds: int = 300
+    stream_replay_max_events: int = 2000  # per stream
+    stream_replay_max_streams: int = 1000  # memory backend
+    stream_replay_detach_grace_seconds: float = 15.0
+    stream_replay_poll_ms: float = 100.0  # streams generated by another worker
+
+    # Batch chat endpoint (items per request, concurrent LLM calls per batch)
+    chat_batch_max_items: int = 50
+    chat_batch_concurrency: int = 8
+
+    # Agent instance pool (initialized agents shared per name and config)
+    agent_pool_enabled: bool = True
+    agent_pool_max_size: int = 64
+    agent_pool_idle_ttl_seconds: float = 1800.0  # evict configs unused this long (0 keeps them)
+    agent_pool_prewarm: bool = False  # build every registered agent at startup
+
+    # Agent pipelines (stages run as a dependency graph)
+    pipeline_max_concurrency: int = 4
+    pipeline_stage_timeout_seconds: float = 120.0  # per attempt (0 disables)
+
+    # Parallel fan-out across agents/models (AgentOrchestrator.invoke_parallel)
+    parallel_branch_timeout_seconds: float = 120.0  # per branch (0 disables)
+
+    # Token counting (one cached tokenizer per model family, memoized counts)
+    token_count_cache_size: int = 50000
+
+    # Conversation-bound chat (history packed into the model's context window)
+    chat_history_max_messages: int = 200  # rows read per turn, however long the conversation
+    chat_context_default_limit: int = 8192  # when the model is not in the catalog
+    chat_context_reserve_tokens: int = 1024  # kept free for the completion
+
+    # Write-behind persistence (batched message inserts, coalesced row updates)
+    persistence_write_behind_enabled: bool = True
+    persistence_batch_size: int = 100
+    persistence_batch_window_ms: float = 50.0
+    persistence_max_pending: int = 10000  # backpressure limit
+    persistence_enqueue_timeout_seconds: float = 5.0
+    persistence_max_retries: int = 3
+    persistence_shutdown_timeout_seconds: float = 30.0
+
+    # WebSocket chat (concurrent streams per connection, unacknowledged frames per stream)
+    ws_max_streams_per_connection: int = 8
+    ws_max_unacked_frames: int = 32
+    ws_stream_buffer_chunks: int = 256
+
     # Langfuse Observability (optional)
     langfuse_enabled: bool = False
     langfuse_secret_key: str = ""
@@ -74,6 +193,11 @@ class Settings(BaseSettings):
         """Parse comma-separated CORS_ORIGINS string into list."""
         return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
 
+    @computed_field
+    def response_cache_models_list(self) -> list[str]:
+        """Parse comma-separated RESPONSE_CACHE_MODELS string into list."""
+        return [model.strip() for model in self.response_cache_models.split(",") if model.strip()]
+
 
 # Global settings instance
 settings = Settings()
@@ -7,7 +7,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, String, Text
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
@@ -48,6 +48,9 @@ class Conversation(Base):
     # Summary for long conversations (can be used for context compression)
     summary = Column(Text, nullable=True)
 
+    # Sum of the token counts of all messages (the last message's cumulative_tokens)
+    total_tokens = Column(Integer, default=0, nullable=False)
+
     # Flexible metadata for custom fields
     metadata = Column(JSON, default=dict)
 
@@ -7,7 +7,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship
 
@@ -33,6 +33,12 @@ class Message(Base):
     system prompts, and tool call results.
     """
     __tablename__ = "messages"
+    __table_args__ = (
+        # History reads: newest messages of one conversation, in order
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+        # Budget reads: the messages after a running-total threshold
+        Index("ix_messages_conversation_cumulative", "conversation_id", "cumulative_tokens"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False, index=True)
@@ -51,6 +57,11 @@ class Message(Base):
     tool_call_id = Column(String(100), nullable=True)
     tool_name = Column(String(100), nullable=True)
 
+    # Tokens in the content, counted once at insert (used for context packing)
+    token_count = Column(Integer, nullable=True)
+    # Running total of token_count in the conversation, up to and including this message
+    cumulative_tokens = Column(Integer, nullable=True)
+
     # Metrics for assistant messages
     tokens_input = Column(Integer, nullable=True)
     tokens_output = Column(Integer, nullable=True)
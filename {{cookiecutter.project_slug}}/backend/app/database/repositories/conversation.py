@@ -3,9 +3,9 @@ Conversation repository for {{cookiecutter.project_name}}.
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional
 
-from sqlalchemy import desc, select
+from sqlalchemy import desc, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -121,6 +121,32 @@ class ConversationRepository:
             await db.refresh(conversation)
         return conversation
 
+    @staticmethod
+    async def bulk_update(db: AsyncSession, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Apply column updates to many conversations, keyed by conversation id.
+
+        Updates with the same set of columns are sent as one executemany
+        UPDATE by primary key.
+
+        Returns:
+            Number of conversations updated
+        """
+        groups: Dict[FrozenSet[str], List[Dict[str, Any]]] = {}
+        for conversation_id, values in updates.items():
+            groups.setdefault(frozenset(values), []).append({"id": conversation_id, **values})
+        for params in groups.values():
+            await db.execute(update(Conversation), params)
+        return len(updates)
+
+    @staticmethod
+    def title_from_message(message_content: str, max_length: int = 100) -> str:
+        """Conversation title from the first message content."""
+        title = message_content.strip()
+        if len(title) > max_length:
+            title = title[:max_length - 3] + "..."
+        return title
+
     @staticmethod
     async def archive(db: AsyncSession, conversation_id: str) -> Optional[Conversation]:
         """Archive a conversation."""
@@ -172,9 +198,5 @@ class ConversationRepository:
         max_length: int = 100
     ) -> Optional[Conversation]:
         """Generate and set title from first message content."""
-        # Truncate and clean up the content for a title
-        title = message_content.strip()
-        if len(title) > max_length:
-            title = title[:max_length - 3] + "..."
-
+        title = ConversationRepository.title_from_message(message_content, max_length)
         return await ConversationRepository.update(db, conversation_id, title=title)
@@ -3,12 +3,14 @@ Message repository for {{cookiecutter.project_name}}.
 """
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import asc, desc, select
+from sqlalchemy import asc, desc, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...utils.logging import get_logger
+from ...utils.token_counter import DEFAULT_MODEL, count_text_tokens
+from ..models.conversation import Conversation
 from ..models.message import Message, MessageRoleEnum
 
 logger = get_logger("message_repository")
@@ -17,6 +19,36 @@ logger = get_logger("message_repository")
 class MessageRepository:
     """Repository for Message model operations."""
 
+    @staticmethod
+    async def _assign_running_totals(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        """
+        Fill `token_count` and `cumulative_tokens` of new message rows, in order.
+
+        Rows without a count are counted once here. Each conversation's
+        `total_tokens` is advanced with one atomic UPDATE ... RETURNING, so
+        concurrent writers to a conversation cannot interleave running totals.
+        """
+        added: Dict[str, int] = {}
+        for row in rows:
+            if row.get("token_count") is None:
+                row["token_count"] = count_text_tokens(row["content"], row.get("model") or DEFAULT_MODEL)
+            added[row["conversation_id"]] = added.get(row["conversation_id"], 0) + row["token_count"]
+
+        running: Dict[str, int] = {}
+        for conversation_id, tokens in added.items():
+            result = await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(total_tokens=Conversation.total_tokens + tokens)
+                .returning(Conversation.total_tokens)
+            )
+            total = result.scalar_one_or_none()
+            running[conversation_id] = (total if total is not None else tokens) - tokens
+
+        for row in rows:
+            running[row["conversation_id"]] += row["token_count"]
+            row["cumulative_tokens"] = running[row["conversation_id"]]
+
     @staticmethod
     async def create(
         db: AsyncSession,
@@ -27,14 +59,15 @@ class MessageRepository:
         tool_calls: Optional[List[Dict[str, Any]]] = None,
         tool_call_id: Optional[str] = None,
         tool_name: Optional[str] = None,
+        token_count: Optional[int] = None,
         tokens_input: Optional[int] = None,
         tokens_output: Optional[int] = None,
         latency_ms: Optional[int] = None,
         structured_output: Optional[Dict[str, Any]] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> Message:
-        """Create a new message."""
-        message = Message(
+        """Create a new message (its token count is computed if not given)."""
+        row = dict(
             conversation_id=conversation_id,
             role=role,
             content=content,
@@ -42,23 +75,48 @@ class MessageRepository:
             tool_calls=tool_calls,
             tool_call_id=tool_call_id,
             tool_name=tool_name,
+            token_count=token_count,
             tokens_input=tokens_input,
             tokens_output=tokens_output,
             latency_ms=latency_ms,
             structured_output=structured_output,
             metadata=metadata or {}
         )
+        await MessageRepository._assign_running_totals(db, [row])
+        message = Message(**row)
         db.add(message)
         await db.flush()
         await db.refresh(message)
         logger.debug(f"Created message: {message.id} in conversation: {conversation_id}")
         return message
 
+    @staticmethod
+    async def bulk_create(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many messages in one statement.
+
+        Rows are dicts of Message attributes, in chronological order. The
+        insert is sent as a multi-row INSERT (or executemany, depending on
+        the driver); no rows are fetched back, so ids and timestamps should
+        be set by the caller. Token counts and running totals are filled in
+        as in `create`.
+
+        Returns:
+            Number of rows inserted
+        """
+        if not rows:
+            return 0
+        await MessageRepository._assign_running_totals(db, rows)
+        await db.execute(insert(Message), rows)
+        logger.debug(f"Inserted {len(rows)} messages")
+        return len(rows)
+
     @staticmethod
     async def create_user_message(
         db: AsyncSession,
         conversation_id: str,
         content: str,
+        token_count: Optional[int] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> Message:
         """Create a user message."""
@@ -67,6 +125,7 @@ class MessageRepository:
             conversation_id=conversation_id,
             role=MessageRoleEnum.USER,
             content=content,
+            token_count=token_count,
             metadata=metadata
         )
 
@@ -77,6 +136,7 @@ class MessageRepository:
         content: str,
         model: Optional[str] = None,
         tool_calls: Optional[List[Dict[str, Any]]] = None,
+        token_count: Optional[int] = None,
         tokens_input: Optional[int] = None,
         tokens_output: Optional[int] = None,
         latency_ms: Optional[int] = None,
@@ -91,6 +151,7 @@ class MessageRepository:
             content=content,
             model=model,
             tool_calls=tool_calls,
+            token_count=token_count,
             tokens_input=tokens_input,
             tokens_output=tokens_output,
             latency_ms=latency_ms,
@@ -189,6 +250,73 @@ class MessageRepository:
         # Return in chronological order
         return list(reversed(messages))
 
+    @staticmethod
+    async def get_history_within_budget(
+        db: AsyncSession,
+        conversation_id: str,
+        token_budget: int,
+        max_messages: int = 200,
+        overhead_tokens: int = 0,
+    ) -> Tuple[List[Tuple[str, str]], int, bool]:
+        """
+        Get the newest user/assistant messages that fit a token budget.
+
+        Uses the running totals stored at insert: the messages whose
+        `cumulative_tokens` exceed the conversation's `total_tokens` minus
+        the budget are the longest suffix that can fit, read with one
+        range query over the (conversation_id, cumulative_tokens) index.
+        Nothing is tokenized, and at most `max_messages` rows are read
+        however long the conversation is. Per-message overhead is then
+        applied to the rows read, dropping the oldest until they fit.
+
+        Args:
+            db: Database session
+            conversation_id: Conversation to read
+            token_budget: Maximum total tokens of the returned messages
+            max_messages: Upper bound on rows read
+            overhead_tokens: Chat-format tokens added per message
+
+        Returns:
+            ((role, content) pairs in chronological order, their total tokens,
+            whether older messages were left out)
+        """
+        total_tokens = (
+            select(Conversation.total_tokens)
+            .where(Conversation.id == conversation_id)
+            .scalar_subquery()
+        )
+        query = (
+            select(Message.role, Message.content, Message.token_count, Message.cumulative_tokens)
+            .where(
+                Message.conversation_id == conversation_id,
+                Message.cumulative_tokens > total_tokens - token_budget,
+                Message.role.in_([MessageRoleEnum.USER, MessageRoleEnum.ASSISTANT]),
+            )
+            .order_by(desc(Message.cumulative_tokens), desc(Message.created_at))
+            .limit(max_messages + 1)
+        )
+        result = await db.execute(query)
+        rows = result.all()
+
+        history: List[Tuple[str, str]] = []
+        total = 0
+        truncated = len(rows) > max_messages
+        oldest_start = 0
+        for role, content, token_count, cumulative in rows[:max_messages]:
+            token_count += overhead_tokens
+            if total + token_count > token_budget:
+                truncated = True
+                break
+            history.append((role.value, content))
+            total += token_count
+            oldest_start = cumulative - (token_count - overhead_tokens)
+
+        # Messages before the oldest one kept were left out
+        truncated = truncated or oldest_start > 0
+
+        history.reverse()
+        return history, total, truncated
+
     @staticmethod
     async def count_by_conversation(
         db: AsyncSession,
@@ -9,11 +9,22 @@ from .langfuse_handler import (
     get_langfuse_handler,
     shutdown_langfuse,
 )
-from .llm_provider import OpenRouterEmbeddings, OpenRouterProvider
+from .http_client import close_http_clients, get_http_async_client, open_http_clients
+from .llm_provider import (
+    OpenRouterEmbeddings,
+    OpenRouterProvider,
+    clear_llm_caches,
+    get_llm_cache_stats,
+)
 
 __all__ = [
     "OpenRouterEmbeddings",
     "OpenRouterProvider",
+    "clear_llm_caches",
+    "get_llm_cache_stats",
+    "get_http_async_client",
+    "open_http_clients",
+    "close_http_clients",
     "get_langfuse_handler",
     "get_langfuse_callbacks",
     "get_langfuse_config",
@@ -0,0 +1,402 @@
+"""
+Admission control for outbound LLM calls.
+
+Every upstream LLM call (chat endpoints, agents, orchestrator routing and
+training rollouts) is admitted through a per-model concurrency limiter:
+
+- Priority classes: interactive streams are admitted before interactive
+  sync calls, which are admitted before background/training work.
+- The limit adapts AIMD-style: it grows additively while calls succeed,
+  and shrinks multiplicatively on 429 responses or when time-to-first-token
+  degrades well beyond its recent median. Only streamed calls report TTFT;
+  the full latency of a non-streamed call mostly reflects how long its
+  completion is, so it is not used as a congestion signal.
+- A 429 with `Retry-After` pauses admissions for that model until the
+  indicated time.
+- Queue-wait time, in-flight calls and current limits are reported through
+  `get_admission_controller().stats()`.
+"""
+
+import asyncio
+import heapq
+import itertools
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("admission")
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Admission priority classes (lower value is admitted first)."""
+    INTERACTIVE_STREAM = 0
+    INTERACTIVE_SYNC = 1
+    BACKGROUND = 2
+
+
+class AdmissionTimeoutError(Exception):
+    """Raised when a call waits longer than the admission queue timeout."""
+
+    def __init__(self, model: str, retry_after: float):
+        self.model = model
+        self.retry_after = retry_after
+        super().__init__(
+            f"LLM admission queue for '{model}' is full. Retry after {retry_after:.1f} seconds."
+        )
+
+
+def get_retry_after(exception: BaseException) -> Optional[float]:
+    """
+    Return the Retry-After delay (seconds) if `exception` is an upstream 429.
+
+    Returns:
+        Seconds to wait (0.0 if the 429 had no Retry-After header),
+        or None if the exception is not a rate-limit response
+    """
+    response = getattr(exception, "response", None)
+    status = getattr(exception, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+
+
+@dataclass
+class AdmissionStats:
+    """Statistics for one model's limiter."""
+
+    admitted: int = 0
+    rate_limited: int = 0
+    timeouts: int = 0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "timeouts": self.timeouts,
+            "avg_queue_wait_ms": self.queue_wait_total / self.admitted * 1000 if self.admitted else 0.0,
+            "max_queue_wait_ms": self.queue_wait_max * 1000,
+        }
+
+
+class ModelLimiter:
+    """AIMD concurrency limiter with a priority queue, for one model."""
+
+    def __init__(
+        self,
+        model: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        baseline_window: int = 50,
+        min_baseline_samples: int = 10,
+    ):
+        self.model = model
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.min_baseline_samples = min_baseline_samples
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.baseline_latency: Optional[float] = None
+        self._ttft_samples: "deque[float]" = deque(maxlen=baseline_window)
+        self.stats = AdmissionStats()
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def _can_admit(self) -> bool:
+        if time.time() < self.blocked_until:
+            return False
+        return self.in_flight < max(self.min_limit, int(self.limit))
+
+    def _wake(self) -> None:
+        """Admit queued callers in priority order while capacity allows."""
+        self._wake_handle = None
+        while self._waiters and self._can_admit():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+        # Paused by Retry-After: try again when the pause ends
+        if self._waiters and self._wake_handle is None and time.time() < self.blocked_until:
+            loop = asyncio.get_running_loop()
+            self._wake_handle = loop.call_later(self.blocked_until - time.time(), self._wake)
+
+    async def acquire(self, priority: Priority, timeout: Optional[float]) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent in the queue
+
+        Raises:
+            AdmissionTimeoutError: If no slot frees up within `timeout`
+        """
+        start = time.perf_counter()
+        if not self._waiters and self._can_admit():
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+            self._wake()
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                if future.done() and not future.cancelled():
+                    # Admitted just as the timeout fired: give the slot back
+                    self.release(None, None)
+                future.cancel()
+                self.stats.timeouts += 1
+                retry_after = max(1.0, self.blocked_until - time.time())
+                raise AdmissionTimeoutError(self.model, retry_after)
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release(None, None)
+                future.cancel()
+                raise
+
+        waited = time.perf_counter() - start
+        self.stats.admitted += 1
+        self.stats.queue_wait_total += waited
+        self.stats.queue_wait_max = max(self.stats.queue_wait_max, waited)
+        return waited
+
+    def release(
+        self, ttft: Optional[float], retry_after: Optional[float], success: bool = False
+    ) -> None:
+        """
+        Free a slot and adapt the limit.
+
+        Args:
+            ttft: Time to first token in seconds (None if not streamed or failed)
+            retry_after: Retry-After seconds if the call got a 429, else None
+            success: Whether the call completed
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+
+        if retry_after is not None:
+            # Multiplicative decrease and pause on rate limiting
+            self.stats.rate_limited += 1
+            self.limit = max(float(self.min_limit), self.limit / 2)
+            if retry_after > 0:
+                self.blocked_until = max(self.blocked_until, time.time() + retry_after)
+            logger.warning(
+                f"Rate limited on {self.model}: limit -> {self.limit:.1f}, "
+                f"retry after {retry_after:.1f}s"
+            )
+        elif success or ttft is not None:
+            degraded = False
+            if ttft is not None:
+                # Compare against the median of recent TTFTs, then record this one
+                if len(self._ttft_samples) >= self.min_baseline_samples:
+                    degraded = ttft > self.baseline_latency * self.latency_tolerance
+                self._ttft_samples.append(ttft)
+                self.baseline_latency = statistics.median(self._ttft_samples)
+
+            if degraded:
+                self.limit = max(float(self.min_limit), self.limit * 0.9)
+            else:
+                # Additive increase: about +1 per limit's worth of successes
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+
+        self._wake()
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = self.stats.to_dict()
+        stats.update({
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "paused_for_s": max(0.0, self.blocked_until - time.time()),
+            "baseline_ttft_ms": self.baseline_latency * 1000 if self.baseline_latency else None,
+        })
+        return stats
+
+
+class Ticket:
+    """Handle for an admitted call; streams mark their first token for latency."""
+
+    def __init__(self, started_at: float, queue_wait: float):
+        self.started_at = started_at
+        self.queue_wait = queue_wait
+        self.first_token_at: Optional[float] = None
+
+    def mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Per-model admission control for outbound LLM calls.
+
+    Usage:
+        admission = get_admission_controller()
+
+        # Context manager
+        async with admission.admit(model, Priority.INTERACTIVE_SYNC):
+            result = await chain.ainvoke(inputs)
+
+        # One-shot call
+        result = await admission.run(model, Priority.BACKGROUND, lambda: chain.ainvoke(inputs))
+
+        # Stream (TTFT is measured to the first chunk)
+        async for chunk in admission.stream(model, Priority.INTERACTIVE_STREAM,
+                                            lambda: chain.astream(inputs)):
+            ...
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        queue_timeout: Optional[float] = 30.0,
+        latency_tolerance: float = 2.0,
+    ):
+        self.enabled = enabled
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self._limiters: Dict[str, ModelLimiter] = {}
+
+    def limiter(self, model: str) -> ModelLimiter:
+        """Get or create the limiter for a model."""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = self._limiters[model] = ModelLimiter(
+                model,
+                initial_limit=self.initial_limit,
+                min_limit=self.min_limit,
+                max_limit=self.max_limit,
+                latency_tolerance=self.latency_tolerance,
+            )
+        return limiter
+
+    @asynccontextmanager
+    async def admit(
+        self, model: str, priority: Priority = Priority.INTERACTIVE_SYNC
+    ) -> AsyncIterator[Ticket]:
+        """
+        Hold a concurrency slot for `model` for the duration of the block.
+
+        Raises:
+            AdmissionTimeoutError: If the call could not be admitted in time
+        """
+        if not self.enabled:
+            yield Ticket(time.perf_counter(), 0.0)
+            return
+
+        limiter = self.limiter(model)
+        waited = await limiter.acquire(priority, self.queue_timeout)
+        ticket = Ticket(time.perf_counter(), waited)
+        try:
+            yield ticket
+        except BaseException as e:
+            retry_after = get_retry_after(e) if isinstance(e, Exception) else None
+            limiter.release(None, retry_after)
+            raise
+        else:
+            ttft = ticket.first_token_at - ticket.started_at if ticket.first_token_at else None
+            limiter.release(ttft, None, success=True)
+
+    async def run(
+        self,
+        model: str,
+        priority: Priority,
+        fn: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Run one upstream call once admitted."""
+        async with self.admit(model, priority):
+            return await fn()
+
+    async def stream(
+        self,
+        model: str,
+        priority: Priority,
+        factory: Callable[[], AsyncIterator[T]],
+    ) -> AsyncIterator[T]:
+        """Iterate an upstream stream while holding a slot."""
+        async with self.admit(model, priority) as ticket:
+            async for chunk in factory():
+                ticket.mark_first_token()
+                yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-model admission statistics."""
+        return {model: limiter.to_dict() for model, limiter in self._limiters.items()}
+
+
+# Global controller instance
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the process-wide admission controller."""
+    global _admission_controller
+    if _admission_controller is None:
+        settings = get_settings()
+        _admission_controller = AdmissionController(
+            enabled=settings.llm_admission_enabled,
+            initial_limit=settings.llm_admission_initial_limit,
+            min_limit=settings.llm_admission_min_limit,
+            max_limit=settings.llm_admission_max_limit,
+            queue_timeout=settings.llm_admission_queue_timeout_seconds or None,
+        )
+    return _admission_controller
+
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionTimeoutError",
+    "Priority",
+    "get_admission_controller",
+    "get_retry_after",
+]
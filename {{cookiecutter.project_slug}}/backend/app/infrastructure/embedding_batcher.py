@@ -0,0 +1,231 @@
+"""
+Micro-batching engine for embedding requests.
+
+Concurrent `aembed_query` / `aembed_documents` calls are coalesced within a
+short window into batches of at most N texts, so a burst of single-text
+queries becomes a handful of HTTP requests instead of one per text.
+Oversized inputs are split into bounded chunks, chunks run with bounded
+concurrency, and results are fanned back to each caller in order.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("embedding_batcher")
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+@dataclass
+class _PendingRequest:
+    """A caller's texts waiting for the next batch."""
+    texts: List[str]
+    future: asyncio.Future
+
+
+@dataclass
+class EmbeddingBatcherStats:
+    """Statistics for embedding batching."""
+
+    requests: int = 0
+    texts: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+        }
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding calls into bounded batches.
+
+    Usage:
+        batcher = EmbeddingBatcher(embed_fn, max_batch_size=64, max_wait_ms=5)
+        vectors = await batcher.embed(["first text", "second text"])
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_concurrency: int = 4,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            embed_fn: Coroutine that embeds one batch of texts in a single request
+            max_batch_size: Maximum number of texts per upstream request
+            max_wait_ms: How long to wait for more texts before sending a partial batch
+            max_concurrency: Maximum number of batches in flight at once
+        """
+        self.embed_fn = embed_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrency = max(1, max_concurrency)
+
+        self._stats = EmbeddingBatcherStats()
+        self._pending: List[_PendingRequest] = []
+        self._pending_count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Strong references to in-flight dispatch tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """Bind loop-specific state to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # New loop (e.g. a fresh asyncio.run in scripts/tests): reset state
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._pending = []
+            self._pending_count = 0
+            self._timer = None
+        return loop
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, sharing upstream requests with concurrent callers.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding vector per input text, in input order
+        """
+        if not texts:
+            return []
+
+        loop = self._bind_loop()
+        self._stats.requests += 1
+        self._stats.texts += len(texts)
+
+        # Full-size chunks go straight out; only the remainder waits for company
+        waiters: List[Awaitable[List[List[float]]]] = []
+        full_chunks = len(texts) // self.max_batch_size
+        for i in range(full_chunks):
+            chunk = texts[i * self.max_batch_size:(i + 1) * self.max_batch_size]
+            waiters.append(self._run_batch(chunk))
+
+        remainder = texts[full_chunks * self.max_batch_size:]
+        if remainder:
+            future = loop.create_future()
+            self._pending.append(_PendingRequest(remainder, future))
+            self._pending_count += len(remainder)
+            if self._pending_count >= self.max_batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait, self._flush)
+            waiters.append(future)
+
+        results = await asyncio.gather(*waiters)
+        return [vector for chunk in results for vector in chunk]
+
+    def _flush(self) -> None:
+        """Send all pending texts as one or more batches."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch: List[_PendingRequest] = []
+            count = 0
+            while self._pending and count + len(self._pending[0].texts) <= self.max_batch_size:
+                request = self._pending.pop(0)
+                batch.append(request)
+                count += len(request.texts)
+            self._pending_count -= count
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[_PendingRequest]) -> None:
+        """Run one coalesced batch and fan results back to each caller."""
+        texts = [text for request in batch for text in request.texts]
+        try:
+            vectors = await self._run_batch(texts)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            size = len(request.texts)
+            if not request.future.done():
+                request.future.set_result(vectors[offset:offset + size])
+            offset += size
+
+    async def _run_batch(self, texts: List[str]) -> List[List[float]]:
+        """Send one upstream request, bounded by the concurrency limit."""
+        async with self._semaphore:
+            self._stats.batches += 1
+            try:
+                vectors = await self.embed_fn(texts)
+            except Exception:
+                self._stats.failed_batches += 1
+                raise
+
+        if len(vectors) != len(texts):
+            raise ValueError(
+                f"Embedding API returned {len(vectors)} vectors for {len(texts)} texts"
+            )
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Get batching statistics."""
+        return self._stats.to_dict()
+
+
+# Registry of batchers, one per (model, credentials)
+_batchers: Dict[Hashable, EmbeddingBatcher] = {}
+
+
+def get_embedding_batcher(key: Hashable, embed_fn: EmbedFn) -> EmbeddingBatcher:
+    """
+    Get or create the shared batcher for a model.
+
+    Uses singleton pattern so calls from different embeddings instances
+    with the same model and credentials are batched together.
+    """
+    if key not in _batchers:
+        settings = get_settings()
+        _batchers[key] = EmbeddingBatcher(
+            embed_fn,
+            max_batch_size=settings.embedding_batch_size,
+            max_wait_ms=settings.embedding_batch_window_ms,
+            max_concurrency=settings.embedding_max_concurrency,
+        )
+    return _batchers[key]
+
+
+def get_embedding_batcher_stats() -> Dict[str, Dict[str, Any]]:
+    """Get statistics for all embedding batchers, keyed by model."""
+    return {
+        str(key[0]) if isinstance(key, tuple) else str(key): batcher.stats()
+        for key, batcher in _batchers.items()
+    }
+
+
+__all__ = [
+    "EmbeddingBatcher",
+    "get_embedding_batcher",
+    "get_embedding_batcher_stats",
+]
@@ -0,0 +1,349 @@
+"""
+Content-addressed embedding cache.
+
+Embeddings are keyed by (model, sha256(text)) and stored in two tiers:
+
+- Tier 1: an in-process LRU of float32 arrays.
+- Tier 2: an on-disk, append-only vector store per model. Vectors are
+  appended to a raw float32 file that is memory-mapped for zero-copy
+  reads, and an append-only offset index maps text digests to vector
+  positions. Writers serialize through a file lock, and readers pick up
+  entries appended by other uvicorn workers by re-reading the index tail,
+  so the store is shared across workers and survives restarts.
+"""
+
+import hashlib
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = get_logger("embedding_cache")
+
+# Index record: sha256 digest, offset (in float32 elements), dimension
+_INDEX_RECORD = struct.Struct("<32sQI")
+
+
+def text_digest(text: str) -> bytes:
+    """Content address of a text."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Statistics for the embedding cache."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+class VectorStore:
+    """
+    Append-only, memory-mapped float32 vector store for a single model.
+
+    Files:
+        <name>.f32   raw float32 vectors, back to back
+        <name>.idx   fixed-size records (digest, offset, dim)
+        <name>.lock  writer lock
+
+    Vectors are written before their index records, so any offset a reader
+    finds in the index is already present in the data file. A torn tail
+    left by a crashed writer is truncated before the next append.
+    """
+
+    def __init__(self, directory: Path, name: str):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = directory / f"{name}.f32"
+        self.index_path = directory / f"{name}.idx"
+        self.lock_path = directory / f"{name}.lock"
+
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._index_pos = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self.data_path.touch(exist_ok=True)
+        self.index_path.touch(exist_ok=True)
+        self._reload_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _reload_index(self) -> None:
+        """Read index records appended since the last reload."""
+        size = self.index_path.stat().st_size
+        if size <= self._index_pos:
+            return
+
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            # Only consume complete records; a concurrent append may be partial
+            count = (size - self._index_pos) // _INDEX_RECORD.size
+            chunk = f.read(count * _INDEX_RECORD.size)
+
+        for digest, offset, dim in _INDEX_RECORD.iter_unpack(chunk):
+            self._index[digest] = (offset, dim)
+        self._index_pos += len(chunk)
+
+    def _view(self, offset: int, dim: int) -> np.ndarray:
+        """Zero-copy view of one vector, remapping the data file if it grew."""
+        end = offset + dim
+        if self._mmap is None or end > self._mmap.shape[0]:
+            elements = self.data_path.stat().st_size // 4
+            self._mmap = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(elements,))
+        return self._mmap[offset:end]
+
+    def get_many(self, digests: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """Look up vectors by digest; missing entries are None."""
+        with self._lock:
+            if any(digest not in self._index for digest in digests):
+                # Pick up entries written by other workers
+                self._reload_index()
+
+            results: List[Optional[np.ndarray]] = []
+            for digest in digests:
+                entry = self._index.get(digest)
+                results.append(self._view(*entry) if entry else None)
+            return results
+
+    def _truncate_torn_tails(self) -> None:
+        """Cut partial records left by an interrupted append (call with the file lock held)."""
+        for path, unit in ((self.index_path, _INDEX_RECORD.size), (self.data_path, 4)):
+            size = path.stat().st_size
+            if size % unit:
+                logger.warning(f"Truncating {size % unit} torn byte(s) at the end of {path}")
+                os.truncate(path, size - size % unit)
+
+    def put_many(self, items: Sequence[Tuple[bytes, np.ndarray]]) -> int:
+        """
+        Append vectors that are not already stored.
+
+        Returns:
+            Number of vectors written
+        """
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Appends must start on a record boundary
+                self._truncate_torn_tails()
+                # Another worker may have stored some of these meanwhile
+                self._reload_index()
+                items = [(d, v) for d, v in items if d not in self._index]
+                if not items:
+                    return 0
+
+                records = []
+                with open(self.data_path, "ab") as data_file:
+                    offset = data_file.tell() // 4
+                    for digest, vector in items:
+                        vector = np.ascontiguousarray(vector, dtype=np.float32)
+                        data_file.write(vector.tobytes())
+                        records.append((digest, offset, vector.shape[0]))
+                        offset += vector.shape[0]
+                    data_file.flush()
+                    os.fsync(data_file.fileno())
+
+                with open(self.index_path, "ab") as index_file:
+                    index_file.write(b"".join(_INDEX_RECORD.pack(*r) for r in records))
+
+                self._reload_index()
+                return len(records)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    """
+    Two-tier (memory LRU + memory-mapped disk) embedding cache.
+
+    Usage:
+        cache = get_embedding_cache()
+        vectors = cache.get_many(model, texts)   # None for misses
+        cache.put_many(model, missing_texts, new_vectors)
+    """
+
+    def __init__(self, memory_size: int = 10000, directory: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            memory_size: Maximum number of vectors kept in the in-process LRU
+            directory: Directory for the on-disk stores (None disables tier 2)
+        """
+        self.memory_size = max(1, memory_size)
+        self.directory = Path(directory) if directory else None
+
+        self._memory: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._stores: Dict[str, VectorStore] = {}
+        self._stats = EmbeddingCacheStats()
+        self._lock = threading.Lock()
+
+    def _store(self, model: str) -> Optional[VectorStore]:
+        """Get the disk store for a model, opening it on first use."""
+        if self.directory is None:
+            return None
+        store = self._stores.get(model)
+        if store is None:
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+            try:
+                store = VectorStore(self.directory, name)
+            except OSError as e:
+                logger.warning(f"Embedding disk cache disabled for {model}: {e}")
+                self.directory = None
+                return None
+            self._stores[model] = store
+        return store
+
+    def _remember(self, key: Tuple[str, bytes], vector: np.ndarray) -> None:
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            One float32 array per text, or None for texts that are not cached
+        """
+        digests = [text_digest(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        disk_positions: List[int] = []
+
+        with self._lock:
+            for i, digest in enumerate(digests):
+                vector = self._memory.get((model, digest))
+                if vector is not None:
+                    self._memory.move_to_end((model, digest))
+                    results[i] = vector
+                    self._stats.memory_hits += 1
+                else:
+                    disk_positions.append(i)
+
+            store = self._store(model) if disk_positions else None
+
+        if store is not None:
+            found = store.get_many([digests[i] for i in disk_positions])
+            with self._lock:
+                for i, vector in zip(disk_positions, found):
+                    if vector is not None:
+                        results[i] = vector
+                        self._remember((model, digests[i]), vector)
+                        self._stats.disk_hits += 1
+
+        with self._lock:
+            self._stats.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> List[np.ndarray]:
+        """
+        Store vectors in both tiers.
+
+        Returns:
+            The stored float32 arrays, in input order
+        """
+        arrays = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        items = [(text_digest(text), array) for text, array in zip(texts, arrays)]
+
+        with self._lock:
+            for digest, array in items:
+                self._remember((model, digest), array)
+            store = self._store(model)
+
+        if store is not None:
+            try:
+                written = store.put_many(items)
+            except OSError as e:
+                logger.warning(f"Failed to write embeddings to disk cache: {e}")
+                written = 0
+            with self._lock:
+                self._stats.writes += written
+        return arrays
+
+    def clear_memory(self) -> None:
+        """Drop the in-process tier (the disk tier is left intact)."""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics for monitoring."""
+        with self._lock:
+            stats = self._stats.to_dict()
+            stats["memory_size"] = len(self._memory)
+            stats["memory_max_size"] = self.memory_size
+            stats["disk_vectors"] = {model: len(store) for model, store in self._stores.items()}
+        return stats
+
+
+# Global cache instance
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the process-wide embedding cache.
+
+    Returns:
+        The cache, or None if EMBEDDING_CACHE_ENABLED is false
+    """
+    global _embedding_cache
+    settings = get_settings()
+    if not settings.embedding_cache_enabled:
+        return None
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            memory_size=settings.embedding_cache_memory_size,
+            directory=settings.embedding_cache_dir or None,
+        )
+    return _embedding_cache
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """Get embedding cache statistics (empty if the cache is disabled)."""
+    return _embedding_cache.stats() if _embedding_cache is not None else {}
+
+
+__all__ = [
+    "EmbeddingCache",
+    "VectorStore",
+    "get_embedding_cache",
+    "get_embedding_cache_stats",
+]
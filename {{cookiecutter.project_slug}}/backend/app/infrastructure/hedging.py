@@ -0,0 +1,364 @@
+"""
+Hedged LLM requests.
+
+A slow but healthy primary model never trips OpenRouter's sequential
+fallback, so it keeps producing slow responses. `HedgedChatModel` races
+models instead: if the primary has not produced a first token within a
+percentile of its observed time-to-first-token (TTFT), a request to the
+next model starts in parallel. The first stream to produce a token wins
+and the others are cancelled.
+
+TTFT samples are kept per model in a `TTFTTracker`. Hedge rate, win rate
+per model and tokens wasted on cancelled requests (the prompt each one was
+billed for, plus the completion tokens it streamed before it lost) are
+reported through `get_hedging_stats()`.
+"""
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, convert_to_messages
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("hedging")
+
+# Queue sentinel marking the end of a stream
+_DONE = object()
+
+
+class TTFTTracker:
+    """Rolling window of time-to-first-token samples per model."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, model: str, ttft_seconds: float) -> None:
+        """Add a TTFT sample for a model."""
+        self._samples[model].append(ttft_seconds)
+
+    def count(self, model: str) -> int:
+        """Number of samples held for a model."""
+        return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """TTFT percentile in seconds, or None without samples."""
+        samples = self._samples.get(model)
+        if not samples:
+            return None
+        return float(np.percentile(np.fromiter(samples, dtype=float), q))
+
+
+@dataclass
+class HedgingStats:
+    """Statistics for hedged requests."""
+
+    requests: int = 0
+    hedges: int = 0
+    failovers: int = 0
+    wasted_prompt_tokens: int = 0
+    wasted_completion_tokens: int = 0
+    attempts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    wins: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            "failovers": self.failovers,
+            "wasted_prompt_tokens": self.wasted_prompt_tokens,
+            "wasted_completion_tokens": self.wasted_completion_tokens,
+            "wasted_tokens": self.wasted_prompt_tokens + self.wasted_completion_tokens,
+            "models": {
+                model: {
+                    "attempts": attempts,
+                    "wins": self.wins.get(model, 0),
+                    "win_rate": self.wins.get(model, 0) / attempts if attempts else 0.0,
+                }
+                for model, attempts in self.attempts.items()
+            },
+        }
+
+
+# Global tracker and stats, shared by all hedged models
+_ttft_tracker = TTFTTracker()
+_hedging_stats = HedgingStats()
+
+
+def get_ttft_tracker() -> TTFTTracker:
+    """Get the process-wide TTFT tracker."""
+    return _ttft_tracker
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """Get hedging statistics for monitoring."""
+    return _hedging_stats.to_dict()
+
+
+def _prompt_messages(input: Any) -> List[Dict[str, Any]]:
+    """Chat messages of a model input (string, prompt value or message list)."""
+    if isinstance(input, PromptValue):
+        messages = input.to_messages()
+    elif isinstance(input, str):
+        return [{"role": "user", "content": input}]
+    else:
+        messages = convert_to_messages(input)
+    return [{"role": message.type, "content": message.content} for message in messages]
+
+
+def _count_wasted(llm: BaseChatModel, messages: List[Dict[str, Any]], completion: List[str]) -> None:
+    """Add a cancelled request's prompt and streamed completion tokens to the stats."""
+    # Imported here: token_counter depends on llm_provider, which imports this module
+    from app.utils.token_counter import DEFAULT_MODEL, count_text_tokens, count_tokens_in_messages
+
+    _hedging_stats.wasted_prompt_tokens += count_tokens_in_messages(llm, messages)
+    if completion:
+        model_name = getattr(llm, "model_name", None) or DEFAULT_MODEL
+        _hedging_stats.wasted_completion_tokens += count_text_tokens("".join(completion), model_name)
+
+
+class _Attempt:
+    """One model's stream, read in the background into a queue."""
+
+    def __init__(
+        self,
+        model: str,
+        llm: BaseChatModel,
+        input: Any,
+        config: Optional[RunnableConfig],
+        kwargs: Dict[str, Any],
+    ):
+        self.model = model
+        self.llm = llm
+        self.started_at = time.perf_counter()
+        self.completion: List[str] = []
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.first_token: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task = asyncio.ensure_future(self._run(llm, input, config, kwargs))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def _first(self) -> None:
+        if not self.first_token.done():
+            self.first_token.set_result(self.elapsed)
+
+    async def _run(
+        self,
+        llm: BaseChatModel,
+        input: Any,
+        config: Optional[RunnableConfig],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        try:
+            async for chunk in llm.astream(input, config, **kwargs):
+                self._first()
+                if isinstance(chunk.content, str):
+                    self.completion.append(chunk.content)
+                self.queue.put_nowait(chunk)
+            # An empty stream still counts as a (complete) response
+            self._first()
+            self.queue.put_nowait(_DONE)
+        except Exception as e:
+            if not self.first_token.done():
+                self.first_token.set_exception(e)
+                # Retrieved here so an unused failure is not logged by asyncio
+                self.first_token.exception()
+            self.queue.put_nowait(e)
+
+    def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+
+
+class HedgedChatModel(Runnable[Any, BaseMessage]):
+    """
+    Chat model that races a primary model against backups.
+
+    The next model is started when the current latest attempt has not
+    produced a first token within `percentile` of its observed TTFT
+    (clamped to [min_delay, max_delay]; `default_delay` is used until the
+    model has `min_samples` samples). A model that fails before its first
+    token is replaced immediately by the next one.
+
+    Usage:
+        llm = provider.get_llm_with_fallbacks(
+            ["anthropic/claude-3.5-sonnet", "openai/gpt-4o-mini"], hedge=True
+        )
+        chain = prompt | llm | StrOutputParser()
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        llms: List[BaseChatModel],
+        percentile: float = 90.0,
+        min_delay: float = 0.25,
+        max_delay: float = 10.0,
+        default_delay: float = 2.0,
+        min_samples: int = 20,
+        tracker: Optional[TTFTTracker] = None,
+    ):
+        if not models or len(models) != len(llms):
+            raise ValueError("HedgedChatModel needs one LLM per model name")
+        self.models = models
+        self.llms = llms
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.tracker = tracker or get_ttft_tracker()
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait for a first token from `model` before hedging."""
+        if self.tracker.count(model) < self.min_samples:
+            return self.default_delay
+        delay = self.tracker.percentile(model, self.percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    async def _race(
+        self, input: Any, config: Optional[RunnableConfig], kwargs: Dict[str, Any]
+    ) -> _Attempt:
+        """Start attempts until one produces a first token; cancel the rest."""
+        attempts: List[_Attempt] = []
+        failed: List[_Attempt] = []
+        next_index = 0
+        last_error: Optional[BaseException] = None
+        winner: Optional[_Attempt] = None
+
+        def start_next() -> None:
+            nonlocal next_index
+            attempt = _Attempt(self.models[next_index], self.llms[next_index], input, config, kwargs)
+            attempts.append(attempt)
+            _hedging_stats.attempts[attempt.model] += 1
+            next_index += 1
+
+        start_next()
+        try:
+            while True:
+                racing = {a.first_token: a for a in attempts if a not in failed}
+                if not racing:
+                    if next_index >= len(self.models):
+                        raise last_error
+                    # Everything in flight failed: fail over without waiting
+                    _hedging_stats.failovers += 1
+                    start_next()
+                    continue
+
+                timeout = None
+                if next_index < len(self.models):
+                    timeout = max(0.0, self.hedge_delay(attempts[-1].model) - attempts[-1].elapsed)
+
+                done, _ = await asyncio.wait(
+                    racing, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    _hedging_stats.hedges += 1
+                    logger.debug(
+                        f"No first token from {attempts[-1].model} after "
+                        f"{attempts[-1].elapsed:.2f}s, hedging with {self.models[next_index]}"
+                    )
+                    start_next()
+                    continue
+
+                for future in done:
+                    attempt = racing[future]
+                    if future.exception() is not None:
+                        failed.append(attempt)
+                        last_error = future.exception()
+                    elif winner is None:
+                        winner = attempt
+                if winner is None:
+                    continue
+
+                _hedging_stats.wins[winner.model] += 1
+                self.tracker.record(winner.model, winner.first_token.result())
+                return winner
+        finally:
+            # Also runs when the caller is cancelled mid-race
+            self._cancel_losers(attempts, winner, input)
+
+    def _cancel_losers(self, attempts: List[_Attempt], winner: Optional[_Attempt], input: Any) -> None:
+        """Cancel every attempt except the winner and account for wasted work."""
+        messages: Optional[List[Dict[str, Any]]] = None
+        for attempt in attempts:
+            if attempt is winner:
+                continue
+            if not attempt.first_token.done():
+                # Censored sample: the model was at least this slow
+                self.tracker.record(attempt.model, attempt.elapsed)
+            elif attempt.first_token.exception() is not None:
+                continue  # Failed on its own: nothing was generated for it
+            attempt.cancel()
+            # The prompt was billed even if no token arrived
+            if messages is None:
+                messages = _prompt_messages(input)
+            _count_wasted(attempt.llm, messages, attempt.completion)
+
+    async def astream(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> AsyncIterator[BaseMessage]:
+        """Stream from whichever model produces a first token first."""
+        _hedging_stats.requests += 1
+        winner = await self._race(input, config, kwargs)
+        try:
+            while True:
+                item = await winner.queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            winner.cancel()
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> BaseMessage:
+        """Invoke by racing streams and merging the winner's chunks."""
+        message = None
+        async for chunk in self.astream(input, config, **kwargs):
+            message = chunk if message is None else message + chunk
+        return message
+
+    def invoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> BaseMessage:
+        """Synchronous calls are not hedged; they use the primary model."""
+        return self.llms[0].invoke(input, config, **kwargs)
+
+
+def create_hedged_model(models: List[str], llms: List[BaseChatModel]) -> HedgedChatModel:
+    """Create a hedged model configured from settings."""
+    settings = get_settings()
+    return HedgedChatModel(
+        models,
+        llms,
+        percentile=settings.llm_hedge_percentile,
+        min_delay=settings.llm_hedge_min_delay_ms / 1000.0,
+        max_delay=settings.llm_hedge_max_delay_ms / 1000.0,
+        default_delay=settings.llm_hedge_default_delay_ms / 1000.0,
+        min_samples=settings.llm_hedge_min_samples,
+    )
+
+
+__all__ = [
+    "HedgedChatModel",
+    "TTFTTracker",
+    "create_hedged_model",
+    "get_hedging_stats",
+    "get_ttft_tracker",
+]
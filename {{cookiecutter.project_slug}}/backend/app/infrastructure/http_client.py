@@ -0,0 +1,112 @@
+"""
+Shared HTTP transport for outbound LLM traffic.
+
+Every LLM client, embeddings call and catalog fetch goes through one
+long-lived keep-alive connection pool (HTTP/2 when `h2` is installed)
+instead of opening a new pool per request. The FastAPI lifespan opens
+the pool on startup and closes it on shutdown; CLI scripts and tests get
+a lazily created pool on first use.
+"""
+
+from typing import Optional
+
+import httpx
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("http_client")
+
+# Process-wide clients (one sync, one async) sharing the same pool settings
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+
+
+def _http2_available() -> bool:
+    """Check whether the optional `h2` package is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _client_options() -> dict:
+    """Build keyword arguments shared by the sync and async clients."""
+    settings = get_settings()
+
+    http2 = settings.llm_http2_enabled
+    if http2 and not _http2_available():
+        logger.warning(
+            "HTTP/2 requested but the 'h2' package is not installed. "
+            "Falling back to HTTP/1.1 keep-alive. Install with: pip install 'httpx[http2]'"
+        )
+        http2 = False
+
+    return {
+        "http2": http2,
+        "timeout": httpx.Timeout(
+            settings.llm_http_timeout_seconds,
+            connect=settings.llm_http_connect_timeout_seconds,
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.llm_http_max_connections,
+            max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+            keepalive_expiry=settings.llm_http_keepalive_expiry_seconds,
+        ),
+    }
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client.
+
+    Creates the client on first use if the lifespan has not opened it yet.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(**_client_options())
+        logger.info("Shared async HTTP client created")
+    return _async_client
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the shared sync HTTP client.
+
+    Used by synchronous LangChain calls (`invoke`) and CLI commands.
+    """
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(**_client_options())
+        logger.info("Shared sync HTTP client created")
+    return _sync_client
+
+
+async def open_http_clients() -> None:
+    """Open the shared HTTP clients. Call from the application lifespan."""
+    get_http_async_client()
+    get_http_client()
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients and release their connections."""
+    global _async_client, _sync_client
+
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+    logger.info("Shared HTTP clients closed")
+
+
+__all__ = [
+    "get_http_async_client",
+    "get_http_client",
+    "open_http_clients",
+    "close_http_clients",
+]
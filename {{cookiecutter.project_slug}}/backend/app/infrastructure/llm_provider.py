@@ -1,19 +1,169 @@
 """LLM provider integrations using LangChain."""
+import asyncio
+import hashlib
+import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 
 import httpx
+import numpy as np
 import requests
 from langchain_core.embeddings import Embeddings
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
 from app.config import get_settings
+from app.infrastructure.embedding_batcher import get_embedding_batcher
+from app.infrastructure.embedding_cache import get_embedding_cache
+from app.infrastructure.hedging import HedgedChatModel, create_hedged_model
+from app.infrastructure.http_client import get_http_async_client, get_http_client
 from app.infrastructure.langfuse_handler import get_langfuse_callbacks
+from app.infrastructure.model_catalog import ModelInfo, get_model_catalog
+from app.infrastructure.model_router import get_router_callback
 from app.utils.logging import get_logger
 
 logger = get_logger("llm_provider")
 
 
+@dataclass
+class LLMCacheStats:
+    """Statistics for an LLM client cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def to_dict(self, size: int, max_size: int) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size,
+            "max_size": max_size,
+        }
+
+
+class LLMClientCache:
+    """
+    Bounded, process-wide LRU cache of ready-to-use LLM objects.
+
+    Holds configured `ChatOpenAI` instances and compiled chains so that
+    request handlers and agents reuse them instead of rebuilding clients,
+    prompts and HTTP pools on every call. Thread-safe, since `get_llm`
+    is also called from synchronous code paths.
+    """
+
+    def __init__(self, name: str, max_size: int = 64):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._stats = LLMCacheStats()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for `key`, building it with `factory` on a miss.
+
+        Args:
+            key: Hashable cache key
+            factory: Zero-argument callable that builds the value
+
+        Returns:
+            The cached or newly built value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return self._entries[key]
+            self._stats.misses += 1
+
+        # Build outside the lock; construction may be slow
+        value = factory()
+
+        with self._lock:
+            # Another thread may have built the same entry meanwhile
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._stats.evictions += 1
+                logger.debug(f"LLM cache '{self.name}' evicted: {evicted_key}")
+
+        return value
+
+    def clear(self) -> None:
+        """Drop all cached entries (stats are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            return self._stats.to_dict(len(self._entries), self.max_size)
+
+
+# Process-wide caches shared by every OpenRouterProvider instance
+_llm_cache: Optional[LLMClientCache] = None
+_chain_cache: Optional[LLMClientCache] = None
+
+
+def get_llm_cache() -> LLMClientCache:
+    """Get the process-wide cache of configured LLM instances."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMClientCache("llms", get_settings().llm_client_cache_size)
+    return _llm_cache
+
+
+def get_chain_cache() -> LLMClientCache:
+    """Get the process-wide cache of compiled chains."""
+    global _chain_cache
+    if _chain_cache is None:
+        _chain_cache = LLMClientCache("chains", get_settings().llm_client_cache_size)
+    return _chain_cache
+
+
+def get_llm_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get hit/miss/eviction statistics for the LLM and chain caches."""
+    return {
+        "llms": get_llm_cache().stats(),
+        "chains": get_chain_cache().stats(),
+    }
+
+
+def clear_llm_caches() -> None:
+    """
+    Clear cached LLM instances and chains.
+
+    Called on shutdown before the shared HTTP clients are closed, since
+    cached instances hold references to those clients.
+    """
+    get_llm_cache().clear()
+    get_chain_cache().clear()
+
+
+def _freeze_config(value: Any) -> Optional[str]:
+    """Turn a (possibly nested) config dict into a stable, hashable string."""
+    if not value:
+        return None
+    return json.dumps(value, sort_keys=True, default=str)
+
+
 class OpenRouterProvider:
     """OpenRouter LLM provider integration with model querying capabilities."""
     
@@ -30,9 +180,36 @@ class OpenRouterProvider:
             raise ValueError(
                 "OPENROUTER_API_KEY not set. Please set the OPENROUTER_API_KEY environment variable."
             )
-        self._base_url = "https://openrouter.ai/api/v1"
-        self._models_cache: Optional[List[Dict[str, Any]]] = None
-    
+        self._base_url = settings.openrouter_base_url.rstrip("/")
+        # Fingerprint rather than the raw key, so cache keys are safe to log
+        self._key_fingerprint = hashlib.sha256(self.api_key.encode()).hexdigest()[:12]
+
+    def _llm_cache_key(
+        self,
+        model_name: str,
+        temperature: float,
+        fallback_models: Optional[List[str]],
+        provider_config: Optional[Dict[str, Any]],
+        callbacks: Optional[List],
+        callbacks_profile: Optional[str],
+        enable_langfuse: bool,
+    ) -> Hashable:
+        """Build the cache key identifying one configured LLM instance."""
+        if callbacks_profile is None:
+            # Cached instances keep their callbacks alive, so object ids
+            # cannot be reused while the entry exists.
+            callbacks_profile = ",".join(str(id(cb)) for cb in callbacks or [])
+        return (
+            self._base_url,
+            self._key_fingerprint,
+            model_name,
+            float(temperature),
+            tuple(fallback_models or ()),
+            _freeze_config(provider_config),
+            callbacks_profile,
+            enable_langfuse,
+        )
+
     def get_llm(
         self,
         model_name: str = "openai/gpt-4o-mini",
@@ -41,9 +218,17 @@ class OpenRouterProvider:
         fallback_models: Optional[List[str]] = None,
         provider_config: Optional[Dict[str, Any]] = None,
         enable_langfuse: bool = True,
+        callbacks_profile: Optional[str] = None,
+        use_cache: bool = True,
     ) -> ChatOpenAI:
         """
         Get configured OpenRouter LLM instance.
+
+        Instances are cached process-wide, keyed by (model, temperature,
+        fallback models, provider config, callbacks profile), and all share
+        one keep-alive HTTP transport. Cached instances are shared across
+        concurrent requests, so per-request data (session id, tags) must be
+        passed through the invocation config, not through `callbacks`.
         
         Args:
             model_name: OpenRouter model name (e.g., "openai/gpt-4o-mini")
@@ -59,6 +244,9 @@ class OpenRouterProvider:
                 - only: List of provider names to restrict to
                 - ignore: List of provider names to exclude
             enable_langfuse: If True (default), automatically add Langfuse callback if enabled in settings
+            callbacks_profile: Optional name identifying the callbacks set in the cache key.
+                Defaults to the identity of the given callbacks.
+            use_cache: If False, always build a fresh instance
         
         Returns:
             Configured ChatOpenAI instance for OpenRouter
@@ -87,6 +275,34 @@ class OpenRouterProvider:
             )
             ```
         """
+        if not use_cache:
+            return self._build_llm(
+                model_name, temperature, callbacks, fallback_models,
+                provider_config, enable_langfuse,
+            )
+
+        key = self._llm_cache_key(
+            model_name, temperature, fallback_models, provider_config,
+            callbacks, callbacks_profile, enable_langfuse,
+        )
+        return get_llm_cache().get_or_create(
+            key,
+            lambda: self._build_llm(
+                model_name, temperature, callbacks, fallback_models,
+                provider_config, enable_langfuse,
+            ),
+        )
+
+    def _build_llm(
+        self,
+        model_name: str,
+        temperature: float,
+        callbacks: Optional[List],
+        fallback_models: Optional[List[str]],
+        provider_config: Optional[Dict[str, Any]],
+        enable_langfuse: bool,
+    ) -> ChatOpenAI:
+        """Construct a new ChatOpenAI instance on the shared HTTP transport."""
         extra_body = {}
         
         # Add fallback models if provided
@@ -99,10 +315,15 @@ class OpenRouterProvider:
             extra_body["provider"] = provider_config
             logger.debug(f"Configured provider routing: {provider_config}")
         
-        # Automatically add Langfuse callbacks if enabled
+        # Feed latency/cost statistics to the model router
         final_callbacks = callbacks
+        router_callback = get_router_callback()
+        if router_callback is not None:
+            final_callbacks = [router_callback, *(callbacks or [])]
+
+        # Automatically add Langfuse callbacks if enabled
         if enable_langfuse:
-            final_callbacks = get_langfuse_callbacks(callbacks)
+            final_callbacks = get_langfuse_callbacks(final_callbacks)
         
         return ChatOpenAI(
             model=model_name,
@@ -111,6 +332,58 @@ class OpenRouterProvider:
             temperature=temperature,
             callbacks=final_callbacks,
             extra_body=extra_body if extra_body else None,
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
+        )
+
+    def get_chat_chain(
+        self,
+        system_prompt: str,
+        model_name: str = "openai/gpt-4o-mini",
+        temperature: float = 0,
+        fallback_models: Optional[List[str]] = None,
+        provider_config: Optional[Dict[str, Any]] = None,
+        with_history: bool = False,
+    ) -> Runnable:
+        """
+        Get a cached `system prompt | llm | StrOutputParser` chain.
+
+        The chain expects an `input` variable with the user message. With
+        `with_history=True` it also takes a `history` list of (role, content)
+        pairs placed between the system prompt and the user message.
+
+        Args:
+            system_prompt: System prompt for the chain
+            model_name: OpenRouter model name
+            temperature: Model temperature (0-2)
+            fallback_models: Optional list of fallback model names
+            provider_config: Optional provider routing configuration
+            with_history: Whether the prompt includes prior conversation messages
+
+        Returns:
+            Compiled LangChain runnable producing a string
+        """
+        llm_key = self._llm_cache_key(
+            model_name, temperature, fallback_models, provider_config,
+            None, None, True,
+        )
+
+        def build_chain() -> Runnable:
+            llm = self.get_llm(
+                model_name=model_name,
+                temperature=temperature,
+                fallback_models=fallback_models,
+                provider_config=provider_config,
+            )
+            messages = [("system", system_prompt)]
+            if with_history:
+                messages.append(MessagesPlaceholder("history", optional=True))
+            messages.append(("user", "{input}"))
+            prompt = ChatPromptTemplate.from_messages(messages)
+            return prompt | llm | StrOutputParser()
+
+        return get_chain_cache().get_or_create(
+            ("chat", llm_key, system_prompt, with_history), build_chain
         )
     
     def get_llm_with_fallbacks(
@@ -120,12 +393,19 @@ class OpenRouterProvider:
         callbacks: Optional[List] = None,
         provider_config: Optional[Dict[str, Any]] = None,
         enable_langfuse: bool = True,
-    ) -> ChatOpenAI:
+        hedge: bool = False,
+    ) -> Union[ChatOpenAI, HedgedChatModel]:
         """
         Get configured OpenRouter LLM instance with model fallbacks.
         
         The first model in the list is the primary model. If it fails, OpenRouter
         will automatically try the next model in the list.
+
+        With `hedge=True` the models are raced instead: if the primary has not
+        produced a first token within a percentile of its observed TTFT, the
+        next model starts in parallel and the first stream to produce a token
+        wins (see `app.infrastructure.hedging`). Hedging applies to async
+        calls (`ainvoke` / `astream`); sync calls use the primary model.
         
         Args:
             models: List of model names in priority order (e.g., 
@@ -133,9 +413,12 @@ class OpenRouterProvider:
             temperature: Model temperature (0-2)
             callbacks: Optional list of callback handlers
             provider_config: Optional provider routing configuration (see get_llm for details)
+            enable_langfuse: If True (default), add Langfuse callback if enabled in settings
+            hedge: If True, return a `HedgedChatModel` racing the models by latency
         
         Returns:
-            Configured ChatOpenAI instance for OpenRouter with fallbacks
+            Configured ChatOpenAI instance for OpenRouter with fallbacks,
+            or a HedgedChatModel when `hedge=True`
         
         Raises:
             ValueError: If models list is empty
@@ -147,10 +430,30 @@ class OpenRouterProvider:
                 "openai/gpt-4o-mini",
                 "gryphe/mythomax-l2-13b"
             ])
+
+            # Race the primary against the next model when it is slow
+            llm = provider.get_llm_with_fallbacks(
+                ["anthropic/claude-3.5-sonnet", "openai/gpt-4o-mini"],
+                hedge=True,
+            )
             ```
         """
         if not models:
             raise ValueError("At least one model must be provided")
+
+        if hedge and len(models) > 1:
+            # One plain client per model; the race replaces OpenRouter failover
+            llms = [
+                self.get_llm(
+                    model_name=model,
+                    temperature=temperature,
+                    callbacks=callbacks,
+                    provider_config=provider_config,
+                    enable_langfuse=enable_langfuse,
+                )
+                for model in models
+            ]
+            return create_hedged_model(list(models), llms)
         
         primary_model = models[0]
         fallback_models = models[1:] if len(models) > 1 else None
@@ -167,6 +470,10 @@ class OpenRouterProvider:
     def get_models(self, use_cache: bool = True) -> List[Dict[str, Any]]:
         """
         Get list of available models from OpenRouter.
+
+        Served from the process-wide model catalog. With `use_cache=False`
+        (or a cold catalog) this performs a blocking fetch, so async code
+        should prefer `aget_models`.
         
         Args:
             use_cache: Whether to use cached models if available
@@ -175,30 +482,79 @@ class OpenRouterProvider:
             List of model dictionaries with id, context_length, pricing, etc.
         
         Raises:
-            requests.RequestException: If the API request fails
+            httpx.HTTPError: If the API request fails
         """
-        if use_cache and self._models_cache is not None:
-            return self._models_cache
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        try:
-            response = requests.get(
-                f"{self._base_url}/models",
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            models = response.json().get("data", [])
-            logger.info(f"Fetched {len(models)} available models from OpenRouter")
-            self._models_cache = models
-            return models
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch OpenRouter models: {e}")
-            raise
+        catalog = get_model_catalog()
+        if use_cache and catalog.has_data:
+            return catalog.models
+        return catalog.refresh_sync()
+
+    async def aget_models(self, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get list of available models from OpenRouter asynchronously.
+
+        Concurrent cold callers share a single fetch.
+
+        Args:
+            use_cache: Whether to use cached models if available
+
+        Returns:
+            List of model dictionaries with id, context_length, pricing, etc.
+
+        Raises:
+            httpx.HTTPError: If the API request fails
+        """
+        catalog = get_model_catalog()
+        if use_cache and catalog.has_data:
+            if catalog.is_stale:
+                catalog.schedule_refresh()
+            return catalog.models
+        return await catalog.refresh()
+
+    def get_model_info(self, model_name: str, use_cache: bool = True) -> Optional[ModelInfo]:
+        """
+        Get indexed limits and pricing for a model.
+
+        Never blocks inside a running event loop: if the catalog is empty
+        there, a background fetch is scheduled and None is returned. Async
+        callers should use `aget_model_info` (or await
+        `get_model_catalog().ensure_loaded()` first).
+
+        Args:
+            model_name: Model name (e.g., "openai/gpt-4o-mini")
+            use_cache: Whether to use cached models
+
+        Returns:
+            ModelInfo if found, None otherwise
+        """
+        catalog = get_model_catalog()
+        if not use_cache or not catalog.has_data:
+            try:
+                asyncio.get_running_loop()
+                catalog.schedule_refresh()
+            except RuntimeError:
+                try:
+                    catalog.refresh_sync()
+                except Exception as e:
+                    logger.error(f"Failed to load model catalog: {e}")
+                    return None
+        elif catalog.is_stale:
+            catalog.schedule_refresh()
+        return catalog.get(model_name)
+
+    async def aget_model_info(self, model_name: str) -> Optional[ModelInfo]:
+        """
+        Get indexed limits and pricing for a model, loading the catalog if cold.
+
+        Args:
+            model_name: Model name (e.g., "openai/gpt-4o-mini")
+
+        Returns:
+            ModelInfo if found, None otherwise
+        """
+        catalog = get_model_catalog()
+        await catalog.ensure_loaded()
+        return catalog.get(model_name)
     
     def get_balance(self) -> Dict[str, Any]:
         """
@@ -242,7 +598,7 @@ class OpenRouterProvider:
         use_cache: bool = True
     ) -> Optional[int]:
         """
-        Get model context limit from OpenRouter models cache.
+        Get model context limit from the OpenRouter model catalog.
         
         Args:
             model_name: Model name (e.g., "openai/gpt-4o-mini")
@@ -251,20 +607,11 @@ class OpenRouterProvider:
         Returns:
             Context limit if found, None otherwise
         """
-        try:
-            models = self.get_models(use_cache=use_cache)
-            for model in models:
-                if model.get('id') == model_name:
-                    top_provider = model.get('top_provider', {})
-                    if isinstance(top_provider, dict):
-                        context_length = top_provider.get('context_length')
-                        if context_length:
-                            return int(context_length)
-            logger.warning(f"Model {model_name} not found in OpenRouter models")
-            return None
-        except Exception as e:
-            logger.error(f"Failed to get model context limit: {e}")
+        info = self.get_model_info(model_name, use_cache=use_cache)
+        if info is None:
+            self._log_unknown_model(model_name)
             return None
+        return info.context_length
     
     def get_model_max_completion(
         self,
@@ -272,7 +619,7 @@ class OpenRouterProvider:
         use_cache: bool = True
     ) -> Optional[int]:
         """
-        Get model max completion tokens from OpenRouter models cache.
+        Get model max completion tokens from the OpenRouter model catalog.
         
         Args:
             model_name: Model name (e.g., "openai/gpt-4o-mini")
@@ -281,24 +628,30 @@ class OpenRouterProvider:
         Returns:
             Max completion tokens if found, None otherwise
         """
-        try:
-            models = self.get_models(use_cache=use_cache)
-            for model in models:
-                if model.get('id') == model_name:
-                    top_provider = model.get('top_provider', {})
-                    if isinstance(top_provider, dict):
-                        max_completion = top_provider.get('max_completion_tokens')
-                        if max_completion:
-                            return int(max_completion)
-            logger.warning(f"Model {model_name} not found in OpenRouter models")
-            return None
-        except Exception as e:
-            logger.error(f"Failed to get model max completion: {e}")
+        info = self.get_model_info(model_name, use_cache=use_cache)
+        if info is None:
+            self._log_unknown_model(model_name)
             return None
+        return info.max_completion_tokens
+
+    @staticmethod
+    def _log_unknown_model(model_name: str) -> None:
+        if get_model_catalog().has_data:
+            logger.warning(f"Model {model_name} not found in OpenRouter models")
+        else:
+            logger.info(f"Model catalog not loaded yet, limits for {model_name} unknown")
 
 
 class OpenRouterEmbeddings(Embeddings):
-    """OpenRouter embeddings implementation using direct HTTP requests."""
+    """
+    OpenRouter embeddings implementation using direct HTTP requests.
+
+    Requests go over the shared keep-alive HTTP clients. Large inputs are
+    split into bounded chunks, and concurrent async calls for the same model
+    are coalesced into shared batches by an `EmbeddingBatcher`. Texts that
+    were embedded before are served from the `EmbeddingCache` without a
+    network call.
+    """
 
     def __init__(self, api_key: Optional[str] = None, model: str = "openai/text-embedding-3-small"):
         """
@@ -315,23 +668,20 @@ class OpenRouterEmbeddings(Embeddings):
                 "OPENROUTER_API_KEY not set. Please set the OPENROUTER_API_KEY environment variable."
             )
         self.model = model
-        self.base_url = "https://openrouter.ai/api/v1/embeddings"
+        self.base_url = f"{settings.openrouter_base_url.rstrip('/')}/embeddings"
         self.app_name = settings.app_name
         self.app_url = os.environ.get("APP_URL", "")
+        self.batch_size = max(1, settings.embedding_batch_size)
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """
-        Generate embeddings for multiple documents.
-
-        Args:
-            texts: List of texts to embed
-
-        Returns:
-            List of embedding vectors
+        key_fingerprint = hashlib.sha256(self.api_key.encode()).hexdigest()[:12]
+        self._batcher = get_embedding_batcher(
+            (self.model, self.base_url, key_fingerprint),
+            self._aembed_batch,
+        )
+        self._cache = get_embedding_cache()
 
-        Raises:
-            Exception: If API request fails
-        """
+    def _headers(self) -> Dict[str, str]:
+        """Build request headers."""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -342,19 +692,89 @@ class OpenRouterEmbeddings(Embeddings):
             headers["HTTP-Referer"] = self.app_url
         if self.app_name:
             headers["X-Title"] = self.app_name
-        
-        response = requests.post(
+        return headers
+
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> List[List[float]]:
+        """Extract vectors (in input order) from an embeddings response."""
+        if response.status_code != 200:
+            raise Exception(f"API request failed: {response.status_code} - {response.text}")
+
+        data = response.json()["data"]
+        # The API may return items out of order; "index" restores input order
+        if data and "index" in data[0]:
+            data = sorted(data, key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one bounded batch with a single blocking request."""
+        response = get_http_client().post(
             self.base_url,
-            headers=headers,
+            headers=self._headers(),
             json={"model": self.model, "input": texts},
-            timeout=30,
+            timeout=30.0,
         )
+        return self._parse_response(response)
 
-        if response.status_code != 200:
-            raise Exception(f"API request failed: {response.status_code} - {response.text}")
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one bounded batch with a single async request."""
+        response = await get_http_async_client().post(
+            self.base_url,
+            headers=self._headers(),
+            json={"model": self.model, "input": texts},
+            timeout=30.0,
+        )
+        return self._parse_response(response)
 
-        data = response.json()
-        return [item["embedding"] for item in data["data"]]
+    def _lookup(self, texts: List[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Split texts into cached vectors and unique texts that still need embedding.
+
+        Returns:
+            Tuple of (text -> cached vector, texts to embed)
+        """
+        unique = list(dict.fromkeys(texts))
+        if self._cache is None:
+            return {}, unique
+
+        found = self._cache.get_many(self.model, unique)
+        cached = {text: vector for text, vector in zip(unique, found) if vector is not None}
+        missing = [text for text, vector in zip(unique, found) if vector is None]
+        return cached, missing
+
+    def _store(
+        self, cached: Dict[str, Any], texts: List[str], vectors: List[List[float]]
+    ) -> None:
+        """Add freshly embedded vectors to the cache and the lookup result."""
+        if self._cache is not None:
+            vectors = self._cache.put_many(self.model, texts, vectors)
+        cached.update(zip(texts, vectors))
+
+    @staticmethod
+    def _assemble(texts: List[str], vectors: Dict[str, Any]) -> List[List[float]]:
+        """Return vectors in input order, as plain float lists."""
+        return [np.asarray(vectors[text]).tolist() for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for multiple documents.
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            List of embedding vectors
+
+        Raises:
+            Exception: If API request fails
+        """
+        cached, missing = self._lookup(texts)
+        if missing:
+            vectors: List[List[float]] = []
+            for i in range(0, len(missing), self.batch_size):
+                vectors.extend(self._embed_batch(missing[i:i + self.batch_size]))
+            self._store(cached, missing, vectors)
+        return self._assemble(texts, cached)
 
     def embed_query(self, text: str) -> List[float]:
         """
@@ -372,6 +792,8 @@ class OpenRouterEmbeddings(Embeddings):
         """
         Generate embeddings for multiple documents asynchronously.
 
+        Texts are batched together with concurrent callers for the same model.
+
         Args:
             texts: List of texts to embed
 
@@ -381,29 +803,18 @@ class OpenRouterEmbeddings(Embeddings):
         Raises:
             Exception: If API request fails
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
-        # Add optional headers if configured
-        if self.app_url:
-            headers["HTTP-Referer"] = self.app_url
-        if self.app_name:
-            headers["X-Title"] = self.app_name
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                self.base_url,
-                headers=headers,
-                json={"model": self.model, "input": texts},
-            )
-
-            if response.status_code != 200:
-                raise Exception(f"API request failed: {response.status_code} - {response.text}")
+        if self._cache is None:
+            cached, missing = self._lookup(texts)
+            if missing:
+                self._store(cached, missing, await self._batcher.embed(missing))
+            return self._assemble(texts, cached)
 
-            data = response.json()
-            return [item["embedding"] for item in data["data"]]
+        # Index reads and memory-mapped vectors touch the disk: keep them off the event loop
+        cached, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            vectors = await self._batcher.embed(missing)
+            await asyncio.to_thread(self._store, cached, missing, vectors)
+        return await asyncio.to_thread(self._assemble, texts, cached)
 
     async def aembed_query(self, text: str) -> List[float]:
         """
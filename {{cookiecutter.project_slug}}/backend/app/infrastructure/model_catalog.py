@@ -0,0 +1,348 @@
+"""
+OpenRouter model catalog.
+
+Process-wide, indexed view of the OpenRouter `/models` listing. Lookups of
+context length, max completion tokens and pricing are O(1) dict reads and
+never touch the network on the request path:
+
+- Fetches are async and single-flight: concurrent cold misses share one
+  request (a detached task, so a cancelled caller does not fail the
+  others) instead of stampeding the API.
+- A background task refreshes the catalog every TTL while serving the
+  previous (stale) data.
+- Every successful fetch is written to an on-disk JSON snapshot, which is
+  loaded at startup so a worker that starts cold or offline still has limits.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import get_settings
+from app.infrastructure.http_client import get_http_async_client, get_http_client
+from app.utils.logging import get_logger
+
+logger = get_logger("model_catalog")
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """Convert an API value to int, returning None when missing or invalid."""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert an API price string to float, returning None when invalid."""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class ModelInfo:
+    """Indexed limits and pricing for a single model."""
+
+    id: str
+    context_length: Optional[int] = None
+    max_completion_tokens: Optional[int] = None
+    # USD per token, as reported by OpenRouter
+    prompt_price: Optional[float] = None
+    completion_price: Optional[float] = None
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> "ModelInfo":
+        """Build from one entry of the OpenRouter `/models` response."""
+        top_provider = data.get("top_provider") or {}
+        if not isinstance(top_provider, dict):
+            top_provider = {}
+        pricing = data.get("pricing") or {}
+        if not isinstance(pricing, dict):
+            pricing = {}
+
+        return cls(
+            id=data.get("id", ""),
+            context_length=_to_int(top_provider.get("context_length")),
+            max_completion_tokens=_to_int(top_provider.get("max_completion_tokens")),
+            prompt_price=_to_float(pricing.get("prompt")),
+            completion_price=_to_float(pricing.get("completion")),
+        )
+
+
+class ModelCatalog:
+    """
+    Indexed, TTL-refreshed OpenRouter model catalog.
+
+    Usage:
+        catalog = get_model_catalog()
+        await catalog.ensure_loaded()
+        info = catalog.get("openai/gpt-4o-mini")
+        if info:
+            print(info.context_length)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        ttl_seconds: float = 3600.0,
+        snapshot_path: Optional[str] = None,
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+
+        self._models: List[Dict[str, Any]] = []
+        self._index: Dict[str, ModelInfo] = {}
+        self._fetched_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._failed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._fetch_count = 0
+        self._fetch_failures = 0
+
+        self._load_snapshot()
+
+    @property
+    def models(self) -> List[Dict[str, Any]]:
+        """Raw model dictionaries from the last successful fetch."""
+        return self._models
+
+    @property
+    def has_data(self) -> bool:
+        """Whether any catalog data (fresh, stale or snapshot) is available."""
+        return bool(self._index)
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the catalog is older than its TTL (or was never fetched)."""
+        if self._fetched_at is None:
+            return True
+        return time.time() - self._fetched_at >= self.ttl_seconds
+
+    def get(self, model_id: str) -> Optional[ModelInfo]:
+        """O(1) lookup of a model by id. Never performs I/O."""
+        return self._index.get(model_id)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _apply(self, models: List[Dict[str, Any]], fetched_at: float) -> None:
+        """Swap in a new model list and rebuild the index."""
+        index = {}
+        for model in models:
+            model_id = model.get("id")
+            if model_id:
+                index[model_id] = ModelInfo.from_api(model)
+
+        # Single assignment each, so readers never see a half-built index
+        self._models = models
+        self._index = index
+        self._fetched_at = fetched_at
+
+    def _load_snapshot(self) -> None:
+        """Load the on-disk snapshot, if present."""
+        if not self.snapshot_path or not self.snapshot_path.exists():
+            return
+        try:
+            payload = json.loads(self.snapshot_path.read_text())
+            self._apply(payload.get("data", []), payload.get("fetched_at", 0.0))
+            logger.info(
+                f"Loaded {len(self._index)} models from catalog snapshot "
+                f"{self.snapshot_path}"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load model catalog snapshot: {e}")
+
+    def _write_snapshot(self) -> None:
+        """Atomically write the current catalog to disk."""
+        if not self.snapshot_path:
+            return
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(
+                json.dumps({"fetched_at": self._fetched_at, "data": self._models})
+            )
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Failed to write model catalog snapshot: {e}")
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        """Fetch the model list from OpenRouter and update the index."""
+        self._fetch_count += 1
+        try:
+            client = get_http_async_client()
+            response = await client.get(
+                f"{self.base_url}/models", headers=self._headers(), timeout=10.0
+            )
+            response.raise_for_status()
+            models = response.json().get("data", [])
+        except Exception as e:
+            self._fetch_failures += 1
+            self._failed_at = time.monotonic()
+            logger.error(f"Failed to fetch OpenRouter models: {e}")
+            raise
+
+        self._apply(models, time.time())
+        self._failed_at = None
+        logger.info(f"Fetched {len(models)} available models from OpenRouter")
+        await asyncio.to_thread(self._write_snapshot)
+        return models
+
+    async def refresh(self) -> List[Dict[str, Any]]:
+        """
+        Fetch the catalog, sharing one in-flight request between callers.
+
+        Returns:
+            List of model dictionaries
+
+        Raises:
+            httpx.HTTPError: If the API request fails
+        """
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._fetch())
+            # Mark retrieved so an unawaited failure is not logged again
+            self._inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        # The fetch is not owned by any caller: one being cancelled (e.g. its
+        # client disconnecting) leaves it running for the others
+        return await asyncio.shield(self._inflight)
+
+    async def ensure_loaded(self) -> None:
+        """
+        Make sure catalog data is available.
+
+        Blocks only on a cold start with no snapshot (not again within a
+        minute of a failed fetch). Stale data is served while a background
+        refresh runs.
+        """
+        if not self.has_data:
+            if self._failed_at is not None and time.monotonic() - self._failed_at < 60.0:
+                return
+            try:
+                await self.refresh()
+            except Exception:
+                pass
+        elif self.is_stale:
+            self.schedule_refresh()
+
+    def schedule_refresh(self) -> None:
+        """Start a background refresh if none is in flight."""
+        if self._inflight is not None and not self._inflight.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        async def _refresh_quietly() -> None:
+            try:
+                await self.refresh()
+            except Exception:
+                pass
+
+        loop.create_task(_refresh_quietly())
+
+    def refresh_sync(self) -> List[Dict[str, Any]]:
+        """
+        Blocking fetch for synchronous callers (CLI commands, scripts).
+
+        Raises:
+            httpx.HTTPError: If the API request fails
+        """
+        self._fetch_count += 1
+        try:
+            response = get_http_client().get(
+                f"{self.base_url}/models", headers=self._headers(), timeout=10.0
+            )
+            response.raise_for_status()
+            models = response.json().get("data", [])
+        except Exception as e:
+            self._fetch_failures += 1
+            logger.error(f"Failed to fetch OpenRouter models: {e}")
+            raise
+
+        self._apply(models, time.time())
+        self._write_snapshot()
+        logger.info(f"Fetched {len(models)} available models from OpenRouter")
+        return models
+
+    async def _refresh_loop(self) -> None:
+        """Refresh the catalog every TTL until cancelled."""
+        while True:
+            if self.is_stale:
+                try:
+                    await self.refresh()
+                except Exception:
+                    # Keep serving the previous data; retry sooner than a full TTL
+                    await asyncio.sleep(min(60.0, self.ttl_seconds))
+                    continue
+            delay = self.ttl_seconds
+            if self._fetched_at is not None:
+                delay = max(1.0, self._fetched_at + self.ttl_seconds - time.time())
+            await asyncio.sleep(delay)
+
+    async def start(self) -> None:
+        """Start background refresh. Call from the application lifespan."""
+        if not self.api_key:
+            logger.info("OPENROUTER_API_KEY not set, model catalog refresh disabled")
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+            logger.info(f"Model catalog refresh started (ttl={self.ttl_seconds:.0f}s)")
+
+    async def stop(self) -> None:
+        """Stop background refresh."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get catalog statistics for monitoring."""
+        return {
+            "models": len(self._index),
+            "fetched_at": self._fetched_at,
+            "stale": self.is_stale,
+            "ttl_seconds": self.ttl_seconds,
+            "fetch_count": self._fetch_count,
+            "fetch_failures": self._fetch_failures,
+        }
+
+
+# Global catalog instance
+_model_catalog: Optional[ModelCatalog] = None
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Get or create the process-wide model catalog."""
+    global _model_catalog
+    if _model_catalog is None:
+        settings = get_settings()
+        _model_catalog = ModelCatalog(
+            base_url=settings.openrouter_base_url.rstrip("/"),
+            api_key=settings.openrouter_api_key,
+            ttl_seconds=settings.model_catalog_ttl_seconds,
+            snapshot_path=settings.model_catalog_snapshot_path or None,
+        )
+    return _model_catalog
+
+
+__all__ = [
+    "ModelCatalog",
+    "ModelInfo",
+    "get_model_catalog",
+]
@@ -0,0 +1,387 @@
+"""
+Latency-aware adaptive model router.
+
+Keeps per-model EWMA statistics of time-to-first-token (TTFT), output
+tokens/sec, error rate and cost per call, fed by `RouterCallbackHandler`
+(attached to every LLM built by `OpenRouterProvider.get_llm`). Agents that
+declare acceptable models in `AgentConfig.fallback_models` use
+`ModelRouter.select()` to pick the cheapest model that meets their latency
+SLO.
+
+Models that are unmeasured or above the error-rate limit are not used for
+regular traffic, but receive a small share of it as probes
+(`MODEL_ROUTER_PROBE_RATE`), and error rates decay towards zero while a
+model is not called (`MODEL_ROUTER_ERROR_HALF_LIFE_SECONDS`), so a model
+that failed for a while is retried once it recovers.
+
+Statistics are exported on `/api/v1/metrics/llm` and persisted to a JSON
+file on shutdown (loaded on startup), so restarts keep what was learned.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.config import get_settings
+from app.infrastructure.model_catalog import get_model_catalog
+from app.utils.logging import get_logger
+
+logger = get_logger("model_router")
+
+
+@dataclass
+class ModelStats:
+    """EWMA statistics for one model."""
+
+    samples: int = 0
+    errors: int = 0
+    ttft_ms: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    error_rate: float = 0.0
+    cost_usd: Optional[float] = None
+    updated_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring and persistence."""
+        return asdict(self)
+
+
+def _ewma(previous: Optional[float], value: float, alpha: float) -> float:
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+class ModelRouter:
+    """
+    Per-model latency/cost statistics and SLO-based model selection.
+
+    Usage:
+        router = get_model_router()
+        model = router.select(
+            ["anthropic/claude-3.5-sonnet", "openai/gpt-4o-mini"],
+            latency_slo_ms=1500,
+        )
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        max_error_rate: float = 0.2,
+        error_half_life_seconds: float = 300.0,
+        probe_rate: float = 0.05,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            alpha: EWMA smoothing factor (higher reacts faster)
+            max_error_rate: Models above this error rate are not selected
+                while a healthier candidate exists (except as probes)
+            error_half_life_seconds: Time for an error rate to halve while
+                a model gets no calls (0 disables decay)
+            probe_rate: Share of selections sent to an unmeasured or
+                unhealthy candidate to (re)measure it
+        """
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.error_half_life = error_half_life_seconds
+        self.probe_rate = probe_rate
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def _entry(self, model: str) -> ModelStats:
+        entry = self._stats.get(model)
+        if entry is None:
+            entry = self._stats[model] = ModelStats()
+        return entry
+
+    def _error_rate(self, entry: ModelStats, now: float) -> float:
+        """Error rate decayed by the time since the model's last call."""
+        if not self.error_half_life or not entry.error_rate:
+            return entry.error_rate
+        idle = max(0.0, now - entry.updated_at)
+        return entry.error_rate * 0.5 ** (idle / self.error_half_life)
+
+    def record_success(
+        self,
+        model: str,
+        ttft_ms: float,
+        tokens_per_second: Optional[float] = None,
+        cost_usd: Optional[float] = None,
+    ) -> None:
+        """Record a completed call."""
+        with self._lock:
+            entry = self._entry(model)
+            entry.samples += 1
+            entry.ttft_ms = _ewma(entry.ttft_ms, ttft_ms, self.alpha)
+            if tokens_per_second is not None:
+                entry.tokens_per_second = _ewma(entry.tokens_per_second, tokens_per_second, self.alpha)
+            if cost_usd is not None:
+                entry.cost_usd = _ewma(entry.cost_usd, cost_usd, self.alpha)
+            now = time.time()
+            entry.error_rate = _ewma(self._error_rate(entry, now), 0.0, self.alpha)
+            entry.updated_at = now
+
+    def record_error(self, model: str) -> None:
+        """Record a failed call."""
+        with self._lock:
+            entry = self._entry(model)
+            entry.samples += 1
+            entry.errors += 1
+            now = time.time()
+            previous = self._error_rate(entry, now) if entry.samples > 1 else None
+            entry.error_rate = _ewma(previous, 1.0, self.alpha)
+            entry.updated_at = now
+
+    def get(self, model: str) -> Optional[ModelStats]:
+        """Get statistics for a model."""
+        return self._stats.get(model)
+
+    def _expected_cost(self, model: str) -> float:
+        """Observed cost per call, or catalog list price when not observed yet."""
+        entry = self._stats.get(model)
+        if entry is not None and entry.cost_usd is not None:
+            return entry.cost_usd
+        info = get_model_catalog().get(model)
+        if info is not None and info.prompt_price is not None:
+            # Nominal call: 1k prompt + 250 completion tokens
+            return info.prompt_price * 1000 + (info.completion_price or 0.0) * 250
+        return float("inf")
+
+    def select(self, candidates: Sequence[str], latency_slo_ms: Optional[float] = None) -> str:
+        """
+        Pick the cheapest healthy model that meets the latency SLO.
+
+        Only measured models serve regular traffic; a `probe_rate` share of
+        selections goes to the least recently measured of the unmeasured or
+        unhealthy candidates instead. If no measured model meets the SLO,
+        the fastest healthy one is returned.
+
+        Args:
+            candidates: Acceptable models, in preference order
+            latency_slo_ms: Maximum acceptable TTFT in milliseconds (None: cheapest)
+
+        Returns:
+            The selected model name
+        """
+        if not candidates:
+            raise ValueError("At least one candidate model must be provided")
+
+        now = time.time()
+        with self._lock:
+            measured = {m: self._stats[m] for m in candidates if m in self._stats}
+            error_rates = {m: self._error_rate(entry, now) for m, entry in measured.items()}
+            probe = self._random.random() < self.probe_rate
+
+        unmeasured = [m for m in candidates if m not in measured]
+        healthy = [m for m in candidates if m in measured and error_rates[m] <= self.max_error_rate]
+        if not healthy and unmeasured:
+            # Nothing known to work: measure the next candidate
+            return unmeasured[0]
+
+        excluded = [m for m in candidates if m not in healthy]
+        if probe and excluded and healthy:
+            return min(excluded, key=lambda m: measured[m].updated_at if m in measured else 0.0)
+
+        def ttft(model: str) -> float:
+            value = measured[model].ttft_ms
+            return float("inf") if value is None else value
+
+        pool = healthy or [m for m in candidates if m in measured]
+
+        meeting_slo = [m for m in pool if latency_slo_ms is None or ttft(m) <= latency_slo_ms]
+        if meeting_slo:
+            return min(meeting_slo, key=lambda m: (self._expected_cost(m), candidates.index(m)))
+        return min(pool, key=ttft)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-model statistics for dashboards."""
+        with self._lock:
+            return {model: entry.to_dict() for model, entry in self._stats.items()}
+
+    def load(self, path: str) -> None:
+        """Load persisted statistics, if the file exists."""
+        file = Path(path)
+        if not file.exists():
+            return
+        try:
+            payload = json.loads(file.read_text())
+            with self._lock:
+                for model, data in payload.get("models", {}).items():
+                    self._stats[model] = ModelStats(**data)
+            logger.info(f"Loaded router statistics for {len(self._stats)} models from {file}")
+        except Exception as e:
+            logger.warning(f"Failed to load model router statistics: {e}")
+
+    def save(self, path: str) -> None:
+        """Atomically persist statistics to disk."""
+        file = Path(path)
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({"saved_at": time.time(), "models": self.stats()}))
+            os.replace(tmp_path, file)
+        except Exception as e:
+            logger.warning(f"Failed to save model router statistics: {e}")
+
+
+class RouterCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback feeding `ModelRouter` statistics.
+
+    TTFT is the time to the first streamed token; for non-streaming calls
+    it is the full response latency.
+    """
+
+    # Cheap bookkeeping only, so run in the caller's thread/loop
+    run_inline = True
+
+    def __init__(self, router: "ModelRouter"):
+        self.router = router
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        self._runs[run_id] = {
+            "model": params.get("model") or params.get("model_name") or metadata.get("ls_model_name"),
+            "start": time.perf_counter(),
+            "first_token": None,
+        }
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        end = time.perf_counter()
+        llm_output = response.llm_output or {}
+        # Attribute to the requested model; the served name may carry a version suffix
+        model = run["model"] or llm_output.get("model_name")
+        if not model:
+            return
+
+        prompt_tokens, completion_tokens = self._usage(response)
+        first_token = run["first_token"] or end
+        generation_time = end - first_token if run["first_token"] else end - run["start"]
+        tokens_per_second = (
+            completion_tokens / generation_time if completion_tokens and generation_time > 0 else None
+        )
+
+        cost = None
+        info = get_model_catalog().get(model)
+        if info is not None and info.prompt_price is not None and (prompt_tokens or completion_tokens):
+            cost = prompt_tokens * info.prompt_price + completion_tokens * (info.completion_price or 0.0)
+
+        self.router.record_success(
+            model,
+            ttft_ms=(first_token - run["start"]) * 1000,
+            tokens_per_second=tokens_per_second,
+            cost_usd=cost,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        # Cancelled runs (client disconnects, hedge losers, cancelled branches) say nothing about the model
+        if isinstance(error, asyncio.CancelledError) or not isinstance(error, Exception):
+            return
+        if run is not None and run["model"]:
+            self.router.record_error(run["model"])
+
+    @staticmethod
+    def _usage(response: LLMResult) -> Tuple[int, int]:
+        """Extract (prompt, completion) token counts from an LLM result."""
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+
+        # Streaming results carry usage on the message instead
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+        return 0, 0
+
+
+# Global router instance
+_model_router: Optional[ModelRouter] = None
+_router_callback: Optional[RouterCallbackHandler] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router."""
+    global _model_router
+    if _model_router is None:
+        settings = get_settings()
+        _model_router = ModelRouter(
+            alpha=settings.model_router_ewma_alpha,
+            max_error_rate=settings.model_router_max_error_rate,
+            error_half_life_seconds=settings.model_router_error_half_life_seconds,
+            probe_rate=settings.model_router_probe_rate,
+        )
+    return _model_router
+
+
+def get_router_callback() -> Optional[RouterCallbackHandler]:
+    """
+    Get the shared router callback handler.
+
+    Returns:
+        The handler, or None if MODEL_ROUTER_ENABLED is false
+    """
+    global _router_callback
+    if not get_settings().model_router_enabled:
+        return None
+    if _router_callback is None:
+        _router_callback = RouterCallbackHandler(get_model_router())
+    return _router_callback
+
+
+def load_router_stats() -> None:
+    """Load persisted router statistics. Call from the application lifespan."""
+    path = get_settings().model_router_stats_path
+    if path:
+        get_model_router().load(path)
+
+
+def save_router_stats() -> None:
+    """Persist router statistics. Call from the application lifespan."""
+    path = get_settings().model_router_stats_path
+    if path and _model_router is not None:
+        _model_router.save(path)
+
+
+__all__ = [
+    "ModelRouter",
+    "ModelStats",
+    "RouterCallbackHandler",
+    "get_model_router",
+    "get_router_callback",
+    "load_router_stats",
+    "save_router_stats",
+]
@@ -0,0 +1,425 @@
+"""
+LLM response cache for deterministic chat requests.
+
+Temperature-0 requests with the same (model, system prompt, message) are
+answered from the cache instead of calling the LLM. Backends are pluggable:
+
+- ``memory``: in-process LRU with per-entry TTL (default)
+- ``redis``: shared across workers, requires the optional ``redis`` package
+- ``sqlite``: single file via the stdlib ``sqlite3`` module, for local dev
+
+An optional semantic mode also matches paraphrased messages: each cached
+message is embedded, and a lookup that misses exactly is served by the most
+similar cached message for the same model and system prompt if its cosine
+similarity is above a threshold.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("response_cache")
+
+
+class ResponseCacheBackend:
+    """Interface for response cache storage."""
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if missing or expired."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        """Store a value with a time-to-live."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+
+class MemoryResponseBackend(ResponseCacheBackend):
+    """In-process LRU with per-entry expiry."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        self._entries[key] = (value, time.time() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisResponseBackend(ResponseCacheBackend):
+    """Redis-backed cache shared by all workers."""
+
+    name = "redis"
+
+    def __init__(self, redis_url: str, prefix: str = "llm:response:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "Redis response cache requires the 'redis' package. "
+                "Install with: pip install 'redis>=5.0.0'"
+            ) from e
+
+        self.prefix = prefix
+        self._client = redis.from_url(redis_url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        await self._client.set(self.prefix + key, value, ex=ttl_seconds)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class SQLiteResponseBackend(ResponseCacheBackend):
+    """Single-file SQLite cache for local development."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl_seconds),
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._conn.close)
+
+
+class _SemanticIndex:
+    """Normalized message embeddings for one (model, system prompt) scope."""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.vectors: Optional[np.ndarray] = None
+
+    def add(self, key: str, vector: np.ndarray, max_entries: int) -> None:
+        if key in self.keys:
+            return
+        row = vector[np.newaxis, :]
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.keys.append(key)
+        if len(self.keys) > max_entries:
+            self.keys = self.keys[-max_entries:]
+            self.vectors = self.vectors[-max_entries:]
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+            return None, 0.0
+        scores = self.vectors @ vector
+        best = int(np.argmax(scores))
+        return self.keys[best], float(scores[best])
+
+
+@dataclass
+class ResponseCacheStats:
+    """Statistics for the response cache."""
+
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+class ResponseCache:
+    """
+    Cache of final LLM responses for deterministic chat requests.
+
+    Backend errors are logged and treated as misses, so the cache never
+    fails a chat request.
+
+    Usage:
+        cache = get_response_cache()
+        if cache.is_cacheable(model, temperature):
+            cached = await cache.get(model, system_prompt, message)
+            ...
+            await cache.set(model, system_prompt, message, response_text)
+    """
+
+    def __init__(
+        self,
+        backend: ResponseCacheBackend,
+        ttl_seconds: int = 3600,
+        models: Optional[List[str]] = None,
+        semantic_enabled: bool = False,
+        semantic_threshold: float = 0.95,
+        embedding_model: str = "openai/text-embedding-3-small",
+        max_semantic_entries: int = 1000,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Storage backend
+            ttl_seconds: Time-to-live of cached responses
+            models: Models that opt in to caching ("*" or None for all)
+            semantic_enabled: Also match paraphrased messages by embedding similarity
+            semantic_threshold: Minimum cosine similarity for a semantic hit
+            embedding_model: Embedding model used in semantic mode
+            max_semantic_entries: Maximum embeddings kept per semantic scope
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.models = None if not models or "*" in models else set(models)
+        self.semantic_enabled = semantic_enabled
+        self.semantic_threshold = semantic_threshold
+        self.embedding_model = embedding_model
+        self.max_semantic_entries = max(1, max_semantic_entries)
+
+        self._embeddings = None
+        self._semantic: Dict[str, _SemanticIndex] = {}
+        self._stats = ResponseCacheStats()
+
+    def is_cacheable(self, model: str, temperature: Optional[float]) -> bool:
+        """Only deterministic requests for opted-in models are cached."""
+        if temperature is None or temperature != 0:
+            return False
+        return self.models is None or model in self.models
+
+    @staticmethod
+    def _scope(model: str, system_prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, system_prompt]).encode()).hexdigest()
+
+    @classmethod
+    def make_key(cls, model: str, system_prompt: str, message: str) -> str:
+        """Exact-match cache key for a request."""
+        return hashlib.sha256(
+            json.dumps([model, system_prompt, message]).encode()
+        ).hexdigest()
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Normalized embedding of a message, or None if unavailable."""
+        try:
+            if self._embeddings is None:
+                from app.infrastructure.llm_provider import OpenRouterEmbeddings
+                self._embeddings = OpenRouterEmbeddings(model=self.embedding_model)
+            vector = np.asarray(await self._embeddings.aembed_query(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Semantic response cache lookup skipped: {e}")
+            return None
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    async def get(self, model: str, system_prompt: str, message: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response text, or None on a miss
+        """
+        try:
+            value = await self.backend.get(self.make_key(model, system_prompt, message))
+            if value is not None:
+                self._stats.hits += 1
+                return value
+
+            if self.semantic_enabled:
+                index = self._semantic.get(self._scope(model, system_prompt))
+                vector = await self._embed(message) if index else None
+                if vector is not None:
+                    key, score = index.nearest(vector)
+                    if key and score >= self.semantic_threshold:
+                        value = await self.backend.get(key)
+                        if value is not None:
+                            self._stats.semantic_hits += 1
+                            logger.debug(f"Semantic response cache hit (similarity={score:.3f})")
+                            return value
+        except Exception as e:
+            self._stats.errors += 1
+            logger.warning(f"Response cache lookup failed ({self.backend.name}): {e}")
+
+        self._stats.misses += 1
+        return None
+
+    async def set(self, model: str, system_prompt: str, message: str, response: str) -> None:
+        """Store a response for later identical (or similar) requests."""
+        if not response:
+            return
+        key = self.make_key(model, system_prompt, message)
+        try:
+            await self.backend.set(key, response, self.ttl_seconds)
+            self._stats.writes += 1
+        except Exception as e:
+            self._stats.errors += 1
+            logger.warning(f"Response cache write failed ({self.backend.name}): {e}")
+            return
+
+        if self.semantic_enabled:
+            vector = await self._embed(message)
+            if vector is not None:
+                scope = self._scope(model, system_prompt)
+                index = self._semantic.setdefault(scope, _SemanticIndex())
+                index.add(key, vector, self.max_semantic_entries)
+
+    async def close(self) -> None:
+        """Close the backend."""
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics for monitoring."""
+        stats = self._stats.to_dict()
+        stats["backend"] = self.backend.name
+        stats["semantic"] = self.semantic_enabled
+        return stats
+
+
+def iter_cached_chunks(text: str, words_per_chunk: int = 4) -> Iterator[str]:
+    """
+    Split a cached response into token-like chunks for synthetic streaming.
+
+    Whitespace is kept with the preceding word, so joining the chunks
+    reproduces the original text exactly.
+    """
+    words = re.findall(r"\s*\S+\s*", text) or [text]
+    for i in range(0, len(words), words_per_chunk):
+        yield "".join(words[i:i + words_per_chunk])
+
+
+def _create_backend() -> ResponseCacheBackend:
+    """Create the backend selected by RESPONSE_CACHE_BACKEND."""
+    settings = get_settings()
+    backend = settings.response_cache_backend.lower()
+
+    if backend == "redis":
+        if not settings.redis_url:
+            logger.warning("RESPONSE_CACHE_BACKEND=redis but REDIS_URL is not set, using memory")
+        else:
+            try:
+                return RedisResponseBackend(settings.redis_url)
+            except ImportError as e:
+                logger.warning(f"{e}. Falling back to in-memory response cache.")
+    elif backend == "sqlite":
+        return SQLiteResponseBackend(settings.response_cache_sqlite_path)
+    elif backend != "memory":
+        logger.warning(f"Unknown RESPONSE_CACHE_BACKEND '{backend}', using memory")
+
+    return MemoryResponseBackend(max_entries=settings.response_cache_max_entries)
+
+
+# Global cache instance
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide response cache.
+
+    Returns:
+        The cache, or None if RESPONSE_CACHE_ENABLED is false
+    """
+    global _response_cache
+    settings = get_settings()
+    if not settings.response_cache_enabled:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            backend=_create_backend(),
+            ttl_seconds=settings.response_cache_ttl_seconds,
+            models=settings.response_cache_models_list,
+            semantic_enabled=settings.response_cache_semantic_enabled,
+            semantic_threshold=settings.response_cache_semantic_threshold,
+            embedding_model=settings.response_cache_embedding_model,
+            max_semantic_entries=settings.response_cache_max_entries,
+        )
+        logger.info(f"Response cache enabled (backend={_response_cache.backend.name})")
+    return _response_cache
+
+
+async def close_response_cache() -> None:
+    """Close the response cache backend. Call from the application lifespan."""
+    global _response_cache
+    if _response_cache is not None:
+        await _response_cache.close()
+        _response_cache = None
+
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Get response cache statistics (empty if the cache is disabled)."""
+    return _response_cache.stats() if _response_cache is not None else {}
+
+
+__all__ = [
+    "ResponseCache",
+    "ResponseCacheBackend",
+    "MemoryResponseBackend",
+    "RedisResponseBackend",
+    "SQLiteResponseBackend",
+    "iter_cached_chunks",
+    "get_response_cache",
+    "get_response_cache_stats",
+    "close_response_cache",
+]
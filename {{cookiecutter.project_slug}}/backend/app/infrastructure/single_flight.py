@@ -0,0 +1,265 @@
+"""
+Single-flight coalescing of identical in-flight LLM calls.
+
+When many callers send the same request at the same moment, only the first
+one (the leader) calls the LLM; the others join its in-flight call:
+
+- `do()` shares one upstream future between all callers.
+- `stream()` shares one upstream token stream, broadcast to every
+  subscriber. Late joiners first receive the chunks already produced.
+
+Each flight is reference counted. A caller that is cancelled (for example,
+a client that disconnects) only detaches itself; the upstream call is
+cancelled when its last caller leaves.
+"""
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+logger = get_logger("single_flight")
+
+T = TypeVar("T")
+
+
+def make_flight_key(
+    model: str,
+    params: Dict[str, Any],
+    messages: Sequence[Tuple[str, str]],
+) -> str:
+    """
+    Build a key for an LLM call.
+
+    Message content is kept exactly, apart from leading and trailing
+    whitespace: prompts differing in indentation or line breaks (code,
+    YAML, tables) can have different answers.
+
+    Args:
+        model: Model name
+        params: Generation parameters (temperature, etc.)
+        messages: (role, content) pairs
+
+    Returns:
+        Hex digest identifying the call
+    """
+    normalized = {
+        "model": model,
+        "params": params,
+        "messages": [[role, content.strip()] for role, content in messages],
+    }
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class _Flight:
+    """An in-flight call shared by several callers."""
+    task: asyncio.Future
+    refs: int = 0
+
+
+@dataclass
+class _StreamFlight:
+    """An in-flight stream broadcast to several subscribers."""
+    chunks: List[Any] = field(default_factory=list)
+    done: bool = False
+    error: Optional[BaseException] = None
+    refs: int = 0
+    task: Optional[asyncio.Task] = None
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+@dataclass
+class SingleFlightStats:
+    """Statistics for single-flight coalescing."""
+
+    calls: int = 0
+    coalesced: int = 0
+    upstream_cancelled: int = 0
+
+    def to_dict(self, in_flight: int) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.calls - self.coalesced,
+            "upstream_cancelled": self.upstream_cancelled,
+            "in_flight": in_flight,
+            "coalesce_rate": self.coalesced / self.calls if self.calls else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one upstream call.
+
+    Usage:
+        single_flight = get_single_flight()
+        key = make_flight_key(model, {"temperature": 0}, [("user", message)])
+
+        text = await single_flight.do(key, lambda: chain.ainvoke(inputs))
+
+        async for chunk in single_flight.stream(key, lambda: chain.astream(inputs)):
+            ...
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self._stats = SingleFlightStats()
+
+    def _forget_call(self, key: str, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def _forget_stream(self, key: str, flight: _StreamFlight) -> None:
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn`, or join an identical call that is already in flight.
+
+        Args:
+            key: Call key from `make_flight_key`
+            fn: Zero-argument coroutine function making the upstream call
+
+        Returns:
+            The (shared) result of the upstream call
+        """
+        if not self.enabled:
+            return await fn()
+
+        self._stats.calls += 1
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Flight(task=asyncio.ensure_future(fn()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _, k=key, f=flight: self._forget_call(k, f))
+        else:
+            self._stats.coalesced += 1
+
+        flight.refs += 1
+        try:
+            # Shield so one cancelled caller does not cancel the shared call
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.refs -= 1
+            if flight.refs == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget_call(key, flight)
+                self._stats.upstream_cancelled += 1
+
+    async def stream(
+        self, key: str, factory: Callable[[], AsyncIterator[T]]
+    ) -> AsyncIterator[T]:
+        """
+        Iterate `factory()`, or subscribe to an identical stream in flight.
+
+        Args:
+            key: Call key from `make_flight_key`
+            factory: Zero-argument callable returning the upstream async iterator
+
+        Yields:
+            Every chunk of the shared upstream stream, from the beginning
+        """
+        if not self.enabled:
+            async for chunk in factory():
+                yield chunk
+            return
+
+        self._stats.calls += 1
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, factory))
+        else:
+            self._stats.coalesced += 1
+
+        flight.refs += 1
+        index = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(
+                        lambda: len(flight.chunks) > index or flight.done
+                    )
+                    pending = flight.chunks[index:]
+                    done, error = flight.done, flight.error
+
+                for chunk in pending:
+                    yield chunk
+                index += len(pending)
+
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            flight.refs -= 1
+            if flight.refs == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget_stream(key, flight)
+                self._stats.upstream_cancelled += 1
+
+    async def _pump(
+        self, key: str, flight: _StreamFlight, factory: Callable[[], AsyncIterator[Any]]
+    ) -> None:
+        """Read the upstream stream and wake subscribers on every chunk."""
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            # Tell remaining subscribers, but let the cancellation propagate
+            flight.error = asyncio.CancelledError("Upstream stream was cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._forget_stream(key, flight)
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        return self._stats.to_dict(in_flight=len(self._calls) + len(self._streams))
+
+
+# Global single-flight instance
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight group."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(enabled=get_settings().single_flight_enabled)
+    return _single_flight
+
+
+__all__ = [
+    "SingleFlight",
+    "get_single_flight",
+    "make_flight_key",
+]
@@ -0,0 +1,102 @@
+"""
+Accounting for streams cancelled by client disconnects.
+
+Streaming endpoints stop reading the upstream LLM stream as soon as the
+client goes away (see `SSEWriter.stream(..., request=request)`), or, for
+resumable streams, once no client has reattached within the detach grace
+period (see `stream_replay`). This closes the upstream HTTP request. This
+module records:
+
+- client disconnects, with the partial transcript that was delivered;
+- upstream streams that were actually cancelled (a stream shared through
+  single-flight keeps running while other subscribers remain);
+- an estimate of the completion tokens saved: the average completion
+  length of streams that ran to the end, minus the tokens already received
+  when the upstream was cancelled.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from app.utils.logging import get_logger
+
+logger = get_logger("stream_cancellation")
+
+
+@dataclass
+class StreamCancellationStats:
+    """Statistics for cancelled upstream streams."""
+
+    client_disconnects: int = 0
+    partial_chars_delivered: int = 0
+    completed_streams: int = 0
+    completed_tokens: int = 0
+    cancelled_streams: int = 0
+    tokens_before_cancel: int = 0
+    tokens_saved: float = 0.0
+
+    @property
+    def avg_completion_tokens(self) -> float:
+        return self.completed_tokens / self.completed_streams if self.completed_streams else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "client_disconnects": self.client_disconnects,
+            "partial_chars_delivered": self.partial_chars_delivered,
+            "completed_streams": self.completed_streams,
+            "cancelled_streams": self.cancelled_streams,
+            "avg_completion_tokens": self.avg_completion_tokens,
+            "tokens_before_cancel": self.tokens_before_cancel,
+            "tokens_saved_estimate": round(self.tokens_saved),
+        }
+
+
+_stats = StreamCancellationStats()
+
+
+def record_stream_completed(tokens: int) -> None:
+    """Record an upstream stream that ran to completion."""
+    _stats.completed_streams += 1
+    _stats.completed_tokens += tokens
+
+
+def record_stream_cancelled(tokens: int) -> float:
+    """
+    Record an upstream stream cancelled before completion.
+
+    Args:
+        tokens: Chunks/tokens received before cancellation
+
+    Returns:
+        Estimated completion tokens saved
+    """
+    saved = max(0.0, _stats.avg_completion_tokens - tokens)
+    _stats.cancelled_streams += 1
+    _stats.tokens_before_cancel += tokens
+    _stats.tokens_saved += saved
+    return saved
+
+
+def record_client_disconnect(endpoint: str, user_id: str, partial_text: str) -> None:
+    """Record a client that disconnected mid-stream, with its partial transcript."""
+    _stats.client_disconnects += 1
+    _stats.partial_chars_delivered += len(partial_text)
+    logger.info(
+        f"Client disconnected from {endpoint} (user {user_id}) after "
+        f"{len(partial_text)} chars",
+        extra={"endpoint": endpoint, "user_id": user_id, "partial_transcript": partial_text},
+    )
+
+
+def get_stream_cancellation_stats() -> Dict[str, Any]:
+    """Get stream cancellation statistics for monitoring."""
+    return _stats.to_dict()
+
+
+__all__ = [
+    "get_stream_cancellation_stats",
+    "record_client_disconnect",
+    "record_stream_cancelled",
+    "record_stream_completed",
+]
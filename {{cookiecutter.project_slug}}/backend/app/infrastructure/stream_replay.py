@@ -0,0 +1,620 @@
+"""
+Resumable SSE streams backed by a replay buffer.
+
+Every SSE event of a resumable stream gets an id `<stream_id>:<seq>` and is
+appended to a bounded, TTL'd replay buffer. Generation runs detached from
+the HTTP connection: the client's response only tails the buffer. When a
+client reconnects with `Last-Event-ID`, it resumes from the next event
+while the original generation keeps running; nothing is generated twice.
+
+- ``memory`` backend: in-process, for single-worker deployments (default)
+- ``redis`` backend: shared across workers (requires the optional ``redis``
+  package); subscribers on other workers poll it
+
+Replay is opt-in (`STREAM_REPLAY_ENABLED`): without it a client disconnect
+cancels the upstream LLM request at once. A resumable stream left without
+subscribers is cancelled `STREAM_REPLAY_DETACH_GRACE_SECONDS` after the
+last one leaves, so abandoned streams still close their upstream request
+(see `stream_cancellation`). Events stay replayable for
+`STREAM_REPLAY_TTL_SECONDS` after the last one.
+
+Usage:
+    async def frames(watch: Optional[Request]) -> AsyncIterator[bytes]:
+        ...  # SSE frames, e.g. from SSEWriter.stream(..., request=watch)
+
+    resumed = await resume_from_request(request, owner=current_user.id)
+    if resumed is not None:
+        return resumed
+    return await resumable_response(request, frames, owner=current_user.id)
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+from app.utils.sse import HEARTBEAT, SSE_HEADERS, encode_event
+
+logger = get_logger("stream_replay")
+
+STREAM_ID_HEADER = "X-Stream-ID"
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Parse a `Last-Event-ID` value (`<stream_id>:<seq>`) into (stream_id, seq)."""
+    if not value:
+        return None
+    stream_id, _, seq = value.strip().rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+@dataclass
+class ReplaySlice:
+    """Events after a position, with the stream's metadata."""
+
+    owner: str
+    events: List[Tuple[int, bytes]]
+    finished: bool
+
+
+class ReplayBackend:
+    """Interface for replay buffer storage."""
+
+    name = "base"
+
+    async def create(self, stream_id: str, owner: str, ttl_seconds: int) -> None:
+        """Register a new stream."""
+        raise NotImplementedError
+
+    async def append(self, stream_id: str, seq: int, event: bytes, ttl_seconds: int) -> None:
+        """Append an event and extend the stream's expiry."""
+        raise NotImplementedError
+
+    async def finish(self, stream_id: str, ttl_seconds: int) -> None:
+        """Mark the stream complete (no more events)."""
+        raise NotImplementedError
+
+    async def read(self, stream_id: str, after: int) -> Optional[ReplaySlice]:
+        """Return events with seq > `after`, or None if the stream is unknown or expired."""
+        raise NotImplementedError
+
+    async def attach(self, stream_id: str) -> None:
+        """Record that a subscriber is reading the stream (from any worker)."""
+        raise NotImplementedError
+
+    async def last_attached(self, stream_id: str) -> float:
+        """Time a subscriber last read the stream (0 if never)."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend-specific statistics."""
+        return {}
+
+
+@dataclass
+class _BufferedStream:
+    owner: str
+    events: Deque[Tuple[int, bytes]]
+    expires_at: float
+    finished: bool = False
+    attached_at: float = 0.0
+
+
+class MemoryReplayBackend(ReplayBackend):
+    """
+    In-process buffers.
+
+    When full, the oldest expired or completed stream is evicted; a stream
+    that is still producing is evicted only when every stream is live.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_streams: int = 1000, max_events: int = 2000):
+        self.max_streams = max(1, max_streams)
+        self.max_events = max(1, max_events)
+        self._streams: "OrderedDict[str, _BufferedStream]" = OrderedDict()
+        self.live_evictions = 0
+
+    def _evict(self) -> None:
+        """Make room for one stream."""
+        now = time.time()
+        for stream_id, entry in self._streams.items():
+            if entry.finished or entry.expires_at <= now:
+                del self._streams[stream_id]
+                return
+        stream_id, _ = self._streams.popitem(last=False)
+        self.live_evictions += 1
+        logger.warning(
+            f"Replay buffer full ({self.max_streams} live streams): evicted live stream {stream_id}, "
+            f"it can no longer be resumed"
+        )
+
+    def _get(self, stream_id: str) -> Optional[_BufferedStream]:
+        entry = self._streams.get(stream_id)
+        if entry is not None and entry.expires_at <= time.time():
+            del self._streams[stream_id]
+            return None
+        return entry
+
+    async def create(self, stream_id: str, owner: str, ttl_seconds: int) -> None:
+        self._streams[stream_id] = _BufferedStream(
+            owner=owner, events=deque(maxlen=self.max_events), expires_at=time.time() + ttl_seconds
+        )
+        while len(self._streams) > self.max_streams:
+            self._evict()
+
+    async def append(self, stream_id: str, seq: int, event: bytes, ttl_seconds: int) -> None:
+        entry = self._get(stream_id)
+        if entry is not None:
+            entry.events.append((seq, event))
+            entry.expires_at = time.time() + ttl_seconds
+
+    async def finish(self, stream_id: str, ttl_seconds: int) -> None:
+        entry = self._get(stream_id)
+        if entry is not None:
+            entry.finished = True
+            entry.expires_at = time.time() + ttl_seconds
+
+    async def read(self, stream_id: str, after: int) -> Optional[ReplaySlice]:
+        entry = self._get(stream_id)
+        if entry is None:
+            return None
+        # Sequence numbers are contiguous, so the position is an offset
+        start = max(0, after + 1 - entry.events[0][0]) if entry.events else 0
+        events = list(itertools.islice(entry.events, start, None))
+        return ReplaySlice(owner=entry.owner, events=events, finished=entry.finished)
+
+    async def attach(self, stream_id: str) -> None:
+        entry = self._get(stream_id)
+        if entry is not None:
+            entry.attached_at = time.time()
+
+    async def last_attached(self, stream_id: str) -> float:
+        entry = self._get(stream_id)
+        return entry.attached_at if entry is not None else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"buffered_streams": len(self._streams), "live_evictions": self.live_evictions}
+
+
+class RedisReplayBackend(ReplayBackend):
+    """Redis-backed buffers shared by all workers (a sorted set of events per stream)."""
+
+    name = "redis"
+
+    def __init__(self, redis_url: str, max_events: int = 2000, prefix: str = "sse:replay:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "Redis stream replay requires the 'redis' package. "
+                "Install with: pip install 'redis>=5.0.0'"
+            ) from e
+
+        self.prefix = prefix
+        self.max_events = max(1, max_events)
+        self._client = redis.from_url(redis_url)
+
+    def _keys(self, stream_id: str) -> Tuple[str, str]:
+        return f"{self.prefix}{stream_id}:meta", f"{self.prefix}{stream_id}:events"
+
+    async def create(self, stream_id: str, owner: str, ttl_seconds: int) -> None:
+        meta, _ = self._keys(stream_id)
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hset(meta, mapping={"owner": owner, "finished": 0, "attached_at": 0})
+            pipe.expire(meta, ttl_seconds)
+            await pipe.execute()
+
+    async def append(self, stream_id: str, seq: int, event: bytes, ttl_seconds: int) -> None:
+        meta, events = self._keys(stream_id)
+        async with self._client.pipeline(transaction=True) as pipe:
+            # Events embed their id, so members are unique
+            pipe.zadd(events, {event: seq})
+            pipe.zremrangebyrank(events, 0, -(self.max_events + 1))
+            pipe.expire(events, ttl_seconds)
+            pipe.expire(meta, ttl_seconds)
+            await pipe.execute()
+
+    async def finish(self, stream_id: str, ttl_seconds: int) -> None:
+        meta, events = self._keys(stream_id)
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hset(meta, "finished", 1)
+            pipe.expire(meta, ttl_seconds)
+            pipe.expire(events, ttl_seconds)
+            await pipe.execute()
+
+    async def read(self, stream_id: str, after: int) -> Optional[ReplaySlice]:
+        meta, events = self._keys(stream_id)
+        # Metadata first: if it says finished, every event is already stored
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(meta)
+            pipe.zrangebyscore(events, f"({after}", "+inf", withscores=True)
+            fields, stored = await pipe.execute()
+        if not fields:
+            return None
+        return ReplaySlice(
+            owner=fields[b"owner"].decode(),
+            events=[(int(score), event) for event, score in stored],
+            finished=fields.get(b"finished") == b"1",
+        )
+
+    async def attach(self, stream_id: str) -> None:
+        meta, _ = self._keys(stream_id)
+        await self._client.hset(meta, "attached_at", time.time())
+
+    async def last_attached(self, stream_id: str) -> float:
+        meta, _ = self._keys(stream_id)
+        value = await self._client.hget(meta, "attached_at")
+        return float(value) if value else 0.0
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+@dataclass
+class StreamReplayStats:
+    """Statistics for resumable streams."""
+
+    started: int = 0
+    resumed: int = 0
+    replayed_events: int = 0
+    resume_misses: int = 0
+    detached_cancelled: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "started": self.started,
+            "resumed": self.resumed,
+            "replayed_events": self.replayed_events,
+            "resume_misses": self.resume_misses,
+            "detached_cancelled": self.detached_cancelled,
+        }
+
+
+@dataclass
+class _LocalStream:
+    """A stream generated by this worker."""
+
+    stream_id: str
+    seq: int = 0
+    done: bool = False
+    subscribers: int = 0
+    detached_at: float = field(default_factory=time.time)
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+    task: Optional[asyncio.Task] = None
+
+
+class StreamReplay:
+    """
+    Runs SSE streams detached from their connections and serves them from a replay buffer.
+
+    Args:
+        backend: Replay buffer storage
+        ttl_seconds: How long events stay replayable after the last one
+        detach_grace_seconds: How long a stream without subscribers keeps generating
+        poll_interval: Polling interval for streams generated by another worker
+        heartbeat_seconds: Idle time before a heartbeat comment (0 disables heartbeats)
+    """
+
+    def __init__(
+        self,
+        backend: ReplayBackend,
+        ttl_seconds: int = 300,
+        detach_grace_seconds: float = 15.0,
+        poll_interval: float = 0.1,
+        heartbeat_seconds: float = 15.0,
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.detach_grace = detach_grace_seconds
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat_seconds
+        self._local: Dict[str, _LocalStream] = {}
+        self._stats = StreamReplayStats()
+
+    async def start(self, frames: AsyncIterator[bytes], owner: str) -> str:
+        """
+        Start generating a stream in the background.
+
+        Args:
+            frames: SSE frames to buffer (heartbeat comments are dropped)
+            owner: User allowed to subscribe
+
+        Returns:
+            The new stream's id
+        """
+        stream_id = uuid.uuid4().hex
+        await self.backend.create(stream_id, owner, self.ttl_seconds)
+        local = _LocalStream(stream_id)
+        self._local[stream_id] = local
+        local.task = asyncio.ensure_future(self._produce(local, frames))
+        asyncio.ensure_future(self._reap(local))
+        self._stats.started += 1
+        return stream_id
+
+    async def _produce(self, local: _LocalStream, frames: AsyncIterator[bytes]) -> None:
+        prefix = f"id: {local.stream_id}:".encode()
+        try:
+            async for frame in frames:
+                if frame.startswith(b":"):
+                    continue  # Heartbeats are per connection
+                seq = local.seq + 1
+                await self.backend.append(
+                    local.stream_id, seq, prefix + str(seq).encode() + b"\n" + frame, self.ttl_seconds
+                )
+                local.seq = seq
+                async with local.changed:
+                    local.changed.notify_all()
+        except Exception as e:
+            logger.error(f"Resumable stream {local.stream_id} failed: {e}", exc_info=True)
+        finally:
+            local.done = True
+            self._local.pop(local.stream_id, None)
+            aclose = getattr(frames, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            await self.backend.finish(local.stream_id, self.ttl_seconds)
+            async with local.changed:
+                local.changed.notify_all()
+
+    async def _reap(self, local: _LocalStream) -> None:
+        """Cancel the stream once it has had no subscribers for the grace period."""
+        wait = self.detach_grace
+        while not local.done:
+            await asyncio.sleep(max(self.poll_interval, wait))
+            if local.done:
+                return
+            if local.subscribers:
+                wait = self.detach_grace
+                continue
+            last_seen = max(local.detached_at, await self.backend.last_attached(local.stream_id))
+            # Sleep until the grace period ends rather than polling
+            wait = last_seen + self.detach_grace - time.time()
+            if wait <= 0:
+                logger.info(f"Cancelling abandoned stream {local.stream_id} after {self.detach_grace:g}s")
+                self._stats.detached_cancelled += 1
+                local.task.cancel()
+                return
+
+    async def resume(self, stream_id: str, after: int, owner: str) -> Optional[AsyncIterator[bytes]]:
+        """
+        Subscribe to a buffered stream after event `after`, if `owner` may read it.
+
+        Returns:
+            The events, or None if the stream is unknown, expired or owned by another user
+        """
+        replay = await self.backend.read(stream_id, after=2**62)
+        if replay is None or replay.owner != owner:
+            self._stats.resume_misses += 1
+            return None
+        self._stats.resumed += 1
+        return self.subscribe(stream_id, after)
+
+    async def subscribe(self, stream_id: str, after: int = 0) -> AsyncIterator[bytes]:
+        """
+        Yield the stream's events with seq > `after`, then follow it until it finishes.
+
+        Yields heartbeat comments while waiting. Ends with an error event if
+        the requested position has expired or been trimmed from the buffer.
+        """
+        local = self._local.get(stream_id)
+        if local is not None:
+            local.subscribers += 1
+        resumed = after > 0
+        loop = asyncio.get_running_loop()
+        idle_since = loop.time()
+        try:
+            while True:
+                replay = await self.backend.read(stream_id, after)
+                if replay is None or (replay.events and replay.events[0][0] > after + 1):
+                    self._stats.resume_misses += 1
+                    yield encode_event({"error": "Stream is no longer available", "resumable": False})
+                    return
+
+                for seq, event in replay.events:
+                    yield event
+                    after = seq
+                if replay.events:
+                    idle_since = loop.time()
+                    if resumed:
+                        self._stats.replayed_events += len(replay.events)
+                if replay.finished:
+                    return
+
+                if local is not None:
+                    async with local.changed:
+                        timeout = self.heartbeat or None
+                        try:
+                            await asyncio.wait_for(
+                                local.changed.wait_for(lambda: local.seq > after or local.done), timeout
+                            )
+                        except asyncio.TimeoutError:
+                            pass
+                else:
+                    # Generated by another worker: keep it alive and poll
+                    await self.backend.attach(stream_id)
+                    await asyncio.sleep(self.poll_interval)
+                if self.heartbeat and loop.time() - idle_since >= self.heartbeat:
+                    idle_since = loop.time()
+                    yield HEARTBEAT
+        finally:
+            if local is not None:
+                local.subscribers -= 1
+                if local.subscribers == 0:
+                    local.detached_at = time.time()
+
+    async def close(self) -> None:
+        """Cancel running streams and close the backend."""
+        tasks = [local.task for local in self._local.values() if local.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistics for monitoring."""
+        return {
+            "backend": self.backend.name,
+            "active_streams": len(self._local),
+            **self._stats.to_dict(),
+            **self.backend.stats(),
+        }
+
+
+def _create_backend() -> ReplayBackend:
+    """Create the backend selected by STREAM_REPLAY_BACKEND."""
+    settings = get_settings()
+    backend = settings.stream_replay_backend.lower()
+
+    if backend == "redis":
+        if not settings.redis_url:
+            logger.warning("STREAM_REPLAY_BACKEND=redis but REDIS_URL is not set, using memory")
+        else:
+            try:
+                return RedisReplayBackend(settings.redis_url, max_events=settings.stream_replay_max_events)
+            except ImportError as e:
+                logger.warning(f"{e}. Falling back to in-memory stream replay.")
+    elif backend != "memory":
+        logger.warning(f"Unknown STREAM_REPLAY_BACKEND '{backend}', using memory")
+
+    return MemoryReplayBackend(
+        max_streams=settings.stream_replay_max_streams,
+        max_events=settings.stream_replay_max_events,
+    )
+
+
+# Global replay instance
+_stream_replay: Optional[StreamReplay] = None
+
+
+def get_stream_replay() -> Optional[StreamReplay]:
+    """
+    Get the process-wide stream replay manager.
+
+    Returns:
+        The manager, or None if STREAM_REPLAY_ENABLED is false
+    """
+    global _stream_replay
+    settings = get_settings()
+    if not settings.stream_replay_enabled:
+        return None
+    if _stream_replay is None:
+        _stream_replay = StreamReplay(
+            backend=_create_backend(),
+            ttl_seconds=settings.stream_replay_ttl_seconds,
+            detach_grace_seconds=settings.stream_replay_detach_grace_seconds,
+            poll_interval=settings.stream_replay_poll_ms / 1000.0,
+            heartbeat_seconds=settings.sse_heartbeat_seconds,
+        )
+        logger.info(f"Stream replay enabled (backend={_stream_replay.backend.name})")
+    return _stream_replay
+
+
+async def close_stream_replay() -> None:
+    """Cancel running streams and close the backend. Call from the application lifespan."""
+    global _stream_replay
+    if _stream_replay is not None:
+        await _stream_replay.close()
+        _stream_replay = None
+
+
+def get_stream_replay_stats() -> Dict[str, Any]:
+    """Get stream replay statistics (empty if replay is disabled or unused)."""
+    return _stream_replay.stats() if _stream_replay is not None else {}
+
+
+async def resume_response(stream_id: str, after: int, owner: str) -> Optional[StreamingResponse]:
+    """
+    Response continuing a buffered stream after event `after`.
+
+    Returns:
+        The response, or None if replay is disabled, or the stream is
+        unknown, expired or owned by another user
+    """
+    replay = get_stream_replay()
+    events = await replay.resume(stream_id, after, owner) if replay is not None else None
+    if events is None:
+        return None
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers={**SSE_HEADERS, STREAM_ID_HEADER: stream_id}
+    )
+
+
+async def resume_from_request(request: Request, owner: str) -> Optional[StreamingResponse]:
+    """
+    Response resuming the stream named by the request's `Last-Event-ID` header.
+
+    Returns:
+        The response, or None if there is nothing to resume (the caller
+        then starts a new stream)
+    """
+    position = parse_last_event_id(request.headers.get("last-event-id"))
+    if position is None:
+        return None
+    response = await resume_response(*position, owner=owner)
+    if response is not None:
+        logger.info(f"Resuming stream {position[0]} after event {position[1]} for user {owner}")
+    return response
+
+
+async def resumable_response(
+    request: Request,
+    frames: Callable[[Optional[Request]], AsyncIterator[bytes]],
+    owner: str,
+) -> StreamingResponse:
+    """
+    Start an SSE stream that a reconnecting client can resume.
+
+    The stream is generated detached from the connection and served from
+    the replay buffer; the stream id is sent in the `X-Stream-ID` header
+    and in every event id. With replay disabled, the stream is served
+    directly, as before.
+
+    Args:
+        request: The incoming request
+        frames: Builds the stream's SSE frames; receives the request to
+            watch for disconnects, or None when generation is detached
+        owner: User id allowed to resume the stream
+    """
+    replay = get_stream_replay()
+    if replay is None:
+        return StreamingResponse(frames(request), media_type="text/event-stream", headers=SSE_HEADERS)
+
+    stream_id = await replay.start(frames(None), owner)
+    return StreamingResponse(
+        replay.subscribe(stream_id),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, STREAM_ID_HEADER: stream_id},
+    )
+
+
+__all__ = [
+    "MemoryReplayBackend",
+    "RedisReplayBackend",
+    "ReplayBackend",
+    "ReplaySlice",
+    "STREAM_ID_HEADER",
+    "StreamReplay",
+    "close_stream_replay",
+    "get_stream_replay",
+    "get_stream_replay_stats",
+    "parse_last_event_id",
+    "resume_from_request",
+    "resumable_response",
+    "resume_response",
+]
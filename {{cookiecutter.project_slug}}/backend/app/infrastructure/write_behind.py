@@ -0,0 +1,448 @@
+"""
+Write-behind persistence queue for chat messages and row updates.
+
+Endpoints enqueue writes and return; a background worker persists them
+in batches, so database round trips stay off the request path:
+
+- messages are inserted in batches of up to `PERSISTENCE_BATCH_SIZE` rows
+  with one multi-row INSERT, sent when the batch is full or
+  `PERSISTENCE_BATCH_WINDOW_MS` after the first pending write;
+- conversation updates are coalesced: repeated updates of one
+  conversation between flushes become a single UPDATE with the latest values;
+- a batch is written in one transaction and retried on failure;
+- at most `PERSISTENCE_MAX_PENDING` writes wait at once; enqueueing beyond
+  that waits for space, up to `PERSISTENCE_ENQUEUE_TIMEOUT_SECONDS`
+  (backpressure), then raises `PersistenceQueueFullError`;
+- `sync(conversation_id)` waits until a conversation's pending writes are
+  committed, so reads see the previous turn;
+- `close_write_behind_queue()` flushes everything that is pending; call it
+  from the application lifespan before the database is closed.
+
+Message ids and `created_at` are assigned at enqueue time, so message
+order does not depend on when batches are written.
+
+Usage:
+    queue = get_write_behind_queue()
+    await queue.add_message(conversation_id, MessageRoleEnum.USER, "Hello", token_count=2)
+    await queue.update_conversation(conversation_id, last_message_at=datetime.utcnow())
+"""
+
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.database.models.message import MessageRoleEnum
+from app.utils.logging import get_logger
+
+logger = get_logger("write_behind")
+
+
+class PersistenceQueueFullError(Exception):
+    """Raised when a write waits longer than the enqueue timeout for queue space."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(
+            f"Persistence queue is full. Retry after {retry_after:.1f} seconds."
+        )
+
+
+@dataclass
+class WriteBatch:
+    """Writes persisted together in one transaction."""
+
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    conversations: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.messages) + len(self.conversations)
+
+    def conversation_ids(self) -> List[str]:
+        """Conversation of every write in the batch (one entry per write)."""
+        return [row["conversation_id"] for row in self.messages] + list(self.conversations)
+
+
+WriteFn = Callable[[WriteBatch], Awaitable[None]]
+
+
+async def write_batch(batch: WriteBatch) -> None:
+    """Persist a batch through the repositories in one transaction."""
+    from app.database.repositories import ConversationRepository, MessageRepository
+    from app.database.session import get_async_session
+
+    async with get_async_session() as db:
+        await MessageRepository.bulk_create(db, batch.messages)
+        if batch.conversations:
+            await ConversationRepository.bulk_update(db, batch.conversations)
+        await db.commit()
+
+
+@dataclass
+class WriteBehindStats:
+    """Statistics for the write-behind queue."""
+
+    messages: int = 0
+    updates: int = 0
+    coalesced_updates: int = 0
+    batches: int = 0
+    rows_written: int = 0
+    failed_batches: int = 0
+    dropped_writes: int = 0
+    backpressure_waits: int = 0
+    rejected_writes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return {
+            "messages": self.messages,
+            "updates": self.updates,
+            "coalesced_updates": self.coalesced_updates,
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "avg_batch_size": self.rows_written / self.batches if self.batches else 0.0,
+            "failed_batches": self.failed_batches,
+            "dropped_writes": self.dropped_writes,
+            "backpressure_waits": self.backpressure_waits,
+            "rejected_writes": self.rejected_writes,
+        }
+
+
+class WriteBehindQueue:
+    """
+    Batches message inserts and coalesces row updates behind the request path.
+
+    Usage:
+        queue = WriteBehindQueue(write_batch, max_batch_size=100, max_wait_ms=50)
+        await queue.add_message(conversation_id, MessageRoleEnum.USER, "Hello")
+        await queue.close()  # flushes pending writes
+    """
+
+    def __init__(
+        self,
+        write_fn: WriteFn = write_batch,
+        enabled: bool = True,
+        max_batch_size: int = 100,
+        max_wait_ms: float = 50.0,
+        max_pending: int = 10000,
+        enqueue_timeout_seconds: float = 5.0,
+        max_retries: int = 3,
+        retry_delay_ms: float = 200.0,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            write_fn: Coroutine that persists one batch in a single transaction
+            enabled: When False, every write is persisted inline
+            max_batch_size: Maximum messages (and, separately, row updates) per batch
+            max_wait_ms: How long to wait for more writes before flushing a partial batch
+            max_pending: Maximum writes waiting at once (backpressure limit)
+            enqueue_timeout_seconds: How long an enqueue waits for space before failing
+            max_retries: Retries of a failed batch before its writes are dropped
+            retry_delay_ms: Delay before the first retry (doubles on each retry)
+        """
+        self.write_fn = write_fn
+        self.enabled = enabled
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+        self.enqueue_timeout = max(0.0, enqueue_timeout_seconds)
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = max(0.0, retry_delay_ms) / 1000.0
+
+        self._stats = WriteBehindStats()
+        self._batch = WriteBatch()
+        # Writes waiting or in flight, per conversation (for sync)
+        self._by_conversation: Dict[str, int] = {}
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closing = False
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pending(self) -> int:
+        """Writes enqueued but not yet committed."""
+        return len(self._batch) + self._in_flight
+
+    def _bind_loop(self) -> None:
+        """Bind loop-specific state to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # New loop (e.g. a fresh asyncio.run in scripts/tests): reset state
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._changed = asyncio.Condition()
+            self._batch = WriteBatch()
+            self._by_conversation = {}
+            self._in_flight = 0
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._closing = False
+            self._worker = loop.create_task(self._run())
+
+    async def add_message(
+        self,
+        conversation_id: str,
+        role: MessageRoleEnum,
+        content: str,
+        **fields: Any,
+    ) -> str:
+        """
+        Enqueue a message insert.
+
+        Args:
+            conversation_id: Conversation the message belongs to
+            role: Message role
+            content: Message content
+            **fields: Other Message columns (model, token_count, latency_ms, metadata, ...)
+
+        Returns:
+            The id the message will be stored with
+
+        Raises:
+            PersistenceQueueFullError: If no space frees up within the enqueue timeout
+        """
+        row = {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "created_at": datetime.utcnow(),
+            **fields,
+        }
+        row.setdefault("metadata", {})
+        self._stats.messages += 1
+        if not self.enabled:
+            await self.write_fn(WriteBatch(messages=[row]))
+            return row["id"]
+
+        await self._reserve()
+        self._batch.messages.append(row)
+        self._track(conversation_id, 1)
+        self._notify()
+        return row["id"]
+
+    async def update_conversation(self, conversation_id: str, **values: Any) -> None:
+        """
+        Enqueue a conversation update, merged with any pending update of it.
+
+        Raises:
+            PersistenceQueueFullError: If no space frees up within the enqueue timeout
+        """
+        self._stats.updates += 1
+        if not self.enabled:
+            await self.write_fn(WriteBatch(conversations={conversation_id: dict(values)}))
+            return
+
+        self._bind_loop()
+        if conversation_id not in self._batch.conversations:
+            await self._reserve()
+        # Looked up after waiting: the pending batch is swapped out on every flush
+        pending = self._batch.conversations
+        if conversation_id in pending:
+            pending[conversation_id].update(values)
+            self._stats.coalesced_updates += 1
+            return
+        pending[conversation_id] = dict(values)
+        self._track(conversation_id, 1)
+        self._notify()
+
+    async def _reserve(self) -> None:
+        """Wait for space in the queue (backpressure)."""
+        self._bind_loop()
+        if self.pending < self.max_pending:
+            return
+
+        self._stats.backpressure_waits += 1
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self.pending < self.max_pending),
+                    timeout=self.enqueue_timeout,
+                )
+            except asyncio.TimeoutError:
+                self._stats.rejected_writes += 1
+                raise PersistenceQueueFullError(retry_after=max(1.0, self.enqueue_timeout))
+
+    def _track(self, conversation_id: str, delta: int) -> None:
+        count = self._by_conversation.get(conversation_id, 0) + delta
+        if count > 0:
+            self._by_conversation[conversation_id] = count
+        else:
+            self._by_conversation.pop(conversation_id, None)
+
+    def _notify(self) -> None:
+        """Wake the worker; request an immediate flush if a batch is full."""
+        if len(self._batch.messages) >= self.max_batch_size:
+            self._flush_requested = True
+        self._wakeup.set()
+
+    async def sync(self, conversation_id: str) -> None:
+        """Wait until the pending writes of a conversation are committed (or dropped)."""
+        if not self.enabled or conversation_id not in self._by_conversation:
+            return
+        self._flush_requested = True
+        self._wakeup.set()
+        async with self._changed:
+            await self._changed.wait_for(lambda: conversation_id not in self._by_conversation)
+
+    async def flush(self) -> None:
+        """Wait until every write enqueued so far is committed (or dropped)."""
+        if not self.enabled or self._loop is None or self.pending == 0:
+            return
+        self._flush_requested = True
+        self._wakeup.set()
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.pending == 0)
+
+    async def _run(self) -> None:
+        """Worker: collect writes for a batch window, then persist them."""
+        while True:
+            await self._wakeup.wait()
+            if not self._flush_requested and not self._closing:
+                # Give concurrent requests a chance to join this batch
+                deadline = self._loop.time() + self.max_wait
+                while not self._flush_requested and not self._closing:
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+            batch = self._take()
+            if batch:
+                await self._write(batch)
+            if not self._batch:
+                self._wakeup.clear()
+                self._flush_requested = False
+                if self._closing:
+                    return
+            else:
+                self._wakeup.set()
+
+    def _take(self) -> WriteBatch:
+        """Swap out up to one batch worth of pending writes."""
+        pending = self._batch
+        batch = WriteBatch(messages=pending.messages[:self.max_batch_size])
+        pending.messages = pending.messages[self.max_batch_size:]
+        for conversation_id in list(pending.conversations)[:self.max_batch_size]:
+            batch.conversations[conversation_id] = pending.conversations.pop(conversation_id)
+        self._in_flight += len(batch)
+        return batch
+
+    async def _write(self, batch: WriteBatch) -> None:
+        """Persist one batch, retrying with backoff; then release its writes."""
+        delay = self.retry_delay
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self.write_fn(batch)
+                    self._stats.batches += 1
+                    self._stats.rows_written += len(batch)
+                    return
+                except Exception as e:
+                    self._stats.failed_batches += 1
+                    if attempt == self.max_retries:
+                        self._stats.dropped_writes += len(batch)
+                        logger.error(
+                            f"Dropped {len(batch)} writes after {attempt + 1} failed attempts: {e}"
+                        )
+                        return
+                    logger.warning(f"Persisting batch of {len(batch)} writes failed, retrying: {e}")
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        finally:
+            self._in_flight -= len(batch)
+            for conversation_id in batch.conversation_ids():
+                self._track(conversation_id, -1)
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush every pending write and stop the worker.
+
+        Args:
+            timeout: Maximum seconds to wait for the flush (None waits until done)
+        """
+        worker = self._worker
+        if worker is None or worker.done():
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(worker), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Write-behind flush timed out; {self.pending} writes not persisted")
+            worker.cancel()
+        self._worker = None
+        logger.info(f"Write-behind queue closed ({self._stats.rows_written} rows written)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        return {
+            **self._stats.to_dict(),
+            "enabled": self.enabled,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+        }
+
+
+# Global queue instance
+_write_behind_queue: Optional[WriteBehindQueue] = None
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """
+    Get or create the global write-behind queue.
+
+    Uses singleton pattern so every endpoint shares one worker and one
+    backpressure limit.
+    """
+    global _write_behind_queue
+    if _write_behind_queue is None:
+        settings = get_settings()
+        _write_behind_queue = WriteBehindQueue(
+            enabled=settings.persistence_write_behind_enabled,
+            max_batch_size=settings.persistence_batch_size,
+            max_wait_ms=settings.persistence_batch_window_ms,
+            max_pending=settings.persistence_max_pending,
+            enqueue_timeout_seconds=settings.persistence_enqueue_timeout_seconds,
+            max_retries=settings.persistence_max_retries,
+        )
+    return _write_behind_queue
+
+
+async def close_write_behind_queue() -> None:
+    """Flush pending writes and stop the worker. Call from the application lifespan."""
+    global _write_behind_queue
+    if _write_behind_queue is not None:
+        await _write_behind_queue.close(
+            timeout=get_settings().persistence_shutdown_timeout_seconds
+        )
+        _write_behind_queue = None
+
+
+def get_write_behind_stats() -> Dict[str, Any]:
+    """Get write-behind queue statistics (empty if the queue is unused)."""
+    return _write_behind_queue.stats() if _write_behind_queue is not None else {}
+
+
+__all__ = [
+    "PersistenceQueueFullError",
+    "WriteBatch",
+    "WriteBehindQueue",
+    "close_write_behind_queue",
+    "get_write_behind_queue",
+    "get_write_behind_stats",
+    "write_batch",
+]
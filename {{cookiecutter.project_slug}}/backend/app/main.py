@@ -6,12 +6,21 @@
 from contextlib import asynccontextmanager
 
 import uvicorn
+from app.agents.pool import close_agent_pool
+from app.agents.registry import AgentRegistry
 from app.api.v1.router import api_router
 from app.config import get_settings
 from app.database.session import cleanup_database, initialize_database
 from app.exceptions import setup_exception_handlers
+from app.infrastructure.http_client import close_http_clients, open_http_clients
 from app.infrastructure.langchain_tracing import initialize_langchain_tracing
 from app.infrastructure.langfuse_handler import flush_langfuse, shutdown_langfuse
+from app.infrastructure.llm_provider import clear_llm_caches
+from app.infrastructure.model_catalog import get_model_catalog
+from app.infrastructure.model_router import load_router_stats, save_router_stats
+from app.infrastructure.response_cache import close_response_cache
+from app.infrastructure.stream_replay import close_stream_replay
+from app.infrastructure.write_behind import close_write_behind_queue
 from app.middleware import setup_middleware
 from app.models.base import APIInfo
 from fastapi import FastAPI
@@ -30,10 +39,23 @@ async def lifespan(app: FastAPI):
     try:
         # Initialize LangChain tracing (LangSmith)
         initialize_langchain_tracing()
-        
+
+        # Open the shared keep-alive HTTP transport for LLM calls
+        await open_http_clients()
+
+        # Keep the OpenRouter model catalog fresh in the background
+        await get_model_catalog().start()
+
+        # Restore model router statistics from the previous run
+        load_router_stats()
+
         # Initialize database
         await initialize_database()
         logger.info("Database initialized successfully")
+
+        # Build registered agents before the first request needs them
+        if settings.agent_pool_enabled and settings.agent_pool_prewarm:
+            AgentRegistry.warm_up()
         yield
     except Exception as e:
         logger.error(f"Failed to initialize: {e}")
@@ -44,7 +66,25 @@ async def lifespan(app: FastAPI):
             # Flush and shutdown Langfuse if enabled
             flush_langfuse()
             shutdown_langfuse()
-            
+
+            # Stop background catalog refresh and persist router statistics
+            await get_model_catalog().stop()
+            save_router_stats()
+
+            # Close the response cache backend (Redis / SQLite connections)
+            await close_response_cache()
+
+            # Cancel detached streams and close the replay buffer backend
+            await close_stream_replay()
+
+            # Drop pooled agents and cached LLM clients, then close their shared transport
+            close_agent_pool()
+            clear_llm_caches()
+            await close_http_clients()
+
+            # Persist queued messages and updates before the database closes
+            await close_write_behind_queue()
+
             # Cleanup database
             await cleanup_database()
             logger.info("Database cleaned up successfully")
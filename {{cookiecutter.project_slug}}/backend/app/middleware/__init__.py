@@ -10,8 +10,10 @@ from app.config import get_settings
 from app.utils.logging import get_logger
 from fastapi import Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = get_logger("middleware")
 
@@ -70,6 +72,49 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
+class SelectiveGZipMiddleware:
+    """
+    Gzip compression that never buffers event streams.
+
+    Responses whose content type is excluded (Server-Sent Events by default)
+    bypass the compressor, so every frame is flushed to the client as soon
+    as it is written.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        excluded_content_types: tuple = ("text/event-stream",),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.excluded_content_types = excluded_content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        async def app_with_bypass(scope: Scope, receive: Receive, gzip_send: Send) -> None:
+            target = gzip_send
+
+            async def route(message: Message) -> None:
+                nonlocal target
+                if message["type"] == "http.response.start":
+                    content_type = Headers(raw=message["headers"]).get("content-type", "")
+                    if content_type.split(";")[0].strip() in self.excluded_content_types:
+                        target = send
+                await target(message)
+
+            await self.app(scope, receive, route)
+
+        responder = GZipResponder(app_with_bypass, self.minimum_size, compresslevel=self.compresslevel)
+        await responder(scope, receive, send)
+
+
 def setup_middleware(app):
     """Set up all middleware for the application."""
     settings = get_settings()
@@ -83,8 +128,8 @@ def setup_middleware(app):
         allow_headers=settings.cors_allow_headers,
     )
 
-    # Gzip compression
-    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    # Gzip compression (event streams are sent uncompressed)
+    app.add_middleware(SelectiveGZipMiddleware, minimum_size=1000)
 
     # Security headers
     app.add_middleware(SecurityHeadersMiddleware)
@@ -100,5 +145,6 @@ def setup_middleware(app):
 __all__ = [
     "LoggingMiddleware",
     "SecurityHeadersMiddleware",
+    "SelectiveGZipMiddleware",
     "setup_middleware",
 ]
@@ -9,6 +9,7 @@ from typing import Callable, Optional
 from app.config import get_settings
 from app.utils.logging import get_logger
 from fastapi import Request, Response
+from limits import parse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
@@ -49,6 +50,7 @@ class RateLimits:
     # LLM endpoints (expensive operations)
     CHAT = "30/minute"      # 30 chat requests per minute
     STREAMING = "20/minute" # 20 streaming requests per minute
+    BATCH = "60/minute"     # 60 batch items per minute (counted per item)
 
     # Authentication endpoints
     AUTH = "20/minute"      # 20 auth requests per minute
@@ -58,6 +60,35 @@ class RateLimits:
     HEALTH = "1000/minute"  # Health checks are cheap
 
 
+def request_cost(request: Request) -> int:
+    """
+    Rate limit cost of a request (use with `limiter.limit(..., cost=request_cost)`).
+
+    Defaults to 1; endpoints that do several units of work per request (e.g.
+    batches) set `request.state.rate_limit_cost` from a dependency, which
+    runs before the limit is checked.
+    """
+    return max(1, int(getattr(request.state, "rate_limit_cost", 1)))
+
+
+def hit_rate_limit(limit_value: str, scope: str, key: str) -> bool:
+    """
+    Charge one unit against a rate limit outside of an HTTP endpoint.
+
+    Used by transports such as WebSockets, where the decorator cannot apply
+    per message. Shares the limiter's storage.
+
+    Args:
+        limit_value: Limit string, e.g. `RateLimits.STREAMING`
+        scope: Namespace for the limit (e.g. the endpoint)
+        key: Caller identity, e.g. `user:<id>`
+
+    Returns:
+        False if the limit is exceeded
+    """
+    return limiter.limiter.hit(parse(limit_value), scope, key)
+
+
 def setup_rate_limiting(app):
     """
     Set up rate limiting for the FastAPI application.
@@ -118,6 +149,8 @@ __all__ = [
     "setup_rate_limiting",
     "get_rate_limiter",
     "get_user_or_ip",
+    "request_cost",
+    "hit_rate_limit",
     "rate_limit_chat",
     "rate_limit_streaming",
     "rate_limit_auth",
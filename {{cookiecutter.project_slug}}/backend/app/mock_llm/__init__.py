@@ -0,0 +1,15 @@
+"""
+Local OpenAI-compatible mock LLM server for offline benchmarks and tests.
+"""
+
+from .config import MockLLMConfig, ResponseFixture, ToolCallFixture, load_fixtures
+from .server import MockLLMServer, create_mock_llm_app
+
+__all__ = [
+    "MockLLMConfig",
+    "MockLLMServer",
+    "ResponseFixture",
+    "ToolCallFixture",
+    "create_mock_llm_app",
+    "load_fixtures",
+]
@@ -0,0 +1,93 @@
+"""
+Configuration and response fixtures for the mock LLM server.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ToolCallFixture(BaseModel):
+    """A tool call returned by a fixture."""
+
+    name: str
+    arguments: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ResponseFixture(BaseModel):
+    """
+    Canned response for requests whose last user message matches `match`.
+
+    `match` is a regular expression searched (case-insensitively) in the
+    last user message. A fixture returns either `content` or `tool_calls`.
+    """
+
+    match: str
+    content: Optional[str] = None
+    tool_calls: List[ToolCallFixture] = Field(default_factory=list)
+
+
+class MockLLMConfig(BaseModel):
+    """Timing, failure injection and fixtures for the mock LLM server."""
+
+    ttft_ms: float = Field(default=200.0, ge=0, description="Time to first token")
+    tokens_per_second: float = Field(default=50.0, gt=0, description="Output token rate")
+    jitter: float = Field(
+        default=0.1, ge=0, le=1, description="Relative random jitter applied to timings"
+    )
+    embedding_latency_ms: float = Field(default=20.0, ge=0, description="Latency per embeddings call")
+    embedding_dimensions: int = Field(default=1536, gt=0, description="Embedding vector size")
+
+    error_rate: float = Field(default=0.0, ge=0, le=1, description="Fraction of 500 responses")
+    rate_limit_rate: float = Field(default=0.0, ge=0, le=1, description="Fraction of 429 responses")
+    retry_after_seconds: float = Field(default=1.0, ge=0, description="Retry-After on 429s")
+
+    seed: int = Field(default=0, description="Seed for timing jitter and failure injection")
+    default_response: str = Field(
+        default=(
+            "This is a deterministic response from the mock LLM server. "
+            "It streams tokens with configurable latency so throughput "
+            "features can be benchmarked offline."
+        ),
+        description="Content returned when no fixture matches",
+    )
+    fixtures: List[ResponseFixture] = Field(default_factory=list)
+    models: List[str] = Field(
+        default_factory=lambda: [
+            "openai/gpt-4o-mini",
+            "openai/gpt-4o",
+            "anthropic/claude-3.5-sonnet",
+            "openai/text-embedding-3-small",
+        ],
+        description="Models listed by GET /models",
+    )
+
+    def find_fixture(self, text: str) -> Optional[ResponseFixture]:
+        """Return the first fixture matching `text`."""
+        for fixture in self.fixtures:
+            if re.search(fixture.match, text, re.IGNORECASE):
+                return fixture
+        return None
+
+
+def load_fixtures(path: str) -> List[ResponseFixture]:
+    """
+    Load response fixtures from a JSON file.
+
+    The file holds a list of fixtures, e.g.:
+        [{"match": "refund", "content": "Refunds take 5 days."},
+         {"match": "weather", "tool_calls": [{"name": "get_weather", "arguments": {"city": "Paris"}}]}]
+    """
+    data = json.loads(Path(path).read_text())
+    return [ResponseFixture(**item) for item in data]
+
+
+__all__ = [
+    "MockLLMConfig",
+    "ResponseFixture",
+    "ToolCallFixture",
+    "load_fixtures",
+]
@@ -0,0 +1,451 @@
+"""
+Deterministic OpenAI-compatible mock LLM server.
+
+Implements the subset of the OpenAI/OpenRouter API used by this backend:
+
+- `POST /v1/chat/completions`: plain and streaming (SSE) completions,
+  tool calls and structured output (`response_format`)
+- `POST /v1/embeddings`: deterministic unit vectors derived from the text
+- `GET /v1/models`: model listing with pricing, for the model catalog
+
+Response content depends only on the request (and the configured
+fixtures), so runs are reproducible. Timing (TTFT, tokens/sec) and failure
+injection (500s, 429s with Retry-After) come from `MockLLMConfig`; the
+sequence of injected failures is fixed by its seed.
+
+Point the backend at it with `OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1`.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+import uvicorn
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.mock_llm.config import MockLLMConfig
+from app.utils.logging import get_logger
+
+logger = get_logger("mock_llm")
+
+# Whitespace-delimited pieces stand in for tokens
+_TOKEN_PATTERN = re.compile(r"\s*\S+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into pseudo-tokens that concatenate back to the text."""
+    tokens = _TOKEN_PATTERN.findall(text)
+    trailing = text[len("".join(tokens)):]
+    if trailing:
+        tokens.append(trailing)
+    return tokens
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a chat message whose content is a string or a list of parts."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def sample_from_schema(schema: Dict[str, Any], root: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Build a deterministic instance of a JSON schema.
+
+    Handles the constructs Pydantic emits: `$ref`/`$defs`, `anyOf`/`oneOf`,
+    enums, defaults, objects, arrays and scalar types.
+    """
+    root = root if root is not None else schema
+
+    if "$ref" in schema:
+        name = schema["$ref"].split("/")[-1]
+        definitions = root.get("$defs") or root.get("definitions") or {}
+        return sample_from_schema(definitions.get(name, {}), root)
+    for key in ("anyOf", "oneOf", "allOf"):
+        options = [option for option in schema.get(key, []) if option.get("type") != "null"]
+        if options:
+            return sample_from_schema(options[0], root)
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if "default" in schema:
+        return schema["default"]
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), None)
+
+    if schema_type == "object" or "properties" in schema:
+        return {
+            name: sample_from_schema(prop, root)
+            for name, prop in (schema.get("properties") or {}).items()
+        }
+    if schema_type == "array":
+        count = max(1, schema.get("minItems", 1))
+        return [sample_from_schema(schema.get("items") or {}, root) for _ in range(count)]
+    if schema_type == "string":
+        return "mock"
+    if schema_type == "integer":
+        return int(schema.get("minimum", 1))
+    if schema_type == "number":
+        return float(schema.get("minimum", 0.5))
+    if schema_type == "boolean":
+        return True
+    return None
+
+
+def embed_text(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector for a text."""
+    seed = int(hashlib.sha256(text.encode()).hexdigest()[:16], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+@dataclass
+class MockLLMStats:
+    """Request counters for the mock server."""
+
+    chat_completions: int = 0
+    streamed: int = 0
+    tool_calls: int = 0
+    embeddings: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    completion_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        return asdict(self)
+
+
+class MockLLM:
+    """Request handling behind the mock server's routes."""
+
+    def __init__(self, config: MockLLMConfig):
+        self.config = config
+        self.stats = MockLLMStats()
+        self._rng = random.Random(config.seed)
+
+    def _delay(self, milliseconds: float) -> float:
+        """Apply jitter to a delay and convert it to seconds."""
+        jitter = self.config.jitter
+        factor = 1.0 + self._rng.uniform(-jitter, jitter) if jitter else 1.0
+        return max(0.0, milliseconds * factor / 1000.0)
+
+    def _injected_failure(self) -> Optional[JSONResponse]:
+        """Return a 429 or 500 response according to the configured rates."""
+        roll = self._rng.random()
+        if roll < self.config.rate_limit_rate:
+            self.stats.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit exceeded (mock)", "code": 429}},
+                headers={"Retry-After": f"{self.config.retry_after_seconds:g}"},
+            )
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.stats.errors += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal server error (mock)", "code": 500}},
+            )
+        return None
+
+    def _plan(self, body: Dict[str, Any]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Decide the (content, tool_calls) of a completion."""
+        messages = body.get("messages") or []
+        last_user = next(
+            (_message_text(m) for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        after_tool = bool(messages) and messages[-1].get("role") == "tool"
+        fixture = self.config.find_fixture(last_user)
+        tools = {
+            tool["function"]["name"]: tool["function"]
+            for tool in body.get("tools") or []
+            if tool.get("type") == "function"
+        }
+        tool_choice = body.get("tool_choice")
+
+        if tools and not after_tool and tool_choice != "none":
+            if fixture is not None and fixture.tool_calls:
+                return None, [
+                    {"name": call.name, "arguments": call.arguments} for call in fixture.tool_calls
+                ]
+            # Forced tool call (e.g. structured output via function calling)
+            forced = None
+            if isinstance(tool_choice, dict):
+                forced = (tool_choice.get("function") or {}).get("name")
+            elif tool_choice in ("required", "any"):
+                forced = next(iter(tools))
+            if forced in tools:
+                arguments = sample_from_schema(tools[forced].get("parameters") or {})
+                return None, [{"name": forced, "arguments": arguments}]
+
+        content = fixture.content if fixture is not None and fixture.content is not None else None
+        response_format = body.get("response_format") or {}
+        if content is None and response_format.get("type") == "json_schema":
+            schema = (response_format.get("json_schema") or {}).get("schema") or {}
+            content = json.dumps(sample_from_schema(schema))
+        elif content is None and response_format.get("type") == "json_object":
+            content = json.dumps({"response": self.config.default_response})
+        if content is None:
+            content = self.config.default_response
+
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        if max_tokens and not response_format:
+            content = "".join(tokenize(content)[:max_tokens])
+        return content, []
+
+    @staticmethod
+    def _tool_call_payload(tool_calls: List[Dict[str, Any]], streaming: bool) -> List[Dict[str, Any]]:
+        payload = []
+        for index, call in enumerate(tool_calls):
+            entry = {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }
+            if streaming:
+                entry["index"] = index
+            payload.append(entry)
+        return payload
+
+    def _usage(self, body: Dict[str, Any], completion_tokens: int) -> Dict[str, int]:
+        prompt_tokens = sum(len(tokenize(_message_text(m))) for m in body.get("messages") or [])
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def chat_completions(self, request: Request):
+        body = await request.json()
+        self.stats.chat_completions += 1
+        failure = self._injected_failure()
+        if failure is not None:
+            return failure
+
+        model = body.get("model") or self.config.models[0]
+        content, tool_calls = self._plan(body)
+        tokens = tokenize(content) if content else []
+        completion_tokens = len(tokens) if tokens else len(tool_calls)
+        self.stats.completion_tokens += completion_tokens
+        self.stats.tool_calls += len(tool_calls)
+
+        ttft = self._delay(self.config.ttft_ms)
+        per_token = self._delay(1000.0 / self.config.tokens_per_second)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            self.stats.streamed += 1
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                self._stream(
+                    body, model, completion_id, created, tokens, tool_calls,
+                    ttft, per_token, include_usage,
+                ),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(ttft + per_token * max(0, len(tokens) - 1))
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = self._tool_call_payload(tool_calls, streaming=False)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+            }],
+            "usage": self._usage(body, completion_tokens),
+        }
+
+    async def _stream(
+        self,
+        body: Dict[str, Any],
+        model: str,
+        completion_id: str,
+        created: int,
+        tokens: List[str],
+        tool_calls: List[Dict[str, Any]],
+        ttft: float,
+        per_token: float,
+        include_usage: bool,
+    ) -> AsyncIterator[str]:
+        def event(choices: List[Dict[str, Any]], **extra: Any) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        # Sleep towards a schedule so per-token overhead does not accumulate
+        start = time.perf_counter()
+        await asyncio.sleep(ttft)
+        if tool_calls:
+            delta = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": self._tool_call_payload(tool_calls, streaming=True),
+            }
+            yield event([{"index": 0, "delta": delta, "finish_reason": None}])
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(max(0.0, start + ttft + index * per_token - time.perf_counter()))
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            yield event([{"index": 0, "delta": delta, "finish_reason": None}])
+
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        yield event([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if include_usage:
+            completion_tokens = len(tokens) if tokens else len(tool_calls)
+            yield event([], usage=self._usage(body, completion_tokens))
+        yield "data: [DONE]\n\n"
+
+    async def embeddings(self, request: Request):
+        body = await request.json()
+        self.stats.embeddings += 1
+        failure = self._injected_failure()
+        if failure is not None:
+            return failure
+
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or self.config.embedding_dimensions
+        await asyncio.sleep(self._delay(self.config.embedding_latency_ms))
+
+        prompt_tokens = sum(len(tokenize(str(text))) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model") or "openai/text-embedding-3-small",
+            "data": [
+                {"object": "embedding", "index": index, "embedding": embed_text(str(text), dimensions)}
+                for index, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    async def models(self):
+        return {
+            "data": [
+                {
+                    "id": model,
+                    "name": model,
+                    "context_length": 128000,
+                    "pricing": {"prompt": "0.00000015", "completion": "0.0000006"},
+                    "top_provider": {"context_length": 128000, "max_completion_tokens": 16384},
+                }
+                for model in self.config.models
+            ]
+        }
+
+
+def create_mock_llm_app(config: Optional[MockLLMConfig] = None) -> FastAPI:
+    """Create the mock server's ASGI application."""
+    mock = MockLLM(config or MockLLMConfig())
+    router = APIRouter(prefix="/v1")
+    router.add_api_route("/chat/completions", mock.chat_completions, methods=["POST"])
+    router.add_api_route("/embeddings", mock.embeddings, methods=["POST"])
+    router.add_api_route("/models", mock.models, methods=["GET"])
+    router.add_api_route("/mock/stats", lambda: mock.stats.to_dict(), methods=["GET"])
+
+    app = FastAPI(title="Mock LLM", docs_url=None, redoc_url=None)
+    app.include_router(router)
+    app.state.mock = mock
+    return app
+
+
+class MockLLMServer:
+    """
+    Runs the mock server on a background thread, for tests and benchmarks.
+
+    Usage:
+        with MockLLMServer(MockLLMConfig(ttft_ms=50)) as server:
+            settings.openrouter_base_url = server.base_url
+            ...
+    """
+
+    def __init__(self, config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockLLMConfig()
+        self.host = host
+        self.port = port
+        self.app = create_mock_llm_app(self.config)
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def stats(self) -> MockLLMStats:
+        return self.app.state.mock.stats
+
+    def start(self, timeout: float = 10.0) -> None:
+        """Start serving and wait until the server accepts connections."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, log_level="warning", lifespan="off")
+        )
+        self._thread = threading.Thread(
+            target=self._server.run, kwargs={"sockets": [sock]}, daemon=True
+        )
+        self._thread.start()
+
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Mock LLM server failed to start")
+            time.sleep(0.01)
+        logger.info(f"Mock LLM server listening on {self.base_url}")
+
+    def stop(self) -> None:
+        """Stop the server and wait for its thread."""
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def __enter__(self) -> "MockLLMServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+__all__ = [
+    "MockLLM",
+    "MockLLMServer",
+    "MockLLMStats",
+    "create_mock_llm_app",
+    "embed_text",
+    "sample_from_schema",
+    "tokenize",
+]
@@ -11,7 +11,7 @@ import jwt
 from app.config import Settings, get_settings
 from app.exceptions import UnauthorizedError, ValidationError
 from app.utils.logging import get_logger
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query, WebSocket, WebSocketException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 
@@ -276,6 +276,31 @@ async def require_current_user(
         )
 
 
+async def require_websocket_user(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="Clerk session token (browsers cannot set headers on WebSockets)"),
+    clerk_provider: ClerkAuthProvider = Depends(get_clerk_provider)
+) -> ClerkUser:
+    """
+    Get the authenticated user of a WebSocket connection.
+
+    The token is read from the `Authorization: Bearer` header, or from the
+    `token` query parameter. Closes the connection with a policy violation
+    if no valid token is provided.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        token = credentials
+    if not token:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Authentication required")
+
+    try:
+        return await clerk_provider.verify_token(token)
+    except UnauthorizedError as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+
+
 async def require_admin(
     current_user: ClerkUser = Depends(require_current_user)
 ) -> ClerkUser:
@@ -357,6 +382,7 @@ __all__ = [
     "get_clerk_provider",
     "get_current_user",
     "require_current_user",
+    "require_websocket_user",
     "require_admin",
     "require_role",
     "require_auth",
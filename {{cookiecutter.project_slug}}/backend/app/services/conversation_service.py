@@ -0,0 +1,199 @@
+"""
+Conversation-bound chat for {{cookiecutter.project_name}}.
+
+Loads a conversation's history packed into the model's context window,
+and persists each completed turn.
+
+Context assembly costs the same for a conversation of ten messages or
+ten thousand:
+
+- token counts and running totals are stored per message at insert, so
+  the history is never re-tokenized; only the new message is counted;
+- the messages that can fit are found with one range query over the
+  (conversation_id, cumulative_tokens) index, reading at most
+  `CHAT_HISTORY_MAX_MESSAGES` rows of role, content and token count;
+- the budget is the model's context limit from the catalog (minus a
+  safety buffer, the completion reserve, the system prompt and the new
+  message); the newest messages that fit are kept.
+
+The turn is written after the response, through the write-behind queue:
+the endpoint only enqueues it, so persistence adds no database round
+trips to the request. Loading a conversation first waits for its queued
+writes, so every turn sees the previous one.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.config import get_settings
+from app.database.models.conversation import Conversation
+from app.database.models.message import MessageRoleEnum
+from app.database.repositories import ConversationRepository, MessageRepository, UserRepository
+from app.database.session import get_async_session
+from app.exceptions import NotFoundError
+from app.infrastructure.llm_provider import OpenRouterProvider
+from app.infrastructure.model_catalog import get_model_catalog
+from app.infrastructure.write_behind import get_write_behind_queue
+from app.security.clerk_auth import ClerkUser
+from app.utils.logging import get_logger
+from app.utils.token_counter import (
+    calculate_safe_context_limit,
+    count_text_tokens,
+    get_model_context_limit,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = get_logger("conversation_service")
+
+# Chat-format tokens added per message (role markers and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class ConversationContext:
+    """History and token accounting for one conversation turn."""
+
+    conversation_id: str
+    message: str
+    message_tokens: int
+    history: List[Tuple[str, str]] = field(default_factory=list)
+    history_tokens: int = 0
+    truncated: bool = False
+
+
+async def _get_user_id(db: AsyncSession, user: ClerkUser) -> str:
+    """Database id of a Clerk user, creating the user row on first use."""
+    db_user = await UserRepository.get_by_clerk_id(db, user.id)
+    if db_user is None:
+        db_user = await UserRepository.create(db, clerk_id=user.id, email=user.email or None)
+    return db_user.id
+
+
+async def _get_owned_conversation(
+    db: AsyncSession, conversation_id: str, user: ClerkUser
+) -> Conversation:
+    conversation = await ConversationRepository.get_by_id(db, conversation_id)
+    if conversation is not None:
+        db_user = await UserRepository.get_by_clerk_id(db, user.id)
+        if db_user is not None and conversation.user_id == db_user.id:
+            return conversation
+    raise NotFoundError(f"Conversation '{conversation_id}' not found")
+
+
+async def create_conversation(
+    user: ClerkUser, model: Optional[str] = None, title: Optional[str] = None
+) -> Conversation:
+    """Create a conversation owned by `user`."""
+    async with get_async_session() as db:
+        user_id = await _get_user_id(db, user)
+        conversation = await ConversationRepository.create(
+            db, user_id=user_id, title=title, model_name=model
+        )
+        await db.commit()
+        return conversation
+
+
+def history_budget(model: str, system_prompt: str, message_tokens: int) -> int:
+    """Tokens left for history in `model`'s context window."""
+    settings = get_settings()
+    context_limit = (
+        get_model_context_limit(OpenRouterProvider(), model) or settings.chat_context_default_limit
+    )
+    return (
+        calculate_safe_context_limit(context_limit)
+        - settings.chat_context_reserve_tokens
+        - count_text_tokens(system_prompt, model)
+        - message_tokens
+        - 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+
+
+async def load_context(
+    conversation_id: str, user: ClerkUser, model: str, system_prompt: str, message: str
+) -> ConversationContext:
+    """
+    Load the history of a conversation that fits the model's context window.
+
+    Raises:
+        NotFoundError: If the conversation does not exist or belongs to another user
+    """
+    settings = get_settings()
+    message_tokens = count_text_tokens(message, model)
+    # The budget depends on the model's context window
+    await get_model_catalog().ensure_loaded()
+    budget = history_budget(model, system_prompt, message_tokens)
+
+    # Read-your-writes: the previous turn may still be queued
+    await get_write_behind_queue().sync(conversation_id)
+    async with get_async_session() as db:
+        await _get_owned_conversation(db, conversation_id, user)
+        history, history_tokens, truncated = await MessageRepository.get_history_within_budget(
+            db,
+            conversation_id,
+            token_budget=max(0, budget),
+            max_messages=settings.chat_history_max_messages,
+            overhead_tokens=MESSAGE_OVERHEAD_TOKENS,
+        )
+
+    if truncated:
+        logger.debug(
+            f"Conversation {conversation_id}: kept {len(history)} messages "
+            f"({history_tokens} tokens) of budget {budget}"
+        )
+    return ConversationContext(
+        conversation_id=conversation_id,
+        message=message,
+        message_tokens=message_tokens,
+        history=history,
+        history_tokens=history_tokens,
+        truncated=truncated,
+    )
+
+
+async def save_turn(
+    context: ConversationContext,
+    response: str,
+    model: str,
+    latency_ms: Optional[int] = None,
+    metadata: Optional[dict] = None,
+) -> None:
+    """
+    Queue the user message and the assistant response of a turn for persistence.
+
+    Raises:
+        PersistenceQueueFullError: If the write-behind queue stays full
+    """
+    queue = get_write_behind_queue()
+    await queue.add_message(
+        context.conversation_id,
+        MessageRoleEnum.USER,
+        context.message,
+        token_count=context.message_tokens,
+    )
+    await queue.add_message(
+        context.conversation_id,
+        MessageRoleEnum.ASSISTANT,
+        response,
+        model=model,
+        token_count=count_text_tokens(response, model),
+        tokens_input=context.history_tokens + context.message_tokens,
+        latency_ms=latency_ms,
+        metadata=metadata or {},
+    )
+
+    now = datetime.utcnow()
+    updates = {"last_message_at": now, "updated_at": now}
+    if not context.history and not context.truncated:
+        updates["title"] = ConversationRepository.title_from_message(context.message)
+    await queue.update_conversation(context.conversation_id, **updates)
+
+
+__all__ = [
+    "ConversationContext",
+    "MESSAGE_OVERHEAD_TOKENS",
+    "create_conversation",
+    "history_budget",
+    "load_context",
+    "save_turn",
+]
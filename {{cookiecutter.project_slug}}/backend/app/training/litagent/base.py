@@ -13,6 +13,7 @@ from typing import Any, Callable, Dict, Generic, Optional, TypeVar
 import agentlightning as agl
 from agentlightning.types import NamedResources, PromptTemplate, Rollout, RolloutRawResult
 
+from app.infrastructure.admission import Priority, get_admission_controller
 from app.utils.logging import get_logger
 
 logger = get_logger("litagent")
@@ -186,6 +187,14 @@ class LitLangChainAgent(agl.LitAgent[Dict[str, Any]], Generic[AgentResult]):
         
         return callbacks
     
+    @property
+    def admission_model(self) -> str:
+        """Model name used for LLM admission control of rollouts.
+        
+        Defaults to the subclass's `_model_name` attribute, if set.
+        """
+        return getattr(self, "_model_name", None) or "training"
+    
     async def rollout_async(
         self,
         task: Dict[str, Any],
@@ -223,12 +232,16 @@ class LitLangChainAgent(agl.LitAgent[Dict[str, Any]], Generic[AgentResult]):
         callbacks = self.get_langchain_callbacks()
         config = {"callbacks": callbacks} if callbacks else None
         
-        # Invoke agent
+        # Invoke agent (admitted at background priority, behind interactive traffic)
         try:
-            result = await self.invoke_agent(
-                self._current_agent,
-                task,
-                config=config,
+            result = await get_admission_controller().run(
+                self.admission_model,
+                Priority.BACKGROUND,
+                lambda: self.invoke_agent(
+                    self._current_agent,
+                    task,
+                    config=config,
+                ),
             )
             
             # Compute reward
@@ -2,6 +2,9 @@
 Utility functions for {{cookiecutter.project_name}}.
 """
 
+from app.utils.json_patch import DeltaEncoder, PatchError, StreamAssembler, apply_patch, diff
+from app.utils.partial_json import IncrementalJSONParser, JSONSyntaxError
+from app.utils.partial_model import PartialModelPlan, get_partial_plan
 from app.utils.structured_streaming import (
     StructuredStreamingHandler,
     parse_response_model_str,
@@ -9,7 +12,16 @@ from app.utils.structured_streaming import (
 )
 
 __all__ = [
+    "DeltaEncoder",
+    "IncrementalJSONParser",
+    "JSONSyntaxError",
+    "PartialModelPlan",
+    "PatchError",
+    "StreamAssembler",
     "StructuredStreamingHandler",
+    "apply_patch",
+    "diff",
+    "get_partial_plan",
     "parse_response_model_str",
     "try_parse_partial_json",
 ]
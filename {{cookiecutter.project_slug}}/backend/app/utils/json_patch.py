@@ -0,0 +1,281 @@
+"""
+Delta encoding of structured streams with JSON Patch.
+
+Sending the whole partial response on every update costs O(n²) bandwidth
+over a stream: each frame repeats everything sent before. `DeltaEncoder`
+sends the first partial as a snapshot and every later one as the patch
+from the previously sent state:
+
+- `data: {"snapshot": {...}, "done": false}` - First frame
+- `data: {"patch": [...], "done": false}` - Changes since the previous frame
+- `data: {"data": {...}, "done": true}` - Final object, for verification
+
+Patches are RFC 6902 operations (`add`, `remove`, `replace`) plus one
+extension for the common case of a string growing at its end:
+`{"op": "append", "path": "/response", "value": " more text"}`.
+Paths are JSON Pointers (RFC 6901).
+
+`StreamAssembler` is the client side: it rebuilds the document from the
+frames and checks it against the final object.
+
+Usage:
+    encoder = DeltaEncoder()
+    async for frame in writer.stream(partials, payload=encoder.frame):
+        yield frame
+
+    assembler = StreamAssembler()
+    async for line in response.aiter_lines():
+        assembler.feed_line(line)
+    result = assembler.document
+"""
+
+from typing import Any, AsyncIterable, Dict, Iterable, List, Optional
+
+import orjson
+
+from app.utils.logging import get_logger
+
+logger = get_logger("json_patch")
+
+Operation = Dict[str, Any]
+
+_MISSING = object()
+
+
+class PatchError(ValueError):
+    """Raised when a patch does not apply to the document."""
+
+
+def escape_token(key: str) -> str:
+    """Escape an object key for use in a JSON Pointer."""
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape_token(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Operation]:
+    """
+    Operations turning `old` into `new` (both plain JSON data).
+
+    Objects and arrays are compared member by member; a string that
+    extends the previous value becomes an `append`.
+    """
+    ops: List[Operation] = []
+    _diff(old, new, path, ops)
+    return ops
+
+
+def _diff(old: Any, new: Any, path: str, ops: List[Operation]) -> None:
+    if type(old) is not type(new):
+        ops.append({"op": "replace", "path": path, "value": new})
+    elif isinstance(new, str):
+        if new == old:
+            return
+        if len(new) > len(old) and new.startswith(old):
+            ops.append({"op": "append", "path": path, "value": new[len(old):]})
+        else:
+            ops.append({"op": "replace", "path": path, "value": new})
+    elif isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{escape_token(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{escape_token(key)}"
+            if key in old:
+                _diff(old[key], value, child, ops)
+            else:
+                ops.append({"op": "add", "path": child, "value": value})
+    elif isinstance(new, list):
+        common = min(len(old), len(new))
+        for index in range(common):
+            _diff(old[index], new[index], f"{path}/{index}", ops)
+        # Remove from the end so earlier indexes stay valid
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        for value in new[common:]:
+            ops.append({"op": "add", "path": f"{path}/-", "value": value})
+    elif new != old:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+
+def _resolve_parent(document: Any, path: str) -> tuple:
+    """Container holding the target of `path`, and the target's key or index."""
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid pointer {path!r}")
+    tokens = [_unescape_token(token) for token in path[1:].split("/")]
+    parent = document
+    for token in tokens[:-1]:
+        parent = _child(parent, token, path)
+    last = tokens[-1]
+    if isinstance(parent, list):
+        if last == "-":
+            return parent, len(parent)
+        if not last.isdigit():
+            raise PatchError(f"Invalid array index in {path!r}")
+        return parent, int(last)
+    if not isinstance(parent, dict):
+        raise PatchError(f"Cannot resolve {path!r}")
+    return parent, last
+
+
+def _child(container: Any, token: str, path: str) -> Any:
+    try:
+        if isinstance(container, list):
+            return container[int(token)]
+        return container[token]
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise PatchError(f"Path {path!r} does not exist")
+
+
+def apply_patch(document: Any, operations: Iterable[Operation]) -> Any:
+    """
+    Apply operations to `document`, in place where possible.
+
+    Returns:
+        The patched document (a new object if the root was replaced)
+
+    Raises:
+        PatchError: If an operation does not apply
+    """
+    for op in operations:
+        kind = op.get("op")
+        path = op.get("path", "")
+        if path == "":
+            if kind == "replace" or kind == "add":
+                document = op["value"]
+            elif kind == "append" and isinstance(document, str):
+                document += op["value"]
+            else:
+                raise PatchError(f"Cannot {kind} the whole document")
+            continue
+
+        parent, key = _resolve_parent(document, path)
+        is_list = isinstance(parent, list)
+        if kind == "add":
+            if is_list:
+                if key > len(parent):
+                    raise PatchError(f"Path {path!r} does not exist")
+                parent.insert(key, op["value"])
+            else:
+                parent[key] = op["value"]
+            continue
+
+        if (is_list and key >= len(parent)) or (not is_list and key not in parent):
+            raise PatchError(f"Path {path!r} does not exist")
+        if kind == "replace":
+            parent[key] = op["value"]
+        elif kind == "remove":
+            del parent[key]
+        elif kind == "append":
+            if not isinstance(parent[key], str):
+                raise PatchError(f"Cannot append to non-string at {path!r}")
+            parent[key] += op["value"]
+        else:
+            raise PatchError(f"Unsupported operation {kind!r}")
+    return document
+
+
+def _plain(item: Any) -> Any:
+    """JSON data of a frame item (models are dumped in JSON mode)."""
+    if hasattr(item, "model_dump"):
+        return item.model_dump(mode="json")
+    return item
+
+
+class DeltaEncoder:
+    """
+    Encodes successive partial responses as a snapshot followed by patches.
+
+    `frame` is an `SSEWriter` payload: when partials are coalesced, the
+    patch goes from the last *sent* state to the newest partial, so no
+    intermediate state needs to reach the client.
+    """
+
+    def __init__(self):
+        self._sent: Any = _MISSING
+        self.patched_frames = 0
+
+    def encode(self, item: Any) -> Dict[str, Any]:
+        """Payload for the next partial response."""
+        data = _plain(item)
+        if self._sent is _MISSING:
+            payload: Dict[str, Any] = {"snapshot": data, "done": False}
+        else:
+            payload = {"patch": diff(self._sent, data), "done": False}
+            self.patched_frames += 1
+        # Keep our own copy: partials may share containers with the producer
+        self._sent = orjson.loads(orjson.dumps(data))
+        return payload
+
+    def frame(self, items: List[Any]) -> Dict[str, Any]:
+        """Frame payload for coalesced partials (only the newest is encoded)."""
+        return self.encode(items[-1])
+
+
+class StreamAssembler:
+    """
+    Rebuilds a delta-encoded stream on the client.
+
+    Feed it the decoded `data:` payloads (`feed`) or raw SSE lines
+    (`feed_line`). On the final frame the rebuilt document is compared with
+    the full object sent by the server, which is kept either way;
+    `verified` tells whether they matched.
+    """
+
+    def __init__(self):
+        self.document: Any = None
+        self.done = False
+        self.verified: Optional[bool] = None
+        self.error: Optional[str] = None
+
+    def feed(self, event: Dict[str, Any]) -> Any:
+        """
+        Apply one decoded event.
+
+        Returns:
+            The document so far
+
+        Raises:
+            PatchError: If a patch does not apply to the document so far
+        """
+        if "error" in event:
+            self.error = event["error"]
+        elif "snapshot" in event:
+            self.document = event["snapshot"]
+        elif "patch" in event:
+            self.document = apply_patch(self.document, event["patch"])
+        elif event.get("done"):
+            final = event.get("data")
+            self.verified = final == self.document
+            if not self.verified:
+                logger.warning("Reassembled stream differs from the final object")
+            self.document = final
+            self.done = True
+        return self.document
+
+    def feed_line(self, line: str) -> Any:
+        """Apply one line of an SSE stream (non-`data:` lines are skipped)."""
+        if line.startswith("data:"):
+            self.feed(orjson.loads(line[5:]))
+        return self.document
+
+
+async def reassemble_stream(lines: AsyncIterable[str]) -> StreamAssembler:
+    """Consume SSE lines (e.g. httpx `response.aiter_lines()`) into an assembler."""
+    assembler = StreamAssembler()
+    async for line in lines:
+        assembler.feed_line(line)
+    return assembler
+
+
+__all__ = [
+    "DeltaEncoder",
+    "PatchError",
+    "StreamAssembler",
+    "apply_patch",
+    "diff",
+    "escape_token",
+    "reassemble_stream",
+]
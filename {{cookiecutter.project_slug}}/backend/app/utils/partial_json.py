@@ -0,0 +1,374 @@
+"""
+Incremental parser for JSON that arrives in chunks.
+
+`IncrementalJSONParser` keeps its tokenizer state (container stack, current
+key, in-string and escape state, the number or literal being read) across
+`feed` calls, and builds the parsed containers in place. Each chunk is
+scanned once, so a whole stream costs O(n) instead of re-parsing the
+accumulated buffer on every chunk. String contents are copied in bulk up to
+the next quote or backslash rather than character by character.
+
+`value()` returns the document parsed so far:
+
+- a string being read is included with the characters received so far;
+- a number being read is included if what was received is a valid number;
+- keys without a value yet, partial keys and partial `true`/`false`/`null`
+  literals are left out.
+
+Text before the first `{` (e.g. a ```json fence or a preamble) and after
+the end of the document is ignored. `pop_changed_keys()` tells which
+top-level keys were written since the last call, so consumers can skip
+the fields that did not change.
+
+Usage:
+    parser = IncrementalJSONParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        partial = parser.value()
+"""
+
+import json
+import re
+from typing import Any, List, Optional, Set
+
+# Object states
+_KEY_OR_END = 0  # after "{"
+_KEY = 1  # after ","
+_COLON = 2
+_VALUE = 3
+_COMMA_OR_END = 4
+# Array states (plus _VALUE and _COMMA_OR_END)
+_VALUE_OR_END = 5  # after "["
+
+# Scalar being read
+_NONE = 0
+_STRING = 1
+_NUMBER = 2
+_LITERAL = 3
+
+_NUMBER_START = "-0123456789"
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SKIP_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_RUN = re.compile(r"[-+0-9.eE]*")
+_LETTER_RUN = re.compile(r"[a-z]*")
+
+
+class JSONSyntaxError(ValueError):
+    """Raised by `feed` when the input cannot be valid JSON."""
+
+
+class _Frame:
+    """An open object or array."""
+
+    __slots__ = ("container", "is_object", "state", "key", "provisional")
+
+    def __init__(self, container: Any, is_object: bool):
+        self.container = container
+        self.is_object = is_object
+        self.state = _KEY_OR_END if is_object else _VALUE_OR_END
+        self.key: Optional[str] = None
+        # Array only: the last element is the value of the scalar being read
+        self.provisional = False
+
+
+class IncrementalJSONParser:
+    """
+    Stateful JSON tokenizer that builds the document as chunks arrive.
+
+    The containers returned by `value()` are the parser's own and keep
+    changing as more chunks are fed; copy them if a snapshot is needed.
+    """
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._root: Any = None
+        self._started = False
+        self._done = False
+        self._error: Optional[str] = None
+        self._changed: Set[str] = set()
+
+        # Scalar being read
+        self._scalar = _NONE
+        self._parts: List[str] = []
+        self._escape: Optional[str] = None  # "" after a backslash, hex digits after "\u"
+        self._surrogates = False
+        self._is_key = False
+
+    @property
+    def done(self) -> bool:
+        """Whether the document is complete."""
+        return self._done
+
+    @property
+    def error(self) -> Optional[str]:
+        """Why the input is invalid, or None."""
+        return self._error
+
+    def feed(self, chunk: str) -> None:
+        """
+        Consume the next chunk.
+
+        Raises:
+            JSONSyntaxError: If the input is not valid JSON (further chunks are ignored)
+        """
+        if self._done or self._error is not None or not chunk:
+            return
+        try:
+            self._consume(chunk)
+        except JSONSyntaxError as e:
+            self._error = str(e)
+            raise
+
+    def value(self) -> Any:
+        """The document parsed so far (None before it starts)."""
+        if self._scalar != _NONE and not self._is_key and self._stack:
+            # Expose the scalar being read in its slot
+            value = self._partial_scalar()
+            if value is not _MISSING:
+                self._place(value, provisional=True)
+        return self._root
+
+    def pop_changed_keys(self) -> Set[str]:
+        """Top-level keys written since the previous call (call after `value()`)."""
+        changed = self._changed
+        self._changed = set()
+        return changed
+
+    def _consume(self, text: str) -> None:
+        pos = 0
+        end = len(text)
+
+        if not self._started:
+            pos = text.find("{")
+            if pos < 0:
+                return
+            self._started = True
+            self._root = {}
+            self._stack.append(_Frame(self._root, True))
+            pos += 1
+
+        while pos < end:
+            if self._scalar == _STRING:
+                pos = self._read_string(text, pos)
+                continue
+            if self._scalar == _NUMBER:
+                match = _NUMBER_RUN.match(text, pos)
+                self._parts.append(match.group())
+                pos = match.end()
+                if pos < end:
+                    self._finish_number()
+                continue
+            if self._scalar == _LITERAL:
+                match = _LETTER_RUN.match(text, pos)
+                self._parts.append(match.group())
+                pos = match.end()
+                if pos < end:
+                    self._finish_literal()
+                continue
+
+            if self._done:
+                # Ignore text after the document
+                return
+            pos = _SKIP_WHITESPACE.match(text, pos).end()
+            if pos >= end:
+                break
+
+            char = text[pos]
+            frame = self._stack[-1]
+            state = frame.state
+
+            if state == _VALUE or state == _VALUE_OR_END:
+                if char in _NUMBER_START:
+                    # Read as a run, starting with this character
+                    self._scalar = _NUMBER
+                    self._parts = []
+                    continue
+                if char in "tfn":
+                    self._scalar = _LITERAL
+                    self._parts = []
+                    continue
+                if char == "]" and state == _VALUE_OR_END:
+                    self._close()
+                else:
+                    self._start_value(char, frame)
+                pos += 1
+            elif state == _COMMA_OR_END:
+                if char == ",":
+                    frame.state = _KEY if frame.is_object else _VALUE
+                elif char == ("}" if frame.is_object else "]"):
+                    self._close()
+                else:
+                    raise JSONSyntaxError(f"Expected ',' or closing bracket, got {char!r}")
+                pos += 1
+            elif state == _KEY_OR_END or state == _KEY:
+                if char == '"':
+                    self._begin_string(is_key=True)
+                elif char == "}" and state == _KEY_OR_END:
+                    self._close()
+                else:
+                    raise JSONSyntaxError(f"Expected object key, got {char!r}")
+                pos += 1
+            else:  # _COLON
+                if char != ":":
+                    raise JSONSyntaxError(f"Expected ':', got {char!r}")
+                frame.state = _VALUE
+                pos += 1
+
+    def _start_value(self, char: str, frame: _Frame) -> None:
+        """Begin a container or string value."""
+        if char == "{" or char == "[":
+            container: Any = {} if char == "{" else []
+            self._place(container)
+            frame.state = _COMMA_OR_END
+            self._stack.append(_Frame(container, char == "{"))
+        elif char == '"':
+            self._begin_string(is_key=False)
+        else:
+            raise JSONSyntaxError(f"Unexpected character {char!r}")
+
+    def _close(self) -> None:
+        self._stack.pop()
+        if not self._stack:
+            self._done = True
+
+    def _begin_string(self, is_key: bool) -> None:
+        self._scalar = _STRING
+        self._is_key = is_key
+        self._parts = []
+        self._escape = None
+        self._surrogates = False
+
+    def _read_string(self, text: str, pos: int) -> int:
+        """Read string content from `pos`; returns the position after what was consumed."""
+        end = len(text)
+        while pos < end:
+            if self._escape is not None:
+                pos = self._read_escape(text, pos)
+                continue
+            match = _STRING_SPECIAL.search(text, pos)
+            if match is None:
+                self._parts.append(text[pos:])
+                return end
+            special = match.start()
+            if special > pos:
+                self._parts.append(text[pos:special])
+            if text[special] == '"':
+                self._finish_string()
+                return special + 1
+            self._escape = ""
+            pos = special + 1
+        return pos
+
+    def _read_escape(self, text: str, pos: int) -> int:
+        """Read (part of) an escape sequence after a backslash."""
+        if self._escape == "":
+            char = text[pos]
+            if char == "u":
+                self._escape = "u"
+            elif char in _ESCAPES:
+                self._parts.append(_ESCAPES[char])
+                self._escape = None
+            else:
+                raise JSONSyntaxError(f"Invalid escape '\\{char}'")
+            return pos + 1
+
+        needed = 5 - len(self._escape)
+        digits = text[pos:pos + needed]
+        self._escape += digits
+        pos += len(digits)
+        if len(self._escape) == 5:
+            try:
+                code = int(self._escape[1:], 16)
+            except ValueError:
+                raise JSONSyntaxError(f"Invalid unicode escape '\\{self._escape}'")
+            if 0xD800 <= code <= 0xDFFF:
+                self._surrogates = True
+            self._parts.append(chr(code))
+            self._escape = None
+        return pos
+
+    def _string_value(self) -> str:
+        # Keep one piece so repeated calls join only what arrived since
+        value = "".join(self._parts)
+        self._parts = [value]
+        if self._surrogates:
+            value = value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+        return value
+
+    def _finish_string(self) -> None:
+        value = self._string_value()
+        self._scalar = _NONE
+        self._parts = []
+        frame = self._stack[-1]
+        if self._is_key:
+            self._is_key = False
+            frame.key = value
+            frame.state = _COLON
+        else:
+            self._place(value)
+            frame.state = _COMMA_OR_END
+
+    def _finish_number(self) -> None:
+        token = "".join(self._parts)
+        value = _parse_number(token)
+        if value is _MISSING:
+            raise JSONSyntaxError(f"Invalid number {token!r}")
+        self._scalar = _NONE
+        self._parts = []
+        self._place(value)
+        self._stack[-1].state = _COMMA_OR_END
+
+    def _finish_literal(self) -> None:
+        token = "".join(self._parts)
+        if token not in _LITERALS:
+            raise JSONSyntaxError(f"Invalid literal {token!r}")
+        self._scalar = _NONE
+        self._parts = []
+        self._place(_LITERALS[token])
+        self._stack[-1].state = _COMMA_OR_END
+
+    def _partial_scalar(self) -> Any:
+        """Value of the scalar being read, or _MISSING if it cannot be shown yet."""
+        if self._scalar == _STRING:
+            return self._string_value()
+        if self._scalar == _NUMBER:
+            return _parse_number("".join(self._parts))
+        token = "".join(self._parts)
+        return _LITERALS[token] if token in _LITERALS else _MISSING
+
+    def _place(self, value: Any, provisional: bool = False) -> None:
+        """
+        Store a value in the open container.
+
+        A provisional value (the scalar still being read) takes the slot the
+        final value will replace: the current key, or the last array element.
+        """
+        # Every write lands under the top-level key being read
+        self._changed.add(self._stack[0].key)
+        frame = self._stack[-1]
+        if frame.is_object:
+            frame.container[frame.key] = value
+            return
+        if frame.provisional:
+            frame.container[-1] = value
+        else:
+            frame.container.append(value)
+        frame.provisional = provisional
+
+
+_MISSING = object()
+
+
+def _parse_number(token: str) -> Any:
+    """Parse a JSON number token, or return _MISSING if it is not one (yet)."""
+    try:
+        value = json.loads(token)
+    except ValueError:
+        return _MISSING
+    return value if isinstance(value, (int, float)) else _MISSING
+
+
+__all__ = ["IncrementalJSONParser", "JSONSyntaxError"]
@@ -0,0 +1,380 @@
+"""
+Compiled plans for building partial Pydantic models while streaming.
+
+A `PartialModelPlan` is compiled once per response model class (see
+`get_partial_plan`). It precomputes, per field:
+
+- the fallback used while the field has not arrived: the field default or
+  default factory, else a value for the annotation ("" for str, [] for
+  lists, None for Optional, the first option of a Literal, an empty
+  partial instance for nested models);
+- how to convert a partial value: scalars are used as-is (a Literal value
+  that is not one of its options yet, e.g. "neg" of "negative", falls back);
+  nested models and lists are built incrementally (see below); anything
+  else is validated with a per-field `TypeAdapter`.
+
+Intermediate frames are built with `model_construct` from the converted
+field values, reconverting only the fields the parser reports as changed.
+JSON arrives in order, so within a changed nested model or list only the
+member converted last (which may have been partial) and the new ones are
+converted again; earlier members are reused from the previous frame. The
+cost per chunk therefore does not grow with the size of the model. Only
+the final frame runs full `model_validate`.
+
+Usage:
+    plan = get_partial_plan(MyResponse)
+    values = plan.initial_values()
+    changed = plan.apply(values, parser.value(), parser.pop_changed_keys())
+    partial = plan.construct(values)
+    final = plan.validate(parser.value())
+"""
+
+import types
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import PydanticUndefined
+
+from app.utils.logging import get_logger
+
+logger = get_logger("partial_model")
+
+T = TypeVar("T", bound=BaseModel)
+
+# Fields treated as the main text of a response, in order of preference
+PRIMARY_CONTENT_FIELDS = ("response", "content", "text", "message", "answer", "output")
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+_UNION_TYPES = (Union, getattr(types, "UnionType", Union))
+
+
+def _copy_json(value: Any) -> Any:
+    """Copy the containers of parsed JSON data (the parser keeps mutating its own)."""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+def _literal_choices(annotation: Any) -> Optional[FrozenSet[Any]]:
+    """Options of a Literal (or Optional Literal) annotation, else None."""
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return frozenset(get_args(annotation))
+    if origin in _UNION_TYPES:
+        choices: Set[Any] = set()
+        for arg in get_args(annotation):
+            if arg is type(None):
+                choices.add(None)
+            elif get_origin(arg) is Literal:
+                choices.update(get_args(arg))
+            else:
+                return None
+        return frozenset(choices)
+    return None
+
+
+def _is_scalar(annotation: Any) -> bool:
+    """Whether partial values of the annotation can be used without validation."""
+    if annotation in _SCALAR_TYPES or get_origin(annotation) is Literal:
+        return True
+    if get_origin(annotation) in _UNION_TYPES:
+        return all(_is_scalar(arg) for arg in get_args(annotation))
+    return False
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _annotation_fallback(annotation: Any) -> Callable[[], Any]:
+    """Factory for the value of a required field that has not arrived yet."""
+    origin = get_origin(annotation)
+    if annotation is str:
+        return lambda: ""
+    if annotation is bool:
+        return lambda: False
+    if annotation is int:
+        return lambda: 0
+    if annotation is float:
+        return lambda: 0.0
+    if annotation is list or origin is list:
+        return list
+    if annotation is dict or origin is dict:
+        return dict
+    if origin is Literal:
+        first = get_args(annotation)[0]
+        return lambda: first
+    if origin in _UNION_TYPES and type(None) in get_args(annotation):
+        return lambda: None
+    if _is_model(annotation):
+        # Resolved on use, so self-referencing models compile
+        def empty_model() -> Any:
+            nested = get_partial_plan(annotation)
+            return nested.construct(nested.initial_values(), fields_set=set())
+        return empty_model
+    return lambda: None
+
+
+# Returned by converters for a value that is not valid (yet)
+_INVALID = object()
+
+# (raw value, previous value, whether `previous` was built from the same stream) -> value or _INVALID
+Converter = Callable[[Any, Any, bool], Any]
+
+
+def _optional_inner(annotation: Any) -> Any:
+    """`X` of an `Optional[X]` annotation, else None."""
+    if get_origin(annotation) not in _UNION_TYPES:
+        return None
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    return args[0] if len(args) == 1 and len(get_args(annotation)) == 2 else None
+
+
+def _compile_converter(annotation: Any) -> Converter:
+    """Converter for partial values of a non-scalar annotation."""
+    inner = _optional_inner(annotation)
+    target = annotation if inner is None else inner
+    if _is_model(target):
+        convert = _model_converter(target)
+    elif get_origin(target) is list and get_args(target):
+        convert = _list_converter(get_args(target)[0])
+    else:
+        adapter = TypeAdapter(annotation)
+
+        def validate(raw: Any, previous: Any, incremental: bool) -> Any:
+            try:
+                return adapter.validate_python(_copy_json(raw))
+            except ValidationError:
+                return _INVALID
+        return validate
+    if inner is None:
+        return convert
+
+    def convert_optional(raw: Any, previous: Any, incremental: bool) -> Any:
+        return None if raw is None else convert(raw, previous, incremental)
+    return convert_optional
+
+
+def _model_converter(model: Type[BaseModel]) -> Converter:
+    def convert(raw: Any, previous: Any, incremental: bool) -> Any:
+        if not isinstance(raw, dict):
+            return _INVALID
+        # Resolved on use, so self-referencing models compile
+        return get_partial_plan(model).build(raw, previous if incremental else None)
+    return convert
+
+
+def _list_converter(item_annotation: Any) -> Converter:
+    if _is_scalar(item_annotation):
+        choices = _literal_choices(item_annotation)
+
+        def convert_item(raw: Any, previous: Any, incremental: bool) -> Any:
+            return raw if choices is None or raw in choices else _INVALID
+    else:
+        convert_item = _compile_converter(item_annotation)
+
+    def convert(raw: Any, previous: Any, incremental: bool) -> Any:
+        if not isinstance(raw, list):
+            return _INVALID
+        if not (incremental and isinstance(previous, list) and len(previous) <= len(raw)):
+            previous = []
+        # Every element before the last one converted was complete
+        start = max(len(previous) - 1, 0)
+        items = previous[:start]
+        for index in range(start, len(raw)):
+            reused = index < len(previous)
+            item = convert_item(raw[index], previous[index] if reused else None, reused)
+            if item is _INVALID:
+                # Elements from the first one that is not valid yet are left out
+                break
+            items.append(item)
+        return items
+    return convert
+
+
+class _FieldPlan:
+    """Precomputed handling of one model field."""
+
+    __slots__ = ("name", "key", "fallback", "scalar", "choices", "converter", "check_default")
+
+    def __init__(self, name: str, key: str, field_info: Any):
+        annotation = field_info.annotation
+        self.name = name
+        self.key = key
+        if field_info.default_factory is not None:
+            self.fallback: Callable[[], Any] = field_info.default_factory
+        elif field_info.default is not PydanticUndefined:
+            default = field_info.default
+            if isinstance(default, (dict, list)):
+                self.fallback = lambda: _copy_json(default)
+            else:
+                self.fallback = lambda: default
+        else:
+            self.fallback = _annotation_fallback(annotation)
+        self.scalar = _is_scalar(annotation)
+        self.choices = _literal_choices(annotation)
+        self.converter: Optional[Converter] = None if self.scalar else _compile_converter(annotation)
+        # A declared default may be non-empty: it must not be extended as streamed data
+        self.check_default = field_info.default_factory is not None or field_info.default is not PydanticUndefined
+
+    def convert(self, raw: Any, previous: Any, incremental: bool = False) -> Any:
+        """
+        Value for a partial frame; keeps `previous` if `raw` is not valid yet.
+
+        With `incremental`, `previous` was converted from an earlier state of
+        the same stream, and only the part of `raw` that may have changed
+        since is converted.
+        """
+        if self.scalar:
+            if self.choices is not None and raw not in self.choices:
+                return self.fallback()
+            return raw
+        if incremental and self.check_default and previous == self.fallback():
+            incremental = False
+        value = self.converter(raw, previous, incremental)
+        return previous if value is _INVALID else value
+
+
+class PartialModelPlan:
+    """
+    Builds partial instances of one response model.
+
+    Compile with `get_partial_plan`, which caches one plan per model class.
+    """
+
+    def __init__(self, schema: Type[T]):
+        self.schema = schema
+        self.fields: List[_FieldPlan] = [
+            _FieldPlan(name, field_info.alias or name, field_info)
+            for name, field_info in schema.model_fields.items()
+        ]
+        self.primary_field: Optional[str] = next(
+            (
+                name for name in PRIMARY_CONTENT_FIELDS
+                if name in schema.model_fields and schema.model_fields[name].annotation is str
+            ),
+            None,
+        )
+        self._by_key: Dict[str, _FieldPlan] = {field.key: field for field in self.fields}
+
+    def initial_values(self) -> Dict[str, Any]:
+        """Field values before any data has arrived."""
+        return {field.name: field.fallback() for field in self.fields}
+
+    def apply(
+        self,
+        values: Dict[str, Any],
+        data: Dict[str, Any],
+        keys: Optional[Iterable[str]] = None,
+    ) -> Set[str]:
+        """
+        Update `values` in place from parsed (partial) data.
+
+        Args:
+            values: Field values, as returned by `initial_values` or a previous call
+            data: Parsed data keyed by field alias
+            keys: Keys of `data` that changed since the previous call on the
+                same stream (None to check and fully convert every field)
+
+        Returns:
+            Names of the fields whose value changed
+        """
+        changed: Set[str] = set()
+        incremental = keys is not None
+        for key in (self._by_key if keys is None else keys):
+            field = self._by_key.get(key)
+            if field is None or key not in data:
+                continue
+            previous = values[field.name]
+            value = field.convert(data[key], previous, incremental)
+            if value is not previous and value != previous:
+                values[field.name] = value
+                changed.add(field.name)
+        return changed
+
+    def construct(self, values: Dict[str, Any], fields_set: Optional[Set[str]] = None) -> T:
+        """Partial instance from field values, without validation."""
+        return self.schema.model_construct(_fields_set=fields_set, **values)
+
+    def build(self, data: Dict[str, Any], previous: Optional[T] = None) -> T:
+        """
+        Partial instance from parsed (partial) data.
+
+        Args:
+            data: Parsed data keyed by field alias
+            previous: Instance built from an earlier state of the same data;
+                only the fields that may have changed since are converted
+
+        Returns:
+            The instance; its `model_fields_set` holds the fields that arrived
+        """
+        if isinstance(previous, self.schema):
+            values = dict(previous.__dict__)
+            arrived = previous.model_fields_set
+        else:
+            values = self.initial_values()
+            arrived = set()
+        fields = [self._by_key[key] for key in data if key in self._by_key]
+        # Objects arrive in order: fields before the last one seen are complete
+        start = 0
+        for index, field in enumerate(fields):
+            if field.name in arrived:
+                start = index
+        for field in fields[start:]:
+            values[field.name] = field.convert(
+                data[field.key], values[field.name], field.name in arrived
+            )
+        return self.construct(values, fields_set={field.name for field in fields})
+
+    def validate(self, data: Dict[str, Any]) -> Optional[T]:
+        """
+        Fully validated instance, with fallbacks for fields that never arrived.
+
+        Returns:
+            The instance, or None if the data does not validate
+        """
+        merged = {
+            field.key: data[field.key] if field.key in data else field.fallback()
+            for field in self.fields
+        }
+        try:
+            return self.schema.model_validate(merged)
+        except ValidationError as e:
+            logger.debug(f"Validation failed on merged data: {e}")
+            return None
+
+
+# Plans compiled so far, one per response model class
+_plans: Dict[type, PartialModelPlan] = {}
+
+
+def get_partial_plan(schema: Type[T]) -> PartialModelPlan:
+    """Get or compile the partial plan of a response model class."""
+    plan = _plans.get(schema)
+    if plan is None:
+        plan = _plans[schema] = PartialModelPlan(schema)
+    return plan
+
+
+__all__ = [
+    "PRIMARY_CONTENT_FIELDS",
+    "PartialModelPlan",
+    "get_partial_plan",
+]
@@ -0,0 +1,247 @@
+"""
+Server-Sent Events writer with frame coalescing.
+
+Emitting one `data:` frame per token costs a JSON encode, a socket write
+and a client-side parse per token. `SSEWriter` batches items from an async
+source into frames instead:
+
+- The first item is sent immediately (no added time-to-first-token).
+- Later items are buffered until the coalescing window elapses or the
+  buffered content reaches the frame size budget.
+- Payloads are encoded with orjson straight to bytes.
+- The transcript is kept as a list of parts and joined once.
+- Heartbeat comments are sent while the source is idle (e.g. before the
+  first token), so proxies do not time out the connection.
+- Items read ahead of the client are bounded (`SSE_MAX_QUEUED_ITEMS`): a
+  slow client slows reading from the source instead of buffering it all.
+- Given the request, client disconnects are detected by polling and the
+  source is cancelled at once (closing the upstream LLM request);
+  `ClientDisconnectedError` is then raised to the endpoint.
+
+Usage:
+    writer = SSEWriter()
+
+    async def events():
+        async for frame in writer.stream(chain.astream(inputs), request=request):
+            yield frame
+        yield writer.event({"done": True, "total_length": len(writer.text)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+import orjson
+from starlette.requests import Request
+
+from app.config import get_settings
+
+# Response headers for event streams (no caching, no proxy buffering)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+}
+
+HEARTBEAT = b": heartbeat\n\n"
+
+# Queue sentinels marking the end of the source and a client disconnect
+_DONE = object()
+_DISCONNECTED = object()
+
+
+class ClientDisconnectedError(Exception):
+    """Raised by `SSEWriter.stream` when the client has gone away."""
+
+
+class _Failure:
+    """Wraps an exception raised by the source."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def encode_event(payload: Any, event_id: Optional[str] = None) -> bytes:
+    """Encode one SSE `data:` frame (optionally with an `id:` line)."""
+    data = orjson.dumps(payload, default=str)
+    if event_id is None:
+        return b"data: " + data + b"\n\n"
+    return b"".join((b"id: ", event_id.encode(), b"\ndata: ", data, b"\n\n"))
+
+
+def text_frame(items: List[str]) -> Any:
+    """Frame payload for coalesced text tokens."""
+    return {"content": "".join(items), "done": False}
+
+
+def latest_frame(items: List[Any]) -> Any:
+    """Frame payload keeping only the newest item (e.g. structured partials)."""
+    latest = items[-1]
+    data = latest.model_dump() if hasattr(latest, "model_dump") else latest
+    return {"data": data, "done": False}
+
+
+class SSEWriter:
+    """
+    Coalesces items from an async source into SSE frames.
+
+    Args:
+        coalesce_ms: Maximum time an item waits in the buffer (0 disables coalescing)
+        max_frame_chars: Flush once the buffered text reaches this many characters
+        heartbeat_seconds: Idle time before a heartbeat comment (0 disables heartbeats)
+        disconnect_poll_ms: Interval between client disconnect checks
+        max_queued: Items read from the source ahead of the client
+    """
+
+    def __init__(
+        self,
+        coalesce_ms: Optional[float] = None,
+        max_frame_chars: Optional[int] = None,
+        heartbeat_seconds: Optional[float] = None,
+        disconnect_poll_ms: Optional[float] = None,
+        max_queued: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.coalesce = (settings.sse_coalesce_ms if coalesce_ms is None else coalesce_ms) / 1000.0
+        self.max_frame_chars = max_frame_chars or settings.sse_max_frame_chars
+        self.heartbeat = (
+            settings.sse_heartbeat_seconds if heartbeat_seconds is None else heartbeat_seconds
+        )
+        self.disconnect_poll = (
+            settings.sse_disconnect_poll_ms if disconnect_poll_ms is None else disconnect_poll_ms
+        ) / 1000.0
+        self.max_queued = max(1, max_queued or settings.sse_max_queued_items)
+
+        self.parts: List[Any] = []
+        self.frames = 0
+        self.disconnected = False
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """The transcript of all text items streamed so far."""
+        if self._text is None:
+            self._text = "".join(part for part in self.parts if isinstance(part, str))
+        return self._text
+
+    @property
+    def last(self) -> Any:
+        """The most recent item, or None."""
+        return self.parts[-1] if self.parts else None
+
+    def event(self, payload: Any, event_id: Optional[str] = None) -> bytes:
+        """Encode a control frame (completion, error) for the same stream."""
+        return encode_event(payload, event_id)
+
+    async def _read(self, source: AsyncIterator[Any], queue: asyncio.Queue) -> None:
+        # Waits for room: the source is read no faster than the client takes frames
+        try:
+            async for item in source:
+                await queue.put(item)
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(_Failure(e))
+
+    async def _watch(self, request: Request, reader: asyncio.Future, queue: asyncio.Queue) -> None:
+        while not await request.is_disconnected():
+            await asyncio.sleep(self.disconnect_poll)
+        # Stop pulling from upstream before anything else
+        reader.cancel()
+        if queue.full():
+            # The reader is stopped; an item the client will never get makes room
+            queue.get_nowait()
+        queue.put_nowait(_DISCONNECTED)
+
+    async def stream(
+        self,
+        source: AsyncIterator[Any],
+        payload: Callable[[List[Any]], Any] = text_frame,
+        request: Optional[Request] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield encoded frames for `source`.
+
+        Args:
+            source: Async iterator of items (text tokens or structured partials)
+            payload: Builds a frame payload from the buffered items
+            request: Watched for client disconnects, if given
+
+        Raises:
+            ClientDisconnectedError: If the client disconnected (the source is cancelled)
+            Exception: Whatever the source raised, after flushing buffered items
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued)
+        reader = asyncio.ensure_future(self._read(source, queue))
+        watcher = (
+            asyncio.ensure_future(self._watch(request, reader, queue)) if request is not None else None
+        )
+
+        buffer: List[Any] = []
+        buffered_chars = 0
+        deadline = 0.0
+
+        def flush() -> bytes:
+            nonlocal buffered_chars
+            frame = encode_event(payload(buffer))
+            buffer.clear()
+            buffered_chars = 0
+            self.frames += 1
+            return frame
+
+        try:
+            while True:
+                if not queue.empty():
+                    item = queue.get_nowait()
+                else:
+                    if buffer:
+                        timeout: Optional[float] = max(0.0, deadline - loop.time())
+                    else:
+                        timeout = self.heartbeat or None
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        yield flush() if buffer else HEARTBEAT
+                        continue
+
+                if item is _DONE:
+                    break
+                if item is _DISCONNECTED:
+                    self.disconnected = True
+                    raise ClientDisconnectedError()
+                if isinstance(item, _Failure):
+                    if buffer:
+                        yield flush()
+                    raise item.error
+
+                self.parts.append(item)
+                self._text = None
+                buffer.append(item)
+                if isinstance(item, str):
+                    buffered_chars += len(item)
+
+                # First frame goes out immediately; later ones per window/budget
+                if self.frames == 0 or not self.coalesce or buffered_chars >= self.max_frame_chars:
+                    yield flush()
+                elif len(buffer) == 1:
+                    deadline = loop.time() + self.coalesce
+
+            if buffer:
+                yield flush()
+        finally:
+            # Also runs when the server cancels the response mid-stream
+            reader.cancel()
+            if watcher is not None:
+                watcher.cancel()
+
+
+__all__ = [
+    "ClientDisconnectedError",
+    "HEARTBEAT",
+    "SSEWriter",
+    "SSE_HEADERS",
+    "encode_event",
+    "latest_frame",
+    "text_frame",
+]
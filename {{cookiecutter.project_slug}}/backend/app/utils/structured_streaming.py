@@ -3,18 +3,20 @@ Structured streaming utilities for LangChain + OpenRouter.
 
 Provides incremental parsing of partial JSON chunks into BaseModel instances,
 similar to Agno's implementation. Handles streaming structured output by:
-1. Accumulating content chunks
-2. Trying multiple strategies to parse partial JSON (Agno's approach)
-3. Merging fields intelligently based on BaseModel schema
-4. Validating and returning incremental BaseModel updates
+1. Feeding content chunks to an incremental JSON parser (each byte is
+   scanned once, so a stream costs O(n) rather than O(n²))
+2. Updating only the changed fields through a per-schema compiled plan
+   (see `partial_model`), building partial models with `model_construct`
+3. Fully validating the final model
 """
-import json
 import re
 from typing import List, Optional, Type, TypeVar
 
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel
 
 from app.utils.logging import get_logger
+from app.utils.partial_json import IncrementalJSONParser, JSONSyntaxError
+from app.utils.partial_model import get_partial_plan
 
 logger = get_logger("structured_streaming")
 
@@ -25,8 +27,10 @@ def try_parse_partial_json(text: str) -> Optional[dict]:
     """
     Try to parse partial JSON, returning what we can.
     
-    Uses aggressive strategies to close incomplete JSON structures.
-    This handles streaming scenarios where JSON arrives incrementally.
+    Incomplete strings, numbers, arrays and objects are closed where the
+    text ends (see `IncrementalJSONParser`). To parse a stream chunk by
+    chunk, feed an `IncrementalJSONParser` instead of calling this on the
+    accumulated text.
     
     Args:
         text: String that may contain partial JSON
@@ -37,72 +41,14 @@ def try_parse_partial_json(text: str) -> Optional[dict]:
     if not text or not text.strip():
         return None
     
-    # Try parsing as-is first
+    parser = IncrementalJSONParser()
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    
-    # Count open brackets to determine what needs closing
-    open_braces = text.count('{') - text.count('}')
-    open_brackets = text.count('[') - text.count(']')
-    in_string = False
-    last_char = ''
-    
-    # Check if we're in the middle of a string
-    quote_count = 0
-    escaped = False
-    for c in text:
-        if c == '\\' and not escaped:
-            escaped = True
-            continue
-        if c == '"' and not escaped:
-            quote_count += 1
-        escaped = False
-    in_string = quote_count % 2 == 1
-    
-    # Build closing sequence
-    attempts = []
-    
-    if in_string:
-        # Close the string first
-        base = text + '"'
-        attempts.append(base + ']' * open_brackets + '}' * open_braces)
-        attempts.append(base + '}' * open_braces)
-        # Maybe we're in a string within an array
-        attempts.append(base + '"]' + '}' * max(0, open_braces))
-    else:
-        # Not in string, just close brackets
-        attempts.append(text + ']' * open_brackets + '}' * open_braces)
-        attempts.append(text + '}' * open_braces)
-    
-    # Also try common patterns
-    attempts.extend([
-        text + '}',
-        text + ']}',
-        text + '"}',
-        text + '"]}',
-        text + '"}]}',
-        text + '": null}',
-        text + '": []}',
-        text + '": {}}',
-        text + '": ""}',
-        text + '": false}',
-        text + '": true}',
-        text + '": 0}',
-        text + ': null}',
-        text + 'null}',
-    ])
-    
-    for attempt in attempts:
-        try:
-            result = json.loads(attempt)
-            if isinstance(result, dict):
-                return result
-        except json.JSONDecodeError:
-            continue
+        parser.feed(text)
+    except JSONSyntaxError:
+        return None
     
-    return None
+    result = parser.value()
+    return result if isinstance(result, dict) else None
 
 
 def _parse_individual_json(
@@ -121,63 +67,26 @@ def _parse_individual_json(
         BaseModel instance if valid data found, None otherwise
     """
     # Try to parse the JSON (handles partial JSON)
-    parsed_dict = try_parse_partial_json(content)
+    return _model_from_partial_dict(try_parse_partial_json(content), output_schema)
+
+
+def _model_from_partial_dict(
+    parsed_dict: Optional[dict], output_schema: Type[T]
+) -> Optional[T]:
+    """
+    Create a partial model from parsed data, with defaults for missing fields.
     
+    Args:
+        parsed_dict: Data parsed so far (may be missing fields)
+        output_schema: Pydantic BaseModel class to parse into
+        
+    Returns:
+        BaseModel instance if valid data found, None otherwise
+    """
     if not parsed_dict or not isinstance(parsed_dict, dict):
         return None
     
-    # Get the expected fields from the response model
-    model_fields = (
-        output_schema.model_fields
-        if hasattr(output_schema, "model_fields")
-        else {}
-    )
-    
-    # Build data with defaults for missing required fields
-    merged_data: dict = {}
-    
-    for field_name, field_info in model_fields.items():
-        if field_name in parsed_dict:
-            merged_data[field_name] = parsed_dict[field_name]
-        elif field_info.default is not None:
-            # Use field default
-            merged_data[field_name] = field_info.default
-        elif field_info.default_factory is not None:
-            # Use default factory
-            merged_data[field_name] = field_info.default_factory()
-        else:
-            # Provide sensible defaults for common types based on annotation
-            annotation = field_info.annotation
-            if annotation is str or (hasattr(annotation, "__origin__") and annotation.__origin__ is str):
-                merged_data[field_name] = ""
-            elif annotation is bool:
-                merged_data[field_name] = False
-            elif annotation is int:
-                merged_data[field_name] = 0
-            elif annotation is float:
-                merged_data[field_name] = 0.0
-            elif annotation is list or (hasattr(annotation, "__origin__") and annotation.__origin__ is list):
-                merged_data[field_name] = []
-            elif hasattr(annotation, "__origin__") and annotation.__origin__ is type(None):
-                merged_data[field_name] = None
-            # Check for Optional types
-            elif hasattr(annotation, "__args__") and type(None) in getattr(annotation, "__args__", ()):
-                merged_data[field_name] = None
-            # For Literal types, use first option
-            elif hasattr(annotation, "__origin__") and str(annotation.__origin__) == "typing.Literal":
-                args = getattr(annotation, "__args__", ())
-                if args:
-                    merged_data[field_name] = args[0]
-    
-    if not merged_data:
-        return None
-    
-    try:
-        return output_schema.model_validate(merged_data)
-    except ValidationError as e:
-        # Log debug but don't break streaming (partial JSON is expected)
-        logger.debug(f"Validation failed on merged data: {e}")
-        return None
+    return get_partial_plan(output_schema).validate(parsed_dict)
 
 
 def parse_response_model_str(
@@ -241,6 +150,9 @@ class StructuredStreamingHandler:
         """
         self.output_schema = output_schema
         self.response_content = ""
+        self._parser = IncrementalJSONParser()
+        self._plan = get_partial_plan(output_schema)
+        self._values = self._plan.initial_values()
         self.last_valid_model: Optional[T] = None
         self.last_parsed_dict: Optional[dict] = None
         self.last_yielded_content_len: int = 0
@@ -329,70 +241,85 @@ class StructuredStreamingHandler:
         if isinstance(chunk, str) and chunk:
             self.response_content += chunk
             
-            # Try to parse incremental update
-            parsed = parse_response_model_str(
-                self.response_content, self.output_schema
-            )
+            # Only the new chunk is parsed; the parser keeps its state
+            if self._parser.error is None:
+                try:
+                    self._parser.feed(chunk)
+                except JSONSyntaxError as e:
+                    logger.debug(f"Incremental JSON parse failed, rescanning content: {e}")
             
-            if parsed is not None:
-                current_dict = parsed.model_dump()
-                
-                # Get current content length
-                current_content_len = len(self._get_primary_content(current_dict) or "")
-                
-                # Yield if:
-                # 1. First valid parse, OR
-                # 2. Content grew by yield_every_n_chars, OR  
-                # 3. Other fields changed (not just content growing)
-                should_yield = (
-                    self.last_parsed_dict is None or
-                    current_content_len >= self.last_yielded_content_len + self.yield_every_n_chars or
-                    self._non_content_fields_changed(current_dict, self.last_parsed_dict)
-                )
-                
-                if should_yield:
-                    self.last_parsed_dict = current_dict
-                    self.last_valid_model = parsed
-                    self.last_yielded_content_len = current_content_len
-                    return parsed
-                else:
-                    # Update internal state but don't yield
-                    self.last_parsed_dict = current_dict
-                    self.last_valid_model = parsed
+            if self._parser.error is None:
+                data = self._parser.value()
+                if not data:
+                    return None
+                # Only fields the parser touched are converted and compared
+                changed = self._plan.apply(self._values, data, self._parser.pop_changed_keys())
+            else:
+                # Not a single JSON document (e.g. prose with braces before it)
+                parsed = parse_response_model_str(self.response_content, self.output_schema)
+                if parsed is None:
+                    return None
+                changed = self._plan.apply(self._values, parsed.model_dump(by_alias=True))
+            
+            first = self.last_valid_model is None
+            if not changed and not first:
+                return None
+            partial = self._plan.construct(self._values)
+            self.last_valid_model = partial
+            
+            # Yield if:
+            # 1. First valid parse, OR
+            # 2. Content grew by yield_every_n_chars, OR
+            # 3. Other fields changed (not just content growing)
+            primary = self._plan.primary_field
+            content = self._values.get(primary) if primary else None
+            current_content_len = len(content) if isinstance(content, str) else 0
+            should_yield = (
+                first or
+                current_content_len >= self.last_yielded_content_len + self.yield_every_n_chars or
+                bool(changed - {primary})
+            )
+            if should_yield:
+                self.last_yielded_content_len = current_content_len
+                return partial
         
         return None
     
-    def _get_primary_content(self, data: dict) -> Optional[str]:
-        """Get the primary content field from parsed data."""
-        content_fields = ["response", "content", "text", "message", "answer", "output"]
-        for field in content_fields:
-            if field in data and isinstance(data[field], str):
-                return data[field]
-        return None
-    
-    def _non_content_fields_changed(self, new_dict: dict, old_dict: dict) -> bool:
-        """Check if any non-content fields changed."""
-        if old_dict is None:
-            return True
-        content_fields = {"response", "content", "text", "message", "answer", "output"}
-        for key in new_dict:
-            if key not in content_fields:
-                if new_dict.get(key) != old_dict.get(key):
-                    return True
-        return False
-    
     def get_last_valid(self) -> Optional[T]:
         """
         Get the last valid BaseModel instance parsed.
         
+        Partial models from string chunks are built without validation;
+        use `finalize` for the validated final model.
+        
         Returns:
             Last valid BaseModel instance or None
         """
         return self.last_valid_model
     
+    def finalize(self) -> Optional[T]:
+        """
+        Validate the complete streamed output.
+        
+        Runs full `model_validate` once, at the end of the stream. If the
+        output does not validate, the last partial model is returned.
+        
+        Returns:
+            Final BaseModel instance or None
+        """
+        if self.response_content and self._parser.error is None:
+            data = self._parser.value()
+            if data:
+                validated = self._plan.validate(data)
+                if validated is not None:
+                    self.last_valid_model = validated
+        return self.last_valid_model
+    
     def reset(self):
         """Reset the handler state."""
         self.response_content = ""
+        self._parser = IncrementalJSONParser()
+        self._values = self._plan.initial_values()
         self.last_valid_model = None
         self.last_parsed_dict = None
         self.last_yielded_content_len = 0
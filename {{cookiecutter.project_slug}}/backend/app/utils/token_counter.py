@@ -1,13 +1,318 @@
-"""Token counting utility using LangChain's built-in methods."""
-from typing import Any, Dict, List, Optional
+"""
+Token counting utility using LangChain's built-in methods.
 
+`TokenCounter` is the engine behind `count_text_tokens`: one tiktoken
+encoding is loaded per model family (`encoding_for_model`) and shared by
+every model that uses it, so counting never builds an LLM client.
+
+- Counts are memoized by content hash in a bounded LRU per family, so a
+  history that is counted again every turn costs dictionary lookups.
+- `count_many` encodes all uncached texts in one batch and returns a
+  numpy array; `count_messages` adds the chat-format overhead of each
+  message; `fit_suffix` finds the newest messages that fit a budget with
+  one cumulative sum.
+- If the encoding cannot be loaded (tiktoken missing, or its data files
+  unreachable offline), the family falls back to ~4 characters per token
+  once, instead of failing on every call.
+
+Usage:
+    counter = get_token_counter("openai/gpt-4o-mini")
+    counts = counter.count_messages(messages)
+    start = fit_suffix(counts, budget)  # messages[start:] fit
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import orjson
 from langchain_core.language_models.chat_models import BaseChatModel
 
+from app.config import get_settings
 from app.infrastructure.llm_provider import OpenRouterProvider
 from app.utils.logging import get_logger
 
 logger = get_logger("token_counter")
 
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+# Encoding used for models tiktoken does not know (as LangChain's ChatOpenAI does)
+DEFAULT_ENCODING = "cl100k_base"
+
+# Chat-format overhead: per message, per `name` field, and priming the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_PRIMING_TOKENS = 3
+
+# Below this many texts to encode, a loop beats tiktoken's batch thread pool
+_BATCH_MIN_TEXTS = 16
+
+# Message fields counted besides `content`
+_MESSAGE_TEXT_FIELDS = ("role", "name", "tool_call_id")
+
+# Encoding name per model name, resolved once
+_model_encodings: Dict[str, str] = {}
+
+
+def encoding_for_model(model_name: str) -> str:
+    """Tokenizer family (tiktoken encoding name) of a model, e.g. "o200k_base"."""
+    encoding = _model_encodings.get(model_name)
+    if encoding is None:
+        try:
+            import tiktoken
+
+            # OpenRouter names carry a provider prefix ("openai/gpt-4o")
+            encoding = tiktoken.encoding_name_for_model(model_name.rsplit("/", 1)[-1])
+        except (ImportError, KeyError):
+            encoding = DEFAULT_ENCODING
+        _model_encodings[model_name] = encoding
+    return encoding
+
+
+def _estimate_tokens(text: str) -> int:
+    """Very rough fallback: ~4 characters per token."""
+    return len(text) // 4
+
+
+def _message_texts(message: Mapping[str, Any]) -> List[str]:
+    """The texts of a message that are sent to the model."""
+    texts: List[str] = []
+    content = message.get("content")
+    if isinstance(content, str):
+        texts.append(content)
+    elif isinstance(content, list):
+        # Content parts: text is counted as text, anything else as its JSON
+        for part in content:
+            if isinstance(part, str):
+                texts.append(part)
+            elif isinstance(part, Mapping) and isinstance(part.get("text"), str):
+                texts.append(part["text"])
+            else:
+                texts.append(orjson.dumps(part, default=str).decode())
+    elif content:
+        texts.append(orjson.dumps(content, default=str).decode())
+    for key in _MESSAGE_TEXT_FIELDS:
+        value = message.get(key)
+        if value:
+            texts.append(str(value))
+    tool_calls = message.get("tool_calls")
+    if tool_calls:
+        texts.append(orjson.dumps(tool_calls, default=str).decode())
+    return texts
+
+
+def fit_suffix(counts: Sequence[int], budget: int) -> int:
+    """
+    Start of the longest suffix of `counts` whose total fits `budget`.
+
+    Returns:
+        Index of the first kept item (`len(counts)` if none fits)
+    """
+    counts = np.asarray(counts)
+    totals = np.cumsum(counts[::-1])
+    return len(counts) - int(np.searchsorted(totals, budget, side="right"))
+
+
+@dataclass
+class TokenCounterStats:
+    """Statistics for one token counter."""
+
+    hits: int = 0
+    misses: int = 0
+    batches: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert stats to dictionary for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TokenCounter:
+    """
+    Memoized token counts for one tokenizer family.
+
+    Get instances with `get_token_counter`, which keeps one per family.
+
+    Args:
+        encoding_name: tiktoken encoding name
+        cache_size: Counts kept in the LRU (defaults to TOKEN_COUNT_CACHE_SIZE)
+        encoding: Encoding object to use instead of loading one
+    """
+
+    def __init__(
+        self,
+        encoding_name: str,
+        cache_size: Optional[int] = None,
+        encoding: Optional[Any] = None,
+    ):
+        self.encoding_name = encoding_name
+        self.cache_size = cache_size or get_settings().token_count_cache_size
+        self.stats = TokenCounterStats()
+        self._encoding = encoding
+        self._loaded = encoding is not None
+        self._cache: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self) -> Optional[Any]:
+        """The tiktoken encoding, loaded on first use (None if unavailable)."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        import tiktoken
+
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        logger.warning(
+                            f"Tokenizer {self.encoding_name} unavailable, "
+                            f"estimating ~4 characters per token: {e}"
+                        )
+                    self._loaded = True
+        return self._encoding
+
+    @property
+    def estimated(self) -> bool:
+        """Whether counts are estimates because the encoding is unavailable."""
+        return self.encoding is None
+
+    @staticmethod
+    def _key(text: str) -> Hashable:
+        # str caches its hash, so repeated lookups of one string are O(1)
+        return (len(text), hash(text))
+
+    def _encode(self, texts: List[str]) -> List[int]:
+        """Token counts of texts, without the cache."""
+        encoding = self.encoding
+        if encoding is None:
+            return [_estimate_tokens(text) for text in texts]
+        self.stats.batches += 1
+        if len(texts) >= _BATCH_MIN_TEXTS:
+            return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+        return [len(encoding.encode_ordinary(text)) for text in texts]
+
+    def count(self, text: str) -> int:
+        """Token count of one text."""
+        if not text:
+            return 0
+        key = self._key(text)
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+                self.stats.hits += 1
+                return count
+        return int(self.count_many([text])[0])
+
+    def count_many(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Token counts of many texts, encoding the uncached ones in one batch.
+
+        Returns:
+            int64 array aligned with `texts`
+        """
+        counts = np.zeros(len(texts), dtype=np.int64)
+        missing: Dict[Hashable, List[int]] = {}
+        to_encode: List[str] = []
+
+        with self._lock:
+            for index, text in enumerate(texts):
+                if not text:
+                    continue
+                key = self._key(text)
+                count = self._cache.get(key)
+                if count is not None:
+                    self._cache.move_to_end(key)
+                    counts[index] = count
+                    self.stats.hits += 1
+                    continue
+                positions = missing.get(key)
+                if positions is None:
+                    missing[key] = [index]
+                    to_encode.append(text)
+                else:
+                    positions.append(index)
+            self.stats.misses += len(to_encode)
+
+        if not to_encode:
+            return counts
+        encoded = self._encode(to_encode)
+
+        with self._lock:
+            for (key, positions), count in zip(missing.items(), encoded):
+                counts[positions] = count
+                self._cache[key] = count
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return counts
+
+    def count_messages(self, messages: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """
+        Token counts of chat messages, including the chat-format overhead.
+
+        Counts content (text parts, other parts as JSON), role, name,
+        tool_call_id and tool_calls (as JSON) of every message in one batch.
+        Add `REPLY_PRIMING_TOKENS` once for a whole prompt.
+
+        Returns:
+            int64 array with one total per message
+        """
+        texts: List[str] = []
+        owners: List[int] = []
+        overhead = np.full(len(messages), TOKENS_PER_MESSAGE, dtype=np.int64)
+        for index, message in enumerate(messages):
+            message_texts = _message_texts(message)
+            texts.extend(message_texts)
+            owners.extend([index] * len(message_texts))
+            if message.get("name"):
+                overhead[index] += TOKENS_PER_NAME
+
+        counts = self.count_many(texts)
+        totals = np.bincount(np.asarray(owners, dtype=np.int64), weights=counts, minlength=len(messages))
+        return totals.astype(np.int64) + overhead
+
+    def clear(self) -> None:
+        """Drop all memoized counts."""
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+# One counter per tokenizer family
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model_name: str = DEFAULT_MODEL) -> TokenCounter:
+    """Get the token counter for a model's tokenizer family."""
+    encoding_name = encoding_for_model(model_name)
+    counter = _counters.get(encoding_name)
+    if counter is None:
+        with _counters_lock:
+            counter = _counters.get(encoding_name)
+            if counter is None:
+                counter = _counters[encoding_name] = TokenCounter(encoding_name)
+    return counter
+
+
+def get_token_counter_stats() -> Dict[str, Any]:
+    """Get statistics for every token counter (for monitoring)."""
+    return {
+        name: {
+            **counter.stats.to_dict(),
+            "size": len(counter),
+            "estimated": counter._loaded and counter._encoding is None,
+        }
+        for name, counter in list(_counters.items())
+    }
+
 
 def count_tokens_llm(model: BaseChatModel, text: str) -> int:
     """
@@ -38,6 +343,16 @@ def count_tokens_llm(model: BaseChatModel, text: str) -> int:
         return len(text) // 4
 
 
+def count_text_tokens(text: str, model_name: str = DEFAULT_MODEL) -> int:
+    """
+    Count tokens in text with the tokenizer of an OpenRouter model.
+
+    Uses the model family's shared `TokenCounter`, so counts are memoized
+    and no LLM client is involved.
+    """
+    return get_token_counter(model_name).count(text)
+
+
 def count_tokens_in_obj(model: BaseChatModel, content: Any) -> int:
     """Count tokens in text, list, or Pydantic objects."""
     try:
@@ -54,31 +369,23 @@ def count_tokens_in_messages(model: BaseChatModel, messages: List[Dict[str, Any]
     - content (string or list)
     - role (string)
     - name (string)
-    - tool_calls (list)
+    - tool_calls (list, as JSON)
     - tool_call_id (string)
+
+    plus the chat-format overhead of each message and of the reply.
     
     Args:
-        model: LangChain chat model instance
+        model: LangChain chat model instance (its model name selects the tokenizer)
         messages: List of message dictionaries with various fields
     
     Returns:
         Total token count
     """
-    total_tokens = 0
-    for message in messages:
-        # Count tokens in common message fields
-        keys = ["content", "role", "name", "tool_call_id"]
-        for key in keys:
-            value = message.get(key)
-            if value:
-                total_tokens += count_tokens_in_obj(model, value)
-        
-        # Count tokens in tool_calls if present
-        tool_calls = message.get("tool_calls")
-        if tool_calls:
-            total_tokens += count_tokens_in_obj(model, tool_calls)
-    
-    return total_tokens
+    if not messages:
+        return 0
+    model_name = getattr(model, "model_name", None) or DEFAULT_MODEL
+    counts = get_token_counter(model_name).count_messages(messages)
+    return int(counts.sum()) + REPLY_PRIMING_TOKENS
 
 
 def get_model_context_limit(
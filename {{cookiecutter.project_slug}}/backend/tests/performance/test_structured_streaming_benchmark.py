@@ -0,0 +1,142 @@
+"""
+Benchmark of partial JSON parsing for structured streaming.
+
+Compares the incremental parser (each chunk is parsed once) with the
+previous approach, which re-parsed the whole accumulated buffer on every
+chunk with up to ~16 `json.loads` candidates. Outputs of 1KB, 10KB and
+100KB are streamed in 8-character chunks (roughly two tokens each).
+
+Run with:
+    pytest tests/performance/test_structured_streaming_benchmark.py -m performance -s
+"""
+
+import json
+import time
+from typing import Callable, List, Optional
+
+import pytest
+from app.utils.partial_json import IncrementalJSONParser
+
+CHUNK_SIZE = 8
+
+
+def legacy_try_parse_partial_json(text: str) -> Optional[dict]:
+    """The previous full-buffer `try_parse_partial_json`, kept as the baseline."""
+    if not text or not text.strip():
+        return None
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    open_braces = text.count('{') - text.count('}')
+    open_brackets = text.count('[') - text.count(']')
+
+    quote_count = 0
+    escaped = False
+    for c in text:
+        if c == '\\' and not escaped:
+            escaped = True
+            continue
+        if c == '"' and not escaped:
+            quote_count += 1
+        escaped = False
+    in_string = quote_count % 2 == 1
+
+    attempts = []
+    if in_string:
+        base = text + '"'
+        attempts.append(base + ']' * open_brackets + '}' * open_braces)
+        attempts.append(base + '}' * open_braces)
+        attempts.append(base + '"]' + '}' * max(0, open_braces))
+    else:
+        attempts.append(text + ']' * open_brackets + '}' * open_braces)
+        attempts.append(text + '}' * open_braces)
+    attempts.extend([
+        text + '}', text + ']}', text + '"}', text + '"]}', text + '"}]}',
+        text + '": null}', text + '": []}', text + '": {}}', text + '": ""}',
+        text + '": false}', text + '": true}', text + '": 0}', text + ': null}',
+        text + 'null}',
+    ])
+
+    for attempt in attempts:
+        try:
+            result = json.loads(attempt)
+            if isinstance(result, dict):
+                return result
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def structured_output(size: int) -> str:
+    """A customer-support style answer whose `response` is `size` characters long."""
+    sentence = 'Your order ships in 3-5 business days, "tracked" end to end.\n'
+    response = (sentence * (size // len(sentence) + 1))[:size]
+    return json.dumps({
+        "response": response,
+        "sentiment": "neutral",
+        "requires_escalation": False,
+        "suggested_actions": ["Check the order status page", "Contact the carrier"],
+        "confidence": 0.9,
+    })
+
+
+def run_legacy(chunks: List[str]) -> Optional[dict]:
+    buffer = ""
+    result = None
+    for chunk in chunks:
+        buffer += chunk
+        result = legacy_try_parse_partial_json(buffer)
+    return result
+
+
+def run_incremental(chunks: List[str]) -> Optional[dict]:
+    parser = IncrementalJSONParser()
+    result = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        result = parser.value()
+    return result
+
+
+def timed(fn: Callable[[List[str]], Optional[dict]], chunks: List[str]) -> float:
+    start = time.perf_counter()
+    fn(chunks)
+    return time.perf_counter() - start
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize(
+    "size",
+    [1_000, 10_000, pytest.param(100_000, marks=pytest.mark.slow)],
+    ids=["1KB", "10KB", "100KB"],
+)
+def test_incremental_parser_vs_full_rescan(size):
+    """The incremental parser produces the same result, faster, with cost linear in size."""
+    text = structured_output(size)
+    chunks = [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+
+    assert run_incremental(chunks) == run_legacy(chunks) == json.loads(text)
+
+    incremental = timed(run_incremental, chunks)
+    legacy = timed(run_legacy, chunks)
+    print(
+        f"\n{size // 1000}KB ({len(chunks)} chunks): incremental {incremental * 1000:.1f}ms, "
+        f"full rescan {legacy * 1000:.1f}ms ({legacy / incremental:.0f}x)"
+    )
+
+    assert incremental < legacy
+
+
+@pytest.mark.performance
+def test_incremental_parser_scales_linearly():
+    """Ten times the output costs roughly ten times as much, not a hundred."""
+    times = {}
+    for size in (10_000, 100_000):
+        text = structured_output(size)
+        chunks = [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+        times[size] = min(timed(run_incremental, chunks) for _ in range(3))
+
+    assert times[100_000] < times[10_000] * 30
@@ -0,0 +1,169 @@
+"""
+Unit tests for the LLM admission controller.
+
+Tests cover priority ordering, AIMD adaptation on 429 responses and TTFT
+degradation, Retry-After pauses and the queue timeout.
+"""
+
+import asyncio
+import time
+
+import pytest
+from app.infrastructure.admission import (
+    AdmissionController,
+    AdmissionTimeoutError,
+    Priority,
+    get_retry_after,
+)
+
+MODEL = "openai/gpt-4o-mini"
+
+
+class RateLimited(Exception):
+    """Stand-in for an upstream 429 error."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: str = ""):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after}})()
+
+
+@pytest.mark.unit
+class TestAdmissionController:
+    """Test AdmissionController class."""
+
+    @pytest.mark.asyncio
+    async def test_priority_ordering(self):
+        """Queued interactive streams are admitted before sync and background calls."""
+        controller = AdmissionController(initial_limit=1, max_limit=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def call(name: str, priority: Priority):
+            async with controller.admit(MODEL, priority):
+                order.append(name)
+                await gate.wait()
+
+        holder = asyncio.create_task(call("holder", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(call("background", Priority.BACKGROUND)),
+            asyncio.create_task(call("sync", Priority.INTERACTIVE_SYNC)),
+            asyncio.create_task(call("stream", Priority.INTERACTIVE_STREAM)),
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(holder, *waiters)
+
+        assert order == ["holder", "stream", "sync", "background"]
+        assert controller.stats()[MODEL]["admitted"] == 4
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_halves_limit(self):
+        """A 429 halves the model's concurrency limit."""
+        controller = AdmissionController(initial_limit=8)
+
+        async def fail():
+            raise RateLimited()
+
+        with pytest.raises(RateLimited):
+            await controller.run(MODEL, Priority.INTERACTIVE_SYNC, fail)
+
+        stats = controller.stats()[MODEL]
+        assert stats["limit"] == 4
+        assert stats["rate_limited"] == 1
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_success_increases_limit(self):
+        """Successful calls grow the limit additively."""
+        controller = AdmissionController(initial_limit=2, max_limit=4)
+
+        async def ok():
+            return "ok"
+
+        for _ in range(4):
+            assert await controller.run(MODEL, Priority.BACKGROUND, ok) == "ok"
+
+        assert 2 < controller.limiter(MODEL).limit <= 4
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_admission(self):
+        """Admissions for a model pause until Retry-After has passed."""
+        controller = AdmissionController(initial_limit=4)
+        limiter = controller.limiter(MODEL)
+
+        await limiter.acquire(Priority.INTERACTIVE_SYNC, None)
+        limiter.release(None, retry_after=0.2)
+
+        start = time.perf_counter()
+        async with controller.admit(MODEL, Priority.INTERACTIVE_SYNC):
+            pass
+        assert time.perf_counter() - start >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """A call that cannot be admitted in time raises AdmissionTimeoutError."""
+        controller = AdmissionController(initial_limit=1, max_limit=1, queue_timeout=0.05)
+        await controller.limiter(MODEL).acquire(Priority.BACKGROUND, None)
+
+        with pytest.raises(AdmissionTimeoutError) as exc_info:
+            async with controller.admit(MODEL, Priority.INTERACTIVE_SYNC):
+                pass
+
+        assert exc_info.value.retry_after >= 1.0
+        stats = controller.stats()[MODEL]
+        assert stats["timeouts"] == 1
+        assert stats["queued"] == 0
+
+    def test_completion_latency_does_not_shrink_limit(self):
+        """Long non-streamed calls are not a congestion signal."""
+        limiter = AdmissionController(initial_limit=8, max_limit=64).limiter(MODEL)
+
+        for _ in range(20):
+            limiter.in_flight += 1
+            limiter.release(None, None, success=True)
+
+        assert limiter.limit > 8
+        assert limiter.baseline_latency is None
+
+    def test_ttft_degradation_shrinks_limit(self):
+        """A TTFT well above the recent median shrinks the limit; normal spread does not."""
+        limiter = AdmissionController(initial_limit=8, max_limit=64).limiter(MODEL)
+
+        for ttft in [0.2, 0.3, 0.25, 0.35, 0.2, 0.3, 0.4, 0.25, 0.3, 0.2] * 3:
+            limiter.in_flight += 1
+            limiter.release(ttft, None, success=True)
+        grown = limiter.limit
+        assert grown > 8
+        assert limiter.baseline_latency == pytest.approx(0.275)
+
+        limiter.in_flight += 1
+        limiter.release(2.0, None, success=True)
+
+        assert limiter.limit == pytest.approx(grown * 0.9)
+
+    @pytest.mark.asyncio
+    async def test_disabled_controller_passes_through(self):
+        """A disabled controller admits everything without tracking."""
+        controller = AdmissionController(enabled=False)
+
+        async with controller.admit(MODEL):
+            pass
+
+        assert controller.stats() == {}
+
+
+@pytest.mark.unit
+class TestGetRetryAfter:
+    """Test Retry-After extraction."""
+
+    def test_seconds_header(self):
+        assert get_retry_after(RateLimited("3")) == 3.0
+
+    def test_missing_header(self):
+        assert get_retry_after(RateLimited()) == 0.0
+
+    def test_not_rate_limited(self):
+        assert get_retry_after(ValueError("boom")) is None
@@ -0,0 +1,113 @@
+"""
+Unit tests for the agent pool.
+
+Tests cover reuse per (name, config, provider), LRU and idle eviction,
+invalidation on re-registration, and pre-warming through the registry.
+"""
+
+from typing import Any, Dict
+
+import pytest
+from app.agents import pool as pool_module
+from app.agents.base import AgentConfig, BaseAgent
+from app.agents.pool import AgentPool
+from app.agents.registry import AgentNotFoundError, AgentRegistry
+from pydantic import BaseModel
+
+
+class EchoResponse(BaseModel):
+    response: str
+
+
+class EchoAgent(BaseAgent[EchoResponse]):
+    """Agent that skips LLM setup and counts how often it is built."""
+
+    name = "echo"
+    description = "Echoes messages"
+    system_prompt = ""
+    response_model = EchoResponse
+    builds = 0
+
+    def __init__(self, llm_provider=None, config=None):
+        type(self).builds += 1
+        self.config = config or AgentConfig()
+        self.llm_provider = llm_provider
+
+    def _process_response(self, result: Dict[str, Any]) -> EchoResponse:
+        return EchoResponse(response=str(result))
+
+
+class FakeProvider:
+    """Stand-in for OpenRouterProvider."""
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A registry holding only EchoAgent, with a fresh pool."""
+    monkeypatch.setattr(AgentRegistry, "_agents", {})
+    monkeypatch.setattr(AgentRegistry, "_metadata", {})
+    monkeypatch.setattr(pool_module, "_pool", AgentPool(max_size=8, idle_ttl_seconds=0))
+    EchoAgent.builds = 0
+    AgentRegistry.register_class("echo", EchoAgent)
+    return AgentRegistry
+
+
+@pytest.mark.unit
+class TestAgentPool:
+    """Test AgentPool class."""
+
+    def test_reuses_instance_per_config(self, registry):
+        provider = FakeProvider()
+
+        first = registry.acquire("echo", provider)
+        again = registry.acquire("echo", provider, AgentConfig())
+        other = registry.acquire("echo", provider, AgentConfig(temperature=0.0))
+
+        assert first is again
+        assert other is not first and other.config.temperature == 0.0
+        assert EchoAgent.builds == 2
+        assert pool_module.get_agent_pool_stats()["hits"] == 1
+
+    def test_evicts_least_recently_used(self):
+        pool = AgentPool(max_size=2, idle_ttl_seconds=0)
+        provider = FakeProvider()
+        configs = [AgentConfig(temperature=t) for t in (0.1, 0.2, 0.3)]
+
+        agents = [pool.get("echo", c, provider, lambda c=c: EchoAgent(provider, c)) for c in configs[:2]]
+        pool.get("echo", configs[0], provider, lambda: EchoAgent(provider, configs[0]))  # touch
+        pool.get("echo", configs[2], provider, lambda: EchoAgent(provider, configs[2]))
+
+        assert len(pool) == 2
+        assert pool.get("echo", configs[0], provider, lambda: None) is agents[0]
+        assert pool.stats()["evictions"] == 1
+
+    def test_evicts_idle_instances(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(pool_module.time, "monotonic", lambda: clock[0])
+        pool = AgentPool(max_size=8, idle_ttl_seconds=60)
+        provider = FakeProvider()
+
+        first = pool.get("echo", AgentConfig(), provider, lambda: EchoAgent(provider))
+        clock[0] += 61
+        second = pool.get("echo", AgentConfig(), provider, lambda: EchoAgent(provider))
+
+        assert second is not first
+        assert pool.stats()["evictions"] == 1
+
+    def test_reregistering_drops_instances(self, registry):
+        provider = FakeProvider()
+        first = registry.acquire("echo", provider)
+
+        registry.register_class("echo", EchoAgent)
+
+        assert registry.acquire("echo", provider) is not first
+
+    def test_warm_up_builds_registered_agents(self, registry):
+        provider = FakeProvider()
+
+        assert registry.warm_up(llm_provider=provider) == ["echo"]
+        assert registry.warm_up(["echo", "missing"], llm_provider=provider) == ["echo"]
+        assert EchoAgent.builds == 1
+
+        with pytest.raises(AgentNotFoundError):
+            registry.acquire("missing", provider)
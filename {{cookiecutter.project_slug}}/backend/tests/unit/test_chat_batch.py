@@ -0,0 +1,108 @@
+"""
+Unit tests for the batch chat endpoint.
+
+Tests cover the batch size limit, per-item rate limiting, NDJSON results
+in completion order and cancellation of unfinished items when the client
+disconnects. `_generate_response` is replaced by a fake with scripted
+delays per message.
+"""
+
+import asyncio
+from typing import Dict, List
+
+import orjson
+import pytest
+from app.api.v1 import chat as chat_module
+from app.api.v1.chat import BatchChatItem, BatchChatRequest
+from app.config import get_settings
+from app.main import app
+from app.middleware.rate_limit import limiter
+from app.security.clerk_auth import ClerkUser, require_current_user
+from fastapi.testclient import TestClient
+
+
+class FakeGenerate:
+    """`_generate_response` replacement: sleeps the delay named by the message."""
+
+    def __init__(self):
+        self.started: List[str] = []
+        self.cancelled: List[str] = []
+
+    async def __call__(self, message: str, model: str, temperature: float, **kwargs):
+        self.started.append(message)
+        try:
+            await asyncio.sleep(float(message))
+        except asyncio.CancelledError:
+            self.cancelled.append(message)
+            raise
+        return f"answer to {message}", False
+
+
+def batch(*delays: float) -> Dict:
+    return {"items": [{"message": str(delay)} for delay in delays]}
+
+
+def lines(body: bytes) -> List[Dict]:
+    return [orjson.loads(line) for line in body.splitlines()]
+
+
+@pytest.fixture
+def generate(monkeypatch) -> FakeGenerate:
+    fake = FakeGenerate()
+    monkeypatch.setattr(chat_module, "_generate_response", fake)
+    return fake
+
+
+@pytest.fixture
+def batch_client(generate):
+    limiter.reset()
+    app.dependency_overrides[require_current_user] = lambda: ClerkUser({"sub": "batch_user"})
+    yield TestClient(app)
+    app.dependency_overrides.pop(require_current_user, None)
+    limiter.reset()
+
+
+@pytest.mark.unit
+class TestChatBatch:
+    """Test the /chat/batch endpoint."""
+
+    def test_results_stream_in_completion_order(self, batch_client: TestClient):
+        response = batch_client.post("/api/v1/chat/batch", json=batch(0.1, 0.0, 0.05))
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        results = lines(response.content)
+        assert [result["index"] for result in results] == [1, 2, 0]
+        assert results[0]["response"] == "answer to 0.0"
+        assert all(result["error"] is None for result in results)
+
+    def test_rejects_oversized_batch(self, batch_client: TestClient, monkeypatch):
+        monkeypatch.setattr(get_settings(), "chat_batch_max_items", 2)
+
+        response = batch_client.post("/api/v1/chat/batch", json=batch(0, 0, 0))
+
+        assert response.status_code == 422
+
+    def test_rate_limit_counts_items(self, batch_client: TestClient):
+        # RateLimits.BATCH allows 60 items per minute
+        assert batch_client.post("/api/v1/chat/batch", json=batch(*[0] * 40)).status_code == 200
+        assert batch_client.post("/api/v1/chat/batch", json=batch(*[0] * 20)).status_code == 200
+        assert batch_client.post("/api/v1/chat/batch", json=batch(0)).status_code == 429
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_disconnect_cancels_unfinished_items(generate):
+    """Closing the response stream cancels the items that are still running."""
+    body = BatchChatRequest(items=[BatchChatItem(message=delay) for delay in ("0", "5", "5")])
+
+    # Undecorated endpoint: the rate limit is covered above
+    response = await chat_module.chat_batch.__wrapped__(
+        request=None, request_body=body, current_user=ClerkUser({"sub": "batch_user"})
+    )
+    first = await response.body_iterator.__anext__()
+    await response.body_iterator.aclose()
+    await asyncio.sleep(0)
+
+    assert orjson.loads(first)["index"] == 0
+    assert sorted(generate.cancelled) == ["5", "5"]
@@ -0,0 +1,93 @@
+"""
+Unit tests for the multiplexed WebSocket chat transport.
+
+Tests cover the per-stream flow-control window and the socket protocol
+(multiplexed streams, acks, cancellation) against the mock LLM server.
+"""
+
+import asyncio
+
+import pytest
+from app.api.v1.chat_ws import ChatStream
+from app.config import get_settings
+from app.infrastructure.llm_provider import clear_llm_caches
+from app.main import app
+from app.mock_llm import MockLLMConfig, MockLLMServer, ResponseFixture
+from app.security.clerk_auth import ClerkUser, require_websocket_user
+from fastapi.testclient import TestClient
+
+
+@pytest.mark.unit
+class TestChatStream:
+    """Test ChatStream flow control."""
+
+    @pytest.mark.asyncio
+    async def test_window_blocks_until_ack(self):
+        stream = ChatStream("s1", max_unacked=2)
+        stream.next_seq()
+        stream.next_seq()
+
+        waiter = asyncio.ensure_future(stream.wait_for_window())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        stream.ack(1)
+        await asyncio.wait_for(waiter, 1.0)
+        assert stream.unacked == 1
+
+    def test_acks_are_cumulative_and_bounded(self):
+        stream = ChatStream("s1", max_unacked=4)
+        for _ in range(3):
+            stream.next_seq()
+
+        stream.ack(2)
+        stream.ack(1)  # Stale ack is ignored
+        assert stream.acked == 2
+        stream.ack(10)  # Cannot acknowledge frames never sent
+        assert stream.acked == 3
+
+
+@pytest.mark.unit
+class TestChatSocket:
+    """Test the socket protocol against the mock LLM server."""
+
+    @pytest.fixture
+    def ws_client(self, monkeypatch):
+        config = MockLLMConfig(
+            ttft_ms=10,
+            tokens_per_second=200,
+            fixtures=[ResponseFixture(match="long", content=" ".join(["word"] * 200))],
+        )
+        with MockLLMServer(config) as server:
+            settings = get_settings()
+            monkeypatch.setattr(settings, "openrouter_base_url", server.base_url)
+            monkeypatch.setattr(settings, "openrouter_api_key", "mock-key")
+            monkeypatch.setattr(settings, "ws_max_unacked_frames", 2)
+            clear_llm_caches()
+            app.dependency_overrides[require_websocket_user] = lambda: ClerkUser({"sub": "ws_user"})
+            yield TestClient(app)
+            app.dependency_overrides.pop(require_websocket_user, None)
+            clear_llm_caches()
+
+    def test_multiplexed_streams_with_flow_control(self, ws_client: TestClient):
+        with ws_client.websocket_connect("/api/v1/chat/ws") as ws:
+            assert ws.receive_json()["type"] == "ready"
+            ws.send_json({"type": "start", "stream_id": "short", "message": "hello"})
+            ws.send_json({"type": "start", "stream_id": "long", "message": "long answer"})
+
+            frames = {"short": [], "long": []}
+            while not frames["short"] or frames["short"][-1]["type"] != "done":
+                message = ws.receive_json()
+                frames[message["stream_id"]].append(message)
+                if message["stream_id"] == "short":
+                    ws.send_json({"type": "ack", "stream_id": "short", "seq": message["seq"]})
+
+            # The unacknowledged stream stalls at the window
+            assert [frame["seq"] for frame in frames["long"]] == [1, 2]
+
+            ws.send_json({"type": "cancel", "stream_id": "long"})
+            while True:
+                message = ws.receive_json()
+                if message["type"] != "chunk":
+                    break
+            assert message == {"type": "cancelled", "stream_id": "long"}
@@ -0,0 +1,78 @@
+"""
+Unit tests for EmbeddingBatcher.
+
+Tests cover request coalescing, chunking of oversized inputs,
+result fan-out order and error propagation.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+from app.infrastructure.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEmbeddingAPI:
+    """Records upstream batches and returns one-dimensional vectors."""
+
+    def __init__(self, fail: bool = False):
+        self.batches: List[List[str]] = []
+        self.fail = fail
+
+    async def __call__(self, texts: List[str]) -> List[List[float]]:
+        self.batches.append(list(texts))
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise Exception("API request failed: 500 - boom")
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestEmbeddingBatcher:
+    """Test EmbeddingBatcher class."""
+
+    async def test_concurrent_queries_are_coalesced(self):
+        """Concurrent single-text calls share upstream requests."""
+        api = FakeEmbeddingAPI()
+        batcher = EmbeddingBatcher(api, max_batch_size=8, max_wait_ms=20)
+
+        results = await asyncio.gather(
+            *[batcher.embed(["x" * i]) for i in range(20)]
+        )
+
+        assert [vectors[0][0] for vectors in results] == [float(i) for i in range(20)]
+        assert [len(batch) for batch in api.batches] == [8, 8, 4]
+
+    async def test_oversized_input_is_chunked(self):
+        """A large input is split into bounded chunks, preserving order."""
+        api = FakeEmbeddingAPI()
+        batcher = EmbeddingBatcher(api, max_batch_size=4, max_wait_ms=1)
+
+        texts = ["a" * i for i in range(10)]
+        vectors = await batcher.embed(texts)
+
+        assert [v[0] for v in vectors] == [float(i) for i in range(10)]
+        assert all(len(batch) <= 4 for batch in api.batches)
+        assert sum(len(batch) for batch in api.batches) == 10
+
+    async def test_errors_reach_every_caller(self):
+        """A failed batch raises in every caller that shared it."""
+        api = FakeEmbeddingAPI(fail=True)
+        batcher = EmbeddingBatcher(api, max_batch_size=8, max_wait_ms=5)
+
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+        )
+
+        assert len(api.batches) == 1
+        assert all(isinstance(r, Exception) for r in results)
+        assert batcher.stats()["failed_batches"] == 1
+
+    async def test_empty_input(self):
+        """Empty input returns immediately without an upstream call."""
+        api = FakeEmbeddingAPI()
+        batcher = EmbeddingBatcher(api)
+
+        assert await batcher.embed([]) == []
+        assert api.batches == []
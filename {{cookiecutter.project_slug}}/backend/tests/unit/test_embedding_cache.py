@@ -0,0 +1,102 @@
+"""
+Unit tests for EmbeddingCache.
+
+Tests cover memory-tier hits, persistence of the memory-mapped disk tier
+across instances, visibility of entries written by another worker,
+recovery from torn writes, and async lookups running off the event loop.
+"""
+
+import threading
+
+import numpy as np
+import pytest
+from app.infrastructure.embedding_cache import EmbeddingCache
+from app.infrastructure.llm_provider import OpenRouterEmbeddings
+
+MODEL = "openai/text-embedding-3-small"
+
+
+@pytest.mark.unit
+class TestEmbeddingCache:
+    """Test EmbeddingCache class."""
+
+    def test_memory_hit(self, tmp_path):
+        """A stored vector is served from memory on the next lookup."""
+        cache = EmbeddingCache(memory_size=10, directory=str(tmp_path))
+        cache.put_many(MODEL, ["hello"], [[0.1, 0.2, 0.3]])
+
+        vector, missing = cache.get_many(MODEL, ["hello", "other"])
+
+        assert np.allclose(vector, [0.1, 0.2, 0.3])
+        assert vector.dtype == np.float32
+        assert missing is None
+        stats = cache.stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """A new instance reads vectors written by a previous one."""
+        EmbeddingCache(directory=str(tmp_path)).put_many(
+            MODEL, ["a", "b"], [[1.0, 2.0], [3.0, 4.0, 5.0]]
+        )
+
+        cache = EmbeddingCache(directory=str(tmp_path))
+        a, b = cache.get_many(MODEL, ["a", "b"])
+
+        assert a.tolist() == [1.0, 2.0]
+        assert b.tolist() == [3.0, 4.0, 5.0]
+        assert cache.stats()["disk_hits"] == 2
+
+    def test_sees_writes_from_other_workers(self, tmp_path):
+        """Entries appended by another process are picked up on lookup."""
+        reader = EmbeddingCache(directory=str(tmp_path))
+        assert reader.get_many(MODEL, ["x"]) == [None]
+
+        EmbeddingCache(directory=str(tmp_path)).put_many(MODEL, ["x"], [[7.0]])
+
+        assert reader.get_many(MODEL, ["x"])[0].tolist() == [7.0]
+
+    def test_duplicate_writes_are_skipped(self, tmp_path):
+        """Storing the same text twice appends it to disk only once."""
+        cache = EmbeddingCache(directory=str(tmp_path))
+        cache.put_many(MODEL, ["a"], [[1.0]])
+        cache.put_many(MODEL, ["a"], [[1.0]])
+
+        assert cache.stats()["writes"] == 1
+
+    def test_torn_tails_are_truncated_before_appending(self, tmp_path):
+        """A half-written record from a crashed writer does not misalign later ones."""
+        EmbeddingCache(directory=str(tmp_path)).put_many(MODEL, ["a"], [[1.0, 2.0]])
+        store = next(tmp_path.rglob("*.idx"))
+        with open(store, "ab") as f:
+            f.write(b"\x01" * 20)
+        with open(store.with_suffix(".f32"), "ab") as f:
+            f.write(b"\x02\x03")
+
+        EmbeddingCache(directory=str(tmp_path)).put_many(MODEL, ["b"], [[3.0]])
+
+        cache = EmbeddingCache(directory=str(tmp_path))
+        a, b = cache.get_many(MODEL, ["a", "b"])
+        assert a.tolist() == [1.0, 2.0]
+        assert b.tolist() == [3.0]
+        assert len(cache._store(MODEL)) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestCachedEmbeddings:
+    """Test OpenRouterEmbeddings with the cache."""
+
+    async def test_async_lookup_runs_off_the_event_loop(self, tmp_path):
+        """Cached vectors are read in a worker thread, not on the loop."""
+        embeddings = OpenRouterEmbeddings(api_key="sk-test", model=MODEL)
+        embeddings._cache = cache = EmbeddingCache(memory_size=0, directory=str(tmp_path))
+        cache.put_many(MODEL, ["a", "b"], [[1.0, 2.0], [3.0]])
+        threads = []
+        get_many = cache.get_many
+        cache.get_many = lambda *args: threads.append(threading.get_ident()) or get_many(*args)
+
+        vectors = await embeddings.aembed_documents(["b", "a", "b"])
+
+        assert vectors == [[3.0], [1.0, 2.0], [3.0]]
+        assert threads and threading.get_ident() not in threads
@@ -0,0 +1,117 @@
+"""
+Unit tests for HedgedChatModel.
+
+Tests cover hedging a slow primary, keeping a fast primary, failover on
+errors, accounting of tokens wasted on cancelled requests and TTFT-based
+hedge delays.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+from app.infrastructure.hedging import HedgedChatModel, TTFTTracker, get_hedging_stats
+from langchain_core.messages import AIMessageChunk
+
+
+class FakeStreamingModel:
+    """Streams fixed tokens after a first-token delay."""
+
+    def __init__(self, tokens: List[str], ttft: float, fail: bool = False):
+        self.tokens = tokens
+        self.ttft = ttft
+        self.fail = fail
+        self.cancelled = False
+
+    async def astream(self, input, config=None, **kwargs):
+        try:
+            await asyncio.sleep(self.ttft)
+            if self.fail:
+                raise RuntimeError("upstream error")
+            for token in self.tokens:
+                yield AIMessageChunk(content=token)
+                await asyncio.sleep(0.001)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def make_model(llms, delay: float = 0.02) -> HedgedChatModel:
+    return HedgedChatModel(
+        [f"model-{i}" for i in range(len(llms))],
+        llms,
+        default_delay=delay,
+        tracker=TTFTTracker(),
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestHedgedChatModel:
+    """Test HedgedChatModel class."""
+
+    async def test_slow_primary_is_hedged(self):
+        """The backup wins when the primary is slower than the hedge delay."""
+        slow = FakeStreamingModel(["slow"], ttft=0.5)
+        fast = FakeStreamingModel(["fa", "st"], ttft=0.01)
+
+        message = await make_model([slow, fast]).ainvoke("hi")
+
+        assert message.content == "fast"
+        await asyncio.sleep(0)
+        assert slow.cancelled
+
+    async def test_cancelled_request_counts_wasted_tokens(self):
+        """The loser's billed prompt is counted as wasted even without a token."""
+        before = get_hedging_stats()
+        slow = FakeStreamingModel(["slow"], ttft=0.5)
+        fast = FakeStreamingModel(["fast"], ttft=0.01)
+
+        await make_model([slow, fast]).ainvoke([("system", "Be brief."), ("human", "Summarise the report")])
+
+        after = get_hedging_stats()
+        assert after["wasted_prompt_tokens"] > before["wasted_prompt_tokens"]
+        assert after["wasted_completion_tokens"] == before["wasted_completion_tokens"]
+        assert after["wasted_tokens"] > before["wasted_tokens"]
+
+    async def test_fast_primary_is_not_hedged(self):
+        """No backup request is made when the primary answers in time."""
+        primary = FakeStreamingModel(["ok"], ttft=0.001)
+        backup = FakeStreamingModel(["backup"], ttft=0.001)
+
+        chunks = [chunk.content async for chunk in make_model([primary, backup], delay=0.2).astream("hi")]
+
+        assert chunks == ["ok"]
+        assert not backup.cancelled
+
+    async def test_failed_primary_fails_over(self):
+        """An error before the first token starts the next model immediately."""
+        broken = FakeStreamingModel([], ttft=0.001, fail=True)
+        backup = FakeStreamingModel(["backup"], ttft=0.001)
+
+        message = await make_model([broken, backup], delay=5).ainvoke("hi")
+
+        assert message.content == "backup"
+
+    async def test_all_models_fail(self):
+        """The last error is raised when every model fails."""
+        models = [FakeStreamingModel([], ttft=0.001, fail=True) for _ in range(2)]
+
+        with pytest.raises(RuntimeError):
+            await make_model(models).ainvoke("hi")
+
+
+@pytest.mark.unit
+def test_hedge_delay_uses_ttft_percentile():
+    """Once enough samples exist the delay follows the TTFT percentile."""
+    tracker = TTFTTracker()
+    model = HedgedChatModel(
+        ["a"], [None], percentile=90, min_delay=0.0, max_delay=10.0,
+        default_delay=2.0, min_samples=10, tracker=tracker,
+    )
+    assert model.hedge_delay("a") == 2.0
+
+    for i in range(1, 11):
+        tracker.record("a", i / 10)
+
+    assert model.hedge_delay("a") == pytest.approx(0.91)
@@ -0,0 +1,134 @@
+"""
+Unit tests for delta-encoded structured streams.
+
+Tests cover patch generation and application (including the `append`
+extension), the encoder's snapshot/patch frames, and reassembling an
+SSE stream on the client side.
+"""
+
+import copy
+import random
+from typing import List
+
+import orjson
+import pytest
+from app.utils.json_patch import (
+    DeltaEncoder,
+    PatchError,
+    StreamAssembler,
+    apply_patch,
+    diff,
+    reassemble_stream,
+)
+from app.utils.sse import SSEWriter
+from pydantic import BaseModel, Field
+
+
+class Reply(BaseModel):
+    response: str = ""
+    tags: List[str] = Field(default_factory=list)
+    confidence: float = 0.0
+
+
+def _random_document(rnd: random.Random, depth: int = 0):
+    roll = rnd.random()
+    if depth > 2 or roll < 0.4:
+        return rnd.choice([rnd.randint(0, 9), "ab"[: rnd.randint(0, 2)] + "x" * rnd.randint(0, 3), None, True])
+    if roll < 0.7:
+        return [_random_document(rnd, depth + 1) for _ in range(rnd.randint(0, 3))]
+    return {rnd.choice(["a", "b/c", "d~e"]): _random_document(rnd, depth + 1) for _ in range(rnd.randint(0, 3))}
+
+
+@pytest.mark.unit
+class TestDiff:
+    """Test diff and apply_patch functions."""
+
+    def test_growing_string_becomes_append(self):
+        ops = diff({"response": "Hel", "n": 1}, {"response": "Hello", "n": 2})
+
+        assert ops == [
+            {"op": "append", "path": "/response", "value": "lo"},
+            {"op": "replace", "path": "/n", "value": 2},
+        ]
+
+    def test_arrays_and_escaped_keys(self):
+        old = {"tags": ["a", "b"], "a/b": {"x~": 1}}
+        new = {"tags": ["a", "bc", "d"], "a/b": {}}
+
+        ops = diff(old, new)
+
+        assert {"op": "append", "path": "/tags/1", "value": "c"} in ops
+        assert {"op": "add", "path": "/tags/-", "value": "d"} in ops
+        assert {"op": "remove", "path": "/a~1b/x~0"} in ops
+        assert apply_patch(copy.deepcopy(old), ops) == new
+
+    def test_round_trip_random_documents(self):
+        rnd = random.Random(0)
+        for _ in range(500):
+            old, new = _random_document(rnd), _random_document(rnd)
+            assert apply_patch(copy.deepcopy(old), diff(old, new)) == new
+
+    def test_invalid_patch_raises(self):
+        with pytest.raises(PatchError):
+            apply_patch({"a": 1}, [{"op": "append", "path": "/a", "value": "x"}])
+        with pytest.raises(PatchError):
+            apply_patch({"a": 1}, [{"op": "remove", "path": "/b"}])
+
+
+@pytest.mark.unit
+class TestDeltaEncoder:
+    """Test DeltaEncoder and StreamAssembler classes."""
+
+    def test_snapshot_then_patches(self):
+        encoder = DeltaEncoder()
+
+        first = encoder.encode(Reply(response="We"))
+        second = encoder.frame([Reply(response="We wi"), Reply(response="We will", tags=["x"])])
+
+        assert first == {"snapshot": {"response": "We", "tags": [], "confidence": 0.0}, "done": False}
+        assert second["patch"] == [
+            {"op": "append", "path": "/response", "value": " will"},
+            {"op": "add", "path": "/tags/-", "value": "x"},
+        ]
+
+    def test_assembler_verifies_final_object(self):
+        assembler = StreamAssembler()
+        assembler.feed({"snapshot": {"response": "a"}, "done": False})
+        assembler.feed({"patch": [{"op": "append", "path": "/response", "value": "b"}], "done": False})
+
+        assert assembler.feed({"data": {"response": "ab"}, "done": True}) == {"response": "ab"}
+        assert assembler.done and assembler.verified
+
+        mismatched = StreamAssembler()
+        mismatched.feed({"snapshot": {"response": "a"}, "done": False})
+        mismatched.feed({"data": {"response": "b"}, "done": True})
+        assert mismatched.verified is False
+        assert mismatched.document == {"response": "b"}
+
+    @pytest.mark.asyncio
+    async def test_sse_stream_round_trip(self):
+        """Frames from SSEWriter reassemble to the final object with less data on the wire."""
+        text = "Your order ships in 3-5 business days. " * 40
+        partials = [Reply(response=text[:i]) for i in range(5, len(text), 5)]
+        partials.append(Reply(response=text, tags=["shipping"], confidence=0.9))
+
+        async def source():
+            for partial in partials:
+                yield partial
+
+        writer = SSEWriter(coalesce_ms=0, heartbeat_seconds=0)
+        encoder = DeltaEncoder()
+        frames = [frame async for frame in writer.stream(source(), payload=encoder.frame)]
+        frames.append(writer.event({"data": writer.last.model_dump(mode="json"), "done": True}))
+
+        async def lines():
+            for frame in frames:
+                for line in frame.decode().split("\n"):
+                    yield line
+
+        assembler = await reassemble_stream(lines())
+
+        assert assembler.verified
+        assert assembler.document == partials[-1].model_dump(mode="json")
+        full_frames = sum(len(orjson.dumps(p.model_dump())) for p in partials)
+        assert sum(len(frame) for frame in frames) < full_frames / 5
@@ -0,0 +1,105 @@
+"""
+Unit tests for the LLM client and chain caches.
+
+Tests cover LRU behaviour of LLMClientCache, reuse of configured LLMs and
+chat chains per configuration, key isolation and clear_llm_caches.
+"""
+
+import pytest
+from app.infrastructure import llm_provider as provider_module
+from app.infrastructure.llm_provider import (
+    LLMClientCache,
+    OpenRouterProvider,
+    clear_llm_caches,
+    get_llm_cache_stats,
+)
+
+
+@pytest.fixture
+def provider(monkeypatch) -> OpenRouterProvider:
+    """Provider with fresh, empty process-wide caches."""
+    monkeypatch.setattr(provider_module, "_llm_cache", LLMClientCache("llms", 16))
+    monkeypatch.setattr(provider_module, "_chain_cache", LLMClientCache("chains", 16))
+    return OpenRouterProvider(api_key="sk-test-one")
+
+
+@pytest.mark.unit
+class TestLLMClientCache:
+    """Test LLMClientCache class."""
+
+    def test_hits_and_misses(self):
+        cache = LLMClientCache("test", max_size=4)
+        builds = []
+
+        first = cache.get_or_create("a", lambda: builds.append("a") or object())
+        again = cache.get_or_create("a", lambda: builds.append("a") or object())
+
+        assert first is again and builds == ["a"]
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LLMClientCache("test", max_size=2)
+        cache.get_or_create("a", lambda: "A")
+        cache.get_or_create("b", lambda: "B")
+        cache.get_or_create("a", lambda: "unused")  # touch
+        cache.get_or_create("c", lambda: "C")
+
+        assert len(cache) == 2
+        assert cache.get_or_create("a", lambda: "rebuilt") == "A"
+        assert cache.get_or_create("b", lambda: "rebuilt") == "rebuilt"
+        assert cache.stats()["evictions"] == 2
+
+    def test_clear_keeps_stats(self):
+        cache = LLMClientCache("test")
+        cache.get_or_create("a", lambda: "A")
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.unit
+class TestCachedProvider:
+    """Test caching in OpenRouterProvider."""
+
+    def test_same_config_reuses_llm(self, provider):
+        llm = provider.get_llm("openai/gpt-4o-mini", temperature=0.2)
+
+        assert provider.get_llm("openai/gpt-4o-mini", temperature=0.2) is llm
+        # A second provider with the same key shares the instance
+        assert OpenRouterProvider(api_key="sk-test-one").get_llm("openai/gpt-4o-mini", temperature=0.2) is llm
+        assert provider.get_llm("openai/gpt-4o-mini", temperature=0.2, use_cache=False) is not llm
+
+    def test_keys_isolate_configurations(self, provider):
+        llm = provider.get_llm("openai/gpt-4o-mini", temperature=0.2)
+
+        assert provider.get_llm("openai/gpt-4o-mini", temperature=0.7) is not llm
+        assert provider.get_llm("anthropic/claude-3-haiku", temperature=0.2) is not llm
+        assert provider.get_llm(
+            "openai/gpt-4o-mini", temperature=0.2, fallback_models=["anthropic/claude-3-haiku"]
+        ) is not llm
+        assert provider.get_llm(
+            "openai/gpt-4o-mini", temperature=0.2, provider_config={"sort": "latency"}
+        ) is not llm
+        # Another API key never gets this key's client
+        assert OpenRouterProvider(api_key="sk-test-two").get_llm("openai/gpt-4o-mini", temperature=0.2) is not llm
+
+    def test_chat_chain_is_cached(self, provider):
+        chain = provider.get_chat_chain("Be brief.", temperature=0.3)
+
+        assert provider.get_chat_chain("Be brief.", temperature=0.3) is chain
+        assert provider.get_chat_chain("Be verbose.", temperature=0.3) is not chain
+        assert provider.get_chat_chain("Be brief.", temperature=0.3, with_history=True) is not chain
+        # Chains for one configuration share its LLM
+        assert provider.get_chat_chain("Be verbose.", temperature=0.3).steps[1] is chain.steps[1]
+        assert get_llm_cache_stats()["chains"]["hits"] == 2
+
+    def test_clear_llm_caches(self, provider):
+        llm = provider.get_llm("openai/gpt-4o-mini")
+        chain = provider.get_chat_chain("Be brief.")
+
+        clear_llm_caches()
+
+        assert provider.get_llm("openai/gpt-4o-mini") is not llm
+        assert provider.get_chat_chain("Be brief.") is not chain
+        assert get_llm_cache_stats()["llms"]["size"] == 1
@@ -0,0 +1,130 @@
+"""
+Unit tests for MessageRepository.
+
+Tests cover packing conversation history into a token budget, batched
+inserts, and the token counts and running totals stored at insert.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from app.database.models.message import MessageRoleEnum
+from app.database.repositories import ConversationRepository, MessageRepository
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.database
+class TestHistoryWithinBudget:
+    """Test MessageRepository.get_history_within_budget."""
+
+    @pytest_asyncio.fixture
+    async def conversation_id(self, test_db_session, test_user):
+        conversation = await ConversationRepository.create(test_db_session, user_id=test_user["id"])
+        for i in range(6):
+            await MessageRepository.create_user_message(
+                test_db_session, conversation.id, f"question {i}", token_count=10
+            )
+            await MessageRepository.create_assistant_message(
+                test_db_session, conversation.id, f"answer {i}", token_count=20
+            )
+        await test_db_session.commit()
+        return conversation.id
+
+    async def test_keeps_newest_messages_that_fit(self, test_db_session, conversation_id):
+        history, total, truncated = await MessageRepository.get_history_within_budget(
+            test_db_session, conversation_id, token_budget=60, overhead_tokens=2
+        )
+
+        assert history == [("assistant", "answer 4"), ("user", "question 5"), ("assistant", "answer 5")]
+        assert total == 22 + 12 + 22
+        assert truncated
+
+    async def test_reads_at_most_max_messages(self, test_db_session, conversation_id):
+        history, _, truncated = await MessageRepository.get_history_within_budget(
+            test_db_session, conversation_id, token_budget=10_000, max_messages=4
+        )
+        assert [content for _, content in history] == ["question 4", "answer 4", "question 5", "answer 5"]
+        assert truncated
+
+        history, total, truncated = await MessageRepository.get_history_within_budget(
+            test_db_session, conversation_id, token_budget=10_000
+        )
+        assert len(history) == 12 and total == 180
+        assert not truncated
+
+    async def test_reads_only_the_suffix_that_can_fit(self, test_db_session, conversation_id):
+        """The range query skips older rows without reading them."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = test_db_session.bind.sync_engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            history, total, truncated = await MessageRepository.get_history_within_budget(
+                test_db_session, conversation_id, token_budget=50
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert history == [("assistant", "answer 4"), ("user", "question 5"), ("assistant", "answer 5")]
+        assert total == 50 and truncated
+        assert len(statements) == 1 and "cumulative_tokens" in statements[0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+@pytest.mark.database
+class TestBulkCreate:
+    """Test MessageRepository.bulk_create."""
+
+    async def test_inserts_rows_in_one_call(self, test_db_session, test_user):
+        conversation = await ConversationRepository.create(test_db_session, user_id=test_user["id"])
+        start = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "conversation_id": conversation.id,
+                "role": MessageRoleEnum.USER if i % 2 == 0 else MessageRoleEnum.ASSISTANT,
+                "content": f"message {i}",
+                "token_count": 5,
+                "created_at": start + timedelta(milliseconds=i),
+                "metadata": {},
+            }
+            for i in range(4)
+        ]
+
+        assert await MessageRepository.bulk_create(test_db_session, rows) == 4
+        await test_db_session.commit()
+
+        messages = await MessageRepository.get_by_conversation(test_db_session, conversation.id)
+        assert [m.id for m in messages] == [row["id"] for row in rows]
+        assert await MessageRepository.bulk_create(test_db_session, []) == 0
+
+    async def test_assigns_running_totals(self, test_db_session, test_user):
+        conversation = await ConversationRepository.create(test_db_session, user_id=test_user["id"])
+        await MessageRepository.create_user_message(
+            test_db_session, conversation.id, "first", token_count=7
+        )
+        rows = [
+            {"conversation_id": conversation.id, "role": MessageRoleEnum.ASSISTANT,
+             "content": "second", "token_count": 3, "metadata": {}},
+            # Counted once at insert when no count is given
+            {"conversation_id": conversation.id, "role": MessageRoleEnum.USER,
+             "content": "x" * 40, "metadata": {}},
+        ]
+        await MessageRepository.bulk_create(test_db_session, rows)
+        await test_db_session.commit()
+
+        messages = await MessageRepository.get_by_conversation(test_db_session, conversation.id)
+        counts = [m.token_count for m in messages]
+        assert counts[:2] == [7, 3] and counts[2] > 0
+        assert [m.cumulative_tokens for m in messages] == [7, 10, 10 + counts[2]]
+
+        conversation = await ConversationRepository.get_by_id(test_db_session, conversation.id)
+        assert conversation.total_tokens == 10 + counts[2]
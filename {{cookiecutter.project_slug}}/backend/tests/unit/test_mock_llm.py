@@ -0,0 +1,89 @@
+"""
+Unit tests for the mock LLM server.
+
+Tests cover completions, streaming, structured output, embeddings and
+rate-limit injection through the ASGI app.
+"""
+
+import json
+
+import pytest
+from app.mock_llm import MockLLMConfig, ResponseFixture, create_mock_llm_app
+from app.mock_llm.server import sample_from_schema, tokenize
+from fastapi.testclient import TestClient
+
+
+def make_client(**overrides) -> TestClient:
+    config = MockLLMConfig(ttft_ms=0, tokens_per_second=100000, jitter=0, **overrides)
+    return TestClient(create_mock_llm_app(config))
+
+
+@pytest.mark.unit
+class TestMockLLM:
+    """Test the mock LLM server."""
+
+    def test_tokenize_roundtrip(self):
+        text = "  Hello there,\nworld!  "
+        assert "".join(tokenize(text)) == text
+
+    def test_completion_uses_fixture(self):
+        client = make_client(fixtures=[ResponseFixture(match="refund", content="Refunds take 5 days.")])
+        response = client.post("/v1/chat/completions", json={
+            "model": "openai/gpt-4o-mini",
+            "messages": [{"role": "user", "content": "Where is my refund?"}],
+        })
+
+        body = response.json()
+        assert body["choices"][0]["message"]["content"] == "Refunds take 5 days."
+        assert body["usage"]["completion_tokens"] == 4
+
+    def test_streaming_reassembles_content(self):
+        client = make_client(default_response="one two three")
+        response = client.post("/v1/chat/completions", json={
+            "model": "m",
+            "stream": True,
+            "messages": [{"role": "user", "content": "hi"}],
+        })
+
+        events = [line[6:] for line in response.text.splitlines() if line.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(event) for event in events[:-1]]
+        content = "".join(c["choices"][0]["delta"].get("content") or "" for c in chunks)
+        assert content == "one two three"
+        assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+    def test_structured_output_matches_schema(self):
+        schema = {
+            "type": "object",
+            "properties": {
+                "label": {"$ref": "#/$defs/Label"},
+                "score": {"type": "number"},
+                "note": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+            },
+            "$defs": {"Label": {"enum": ["good", "bad"]}},
+        }
+        assert sample_from_schema(schema) == {"label": "good", "score": 0.5, "note": "mock"}
+
+        client = make_client()
+        response = client.post("/v1/chat/completions", json={
+            "model": "m",
+            "messages": [{"role": "user", "content": "rate this"}],
+            "response_format": {"type": "json_schema", "json_schema": {"name": "r", "schema": schema}},
+        })
+        content = response.json()["choices"][0]["message"]["content"]
+        assert json.loads(content)["label"] == "good"
+
+    def test_embeddings_are_deterministic(self):
+        client = make_client(embedding_dimensions=8, embedding_latency_ms=0)
+        response = client.post("/v1/embeddings", json={"model": "e", "input": ["a", "b", "a"]})
+
+        vectors = [item["embedding"] for item in response.json()["data"]]
+        assert len(vectors[0]) == 8
+        assert vectors[0] == vectors[2] != vectors[1]
+
+    def test_rate_limit_injection(self):
+        client = make_client(rate_limit_rate=1.0, retry_after_seconds=2)
+        response = client.post("/v1/chat/completions", json={"model": "m", "messages": []})
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
@@ -0,0 +1,134 @@
+"""
+Unit tests for ModelCatalog.
+
+Tests cover index lookups, single-flight fetches (including a cancelled
+caller), the on-disk snapshot and cold-start loading.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from app.infrastructure import model_catalog as catalog_module
+from app.infrastructure.model_catalog import ModelCatalog, ModelInfo
+
+MODELS = [
+    {
+        "id": "openai/gpt-4o-mini",
+        "top_provider": {"context_length": 128000, "max_completion_tokens": 16384},
+        "pricing": {"prompt": "0.00000015", "completion": "0.0000006"},
+    },
+    {"id": "meta/llama", "top_provider": None, "pricing": {"prompt": "free"}},
+    {"name": "no id"},
+]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Fake /models endpoint counting requests; set `delay` or `fail` to script it."""
+    state = {"requests": 0, "delay": 0.0, "fail": False}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["requests"] += 1
+        await asyncio.sleep(state["delay"])
+        if state["fail"]:
+            return httpx.Response(500, json={"error": "down"})
+        return httpx.Response(200, json={"data": MODELS})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(catalog_module, "get_http_async_client", lambda: client)
+    return state
+
+
+def make_catalog(snapshot_path=None) -> ModelCatalog:
+    return ModelCatalog("https://openrouter.test/api/v1", "key", snapshot_path=snapshot_path)
+
+
+@pytest.mark.unit
+def test_model_info_from_api():
+    """API entries are parsed into typed limits and prices."""
+    info = ModelInfo.from_api(MODELS[0])
+    assert (info.context_length, info.max_completion_tokens) == (128000, 16384)
+    assert info.prompt_price == pytest.approx(1.5e-7)
+
+    sparse = ModelInfo.from_api(MODELS[1])
+    assert sparse.context_length is None and sparse.prompt_price is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestModelCatalog:
+    """Test ModelCatalog class."""
+
+    async def test_refresh_indexes_models(self, api):
+        catalog = make_catalog()
+        assert catalog.get("openai/gpt-4o-mini") is None and catalog.is_stale
+
+        await catalog.refresh()
+
+        assert catalog.get("openai/gpt-4o-mini").context_length == 128000
+        assert catalog.get("meta/llama") is not None
+        assert catalog.stats()["models"] == 2
+        assert not catalog.is_stale
+
+    async def test_concurrent_refreshes_share_one_fetch(self, api):
+        api["delay"] = 0.02
+        catalog = make_catalog()
+
+        results = await asyncio.gather(*[catalog.refresh() for _ in range(5)])
+
+        assert api["requests"] == 1
+        assert all(result == MODELS for result in results)
+
+    async def test_cancelled_leader_does_not_fail_followers(self, api):
+        api["delay"] = 0.05
+        catalog = make_catalog()
+
+        leader = asyncio.ensure_future(catalog.refresh())
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(catalog.refresh())
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await follower == MODELS
+        assert leader.cancelled()
+        assert api["requests"] == 1
+        assert catalog.has_data
+
+    async def test_failed_fetch_raises_and_keeps_data(self, api):
+        catalog = make_catalog()
+        await catalog.refresh()
+        api["fail"] = True
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await catalog.refresh()
+
+        assert catalog.get("openai/gpt-4o-mini") is not None
+        assert catalog.stats()["fetch_failures"] == 1
+
+    async def test_snapshot_round_trip(self, api, tmp_path):
+        path = tmp_path / "catalog.json"
+        await make_catalog(str(path)).refresh()
+
+        # A new worker starts from the snapshot without fetching
+        restarted = make_catalog(str(path))
+        await restarted.ensure_loaded()
+
+        assert restarted.get("openai/gpt-4o-mini").max_completion_tokens == 16384
+        assert api["requests"] == 1
+
+    async def test_ensure_loaded_fetches_on_cold_start(self, api):
+        catalog = make_catalog()
+
+        await catalog.ensure_loaded()
+
+        assert catalog.has_data and api["requests"] == 1
+
+    async def test_ensure_loaded_backs_off_after_failure(self, api):
+        api["fail"] = True
+        catalog = make_catalog()
+
+        await catalog.ensure_loaded()
+        await catalog.ensure_loaded()
+
+        assert not catalog.has_data and api["requests"] == 1
@@ -0,0 +1,141 @@
+"""
+Unit tests for ModelRouter.
+
+Tests cover SLO-based selection, error-rate filtering, probing and
+error-rate decay, the callback handler and persistence of statistics.
+"""
+
+from uuid import uuid4
+
+import pytest
+from app.infrastructure import model_router as router_module
+from app.infrastructure.model_router import ModelRouter, RouterCallbackHandler
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage
+
+FAST_EXPENSIVE = "anthropic/claude-3.5-sonnet"
+SLOW_CHEAP = "openai/gpt-4o-mini"
+
+
+def make_router() -> ModelRouter:
+    router = ModelRouter(alpha=0.5, probe_rate=0.0)
+    router.record_success(FAST_EXPENSIVE, ttft_ms=300, cost_usd=0.01)
+    router.record_success(SLOW_CHEAP, ttft_ms=1200, cost_usd=0.001)
+    return router
+
+
+@pytest.mark.unit
+class TestModelRouter:
+    """Test ModelRouter class."""
+
+    def test_unmeasured_models_are_only_probed(self):
+        """A candidate without statistics gets probe traffic, not all traffic."""
+        router = ModelRouter(probe_rate=0.0)
+        router.record_success(FAST_EXPENSIVE, ttft_ms=300)
+        assert router.select([FAST_EXPENSIVE, SLOW_CHEAP]) == FAST_EXPENSIVE
+
+        router.probe_rate = 1.0
+        assert router.select([FAST_EXPENSIVE, SLOW_CHEAP]) == SLOW_CHEAP
+
+        # Without any measured model the first candidate is measured
+        assert ModelRouter(probe_rate=0.0).select([SLOW_CHEAP, FAST_EXPENSIVE]) == SLOW_CHEAP
+
+    def test_probe_rate_bounds_probe_share(self):
+        """About probe_rate of the selections go to an excluded model."""
+        router = make_router()
+        router.probe_rate = 0.1
+        router._random.seed(7)
+        for _ in range(3):
+            router.record_error(SLOW_CHEAP)
+
+        picks = [router.select([FAST_EXPENSIVE, SLOW_CHEAP]) for _ in range(1000)]
+
+        assert 50 < picks.count(SLOW_CHEAP) < 150
+
+    def test_cheapest_model_meeting_slo(self):
+        """The cheapest model within the SLO wins."""
+        router = make_router()
+        candidates = [FAST_EXPENSIVE, SLOW_CHEAP]
+
+        assert router.select(candidates, latency_slo_ms=2000) == SLOW_CHEAP
+        assert router.select(candidates, latency_slo_ms=500) == FAST_EXPENSIVE
+
+    def test_fastest_model_when_none_meets_slo(self):
+        """Without a model meeting the SLO the fastest one is used."""
+        router = make_router()
+
+        assert router.select([SLOW_CHEAP, FAST_EXPENSIVE], latency_slo_ms=100) == FAST_EXPENSIVE
+
+    def test_failing_model_is_avoided(self):
+        """Models above the error-rate limit are skipped."""
+        router = make_router()
+        for _ in range(3):
+            router.record_error(SLOW_CHEAP)
+
+        assert router.select([FAST_EXPENSIVE, SLOW_CHEAP], latency_slo_ms=2000) == FAST_EXPENSIVE
+
+    def test_error_rate_decays_while_idle(self, monkeypatch):
+        """A failed model becomes eligible again after a few half-lives."""
+        clock = [1000.0]
+        monkeypatch.setattr(router_module.time, "time", lambda: clock[0])
+        router = ModelRouter(alpha=0.5, error_half_life_seconds=60, probe_rate=0.0)
+        router.record_success(FAST_EXPENSIVE, ttft_ms=300, cost_usd=0.01)
+        router.record_success(SLOW_CHEAP, ttft_ms=1200, cost_usd=0.001)
+        for _ in range(3):
+            router.record_error(SLOW_CHEAP)
+        assert router.select([FAST_EXPENSIVE, SLOW_CHEAP]) == FAST_EXPENSIVE
+
+        clock[0] += 300
+        assert router.select([FAST_EXPENSIVE, SLOW_CHEAP]) == SLOW_CHEAP
+
+    def test_statistics_persist(self, tmp_path):
+        """Statistics survive a save/load round trip."""
+        path = str(tmp_path / "router.json")
+        make_router().save(path)
+
+        router = ModelRouter()
+        router.load(path)
+
+        assert router.get(SLOW_CHEAP).ttft_ms == 1200
+        assert router.get(FAST_EXPENSIVE).cost_usd == 0.01
+
+
+@pytest.mark.unit
+def test_callback_records_ttft_and_throughput():
+    """The callback handler feeds TTFT and tokens/sec into the router."""
+    router = ModelRouter()
+    handler = RouterCallbackHandler(router)
+    run_id = uuid4()
+
+    handler.on_chat_model_start({}, [[]], run_id=run_id, invocation_params={"model": SLOW_CHEAP})
+    handler.on_llm_new_token("Hi", run_id=run_id)
+    handler.on_llm_end(
+        LLMResult(
+            generations=[[ChatGeneration(message=AIMessage(content="Hi there"))]],
+            llm_output={"token_usage": {"prompt_tokens": 10, "completion_tokens": 20}},
+        ),
+        run_id=run_id,
+    )
+
+    stats = router.get(SLOW_CHEAP)
+    assert stats.samples == 1
+    assert stats.ttft_ms is not None
+    assert stats.tokens_per_second > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+async def test_closed_stream_is_not_an_error():
+    """A stream closed early (disconnect, hedge loser) does not count against the model."""
+    router = ModelRouter()
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="one two three")]))
+    config = {"callbacks": [RouterCallbackHandler(router)], "metadata": {"ls_model_name": SLOW_CHEAP}}
+
+    stream = llm.astream("hi", config=config)
+    async for _ in stream:
+        break
+    await stream.aclose()
+
+    stats = router.stats().get(SLOW_CHEAP)
+    assert stats is None or stats["error_rate"] in (None, 0.0)
@@ -0,0 +1,131 @@
+"""
+Unit tests for parallel fan-out.
+
+Tests cover the all, first_success and quorum strategies, cancellation of
+stragglers, per-branch latency, validation and timeouts. Agents are
+replaced by a fake invoke function keyed by model.
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+import pytest
+from app.agents.base import AgentConfig
+from app.agents.parallel import ParallelBranch, ParallelExecutor, ParallelStrategy
+from pydantic import BaseModel
+
+
+class Verdict(BaseModel):
+    response: str
+    requires_escalation: bool
+
+
+class FakeModels:
+    """Invoke function with a scripted delay, verdict or failure per model."""
+
+    def __init__(self, script: Dict[str, tuple]):
+        # model -> (delay, requires_escalation or an exception)
+        self.script = script
+        self.cancelled: List[str] = []
+
+    async def __call__(self, agent, message, context, config: Optional[AgentConfig]):
+        model = config.model_name
+        delay, outcome = self.script[model]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Verdict(response=f"{model} says {message}", requires_escalation=outcome)
+
+
+def branches(*models: str) -> List[ParallelBranch]:
+    return [ParallelBranch(agent="support", model=model) for model in models]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestParallelExecutor:
+    """Test ParallelExecutor class."""
+
+    async def test_all_gathers_every_branch(self):
+        models = FakeModels({"a": (0.05, True), "b": (0.01, RuntimeError("down"))})
+
+        result = await ParallelExecutor(models).run(branches("a", "b"), "hi")
+        by_name = {branch["name"]: branch for branch in result.branches}
+
+        assert not result.success and "support@b" in result.error
+        assert result.output == {"support@a": {"response": "a says hi", "requires_escalation": True}}
+        assert by_name["support@b"]["status"] == "failed"
+        assert by_name["support@a"]["latency_ms"] >= by_name["support@b"]["latency_ms"]
+
+    async def test_first_success_cancels_the_rest(self):
+        models = FakeModels({"fast": (0.01, False), "slow": (5.0, False), "broken": (0.0, RuntimeError("x"))})
+
+        result = await ParallelExecutor(models, ParallelStrategy.FIRST_SUCCESS).run(
+            branches("broken", "slow", "fast"), "hi"
+        )
+        statuses = {branch["model"]: branch["status"] for branch in result.branches}
+
+        assert result.success and result.winner == "support@fast"
+        assert result.output["response"] == "fast says hi"
+        assert statuses == {"broken": "failed", "slow": "cancelled", "fast": "succeeded"}
+        assert models.cancelled == ["slow"]
+        assert result.total_duration_ms < 1000
+
+    async def test_first_success_skips_invalid_responses(self):
+        models = FakeModels({"fast": (0.01, True), "slower": (0.05, False)})
+        executor = ParallelExecutor(
+            models, "first_success", validate=lambda verdict: not verdict.requires_escalation
+        )
+
+        result = await executor.run(branches("fast", "slower"), "hi")
+
+        assert result.winner == "support@slower"
+        assert result.branches[0]["status"] == "invalid"
+
+    async def test_quorum_returns_once_k_agree(self):
+        models = FakeModels({"a": (0.01, True), "b": (0.02, False), "c": (0.03, True), "d": (5.0, False)})
+        executor = ParallelExecutor(models, "quorum", vote_field="requires_escalation", quorum=2)
+
+        result = await executor.run(branches("a", "b", "c", "d"), "hi")
+
+        assert result.success
+        assert result.decision is True and result.winner == "support@a"
+        assert result.votes == {"True": 2, "False": 1}
+        assert models.cancelled == ["d"]
+
+    async def test_quorum_not_reached(self):
+        models = FakeModels({"a": (0.01, True), "b": (0.01, False), "c": (0.01, RuntimeError("x"))})
+        executor = ParallelExecutor(models, "quorum", vote_field="requires_escalation")
+
+        result = await executor.run(branches("a", "b", "c"), "hi")
+
+        assert not result.success and result.decision is None
+        assert result.error == "No 2 branches agreed"
+
+    async def test_branch_timeout(self):
+        models = FakeModels({"a": (1.0, True), "b": (0.01, False)})
+
+        result = await ParallelExecutor(models, timeout_seconds=0.05).run(branches("a", "b"), "hi")
+
+        assert result.branches[0]["status"] == "failed"
+        assert "Timed out" in result.branches[0]["error"]
+
+    async def test_branch_pins_model(self):
+        branch = ParallelBranch(agent="support", model="b")
+        config = AgentConfig(model_name="a", fallback_models=["c"], temperature=0.1)
+
+        pinned = branch.agent_config(config)
+
+        assert (pinned.model_name, pinned.fallback_models, pinned.temperature) == ("b", [], 0.1)
+        assert ParallelBranch(agent="support").agent_config(config) is config
+
+    async def test_rejects_invalid_fan_out(self):
+        models = FakeModels({"a": (0.0, True)})
+        with pytest.raises(ValueError, match="Duplicate"):
+            await ParallelExecutor(models).run(branches("a", "a"), "hi")
+        with pytest.raises(ValueError, match="Quorum"):
+            await ParallelExecutor(models, "quorum", quorum=3).run(branches("a"), "hi")
@@ -0,0 +1,139 @@
+"""
+Unit tests for IncrementalJSONParser and partial JSON parsing.
+
+Tests cover chunk-boundary handling (strings, escapes, numbers, literals),
+the partial values exposed mid-stream, error reporting, and the streaming
+handler built on the parser.
+"""
+
+import json
+import random
+
+import pytest
+from app.utils.partial_json import IncrementalJSONParser, JSONSyntaxError
+from app.utils.structured_streaming import StructuredStreamingHandler, try_parse_partial_json
+from pydantic import BaseModel
+
+
+def _random_value(rnd: random.Random, depth: int = 0):
+    roll = rnd.random()
+    if depth > 3 or roll < 0.4:
+        return rnd.choice([
+            rnd.randint(-1000, 1000),
+            rnd.random() * 1e5,
+            -2.5e-3,
+            True,
+            False,
+            None,
+            "".join(rnd.choice('ab "\\\né\U0001F600/') for _ in range(rnd.randint(0, 20))),
+        ])
+    if roll < 0.7:
+        return [_random_value(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+    return {f"k{i}": _random_value(rnd, depth + 1) for i in range(rnd.randint(0, 4))}
+
+
+@pytest.mark.unit
+class TestIncrementalJSONParser:
+    """Test IncrementalJSONParser class."""
+
+    def test_matches_json_loads_for_any_chunking(self):
+        """Documents split at arbitrary points parse to the same value as json.loads."""
+        rnd = random.Random(0)
+        for _ in range(300):
+            document = {"a": _random_value(rnd), "b": [_random_value(rnd), _random_value(rnd)]}
+            text = json.dumps(document, ensure_ascii=rnd.random() < 0.5)
+
+            parser = IncrementalJSONParser()
+            pos = 0
+            while pos < len(text):
+                size = rnd.randint(1, 7)
+                parser.feed(text[pos:pos + size])
+                json.dumps(parser.value())  # every intermediate value is plain JSON data
+                pos += size
+
+            assert parser.done
+            assert parser.value() == document
+
+    def test_partial_values(self):
+        """Strings and numbers being read are exposed; partial keys and literals are not."""
+        parser = IncrementalJSONParser()
+
+        parser.feed('{"response": "Hel')
+        assert parser.value() == {"response": "Hel"}
+
+        parser.feed('lo", "count": 1')
+        assert parser.value() == {"response": "Hello", "count": 1}
+
+        parser.feed('2, "tags": ["a", "b')
+        assert parser.value() == {"response": "Hello", "count": 12, "tags": ["a", "b"]}
+
+        parser.feed('c"], "ok": tr')
+        assert parser.value() == {"response": "Hello", "count": 12, "tags": ["a", "bc"]}
+
+        parser.feed('ue, "na')
+        assert parser.value()["ok"] is True
+        assert "na" not in parser.value()
+
+        parser.feed('me": "\\u00')
+        parser.feed('e9"}')
+        assert parser.value()["name"] == "é"
+        assert parser.done
+
+    def test_ignores_text_around_the_document(self):
+        """Code fences and preambles before the object and text after it are skipped."""
+        parser = IncrementalJSONParser()
+        for chunk in ["Here you go:\n```json\n{\"a\"", ": [1, 2]}", "\n```"]:
+            parser.feed(chunk)
+
+        assert parser.value() == {"a": [1, 2]}
+        assert parser.done
+
+    def test_invalid_json_raises(self):
+        """Syntax errors are raised once and recorded; later chunks are ignored."""
+        parser = IncrementalJSONParser()
+        with pytest.raises(JSONSyntaxError):
+            parser.feed('{"a" 1}')
+
+        assert parser.error is not None
+        parser.feed('"b": 2}')
+        assert parser.value() == {}
+
+
+@pytest.mark.unit
+class TestTryParsePartialJson:
+    """Test try_parse_partial_json function."""
+
+    def test_closes_open_structures(self):
+        assert try_parse_partial_json('{"a": {"b": [1, "x') == {"a": {"b": [1, "x"]}}
+
+    def test_returns_none_for_non_objects(self):
+        assert try_parse_partial_json("") is None
+        assert try_parse_partial_json("just text") is None
+        assert try_parse_partial_json('{"a": }') is None
+
+
+class Answer(BaseModel):
+    response: str = ""
+    confidence: float = 0.0
+
+
+@pytest.mark.unit
+class TestStructuredStreamingHandler:
+    """Test StructuredStreamingHandler with string chunks."""
+
+    def test_yields_growing_models(self):
+        handler = StructuredStreamingHandler(Answer, yield_every_n_chars=1)
+        text = '{"response": "Hello world", "confidence": 0.75}'
+
+        updates = [handler.add_chunk(text[i:i + 4]) for i in range(0, len(text), 4)]
+        responses = [u.response for u in updates if u is not None]
+
+        assert responses == sorted(responses, key=len)
+        assert handler.get_last_valid() == Answer(response="Hello world", confidence=0.75)
+
+    def test_falls_back_when_json_follows_prose_with_braces(self):
+        handler = StructuredStreamingHandler(Answer)
+        for chunk in ["Use {braces} wisely. ", "```json\n", '{"response": "ok"}', "\n```"]:
+            handler.add_chunk(chunk)
+
+        assert handler.get_last_valid() == Answer(response="ok")
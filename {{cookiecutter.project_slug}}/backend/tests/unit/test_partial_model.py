@@ -0,0 +1,159 @@
+"""
+Unit tests for PartialModelPlan.
+
+Tests cover precomputed fallbacks, Literal fallbacks for partial values,
+changed-field tracking, incremental building of nested models and lists,
+and final validation.
+"""
+
+from typing import List, Literal, Optional
+
+import pytest
+from app.utils.partial_json import IncrementalJSONParser
+from app.utils.partial_model import get_partial_plan
+from app.utils.structured_streaming import StructuredStreamingHandler
+from pydantic import BaseModel, Field
+
+
+class Address(BaseModel):
+    city: str
+    zip_code: str = ""
+
+
+class Ticket(BaseModel):
+    response: str
+    sentiment: Literal["positive", "neutral", "negative"] = "neutral"
+    priority: int
+    escalation_reason: Optional[str] = None
+    tags: List[str] = Field(default_factory=list)
+    address: Address
+
+
+class Order(BaseModel):
+    lines: List[Address] = Field(default_factory=list)
+    codes: List[Literal["a", "b"]] = ["a"]
+    shipping: Optional[Address] = None
+
+
+@pytest.mark.unit
+class TestPartialModelPlan:
+    """Test PartialModelPlan class."""
+
+    def test_plan_is_cached_per_model(self):
+        assert get_partial_plan(Ticket) is get_partial_plan(Ticket)
+
+    def test_initial_values_cover_every_field(self):
+        plan = get_partial_plan(Ticket)
+        values = plan.initial_values()
+
+        assert values["response"] == ""
+        assert values["sentiment"] == "neutral"
+        assert values["priority"] == 0
+        assert values["escalation_reason"] is None
+        assert values["tags"] == [] and values["tags"] is not plan.initial_values()["tags"]
+        assert values["address"].city == ""
+        assert plan.primary_field == "response"
+
+    def test_apply_converts_only_changed_fields(self):
+        plan = get_partial_plan(Ticket)
+        values = plan.initial_values()
+        parser = IncrementalJSONParser()
+
+        parser.feed('{"response": "Hi", "sentiment": "neg')
+        changed = plan.apply(values, parser.value(), parser.pop_changed_keys())
+        # A partial Literal value falls back until it is one of the options
+        assert changed == {"response"}
+        assert values["sentiment"] == "neutral"
+
+        parser.feed('ative", "tags": ["a"')
+        changed = plan.apply(values, parser.value(), parser.pop_changed_keys())
+        assert changed == {"sentiment", "tags"}
+        assert values["sentiment"] == "negative"
+        assert values["tags"] == ["a"]
+
+        # Converted containers are copies: later parsing does not change them
+        tags = values["tags"]
+        parser.feed(', "b"], "address": {"city": "Par')
+        changed = plan.apply(values, parser.value(), parser.pop_changed_keys())
+        assert tags == ["a"]
+        assert values["tags"] == ["a", "b"]
+        assert changed == {"tags", "address"}
+        assert values["address"] == Address(city="Par")
+
+        partial = plan.construct(values)
+        assert isinstance(partial, Ticket)
+        assert partial.address.city == "Par"
+
+    def test_lists_and_nested_models_are_built_incrementally(self):
+        plan = get_partial_plan(Order)
+        values = plan.initial_values()
+        parser = IncrementalJSONParser()
+
+        parser.feed('{"lines": [{"city": "Oslo"}, {"city": "Ro')
+        plan.apply(values, parser.value(), parser.pop_changed_keys())
+        first, partial = values["lines"]
+        assert (first.city, partial.city) == ("Oslo", "Ro")
+
+        parser.feed('me", "zip_code": "00100"}, {"ci')
+        plan.apply(values, parser.value(), parser.pop_changed_keys())
+        # Complete elements are reused; the partial one is rebuilt
+        assert values["lines"][0] is first
+        assert values["lines"][1] == Address(city="Rome", zip_code="00100")
+        assert len(values["lines"]) == 3 and partial.city == "Ro"
+
+        parser.feed('ty": "Bern"}], "codes": ["b", "')
+        plan.apply(values, parser.value(), parser.pop_changed_keys())
+        assert values["lines"][0] is first and values["lines"][2].city == "Bern"
+        # A non-empty default is replaced, not extended; a partial element is left out
+        assert values["codes"] == ["b"]
+
+        parser.feed('a"], "shipping": null}')
+        plan.apply(values, parser.value(), parser.pop_changed_keys())
+        assert values["codes"] == ["b", "a"] and values["shipping"] is None
+
+    def test_build_tracks_arrived_fields(self):
+        plan = get_partial_plan(Address)
+
+        empty = plan.build({})
+        partial = plan.build({"city": "Li"}, empty)
+        full = plan.build({"city": "Lima", "zip_code": "15"}, partial)
+
+        assert empty.model_fields_set == set()
+        assert partial.model_fields_set == {"city"}
+        assert full == Address(city="Lima", zip_code="15")
+
+    def test_validate_fills_fallbacks(self):
+        plan = get_partial_plan(Ticket)
+
+        ticket = plan.validate({"response": "ok", "address": {"city": "Oslo"}})
+
+        assert ticket == Ticket(response="ok", priority=0, address=Address(city="Oslo"))
+        assert plan.validate({"response": "ok", "priority": "high"}) is None
+
+
+@pytest.mark.unit
+class TestStreamingWithPlan:
+    """Test StructuredStreamingHandler partial frames and final validation."""
+
+    def test_partial_frames_then_validated_final(self):
+        handler = StructuredStreamingHandler(Ticket, yield_every_n_chars=1)
+        text = (
+            '{"response": "We will call you", "sentiment": "positive", '
+            '"priority": 2, "address": {"city": "Rome"}}'
+        )
+
+        updates = [handler.add_chunk(text[i:i + 5]) for i in range(0, len(text), 5)]
+        frames = [u for u in updates if u is not None]
+
+        assert frames and all(isinstance(frame, Ticket) for frame in frames)
+        assert frames[-1].address.city == "Rome"
+        final = handler.finalize()
+        assert final == Ticket(
+            response="We will call you", sentiment="positive", priority=2, address=Address(city="Rome")
+        )
+
+    def test_unchanged_chunks_yield_nothing(self):
+        handler = StructuredStreamingHandler(Ticket)
+
+        assert handler.add_chunk('{"response": "Hello"') is not None
+        assert handler.add_chunk("   ") is None
@@ -0,0 +1,154 @@
+"""
+Unit tests for the DAG pipeline executor.
+
+Tests cover concurrent execution of independent stages, input mappings,
+retries and timeouts, skipping and cancellation after failures, and graph
+validation. Agents are replaced by a fake invoke function.
+"""
+
+import asyncio
+import json
+from typing import Dict, List
+
+import pytest
+from app.agents.pipeline import PipelineExecutor, PipelineStage, validate_stages
+from pydantic import BaseModel
+
+
+class Answer(BaseModel):
+    response: str
+
+
+class FakeAgents:
+    """Invoke function with scripted delays and failures per agent."""
+
+    def __init__(self, delays: Dict[str, float] = None, failures: Dict[str, int] = None):
+        self.delays = delays or {}
+        self.failures = dict(failures or {})
+        self.calls: List[tuple] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, agent, message, context, config):
+        self.calls.append((agent, message))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(agent, 0.01))
+            if self.failures.get(agent, 0) > 0:
+                self.failures[agent] -= 1
+                raise RuntimeError(f"{agent} failed")
+            return Answer(response=f"{agent} done")
+        finally:
+            self.running -= 1
+
+
+def diamond() -> List[PipelineStage]:
+    return [
+        PipelineStage(name="research", agent="research", inputs={"q": "input.query"}, message="Research {q}"),
+        PipelineStage(name="facts", agent="facts", depends_on=["research"]),
+        PipelineStage(name="tone", agent="tone", depends_on=["research"]),
+        PipelineStage(
+            name="report",
+            agent="writer",
+            depends_on=["facts", "tone"],
+            inputs={"facts": "facts.response", "tone": "tone.response"},
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestPipelineExecutor:
+    """Test PipelineExecutor class."""
+
+    async def test_independent_stages_run_concurrently(self):
+        agents = FakeAgents(delays={"facts": 0.2, "tone": 0.2})
+        result = await PipelineExecutor(agents).run(diamond(), {"query": "AI"})
+
+        assert result.success
+        assert agents.max_running == 2
+        # The critical path (research -> facts|tone -> report), not the sum
+        assert result.total_duration_ms < 350
+        stages = {stage["name"]: stage for stage in result.stages}
+        assert stages["facts"]["started_ms"] == pytest.approx(stages["tone"]["started_ms"], abs=30)
+        assert all(stage["duration_ms"] >= 0 and stage["status"] == "succeeded" for stage in result.stages)
+        assert result.final_output == {"response": "writer done"}
+
+    async def test_messages_follow_input_mappings(self):
+        agents = FakeAgents()
+        await PipelineExecutor(agents).run(diamond(), {"query": "AI"})
+        messages = dict(agents.calls)
+
+        assert messages["research"] == "Research AI"
+        assert json.loads(messages["facts"]) == {"response": "research done"}
+        assert json.loads(messages["writer"]) == {"facts": "facts done", "tone": "tone done"}
+
+    async def test_concurrency_cap(self):
+        agents = FakeAgents()
+        stages = [PipelineStage(name=f"s{i}", agent=f"a{i}") for i in range(6)]
+
+        result = await PipelineExecutor(agents, max_concurrency=2).run(stages, {"message": "hi"})
+
+        assert result.success and agents.max_running == 2
+        assert result.final_output == {f"s{i}": {"response": f"a{i} done"} for i in range(6)}
+
+    async def test_retries_then_succeeds(self):
+        agents = FakeAgents(failures={"facts": 1})
+        stages = diamond()
+        stages[1].retries = 1
+
+        result = await PipelineExecutor(agents).run(stages, {"query": "AI"})
+
+        assert result.success
+        assert next(s for s in result.stages if s["name"] == "facts")["attempts"] == 2
+
+    async def test_failure_skips_downstream_stages(self):
+        agents = FakeAgents(delays={"tone": 0.05}, failures={"facts": 1})
+
+        result = await PipelineExecutor(agents, stop_on_error=False).run(diamond(), {"query": "AI"})
+        statuses = {stage["name"]: stage["status"] for stage in result.stages}
+
+        assert not result.success
+        assert statuses == {"research": "succeeded", "facts": "failed", "tone": "succeeded", "report": "skipped"}
+        assert "facts" in result.error
+        assert "writer" not in [agent for agent, _ in agents.calls]
+
+    async def test_stop_on_error_cancels_running_stages(self):
+        agents = FakeAgents(delays={"tone": 5.0}, failures={"facts": 1})
+
+        result = await PipelineExecutor(agents).run(diamond(), {"query": "AI"})
+        statuses = {stage["name"]: stage["status"] for stage in result.stages}
+
+        assert statuses["tone"] == "cancelled" and statuses["report"] == "cancelled"
+        assert result.total_duration_ms < 1000
+
+    async def test_timeout_fails_stage(self):
+        agents = FakeAgents(delays={"research": 1.0})
+        stages = diamond()
+        stages[0].timeout_seconds = 0.05
+
+        result = await PipelineExecutor(agents).run(stages, {"query": "AI"})
+
+        assert not result.success
+        assert "Timed out" in result.stages[0]["error"]
+
+
+@pytest.mark.unit
+class TestValidateStages:
+    """Test validate_stages function."""
+
+    def test_topological_order(self):
+        stages = list(reversed(diamond()))
+        assert [stage.name for stage in validate_stages(stages)][0] == "research"
+
+    def test_rejects_invalid_graphs(self):
+        with pytest.raises(ValueError, match="unknown stage"):
+            validate_stages([PipelineStage(name="a", agent="x", depends_on=["b"])])
+        with pytest.raises(ValueError, match="cycle"):
+            validate_stages([
+                PipelineStage(name="a", agent="x", depends_on=["b"]),
+                PipelineStage(name="b", agent="x", depends_on=["a"]),
+            ])
+        with pytest.raises(ValueError, match="Duplicate"):
+            validate_stages([PipelineStage(name="a", agent="x"), PipelineStage(name="a", agent="y")])
@@ -0,0 +1,90 @@
+"""
+Unit tests for ResponseCache.
+
+Tests cover exact-match hits, per-model opt-in, TTL expiry, the SQLite
+backend, semantic matching and synthetic stream chunking.
+"""
+
+import pytest
+from app.infrastructure.response_cache import (
+    MemoryResponseBackend,
+    ResponseCache,
+    SQLiteResponseBackend,
+    iter_cached_chunks,
+)
+
+MODEL = "openai/gpt-4o-mini"
+PROMPT = "You are a helpful assistant."
+
+
+class FakeEmbeddings:
+    """Embeds texts by the presence of a few keywords."""
+
+    KEYWORDS = ["capital", "france", "weather"]
+
+    async def aembed_query(self, text: str):
+        text = text.lower()
+        return [1.0 if word in text else 0.0 for word in self.KEYWORDS]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestResponseCache:
+    """Test ResponseCache class."""
+
+    async def test_exact_hit(self):
+        """An identical request is served from the cache."""
+        cache = ResponseCache(MemoryResponseBackend())
+        await cache.set(MODEL, PROMPT, "Hello", "Hi there!")
+
+        assert await cache.get(MODEL, PROMPT, "Hello") == "Hi there!"
+        assert await cache.get(MODEL, "Other prompt", "Hello") is None
+        assert cache.stats()["hits"] == 1
+
+    async def test_only_deterministic_opted_in_requests(self):
+        """Caching applies to temperature 0 and opted-in models only."""
+        cache = ResponseCache(MemoryResponseBackend(), models=[MODEL])
+
+        assert cache.is_cacheable(MODEL, 0.0)
+        assert not cache.is_cacheable(MODEL, 0.7)
+        assert not cache.is_cacheable("anthropic/claude-3-haiku", 0.0)
+
+    async def test_expired_entries_miss(self):
+        """Entries are not served after their TTL."""
+        cache = ResponseCache(MemoryResponseBackend(), ttl_seconds=0)
+        await cache.set(MODEL, PROMPT, "Hello", "Hi there!")
+
+        assert await cache.get(MODEL, PROMPT, "Hello") is None
+
+    async def test_sqlite_backend(self, tmp_path):
+        """The SQLite backend persists entries across instances."""
+        path = str(tmp_path / "responses.db")
+        cache = ResponseCache(SQLiteResponseBackend(path))
+        await cache.set(MODEL, PROMPT, "Hello", "Hi there!")
+        await cache.close()
+
+        cache = ResponseCache(SQLiteResponseBackend(path))
+        assert await cache.get(MODEL, PROMPT, "Hello") == "Hi there!"
+        await cache.close()
+
+    async def test_semantic_hit(self):
+        """A paraphrased message matches by embedding similarity."""
+        cache = ResponseCache(
+            MemoryResponseBackend(), semantic_enabled=True, semantic_threshold=0.9
+        )
+        cache._embeddings = FakeEmbeddings()
+        await cache.set(MODEL, PROMPT, "What is the capital of France?", "Paris.")
+
+        assert await cache.get(MODEL, PROMPT, "france's capital city?") == "Paris."
+        assert await cache.get(MODEL, PROMPT, "How is the weather?") is None
+        assert cache.stats()["semantic_hits"] == 1
+
+
+@pytest.mark.unit
+def test_cached_chunks_reproduce_text():
+    """Synthetic stream chunks join back to the cached text."""
+    text = "  The quick brown fox\njumps over the lazy dog. "
+    chunks = list(iter_cached_chunks(text, words_per_chunk=2))
+
+    assert "".join(chunks) == text
+    assert len(chunks) == 5
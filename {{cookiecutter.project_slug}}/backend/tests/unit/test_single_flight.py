@@ -0,0 +1,150 @@
+"""
+Unit tests for SingleFlight.
+
+Tests cover call coalescing, stream broadcast to several subscribers and
+cancellation when subscribers leave.
+"""
+
+import asyncio
+
+import pytest
+from app.infrastructure.single_flight import SingleFlight, make_flight_key
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestSingleFlight:
+    """Test SingleFlight class."""
+
+    async def test_concurrent_calls_share_one_upstream(self):
+        """Identical concurrent calls run the upstream call once."""
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(
+            *[single_flight.do("key", upstream) for _ in range(5)]
+        )
+
+        assert results == ["answer"] * 5
+        assert calls == 1
+        assert single_flight.stats()["coalesced"] == 4
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """One caller leaving keeps the upstream call alive for the rest."""
+        single_flight = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        leaver = asyncio.ensure_future(single_flight.do("key", upstream))
+        stayer = asyncio.ensure_future(single_flight.do("key", upstream))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+
+        assert await stayer == "answer"
+        assert single_flight.stats()["upstream_cancelled"] == 0
+
+    async def test_last_caller_leaving_cancels_upstream(self):
+        """The upstream call is cancelled when nobody is waiting for it."""
+        single_flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def upstream():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.ensure_future(single_flight.do("key", upstream))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert single_flight.stats()["upstream_cancelled"] == 1
+
+    async def test_stream_is_broadcast(self):
+        """Subscribers share one upstream stream, late joiners included."""
+        single_flight = SingleFlight()
+        started = 0
+
+        async def upstream():
+            nonlocal started
+            started += 1
+            for token in ["a", "b", "c"]:
+                await asyncio.sleep(0.01)
+                yield token
+
+        async def collect(delay: float):
+            await asyncio.sleep(delay)
+            return [chunk async for chunk in single_flight.stream("key", upstream)]
+
+        results = await asyncio.gather(collect(0), collect(0), collect(0.015))
+
+        assert results == [["a", "b", "c"]] * 3
+        assert started == 1
+
+    async def test_stream_subscriber_can_leave_early(self):
+        """A subscriber that stops early does not disturb the others."""
+        single_flight = SingleFlight()
+
+        async def upstream():
+            for token in ["a", "b", "c"]:
+                await asyncio.sleep(0.01)
+                yield token
+
+        async def take_first():
+            stream = single_flight.stream("key", upstream)
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        async def take_all():
+            return [chunk async for chunk in single_flight.stream("key", upstream)]
+
+        first, everything = await asyncio.gather(take_first(), take_all())
+
+        assert first == "a"
+        assert everything == ["a", "b", "c"]
+
+    async def test_cancelled_pump_stays_cancelled(self):
+        """Cancelling the upstream pump ends subscribers and cancels the task."""
+        single_flight = SingleFlight()
+
+        async def upstream():
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+
+        async def collect(chunks):
+            async for chunk in single_flight.stream("key", upstream):
+                chunks.append(chunk)
+
+        chunks = []
+        subscriber = asyncio.ensure_future(collect(chunks))
+        await asyncio.sleep(0.01)
+        pump = single_flight._streams["key"].task
+        pump.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await subscriber
+        assert pump.cancelled()
+        assert chunks == ["a"]
+
+
+@pytest.mark.unit
+def test_flight_key_keeps_inner_whitespace():
+    """Keys ignore surrounding whitespace but not indentation, content or params."""
+    base = make_flight_key("m", {"temperature": 0}, [("user", "a:\n  b: 1")])
+
+    assert base == make_flight_key("m", {"temperature": 0}, [("user", " a:\n  b: 1\n")])
+    assert base != make_flight_key("m", {"temperature": 0}, [("user", "a:\nb: 1")])
+    assert base != make_flight_key("m", {"temperature": 1}, [("user", "a:\n  b: 1")])
+    assert base != make_flight_key("m", {"temperature": 0}, [("user", "a:\n  b: 2")])
@@ -0,0 +1,164 @@
+"""
+Unit tests for SSEWriter.
+
+Tests cover frame coalescing, the frame size budget, heartbeats, error
+propagation, backpressure from a slow client and cancellation on client
+disconnect.
+"""
+
+import asyncio
+
+import orjson
+import pytest
+from app.utils.sse import (
+    HEARTBEAT,
+    ClientDisconnectedError,
+    SSEWriter,
+    encode_event,
+    latest_frame,
+)
+
+
+def decode(frame: bytes):
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    return orjson.loads(frame[6:-2])
+
+
+async def tokens(items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+@pytest.mark.unit
+class TestSSEWriter:
+    """Test SSEWriter class."""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_after_first_token(self):
+        """The first token is sent alone; a burst after it becomes one frame."""
+        writer = SSEWriter(coalesce_ms=50, heartbeat_seconds=0)
+        frames = [f async for f in writer.stream(tokens(["Hel", "lo", ", ", "world"]))]
+
+        assert [decode(f)["content"] for f in frames] == ["Hel", "lo, world"]
+        assert writer.text == "Hello, world"
+
+    @pytest.mark.asyncio
+    async def test_frame_size_budget(self):
+        """A frame is flushed once the buffer reaches the size budget."""
+        writer = SSEWriter(coalesce_ms=1000, max_frame_chars=4, heartbeat_seconds=0)
+        frames = [f async for f in writer.stream(tokens(["a", "bb", "cc", "d"]))]
+
+        assert [decode(f)["content"] for f in frames] == ["a", "bbcc", "d"]
+
+    @pytest.mark.asyncio
+    async def test_no_coalescing(self):
+        writer = SSEWriter(coalesce_ms=0, heartbeat_seconds=0)
+        frames = [f async for f in writer.stream(tokens(["a", "b", "c"]))]
+
+        assert len(frames) == 3
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_before_first_token(self):
+        """Heartbeat comments are sent while waiting for a slow first token."""
+        writer = SSEWriter(coalesce_ms=10, heartbeat_seconds=0.02)
+        frames = [f async for f in writer.stream(tokens(["late"], delay=0.07))]
+
+        assert frames[0] == HEARTBEAT
+        assert decode(frames[-1])["content"] == "late"
+
+    @pytest.mark.asyncio
+    async def test_error_flushes_buffer_then_raises(self):
+        async def failing():
+            yield "a"
+            yield "b"
+            raise RuntimeError("upstream failed")
+
+        writer = SSEWriter(coalesce_ms=1000, heartbeat_seconds=0)
+        frames = []
+        with pytest.raises(RuntimeError):
+            async for frame in writer.stream(failing()):
+                frames.append(frame)
+
+        assert [decode(f)["content"] for f in frames] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_latest_frame_keeps_newest_partial(self):
+        writer = SSEWriter(coalesce_ms=50, heartbeat_seconds=0)
+        partials = [{"response": "H"}, {"response": "He"}, {"response": "Hey"}]
+        frames = [f async for f in writer.stream(tokens(partials), payload=latest_frame)]
+
+        assert [decode(f)["data"]["response"] for f in frames] == ["H", "Hey"]
+        assert writer.last == {"response": "Hey"}
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect_cancels_source(self):
+        """A disconnect stops the source promptly and raises ClientDisconnectedError."""
+        class Request:
+            disconnected = False
+
+            async def is_disconnected(self):
+                return self.disconnected
+
+        request = Request()
+        state = {"produced": 0, "cancelled": False}
+
+        async def endless():
+            try:
+                while True:
+                    await asyncio.sleep(0.005)
+                    state["produced"] += 1
+                    yield "x"
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        writer = SSEWriter(coalesce_ms=0, heartbeat_seconds=0, disconnect_poll_ms=5)
+        with pytest.raises(ClientDisconnectedError):
+            async for _ in writer.stream(endless(), request=request):
+                if writer.frames == 3:
+                    request.disconnected = True
+
+        await asyncio.sleep(0.02)
+        assert state["cancelled"]
+        assert writer.disconnected
+        assert state["produced"] < 20
+
+    @pytest.mark.asyncio
+    async def test_slow_client_applies_backpressure(self):
+        """The source is read only a bounded number of items ahead of the client."""
+        produced = []
+
+        async def fast():
+            for i in range(1000):
+                produced.append(i)
+                yield "x"
+
+        writer = SSEWriter(coalesce_ms=0, heartbeat_seconds=0, max_queued=4)
+        frames = writer.stream(fast())
+        await frames.__anext__()
+        await asyncio.sleep(0.02)
+
+        assert len(produced) <= 4 + 2
+        rest = [frame async for frame in frames]
+        assert len(rest) == 999 and len(produced) == 1000
+
+    @pytest.mark.asyncio
+    async def test_disconnect_with_full_queue(self):
+        """A disconnect is delivered even when the read-ahead queue is full."""
+        class Request:
+            async def is_disconnected(self):
+                return True
+
+        async def endless():
+            while True:
+                yield "x"
+
+        writer = SSEWriter(coalesce_ms=0, heartbeat_seconds=0, disconnect_poll_ms=5, max_queued=2)
+        with pytest.raises(ClientDisconnectedError):
+            async for _ in writer.stream(endless(), request=Request()):
+                pass
+
+    def test_encode_event_with_id(self):
+        assert encode_event({"a": 1}, event_id="7") == b'id: 7\ndata: {"a":1}\n\n'
@@ -0,0 +1,153 @@
+"""
+Unit tests for resumable streams.
+
+Tests cover Last-Event-ID parsing, the in-memory replay buffer and its
+eviction order, resuming a running stream without regenerating it,
+ownership checks, cancellation of abandoned streams, and replay being
+opt-in.
+"""
+
+import asyncio
+
+import pytest
+from app.config import Settings
+from app.infrastructure.stream_replay import (
+    MemoryReplayBackend,
+    StreamReplay,
+    get_stream_replay,
+    parse_last_event_id,
+)
+from app.utils.sse import encode_event
+
+
+async def frames(count: int, delay: float = 0.0, started: list = None):
+    if started is not None:
+        started.append(True)
+    for i in range(count):
+        if delay:
+            await asyncio.sleep(delay)
+        yield encode_event({"content": str(i)})
+
+
+def seqs(events):
+    return [int(event.split(b"\n", 1)[0].rsplit(b":", 1)[1]) for event in events]
+
+
+@pytest.mark.unit
+class TestParseLastEventId:
+    """Test parse_last_event_id."""
+
+    def test_parses_stream_and_seq(self):
+        assert parse_last_event_id("abc123:7") == ("abc123", 7)
+
+    @pytest.mark.parametrize("value", [None, "", "abc", "abc:", ":3", "abc:x"])
+    def test_rejects_malformed(self, value):
+        assert parse_last_event_id(value) is None
+
+
+@pytest.mark.unit
+class TestMemoryReplayBackend:
+    """Test MemoryReplayBackend class."""
+
+    @pytest.mark.asyncio
+    async def test_read_after_position(self):
+        backend = MemoryReplayBackend()
+        await backend.create("s", "u1", ttl_seconds=60)
+        for seq in range(1, 6):
+            await backend.append("s", seq, b"e%d" % seq, ttl_seconds=60)
+
+        replay = await backend.read("s", after=3)
+        assert [seq for seq, _ in replay.events] == [4, 5]
+        assert replay.owner == "u1" and not replay.finished
+
+    @pytest.mark.asyncio
+    async def test_bounded_events_and_expiry(self):
+        backend = MemoryReplayBackend(max_events=3)
+        await backend.create("s", "u1", ttl_seconds=60)
+        for seq in range(1, 6):
+            await backend.append("s", seq, b"e", ttl_seconds=60)
+        assert [seq for seq, _ in (await backend.read("s", after=0)).events] == [3, 4, 5]
+
+        await backend.create("gone", "u1", ttl_seconds=0)
+        assert await backend.read("gone", after=0) is None
+
+    @pytest.mark.asyncio
+    async def test_evicts_completed_streams_before_live_ones(self):
+        backend = MemoryReplayBackend(max_streams=2)
+        await backend.create("live", "u1", ttl_seconds=60)
+        await backend.create("done", "u1", ttl_seconds=60)
+        await backend.finish("done", ttl_seconds=60)
+
+        await backend.create("new", "u1", ttl_seconds=60)
+        assert await backend.read("done", after=0) is None
+        assert await backend.read("live", after=0) is not None
+        assert backend.stats()["live_evictions"] == 0
+
+        # Every stream is live: the oldest goes, and it is counted
+        await backend.create("newer", "u1", ttl_seconds=60)
+        assert await backend.read("live", after=0) is None
+        assert backend.stats() == {"buffered_streams": 2, "live_evictions": 1}
+
+
+@pytest.mark.unit
+class TestStreamReplay:
+    """Test StreamReplay class."""
+
+    @pytest.mark.asyncio
+    async def test_resume_continues_without_regenerating(self):
+        replay = StreamReplay(MemoryReplayBackend(), heartbeat_seconds=0)
+        started = []
+        stream_id = await replay.start(frames(10, delay=0.01, started=started), owner="u1")
+
+        first = []
+        async for event in replay.subscribe(stream_id):
+            first.append(event)
+            if len(first) == 3:
+                break
+
+        resumed = await replay.resume(stream_id, after=3, owner="u1")
+        rest = [event async for event in resumed]
+
+        assert seqs(first) == [1, 2, 3]
+        assert seqs(rest) == list(range(4, 11))
+        assert len(started) == 1
+
+    @pytest.mark.asyncio
+    async def test_resume_checks_owner(self):
+        replay = StreamReplay(MemoryReplayBackend(), heartbeat_seconds=0)
+        stream_id = await replay.start(frames(2), owner="u1")
+
+        assert await replay.resume(stream_id, after=0, owner="u2") is None
+        assert await replay.resume("unknown", after=0, owner="u1") is None
+        assert replay.stats()["resume_misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_is_cancelled(self):
+        replay = StreamReplay(MemoryReplayBackend(), detach_grace_seconds=0.05, poll_interval=0.01)
+        stream_id = await replay.start(frames(1000, delay=0.01), owner="u1")
+
+        await asyncio.sleep(0.3)
+
+        assert replay.stats()["detached_cancelled"] == 1
+        assert replay.stats()["active_streams"] == 0
+        assert (await replay.backend.read(stream_id, after=0)).finished
+
+    @pytest.mark.asyncio
+    async def test_detached_stream_is_cancelled_after_grace(self):
+        replay = StreamReplay(MemoryReplayBackend(), detach_grace_seconds=0.2, poll_interval=0.01)
+        stream_id = await replay.start(frames(1000, delay=0.01), owner="u1")
+        subscriber = replay.subscribe(stream_id)
+        await subscriber.__anext__()
+
+        await asyncio.sleep(0.3)
+        await subscriber.aclose()
+        await asyncio.sleep(0.15)
+        assert replay.stats()["detached_cancelled"] == 0
+
+        await asyncio.sleep(0.15)
+        assert replay.stats()["detached_cancelled"] == 1
+
+    def test_replay_is_disabled_by_default(self, monkeypatch):
+        monkeypatch.setattr("app.infrastructure.stream_replay.get_settings", lambda: Settings())
+
+        assert get_stream_replay() is None
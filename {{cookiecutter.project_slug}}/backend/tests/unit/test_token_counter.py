@@ -0,0 +1,132 @@
+"""
+Unit tests for the token counting engine.
+
+Tests cover memoization and the LRU bound, batch encoding, chat-format
+overhead, budget fitting, and the fallback when no tokenizer loads. A
+whitespace tokenizer stands in for tiktoken (no encoding downloads).
+"""
+
+from typing import List
+
+import numpy as np
+import pytest
+from app.utils import token_counter
+from app.utils.token_counter import (
+    REPLY_PRIMING_TOKENS,
+    TOKENS_PER_MESSAGE,
+    TOKENS_PER_NAME,
+    TokenCounter,
+    encoding_for_model,
+    fit_suffix,
+)
+
+
+class WordEncoding:
+    """One token per whitespace-separated word; records what was encoded."""
+
+    def __init__(self):
+        self.encoded: List[str] = []
+        self.batches = 0
+
+    def encode_ordinary(self, text: str) -> List[int]:
+        self.encoded.append(text)
+        return list(range(len(text.split())))
+
+    def encode_ordinary_batch(self, texts: List[str]) -> List[List[int]]:
+        self.batches += 1
+        return [self.encode_ordinary(text) for text in texts]
+
+
+@pytest.mark.unit
+class TestTokenCounter:
+    """Test TokenCounter class."""
+
+    def test_counts_are_memoized(self):
+        encoding = WordEncoding()
+        counter = TokenCounter("test", encoding=encoding)
+
+        assert counter.count("one two three") == 3
+        assert counter.count("one two three") == 3
+        assert counter.count("") == 0
+
+        assert encoding.encoded == ["one two three"]
+        assert counter.stats.hits == 1 and counter.stats.misses == 1
+
+    def test_count_many_encodes_unique_misses_in_one_batch(self):
+        encoding = WordEncoding()
+        counter = TokenCounter("test", encoding=encoding)
+        counter.count("cached text")
+        texts = ["cached text"] + [f"text number {i}" for i in range(20)] * 2
+
+        counts = counter.count_many(texts)
+
+        assert isinstance(counts, np.ndarray)
+        assert counts.tolist() == [2] + [3] * 40
+        assert encoding.batches == 1
+        assert len(encoding.encoded) == 21  # each distinct text encoded once
+
+    def test_lru_is_bounded(self):
+        counter = TokenCounter("test", cache_size=3, encoding=WordEncoding())
+        counter.count_many(["a", "b", "c"])
+        counter.count("a")  # most recently used
+        counter.count("d")
+
+        assert len(counter) == 3
+        counter.count_many(["a", "c", "d"])
+        assert counter.stats.misses == 4  # "b" was evicted, the rest hit
+
+    def test_count_messages_adds_chat_overhead(self):
+        counter = TokenCounter("test", encoding=WordEncoding())
+        messages = [
+            {"role": "user", "content": "hello there", "name": "ann"},
+            {"role": "assistant", "content": [{"type": "text", "text": "hi"}],
+             "tool_calls": [{"id": "1", "function": {"name": "lookup"}}]},
+        ]
+
+        counts = counter.count_messages(messages)
+
+        assert counts[0] == 2 + 1 + 1 + TOKENS_PER_MESSAGE + TOKENS_PER_NAME
+        # Tool calls are counted as their JSON (one "word" here)
+        assert counts[1] == 1 + 1 + 1 + TOKENS_PER_MESSAGE
+
+    def test_falls_back_to_estimate_without_tokenizer(self, monkeypatch):
+        import tiktoken
+
+        def unavailable(name):
+            raise OSError("offline")
+
+        monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+        counter = TokenCounter("cl100k_base")
+
+        assert counter.count("x" * 40) == 10
+        assert counter.estimated
+
+    def test_count_tokens_in_messages_uses_model_family(self, monkeypatch):
+        class FakeModel:
+            model_name = "openai/gpt-4o-mini"
+
+        monkeypatch.setattr(
+            token_counter, "_counters", {"o200k_base": TokenCounter("o200k_base", encoding=WordEncoding())}
+        )
+        total = token_counter.count_tokens_in_messages(FakeModel(), [{"role": "user", "content": "a b"}])
+
+        assert total == 3 + TOKENS_PER_MESSAGE + REPLY_PRIMING_TOKENS
+
+
+@pytest.mark.unit
+class TestHelpers:
+    """Test encoding_for_model and fit_suffix functions."""
+
+    def test_encoding_for_model(self):
+        assert encoding_for_model("openai/gpt-4o-mini") == "o200k_base"
+        assert encoding_for_model("openai/gpt-4") == "cl100k_base"
+        assert encoding_for_model("anthropic/claude-3.5-sonnet") == "cl100k_base"
+
+    def test_fit_suffix(self):
+        counts = np.array([5, 4, 3, 2, 1])
+
+        assert fit_suffix(counts, 6) == 2  # 3 + 2 + 1
+        assert fit_suffix(counts, 5) == 3
+        assert fit_suffix(counts, 100) == 0
+        assert fit_suffix(counts, 0) == 5
+        assert fit_suffix([], 10) == 0
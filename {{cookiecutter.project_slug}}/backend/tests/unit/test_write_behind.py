@@ -0,0 +1,133 @@
+"""
+Unit tests for WriteBehindQueue.
+
+Tests cover batching by size and time, update coalescing, read-your-writes
+sync, retries, backpressure and flushing on close.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+from app.database.models.message import MessageRoleEnum
+from app.infrastructure.write_behind import (
+    PersistenceQueueFullError,
+    WriteBatch,
+    WriteBehindQueue,
+)
+
+
+class FakeDatabase:
+    """Records persisted batches; optionally fails or blocks writes."""
+
+    def __init__(self, failures: int = 0):
+        self.batches: List[WriteBatch] = []
+        self.failures = failures
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, batch: WriteBatch) -> None:
+        await self.gate.wait()
+        await asyncio.sleep(0.001)
+        if self.failures:
+            self.failures -= 1
+            raise Exception("database is locked")
+        self.batches.append(batch)
+
+    @property
+    def messages(self) -> list:
+        return [row for batch in self.batches for row in batch.messages]
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestWriteBehindQueue:
+    """Test WriteBehindQueue class."""
+
+    async def test_messages_are_batched_by_size(self):
+        """A full batch is written at once, in enqueue order."""
+        db = FakeDatabase()
+        queue = WriteBehindQueue(db, max_batch_size=4, max_wait_ms=1000)
+
+        for i in range(10):
+            await queue.add_message("c1", MessageRoleEnum.USER, f"m{i}")
+        await queue.close()
+
+        assert [len(batch.messages) for batch in db.batches] == [4, 4, 2]
+        assert [row["content"] for row in db.messages] == [f"m{i}" for i in range(10)]
+
+    async def test_partial_batch_is_written_after_window(self):
+        """A partial batch is written once the batch window elapses."""
+        db = FakeDatabase()
+        queue = WriteBehindQueue(db, max_batch_size=100, max_wait_ms=10)
+
+        message_id = await queue.add_message("c1", MessageRoleEnum.USER, "hello", token_count=1)
+        await asyncio.sleep(0.05)
+
+        assert db.messages[0]["id"] == message_id
+        assert db.messages[0]["token_count"] == 1
+        await queue.close()
+
+    async def test_updates_are_coalesced_per_row(self):
+        """Repeated updates of one conversation become one update with the latest values."""
+        db = FakeDatabase()
+        queue = WriteBehindQueue(db, max_wait_ms=1000)
+
+        await queue.update_conversation("c1", last_message_at=1)
+        await queue.update_conversation("c1", last_message_at=2, title="Hello")
+        await queue.close()
+
+        assert db.batches[0].conversations == {"c1": {"last_message_at": 2, "title": "Hello"}}
+        assert queue.stats()["coalesced_updates"] == 1
+
+    async def test_sync_waits_for_conversation_writes(self):
+        """sync() flushes immediately and returns once the conversation's writes are committed."""
+        db = FakeDatabase()
+        queue = WriteBehindQueue(db, max_wait_ms=10_000)
+
+        await queue.add_message("c1", MessageRoleEnum.USER, "hello")
+        await asyncio.wait_for(queue.sync("c1"), timeout=1)
+
+        assert [row["content"] for row in db.messages] == ["hello"]
+        await queue.close()
+
+    async def test_failed_batches_are_retried(self):
+        """A failed batch is retried and written once the database recovers."""
+        db = FakeDatabase(failures=2)
+        queue = WriteBehindQueue(db, max_wait_ms=1, max_retries=3, retry_delay_ms=1)
+
+        await queue.add_message("c1", MessageRoleEnum.USER, "hello")
+        await queue.close()
+
+        assert len(db.messages) == 1
+        assert queue.stats()["failed_batches"] == 2
+        assert queue.stats()["dropped_writes"] == 0
+
+    async def test_backpressure_rejects_when_full(self):
+        """Enqueueing waits for space and fails after the enqueue timeout."""
+        db = FakeDatabase()
+        db.gate.clear()
+        queue = WriteBehindQueue(db, max_wait_ms=1, max_pending=2, enqueue_timeout_seconds=0.05)
+
+        await queue.add_message("c1", MessageRoleEnum.USER, "one")
+        await queue.add_message("c1", MessageRoleEnum.USER, "two")
+        with pytest.raises(PersistenceQueueFullError):
+            await queue.add_message("c1", MessageRoleEnum.USER, "three")
+
+        db.gate.set()
+        await queue.add_message("c1", MessageRoleEnum.USER, "four")
+        await queue.close()
+
+        assert [row["content"] for row in db.messages] == ["one", "two", "four"]
+        assert queue.stats()["rejected_writes"] == 1
+
+    async def test_disabled_queue_writes_inline(self):
+        """With write-behind disabled every write is persisted before returning."""
+        db = FakeDatabase()
+        queue = WriteBehindQueue(db, enabled=False)
+
+        await queue.add_message("c1", MessageRoleEnum.USER, "hello")
+        await queue.update_conversation("c1", title="Hello")
+
+        assert len(db.batches) == 2
+        assert queue.stats()["pending"] == 0